@@ -23,7 +23,12 @@ from typing import Any, Optional, Union
 import yaml
 from eth_typing.evm import ChecksumAddress
 from hexbytes.main import HexBytes
-from web3.auto import w3 as web3
+
+
+def _eth_account() -> Any:
+    # importing eth_account is expensive, only do so when keys are actually used
+    from eth_account import Account as EthAccount
+    return EthAccount
 
 
 class Account(object):
@@ -41,7 +46,7 @@ class Account(object):
             raise ValueError('Type not supported')
 
         self._name = name
-        self._wallet_address: ChecksumAddress = web3.eth.account.from_key(wallet_private_key).address
+        self._wallet_address: ChecksumAddress = _eth_account().from_key(wallet_private_key).address
 
     @property
     def name(self) -> str:
@@ -101,9 +106,9 @@ class AccountFile(object):
                 wallet_private_key=data['accounts']['buyer']['privateKey']
             )
         else:
-            self._operator = Account(name='Operator', wallet_private_key=web3.eth.account.create().privateKey)
-            self._seller = Account(name='Seller', wallet_private_key=web3.eth.account.create().privateKey)
-            self._buyer = Account(name='Buyer', wallet_private_key=web3.eth.account.create().privateKey)
+            self._operator = Account(name='Operator', wallet_private_key=_eth_account().create().privateKey)
+            self._seller = Account(name='Seller', wallet_private_key=_eth_account().create().privateKey)
+            self._buyer = Account(name='Buyer', wallet_private_key=_eth_account().create().privateKey)
             self._path = self.get_default_path()
             self.write()
 
@@ -0,0 +1,486 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark suite for measuring the performance of the simulator reproducibly.
+
+Micro-benchmarks time single building blocks (merkle trees, FairSwap encoding, xor, data generation, aggregation and
+serialization of results), macro-benchmarks complete simulations of the registered protocols on PyEVM and renderings of
+the registered renderers. Results are written as JSON reports, which can be compared against a saved baseline report.
+"""
+
+import fnmatch
+import functools
+import inspect
+import io
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Generator, List, NamedTuple, Optional, Sequence
+
+from bdtsim.account import Account
+from bdtsim.account_related_diff_collection import FundsDiffCollection, ItemShareCollection
+from bdtsim.bulk_manifest import bdtsim_version
+from bdtsim.data_provider import DataProviderManager
+from bdtsim.environment import EnvironmentManager
+from bdtsim.protocol import ProtocolManager
+from bdtsim.protocol_path import Choice
+from bdtsim.renderer import RendererManager
+from bdtsim.simulation_result import ResultNode, SimulationResult, SimulationResultSerializer, \
+    TransactionLogCollection, TransactionLogEntry, TransactionLogList
+from bdtsim.simulation_result_file import SimulationResultFileReader, SimulationResultFileSerializer
+
+
+logger = logging.getLogger(__name__)
+
+REPORT_FORMAT_VERSION = 1
+
+GROUP_MICRO = 'micro'
+GROUP_MACRO = 'macro'
+GROUPS = (GROUP_MICRO, GROUP_MACRO)
+
+DEFAULT_ROUNDS = 5
+DEFAULT_WARMUP = 1
+DEFAULT_MIN_TIME = 0.1
+DEFAULT_THRESHOLD = 0.1
+DEFAULT_SIZES = (4096, 65536)
+DEFAULT_SLICES_COUNTS = (8, 64)
+DEFAULT_TREE_DEPTH = 8
+
+STATUS_OK = 'ok'
+STATUS_SLOWER = 'slower'
+STATUS_FASTER = 'faster'
+STATUS_NEW = 'new'
+STATUS_FAILED = 'failed'
+
+# fixed accounts, so that benchmarks neither depend on nor modify the user's account file
+BENCHMARK_OPERATOR = Account('Operator', '0x' + '11' * 32)
+BENCHMARK_SELLER = Account('Seller', '0x' + '22' * 32)
+BENCHMARK_BUYER = Account('Buyer', '0x' + '33' * 32)
+
+
+class Benchmark(NamedTuple):
+    """Benchmark definition. `setup` prepares everything not to be measured and returns the function to be timed."""
+    name: str
+    group: str
+    setup: Callable[[], Callable[[], Any]]
+    parameters: Dict[str, Any]
+
+
+class BenchmarkResult(NamedTuple):
+    """Timings (seconds per call) of a benchmark. If the benchmark failed, error is set and the timings are 0."""
+    name: str
+    group: str
+    parameters: Dict[str, Any]
+    rounds: int
+    loops: int
+    min: float
+    median: float
+    mean: float
+    stdev: float
+    error: Optional[str] = None
+
+
+class BenchmarkComparison(NamedTuple):
+    name: str
+    status: str
+    baseline: Optional[float]
+    current: Optional[float]
+    ratio: Optional[float]
+
+
+def benchmark_name(prefix: str, parameters: Dict[str, Any]) -> str:
+    if len(parameters) == 0:
+        return prefix
+    return '%s[%s]' % (prefix, ','.join('%s=%s' % (key, str(value)) for key, value in parameters.items()))
+
+
+def accepts_parameter(cls: Any, parameter_name: str) -> bool:
+    try:
+        return parameter_name in inspect.signature(cls.__init__).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def create_synthetic_result(depth: int = DEFAULT_TREE_DEPTH, transactions: int = 2) -> SimulationResult:
+    """Create a simulation result with a complete binary execution result tree, independent of any protocol.
+
+    Decisions alternate between seller and buyer, every node holds a transaction list with the given number of
+    transactions.
+
+    Args:
+        depth (int): Depth of the execution result tree (the tree has 2^depth final nodes)
+        transactions (int): Number of transactions per node
+
+    Returns:
+        SimulationResult: Simulation result
+    """
+    simulation_result = SimulationResult(BENCHMARK_OPERATOR, BENCHMARK_SELLER, BENCHMARK_BUYER)
+    choices = [Choice(BENCHMARK_SELLER if level % 2 == 0 else BENCHMARK_BUYER, ('honest', 'cheat'),
+                      description='decision %i' % level) for level in range(depth)]
+
+    def tx(account: Account, index: int) -> TransactionLogEntry:
+        other = BENCHMARK_BUYER if account == BENCHMARK_SELLER else BENCHMARK_SELLER
+        return TransactionLogEntry(
+            account=account,
+            tx_dict={'gasPrice': 1000000000},
+            tx_receipt={'gasUsed': 21000 + 1000 * index},
+            description='transaction %i' % index,
+            funds_diff_collection=FundsDiffCollection({account: -1000 * index, other: 1000 * index}),
+            item_share_collection=ItemShareCollection({account: -index, other: index})
+        )
+
+    def populate(node: ResultNode, level: int) -> None:
+        tx_log_list = TransactionLogList()
+        for index in range(transactions):
+            tx_log_list.append(tx(BENCHMARK_SELLER if (level + index) % 2 == 0 else BENCHMARK_BUYER, index))
+        node.tx_collection.append(tx_log_list)
+        if level < depth:
+            for outcome in choices[level].options:
+                populate(node.child(choices[level].choose(outcome, float(level))), level + 1)
+
+    simulation_result.preparation_transactions.append(tx(BENCHMARK_OPERATOR, 0))
+    populate(simulation_result.execution_result_root, 0)
+    return simulation_result
+
+
+def get_micro_benchmarks(sizes: Sequence[int] = DEFAULT_SIZES, slices_counts: Sequence[int] = DEFAULT_SLICES_COUNTS,
+                         depth: int = DEFAULT_TREE_DEPTH) -> List[Benchmark]:
+    # imported here since the FairSwap implementation is only needed when running the benchmarks
+    from bdtsim.protocol.fairswap import encoding, merkle
+    from bdtsim.util.bytes import generate_bytes
+    from bdtsim.util.xor import xor_crypt
+
+    benchmarks: List[Benchmark] = []
+    key = generate_bytes(32, seed=42)
+
+    def micro(prefix: str, setup: Callable[..., Callable[[], Any]], **parameters: Any) -> None:
+        benchmarks.append(Benchmark(benchmark_name(prefix, parameters), GROUP_MICRO,
+                                    lambda: setup(**parameters), parameters))
+
+    def merkle_build(size: int, slices: int) -> Callable[[], Any]:
+        data = generate_bytes(size, seed=42)
+        return lambda: merkle.from_bytes(data, slices).digest
+
+    def merkle_proof(size: int, slices: int) -> Callable[[], Any]:
+        tree = merkle.from_bytes(generate_bytes(size, seed=42), slices)
+        leaf = tree.leaves[-1]
+
+        def run() -> bool:
+            return merkle.MerkleTreeNode.validate_proof(tree.digest, leaf, slices - 1, tree.get_proof(leaf))
+
+        return run
+
+    def encoding_encode(size: int, slices: int) -> Callable[[], Any]:
+        tree = merkle.from_bytes(generate_bytes(size, seed=42), slices)
+        return lambda: encoding.encode(tree, key).digest
+
+    def encoding_decode(size: int, slices: int) -> Callable[[], Any]:
+        tree_enc = encoding.encode(merkle.from_bytes(generate_bytes(size, seed=42), slices), key)
+        return lambda: encoding.decode(tree_enc, key)
+
+    def xor(size: int) -> Callable[[], Any]:
+        data = generate_bytes(size, seed=42)
+        return lambda: xor_crypt(data, key)
+
+    def random_data(size: int) -> Callable[[], Any]:
+        return lambda: DataProviderManager.instantiate('RandomDataProvider', size=size).file_pointer
+
+    def all_nodes(simulation_result: SimulationResult) -> List[ResultNode]:
+        nodes = [simulation_result.execution_result_root]
+        for node in nodes:
+            nodes += node.children.values()
+        return nodes
+
+    def aggregation_lists(depth: int) -> Callable[[], Any]:
+        tx_log_lists = [tx_log_list for node in all_nodes(create_synthetic_result(depth))
+                        for tx_log_list in node.tx_collection]
+        return lambda: [TransactionLogList.Aggregation(tx_log_list) for tx_log_list in tx_log_lists]
+
+    def aggregation_collections(depth: int) -> Callable[[], Any]:
+        tx_collections = [node.tx_collection for node in all_nodes(create_synthetic_result(depth))]
+        return lambda: [TransactionLogCollection.Aggregation(tx_collection) for tx_collection in tx_collections]
+
+    def aggregation_summary(depth: int) -> Callable[[], Any]:
+        final_nodes = create_synthetic_result(depth).execution_result_root.final_nodes
+        return lambda: [final_node.aggregation_summary for final_node in final_nodes]
+
+    def pickle_serialize(depth: int) -> Callable[[], Any]:
+        simulation_result = create_synthetic_result(depth)
+        serializer = SimulationResultSerializer()
+        return lambda: serializer.serialize(simulation_result)
+
+    def pickle_unserialize(depth: int) -> Callable[[], Any]:
+        serializer = SimulationResultSerializer()
+        data = serializer.serialize(create_synthetic_result(depth))
+        return lambda: serializer.unserialize(data)
+
+    def columnar_serialize(depth: int) -> Callable[[], Any]:
+        simulation_result = create_synthetic_result(depth)
+        serializer = SimulationResultFileSerializer()
+        return lambda: serializer.serialize(simulation_result)
+
+    def columnar_load(depth: int) -> Callable[[], Any]:
+        data = SimulationResultFileSerializer().serialize(create_synthetic_result(depth))
+        return lambda: SimulationResultFileReader(data).load()
+
+    def columnar_load_summary(depth: int) -> Callable[[], Any]:
+        data = SimulationResultFileSerializer().serialize(create_synthetic_result(depth))
+        return lambda: SimulationResultFileReader(data).load_summary()
+
+    for prefix, setup in (('merkle.build', merkle_build), ('merkle.proof', merkle_proof),
+                          ('encoding.encode', encoding_encode), ('encoding.decode', encoding_decode)):
+        for size in sizes:
+            for slices in slices_counts:
+                micro(prefix, setup, size=size, slices=slices)
+    for size in sizes:
+        micro('xor', xor, size=size)
+    for size in sizes:
+        micro('data.random', random_data, size=size)
+    micro('aggregation.list', aggregation_lists, depth=depth)
+    micro('aggregation.collection', aggregation_collections, depth=depth)
+    micro('aggregation.summary', aggregation_summary, depth=depth)
+    micro('serialization.pickle.serialize', pickle_serialize, depth=depth)
+    micro('serialization.pickle.unserialize', pickle_unserialize, depth=depth)
+    micro('serialization.columnar.serialize', columnar_serialize, depth=depth)
+    micro('serialization.columnar.load', columnar_load, depth=depth)
+    micro('serialization.columnar.load_summary', columnar_load_summary, depth=depth)
+    return benchmarks
+
+
+def get_macro_benchmarks(sizes: Sequence[int] = DEFAULT_SIZES, slices_counts: Sequence[int] = DEFAULT_SLICES_COUNTS,
+                         depth: int = DEFAULT_TREE_DEPTH) -> List[Benchmark]:
+    benchmarks: List[Benchmark] = []
+
+    def simulation(protocol_name: str, size: int, slices: Optional[int] = None) -> Callable[[], Any]:
+        from bdtsim.simulation import Simulation
+        protocol_parameters = {} if slices is None else {'slices_count': slices}
+        data_provider = DataProviderManager.instantiate('RandomDataProvider', size=size)
+
+        def run() -> SimulationResult:
+            environment = EnvironmentManager.instantiate('PyEVM', operator=BENCHMARK_OPERATOR,
+                                                         seller=BENCHMARK_SELLER, buyer=BENCHMARK_BUYER)
+            return Simulation(
+                protocol=ProtocolManager.instantiate(protocol_name, **protocol_parameters),
+                environment=environment,
+                data_provider=data_provider,
+                operator=BENCHMARK_OPERATOR,
+                seller=BENCHMARK_SELLER,
+                buyer=BENCHMARK_BUYER
+            ).run()
+
+        return run
+
+    def rendering(renderer_name: str, depth: int) -> Callable[[], Any]:
+        simulation_result = create_synthetic_result(depth)
+
+        def run() -> None:
+            renderer = RendererManager.instantiate(renderer_name)
+            if renderer.summary_only:
+                renderer.render_summary(simulation_result.summary)
+            else:
+                renderer.render_to(simulation_result, io.BytesIO())
+
+        return run
+
+    def add(prefix: str, setup: Callable[..., Callable[[], Any]], **parameters: Any) -> None:
+        benchmarks.append(Benchmark(benchmark_name(prefix, parameters), GROUP_MACRO,
+                                    lambda: setup(**parameters), parameters))
+
+    for protocol_name, registration in ProtocolManager.protocols.items():
+        try:
+            slices_option = accepts_parameter(registration.cls, 'slices_count')
+        except Exception as e:
+            logger.warning('skipping simulation benchmarks of %s: %s' % (protocol_name, str(e)))
+            continue
+        for size in sizes:
+            if slices_option:
+                for slices in slices_counts:
+                    add('simulation.%s' % protocol_name, functools.partial(simulation, protocol_name), size=size,
+                        slices=slices)
+            else:
+                add('simulation.%s' % protocol_name, functools.partial(simulation, protocol_name), size=size)
+    for renderer_name in RendererManager.renderers.keys():
+        add('render.%s' % renderer_name, functools.partial(rendering, renderer_name), depth=depth)
+    return benchmarks
+
+
+def get_benchmarks(groups: Sequence[str] = GROUPS, patterns: Optional[Sequence[str]] = None,
+                   sizes: Sequence[int] = DEFAULT_SIZES, slices_counts: Sequence[int] = DEFAULT_SLICES_COUNTS,
+                   depth: int = DEFAULT_TREE_DEPTH) -> List[Benchmark]:
+    """Get the benchmarks of the given groups, optionally limited to names matching any of the given patterns.
+
+    Args:
+        groups (Sequence[str]): Benchmark groups (`micro`, `macro`)
+        patterns (Optional[Sequence[str]]): Shell-style wildcard patterns (e.g. `merkle.*`, `simulation.FairSwap*`)
+        sizes (Sequence[int]): Data sizes (in bytes) used for benchmarks depending on the data size
+        slices_counts (Sequence[int]): Slice counts used for benchmarks depending on the number of slices
+        depth (int): Depth of the synthetic execution result tree used for result processing benchmarks
+
+    Returns:
+        List[Benchmark]: Matching benchmarks
+    """
+    benchmarks: List[Benchmark] = []
+    if GROUP_MICRO in groups:
+        benchmarks += get_micro_benchmarks(sizes, slices_counts, depth)
+    if GROUP_MACRO in groups:
+        benchmarks += get_macro_benchmarks(sizes, slices_counts, depth)
+    if patterns:
+        benchmarks = [benchmark for benchmark in benchmarks
+                      if any(fnmatch.fnmatchcase(benchmark.name, pattern) for pattern in patterns)]
+    return benchmarks
+
+
+def _time(func: Callable[[], Any], loops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(loops):
+        func()
+    return time.perf_counter() - start
+
+
+def _calibrate(func: Callable[[], Any], min_time: float) -> int:
+    # like timeit's autorange: increase the number of loops (1, 2, 5, 10, 20, ...) until a round takes min_time
+    base = 1
+    while True:
+        for loops in (base, 2 * base, 5 * base):
+            if _time(func, loops) >= min_time:
+                return loops
+        base *= 10
+
+
+def run_benchmark(benchmark: Benchmark, rounds: int = DEFAULT_ROUNDS, warmup: int = DEFAULT_WARMUP,
+                  min_time: float = DEFAULT_MIN_TIME) -> BenchmarkResult:
+    """Run a benchmark.
+
+    Micro-benchmarks call the timed function repeatedly per round, so that a round takes at least `min_time` seconds.
+    Macro-benchmarks call it once per round.
+
+    Args:
+        benchmark (Benchmark): Benchmark to be run
+        rounds (int): Number of measured rounds
+        warmup (int): Number of calls before measuring (e.g. for filling caches of compiled contracts)
+        min_time (float): Minimum duration of a micro-benchmark round in seconds
+
+    Returns:
+        BenchmarkResult: Timings per call, or the error if the benchmark failed
+    """
+    try:
+        func = benchmark.setup()
+        for _ in range(warmup):
+            func()
+        loops = _calibrate(func, min_time) if benchmark.group == GROUP_MICRO else 1
+        timings = [_time(func, loops) / loops for _ in range(rounds)]
+    except Exception as e:
+        logger.warning('benchmark %s failed: %s' % (benchmark.name, str(e)))
+        return BenchmarkResult(benchmark.name, benchmark.group, benchmark.parameters, 0, 0, 0.0, 0.0, 0.0, 0.0,
+                               '%s: %s' % (type(e).__name__, str(e)))
+    return BenchmarkResult(
+        name=benchmark.name,
+        group=benchmark.group,
+        parameters=benchmark.parameters,
+        rounds=rounds,
+        loops=loops,
+        min=min(timings),
+        median=statistics.median(timings),
+        mean=statistics.mean(timings),
+        stdev=statistics.stdev(timings) if len(timings) > 1 else 0.0
+    )
+
+
+def run_benchmarks(benchmarks: Sequence[Benchmark], rounds: int = DEFAULT_ROUNDS, warmup: int = DEFAULT_WARMUP,
+                   min_time: float = DEFAULT_MIN_TIME) -> Generator[BenchmarkResult, None, None]:
+    for benchmark in benchmarks:
+        logger.info('running benchmark %s' % benchmark.name)
+        yield run_benchmark(benchmark, rounds, warmup, min_time)
+
+
+def get_environment_info() -> Dict[str, Any]:
+    """Information about the machine and software versions, stored in reports for judging comparability."""
+    return {
+        'bdtsim_version': bdtsim_version(),
+        'python_version': platform.python_version(),
+        'python_implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'argv': sys.argv
+    }
+
+
+def create_report(results: Sequence[BenchmarkResult], parameters: Optional[Dict[str, Any]] = None
+                  ) -> Dict[str, Any]:
+    return {
+        'format_version': REPORT_FORMAT_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(),
+        'environment': get_environment_info(),
+        'parameters': parameters or {},
+        'benchmarks': [result._asdict() for result in results]
+    }
+
+
+def get_report_results(report: Dict[str, Any]) -> List[BenchmarkResult]:
+    if report.get('format_version') != REPORT_FORMAT_VERSION:
+        raise ValueError('unsupported benchmark report format version %s' % str(report.get('format_version')))
+    return [BenchmarkResult(**result) for result in report.get('benchmarks', [])]
+
+
+def compare_results(results: Sequence[BenchmarkResult], baseline: Sequence[BenchmarkResult],
+                    threshold: float = DEFAULT_THRESHOLD) -> List[BenchmarkComparison]:
+    """Compare benchmark results against baseline results by their median timings.
+
+    Args:
+        results (Sequence[BenchmarkResult]): Current results
+        baseline (Sequence[BenchmarkResult]): Baseline results, benchmarks not contained in results are ignored
+        threshold (float): Relative change of the median timing from which on a benchmark is considered slower
+            (`current > baseline * (1 + threshold)`) or faster (`current * (1 + threshold) < baseline`)
+
+    Returns:
+        List[BenchmarkComparison]: Comparison per current result
+    """
+    baseline_results = {result.name: result for result in baseline}
+    comparisons: List[BenchmarkComparison] = []
+    for result in results:
+        baseline_result = baseline_results.get(result.name)
+        current = None if result.error is not None else result.median
+        reference = None if baseline_result is None or baseline_result.error is not None else baseline_result.median
+        if current is None:
+            comparisons.append(BenchmarkComparison(result.name, STATUS_FAILED, reference, None, None))
+            continue
+        if reference is None:
+            comparisons.append(BenchmarkComparison(result.name, STATUS_NEW, None, current, None))
+            continue
+        ratio = current / reference if reference > 0 else float('inf')
+        if ratio > 1 + threshold:
+            status = STATUS_SLOWER
+        elif ratio * (1 + threshold) < 1:
+            status = STATUS_FASTER
+        else:
+            status = STATUS_OK
+        comparisons.append(BenchmarkComparison(result.name, status, reference, current, ratio))
+    return comparisons
+
+
+def format_seconds(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return '-'
+    for factor, unit in ((1, 's'), (1e-3, 'ms'), (1e-6, 'us')):
+        if seconds >= factor:
+            return '%.3f %s' % (seconds / factor, unit)
+    return '%.1f ns' % (seconds / 1e-9)
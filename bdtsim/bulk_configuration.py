@@ -0,0 +1,205 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Helpers for bulk configurations: parameter sweeps and canonical simulation configurations.
+
+Any value of a simulation configuration can be replaced by a sweep specification, which turns it into a sweep axis:
+
+  * `{range: [start, stop, step]}`: arithmetic series from start to stop (inclusive), step defaults to 1
+  * `{geom: [start, stop, factor]}`: geometric series from start to stop (inclusive)
+  * `{values: [a, b, c]}`: explicit list of values
+
+By default, all axes of a simulation configuration are combined (cartesian product). Axes with the same `zip` group
+(e.g. `{geom: [4, 1024, 2], zip: scale}`) are iterated together and need to have the same length.
+Each expanded configuration carries the values of its sweep axes in the `sweep` entry, indexed by the dotted path of
+the axis (e.g. `data_provider.parameters.size`).
+"""
+
+import copy
+import hashlib
+import itertools
+import json
+import logging
+from typing import Any, Dict, Generator, Iterable, List, Tuple, Union
+
+from bdtsim.protocol import DEFAULT_ASSET_PRICE
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENVIRONMENT_CONFIGURATION: Dict[str, Any] = {'name': 'PyEVM'}
+DEFAULT_DATA_PROVIDER_CONFIGURATION: Dict[str, Any] = {'name': 'RandomDataProvider'}
+
+SWEEP_TYPES = ('range', 'geom', 'values')
+SWEEP_KEYS = SWEEP_TYPES + ('zip', )
+
+Number = Union[int, float]
+
+
+def is_sweep_specification(value: Any) -> bool:
+    return (isinstance(value, dict)
+            and len(set(value.keys()).intersection(SWEEP_TYPES)) == 1
+            and set(value.keys()).issubset(SWEEP_KEYS))
+
+
+def sweep_values(specification: Dict[str, Any]) -> List[Any]:
+    """Get the values of a sweep specification.
+
+    Args:
+        specification (Dict[str, Any]): sweep specification (see module documentation)
+
+    Returns:
+        List[Any]: values of the sweep axis
+    """
+    if 'values' in specification:
+        values = specification['values']
+        if not isinstance(values, list) or len(values) == 0:
+            raise ValueError('values sweep needs a non-empty list of values')
+        return list(values)
+    elif 'range' in specification:
+        start, stop, step = _sweep_arguments('range', specification['range'], 1)
+        if step == 0:
+            raise ValueError('range sweep step must not be 0')
+        count = int((stop - start) // step) + 1
+        return [start + i * step for i in range(max(count, 0))]
+    elif 'geom' in specification:
+        start, stop, factor = _sweep_arguments('geom', specification['geom'], None)
+        if start <= 0 or factor <= 1:
+            raise ValueError('geom sweep needs a positive start and a factor greater than 1')
+        series: List[Number] = []
+        value = start
+        while value <= stop:
+            series.append(value)
+            value = value * factor
+        return series
+    else:
+        raise ValueError('unsupported sweep specification %s' % str(specification))
+
+
+def _sweep_arguments(sweep_type: str, arguments: Any, default_third: Any) -> Tuple[Number, Number, Number]:
+    if (not isinstance(arguments, list) or not 2 <= len(arguments) <= 3
+            or (len(arguments) == 2 and default_third is None)):
+        raise ValueError('invalid arguments for %s sweep: %s' % (sweep_type, str(arguments)))
+    for argument in arguments:
+        if isinstance(argument, bool) or not isinstance(argument, (int, float)):
+            raise ValueError('%s sweep arguments need to be numbers' % sweep_type)
+    if len(arguments) == 2:
+        return arguments[0], arguments[1], default_third
+    return arguments[0], arguments[1], arguments[2]
+
+
+def find_sweep_axes(configuration: Any,
+                    path: Tuple[str, ...] = ()) -> Generator[Tuple[Tuple[str, ...], Dict[str, Any]], None, None]:
+    """Find all sweep specifications (in document order) and yield them together with their path."""
+    if is_sweep_specification(configuration):
+        yield path, configuration
+    elif isinstance(configuration, dict):
+        for key, value in configuration.items():
+            yield from find_sweep_axes(value, path + (str(key), ))
+
+
+def expand_simulation_configuration(simulation_configuration: Dict[str, Any]
+                                    ) -> Generator[Dict[str, Any], None, None]:
+    """Lazily expand all sweep axes of a simulation configuration.
+
+    Args:
+        simulation_configuration (Dict[str, Any]): simulation configuration, possibly containing sweep specifications
+
+    Returns:
+        Generator[Dict[str, Any], None, None]: expanded simulation configurations
+    """
+    axes = list(find_sweep_axes(simulation_configuration))
+    if len(axes) == 0:
+        yield simulation_configuration
+        return
+
+    # axes sharing a zip group are iterated together, all other axes form a group on their own
+    groups: Dict[Any, List[Tuple[Tuple[str, ...], List[Any]]]] = {}
+    for path, specification in axes:
+        group_key = ('zip', specification['zip']) if 'zip' in specification else ('axis', path)
+        groups.setdefault(group_key, []).append((path, sweep_values(specification)))
+    for group_key, group_axes in groups.items():
+        if len(set(len(values) for _, values in group_axes)) != 1:
+            raise ValueError('zipped sweep axes %s have different lengths' % ', '.join(
+                '.'.join(path) for path, _ in group_axes
+            ))
+
+    for indices in itertools.product(*[range(len(group_axes[0][1])) for group_axes in groups.values()]):
+        expanded = copy.deepcopy(simulation_configuration)
+        sweep: Dict[str, Any] = {}
+        for index, group_axes in zip(indices, groups.values()):
+            for path, values in group_axes:
+                target = expanded
+                for key in path[:-1]:
+                    target = target[key]
+                target[path[-1]] = values[index]
+                sweep['.'.join(path)] = values[index]
+        expanded['sweep'] = sweep
+        yield expanded
+
+
+def expand_simulation_configurations(simulation_configurations: Iterable[Dict[str, Any]]
+                                     ) -> Generator[Dict[str, Any], None, None]:
+    """Lazily expand the sweep axes of all simulation configurations, skipping duplicates.
+
+    Args:
+        simulation_configurations (Iterable[Dict[str, Any]]): simulation configurations of a bulk configuration
+
+    Returns:
+        Generator[Dict[str, Any], None, None]: expanded, unique simulation configurations
+    """
+    seen = set()
+    for simulation_configuration in simulation_configurations:
+        for expanded in expand_simulation_configuration(simulation_configuration):
+            configuration_hash = canonical_hash(expanded)
+            if configuration_hash in seen:
+                logger.info('skipping duplicate simulation configuration %s' % str(expanded))
+                continue
+            seen.add(configuration_hash)
+            yield expanded
+
+
+def canonical_configuration(simulation_configuration: Dict[str, Any]) -> Dict[str, Any]:
+    """Get the canonical form of a simulation configuration.
+
+    Defaults are filled in, while descriptions, sweep information and unset values are removed, so that all
+    configurations resulting in the same simulation have the same canonical form.
+    """
+    canonical: Dict[str, Any] = {}
+    for key, value in simulation_configuration.items():
+        if key in ('description', 'sweep') or value is None:
+            continue
+        canonical[key] = copy.deepcopy(value)
+    for component, default in (('environment', DEFAULT_ENVIRONMENT_CONFIGURATION),
+                               ('data_provider', DEFAULT_DATA_PROVIDER_CONFIGURATION)):
+        if canonical.get(component) is None:
+            canonical[component] = copy.deepcopy(default)
+    for component in 'protocol', 'environment', 'data_provider':
+        component_configuration = canonical.get(component)
+        if isinstance(component_configuration, dict):
+            component_configuration.pop('description', None)
+            if component_configuration.get('parameters') is None:
+                component_configuration['parameters'] = {}
+    canonical.setdefault('price', DEFAULT_ASSET_PRICE)
+    return canonical
+
+
+def canonical_hash(simulation_configuration: Dict[str, Any]) -> str:
+    """SHA-256 hash of the canonical form of a simulation configuration"""
+    return hashlib.sha256(json.dumps(
+        canonical_configuration(simulation_configuration), sort_keys=True, separators=(',', ':'), default=str
+    ).encode('utf-8')).hexdigest()
@@ -0,0 +1,208 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Job keys and manifests for incremental bulk executions.
+
+Each output of a bulk execution (simulation result or rendering) is accompanied by a manifest, stored in the
+`.bdtsim-manifest` directory of the target directory. The manifest records the job key, a hash over everything the
+output depends on, and whether the job succeeded. A job is up to date if its output exists and its manifest reports
+success for the current job key.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, Iterator, Optional
+
+from bdtsim.bulk_configuration import canonical_configuration
+from bdtsim.contract import SOLC_DEFAULT_VERSION
+from bdtsim.protocol import ProtocolManager
+
+
+MANIFEST_DIRECTORY = '.bdtsim-manifest'
+
+STATUS_SUCCESS = 'success'
+STATUS_FAILED = 'failed'
+STATUS_MISSING = 'missing'
+
+_protocol_source_hashes: Dict[str, str] = {}
+
+
+def bdtsim_version() -> str:
+    try:
+        import pkg_resources  # type: ignore
+        return str(pkg_resources.get_distribution('bdtsim').version)
+    except Exception:
+        return 'unknown'
+
+
+def protocol_source_hash(protocol_name: str) -> str:
+    """Hash over the contract sources and the implementation of a protocol.
+
+    All Solidity sources (including templates) and Python modules within the package of the protocol implementation
+    are hashed. Since the solc version used for compiling a protocol's contracts is pinned in its implementation,
+    changing the solc version changes this hash as well.
+
+    Args:
+        protocol_name (str): Name of the protocol as registered at the ProtocolManager
+
+    Returns:
+        str: SHA-256 hash of the protocol sources
+    """
+    source_hash = _protocol_source_hashes.get(protocol_name)
+    if source_hash is not None:
+        return source_hash
+
+    registration = ProtocolManager.protocols.get(protocol_name)
+    if registration is None:
+        # the simulation will fail and report the unknown protocol
+        return ''
+    protocol_directory = os.path.dirname(inspect.getfile(registration.cls))
+    sha256 = hashlib.sha256()
+    for directory, directories, filenames in os.walk(protocol_directory):
+        directories.sort()
+        for filename in sorted(filenames):
+            if filename.endswith('.sol') or filename.endswith('.py'):
+                path = os.path.join(directory, filename)
+                sha256.update(os.path.relpath(path, protocol_directory).encode('utf-8'))
+                with open(path, 'rb') as fp:
+                    sha256.update(hashlib.sha256(fp.read()).digest())
+    source_hash = sha256.hexdigest()
+    _protocol_source_hashes[protocol_name] = source_hash
+    return source_hash
+
+
+def _hash(data: Any) -> str:
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+    ).hexdigest()
+
+
+def simulation_job_key(simulation_configuration: Dict[str, Any],
+                       output_options: Optional[Dict[str, Any]] = None) -> str:
+    """Key of a simulation job: hash of the canonical configuration, bdtsim version, protocol sources, solc version
+    and the options of the result file format.
+
+    Args:
+        simulation_configuration (Dict[str, Any]): Simulation configuration
+        output_options (Optional[Dict[str, Any]]): Options of the result file format (format, compression, encoding).
+            Results written with other options are not up to date, since renderers rely on the result file format.
+
+    Returns:
+        str: Job key
+    """
+    return _hash({
+        'configuration': canonical_configuration(simulation_configuration),
+        'bdtsim': bdtsim_version(),
+        'protocol_sources': protocol_source_hash(simulation_configuration.get('protocol', {}).get('name', '')),
+        'solc': SOLC_DEFAULT_VERSION,
+        'output': output_options or {}
+    })
+
+
+def renderer_job_key(simulation_key: str, renderer_configuration: Dict[str, Any]) -> str:
+    """Key of a rendering job: hash of the simulation job key and the renderer configuration.
+
+    Args:
+        simulation_key (str): Key of the simulation job providing the simulation result
+        renderer_configuration (Dict[str, Any]): Renderer configuration
+
+    Returns:
+        str: Job key
+    """
+    return _hash({
+        'simulation': simulation_key,
+        'renderer': {key: value for key, value in renderer_configuration.items() if key != 'description'}
+    })
+
+
+def manifest_path(target_directory: str, output_filename: str) -> str:
+    return os.path.join(target_directory, MANIFEST_DIRECTORY, '%s.json' % output_filename)
+
+
+def read_manifest(target_directory: str, output_filename: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(manifest_path(target_directory, output_filename), 'r') as fp:
+            manifest = json.load(fp)
+    except (OSError, ValueError):
+        return None
+    return manifest if isinstance(manifest, dict) else None
+
+
+def write_manifest(target_directory: str, output_filename: str, key: str, status: str,
+                   error: Optional[str] = None) -> None:
+    """Atomically write the manifest of an output.
+
+    Args:
+        target_directory (str): Target directory of the bulk execution
+        output_filename (str): Filename of the output (relative to the target directory)
+        key (str): Job key
+        status (str): `success` or `failed`
+        error (Optional[str]): Error message of failed jobs
+    """
+    write_atomic(manifest_path(target_directory, output_filename), json.dumps({
+        'key': key,
+        'status': status,
+        'error': error
+    }, indent=2).encode('utf-8'))
+
+
+def job_status(target_directory: str, output_filename: str, key: str) -> str:
+    """Status of a job from a previous bulk execution.
+
+    Args:
+        target_directory (str): Target directory of the bulk execution
+        output_filename (str): Filename of the output (relative to the target directory)
+        key (str): Current job key
+
+    Returns:
+        str: `success` if the output exists and is up to date, `failed` if the last execution with the same key failed,
+            `missing` otherwise
+    """
+    manifest = read_manifest(target_directory, output_filename)
+    if manifest is None or manifest.get('key') != key:
+        return STATUS_MISSING
+    if manifest.get('status') == STATUS_SUCCESS:
+        if os.path.isfile(os.path.join(target_directory, output_filename)):
+            return STATUS_SUCCESS
+        return STATUS_MISSING
+    if manifest.get('status') == STATUS_FAILED:
+        return STATUS_FAILED
+    return STATUS_MISSING
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """Write a file atomically, so that readers never see partially written files."""
+    with atomic_writer(path) as fp:
+        fp.write(data)
+
+
+@contextmanager
+def atomic_writer(path: str) -> Iterator[BinaryIO]:
+    """Open a temporary file for writing, which replaces the file at `path` when closed without error."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = '%s.%i.tmp' % (path, os.getpid())
+    try:
+        with open(tmp_path, 'wb') as fp:
+            yield fp
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
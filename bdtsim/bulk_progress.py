@@ -0,0 +1,216 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Progress reporting and run reports for bulk executions."""
+
+import datetime
+import json
+import logging
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from bdtsim.bulk_manifest import write_atomic
+from bdtsim.simulation_result import ResultNode, SimulationResult
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None  # type: ignore
+
+
+logger = logging.getLogger(__name__)
+
+RUN_REPORT_FILENAME = 'run_report.json'
+
+
+class JobStatistics(NamedTuple):
+    wall_time: Optional[float] = None
+    peak_rss: Optional[int] = None
+    path_count: Optional[int] = None
+    transaction_count: Optional[int] = None
+    result_size: Optional[int] = None
+
+
+class JobReport(NamedTuple):
+    output: str
+    simulation_configuration: Dict[str, Any]
+    simulated: bool
+    error: Optional[str]
+    statistics: JobStatistics
+
+
+def log_progress(line: str) -> None:
+    logger.info(line)
+
+
+def peak_rss() -> Optional[int]:
+    """Peak resident set size of the current process in bytes, if available."""
+    if resource is None:
+        return None
+    max_rss = int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    # reported in bytes on macOS, in kilobytes on Linux and other systems
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def count_paths_and_transactions(simulation_result: SimulationResult) -> Tuple[int, int]:
+    """Count the final nodes (protocol paths) and transactions of a simulation result.
+
+    Returns:
+        Tuple[int, int]: number of paths and number of transactions
+    """
+    path_count = 0
+    transaction_count = 0
+    stack: List[ResultNode] = [simulation_result.execution_result_root]
+    while len(stack):
+        node = stack.pop()
+        if len(node.children) == 0:
+            path_count += 1
+        transaction_count += sum(len(tx_list) for tx_list in node.tx_collection)
+        stack.extend(node.children.values())
+    return path_count, transaction_count
+
+
+class BulkProgress(object):
+    def __init__(self, jobs_total: int, cost_total: float, jobs_skipped: int = 0, processes: int = 1,
+                 output: Optional[Callable[[str], None]] = None) -> None:
+        """Track the progress of a bulk execution.
+
+        Job completions are reported by the pool's result handler thread, while progress lines are emitted by a
+        separate reporter thread, so all state is protected by a lock.
+
+        Args:
+            jobs_total (int): Number of jobs to be executed
+            cost_total (float): Sum of the estimated costs of all jobs, used for the ETA
+            jobs_skipped (int): Number of jobs skipped as up to date
+            processes (int): Number of worker processes
+            output (Optional[Callable[[str], None]]): Function progress lines are written to, defaults to logging
+                with level INFO
+        """
+        self._jobs_total = jobs_total
+        self._cost_total = cost_total
+        self._jobs_skipped = jobs_skipped
+        self._processes = processes
+        self._output = output if output is not None else log_progress
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._start_monotonic = time.monotonic()
+        self._finished: Optional[float] = None
+        self._finished_elapsed: Optional[float] = None
+        self._jobs_done = 0
+        self._jobs_failed = 0
+        self._cost_done = 0.0
+        self._paths = 0
+        self._transactions = 0
+        self._job_reports: List[JobReport] = []
+        self._reporter: Optional[threading.Thread] = None
+        self._stop_reporter = threading.Event()
+
+    def job_finished(self, job_report: JobReport, estimated_cost: float = 1.0) -> None:
+        with self._lock:
+            if job_report.error is None:
+                self._jobs_done += 1
+            else:
+                self._jobs_failed += 1
+            self._cost_done += estimated_cost
+            if job_report.simulated:
+                self._paths += job_report.statistics.path_count or 0
+                self._transactions += job_report.statistics.transaction_count or 0
+            self._job_reports.append(job_report)
+
+    @property
+    def elapsed(self) -> float:
+        if self._finished_elapsed is not None:
+            return self._finished_elapsed
+        return time.monotonic() - self._start_monotonic
+
+    def eta(self) -> Optional[float]:
+        """Estimated remaining time in seconds, based on the estimated costs of completed and remaining jobs."""
+        with self._lock:
+            if self._cost_done <= 0:
+                return None
+            return max(self._cost_total - self._cost_done, 0) * self.elapsed / self._cost_done
+
+    def format(self) -> str:
+        eta = self.eta()
+        with self._lock:
+            elapsed = self.elapsed
+            remaining = self._jobs_total - self._jobs_done - self._jobs_failed
+            return ('%i/%i jobs done, %i running, %i failed, %i skipped | %.1f paths/s, %.1f tx/s | '
+                    'elapsed %s, ETA %s') % (
+                self._jobs_done, self._jobs_total, min(remaining, self._processes), self._jobs_failed,
+                self._jobs_skipped, self._paths / elapsed if elapsed > 0 else 0,
+                self._transactions / elapsed if elapsed > 0 else 0, self.format_duration(elapsed),
+                self.format_duration(eta) if eta is not None else 'unknown'
+            )
+
+    @staticmethod
+    def format_duration(seconds: float) -> str:
+        return str(datetime.timedelta(seconds=int(round(seconds))))
+
+    def report(self) -> None:
+        self._output(self.format())
+
+    def start_reporter(self, interval: float) -> None:
+        """Report the progress every `interval` seconds from a background thread, until `stop_reporter` is called."""
+        def run() -> None:
+            while not self._stop_reporter.wait(interval):
+                self.report()
+
+        self._reporter = threading.Thread(target=run, name='bulk-progress', daemon=True)
+        self._reporter.start()
+
+    def stop_reporter(self) -> None:
+        self._stop_reporter.set()
+        if self._reporter is not None:
+            self._reporter.join()
+            self._reporter = None
+        self._finished = time.time()
+        self._finished_elapsed = self.elapsed
+        self.report()
+
+    def get_run_report(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = self.elapsed
+            return {
+                'started': datetime.datetime.fromtimestamp(self._started).isoformat(),
+                'finished': None if self._finished is None else datetime.datetime.fromtimestamp(
+                    self._finished
+                ).isoformat(),
+                'wall_time': elapsed,
+                'processes': self._processes,
+                'jobs_total': self._jobs_total,
+                'jobs_done': self._jobs_done,
+                'jobs_failed': self._jobs_failed,
+                'jobs_skipped': self._jobs_skipped,
+                'paths': self._paths,
+                'transactions': self._transactions,
+                'paths_per_second': self._paths / elapsed if elapsed > 0 else None,
+                'transactions_per_second': self._transactions / elapsed if elapsed > 0 else None,
+                'jobs': [{
+                    'output': job_report.output,
+                    'simulation_configuration': job_report.simulation_configuration,
+                    'simulated': job_report.simulated,
+                    'status': 'success' if job_report.error is None else 'failed',
+                    'error': job_report.error,
+                    **job_report.statistics._asdict()
+                } for job_report in self._job_reports]
+            }
+
+    def write_run_report(self, path: str) -> None:
+        write_atomic(path, json.dumps(self.get_run_report(), indent=2, default=str).encode('utf-8'))
@@ -0,0 +1,155 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cost estimation for bulk execution jobs.
+
+The cost of a simulation is estimated from the wall times recorded in previous bulk executions. Simulations which
+have been executed before are estimated by their last recorded duration. For all other simulations, a heuristic based
+on the data size and the protocol's `slices_count` is used, scaled by the median ratio of recorded duration to
+heuristic of simulations of the same protocol (or of all simulations, if the protocol has not been executed yet).
+"""
+
+import inspect
+import json
+import logging
+import math
+import os
+import statistics
+from typing import Any, Dict, List, Optional
+
+from bdtsim.bulk_configuration import DEFAULT_DATA_PROVIDER_CONFIGURATION, canonical_hash
+from bdtsim.bulk_manifest import MANIFEST_DIRECTORY, write_atomic
+from bdtsim.data_provider import DataProviderManager
+from bdtsim.protocol import ProtocolManager
+
+
+logger = logging.getLogger(__name__)
+
+TIMINGS_FILENAME = 'timings.json'
+
+
+def _default_parameter(cls: Any, parameter_name: str) -> Any:
+    try:
+        parameter = inspect.signature(cls.__init__).parameters.get(parameter_name)
+    except (TypeError, ValueError):
+        return None
+    if parameter is None or parameter.default is inspect.Parameter.empty:
+        return None
+    return parameter.default
+
+
+def _configured_parameter(component_configuration: Dict[str, Any], registrations: Dict[str, Any],
+                          parameter_name: str) -> Any:
+    value = (component_configuration.get('parameters') or {}).get(parameter_name)
+    if value is not None:
+        return value
+    registration = registrations.get(component_configuration.get('name', ''))
+    if registration is None:
+        return None
+    value = registration.kwargs.get(parameter_name)
+    if value is not None:
+        return value
+    return _default_parameter(registration.cls, parameter_name)
+
+
+def heuristic_cost(simulation_configuration: Dict[str, Any]) -> float:
+    """Heuristic, relative cost of a simulation, growing with data size and number of slices.
+
+    Args:
+        simulation_configuration (Dict[str, Any]): Simulation configuration
+
+    Returns:
+        float: Heuristic cost (arbitrary unit)
+    """
+    data_provider_configuration = simulation_configuration.get('data_provider') or DEFAULT_DATA_PROVIDER_CONFIGURATION
+    size = _configured_parameter(data_provider_configuration, DataProviderManager.data_providers, 'size')
+    if size is None:
+        filename = _configured_parameter(data_provider_configuration, DataProviderManager.data_providers, 'filename')
+        if isinstance(filename, str) and os.path.isfile(filename):
+            size = os.path.getsize(filename)
+    slices_count = _configured_parameter(simulation_configuration.get('protocol') or {}, ProtocolManager.protocols,
+                                         'slices_count')
+    try:
+        size_factor = 1 + max(float(size), 0) / 1024 if size is not None else 1.0
+        slices_factor = 1 + math.log2(max(float(slices_count), 1)) if slices_count is not None else 1.0
+    except (TypeError, ValueError):
+        return 1.0
+    return size_factor * slices_factor
+
+
+class JobTimings(object):
+    def __init__(self, target_directory: str) -> None:
+        """Wall times of the simulations of previous bulk executions, stored within the target directory.
+
+        Args:
+            target_directory (str): Target directory of the bulk execution
+        """
+        self._path = os.path.join(target_directory, MANIFEST_DIRECTORY, TIMINGS_FILENAME)
+        self._timings: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(self._path, 'r') as fp:
+                timings = json.load(fp)
+            if isinstance(timings, dict):
+                self._timings = timings
+        except (OSError, ValueError):
+            pass
+        self._scales: Optional[Dict[str, float]] = None
+
+    def __len__(self) -> int:
+        return len(self._timings)
+
+    def record(self, simulation_configuration: Dict[str, Any], duration: float) -> None:
+        """Record the wall time of a simulation (including serialization and rendering)."""
+        self._timings[canonical_hash(simulation_configuration)] = {
+            'protocol': simulation_configuration.get('protocol', {}).get('name'),
+            'heuristic': heuristic_cost(simulation_configuration),
+            'duration': duration
+        }
+        self._scales = None
+
+    def save(self) -> None:
+        write_atomic(self._path, json.dumps(self._timings, indent=2, sort_keys=True).encode('utf-8'))
+
+    def _get_scales(self) -> Dict[str, float]:
+        # median ratio of duration to heuristic cost per protocol, and for all protocols (key '')
+        if self._scales is None:
+            ratios: Dict[str, List[float]] = {'': []}
+            for timing in self._timings.values():
+                try:
+                    ratio = float(timing['duration']) / float(timing['heuristic'])
+                except (KeyError, TypeError, ValueError, ZeroDivisionError):
+                    continue
+                ratios.setdefault(str(timing.get('protocol')), []).append(ratio)
+                ratios[''].append(ratio)
+            self._scales = {key: statistics.median(values) for key, values in ratios.items() if len(values)}
+        return self._scales
+
+    def estimate(self, simulation_configuration: Dict[str, Any]) -> float:
+        """Estimate the wall time of a simulation.
+
+        Args:
+            simulation_configuration (Dict[str, Any]): Simulation configuration
+
+        Returns:
+            float: Estimated duration, in seconds if timings of previous executions are available
+        """
+        timing = self._timings.get(canonical_hash(simulation_configuration))
+        if timing is not None and isinstance(timing.get('duration'), (int, float)):
+            return float(timing['duration'])
+        scales = self._get_scales()
+        scale = scales.get(str(simulation_configuration.get('protocol', {}).get('name')), scales.get('', 1.0))
+        return scale * heuristic_cost(simulation_configuration)
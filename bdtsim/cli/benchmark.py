@@ -0,0 +1,142 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List
+
+from bdtsim.benchmark import DEFAULT_MIN_TIME, DEFAULT_ROUNDS, DEFAULT_SIZES, DEFAULT_SLICES_COUNTS, \
+    DEFAULT_THRESHOLD, DEFAULT_TREE_DEPTH, DEFAULT_WARMUP, GROUPS, STATUS_FAILED, STATUS_SLOWER, BenchmarkResult, \
+    compare_results, create_report, format_seconds, get_benchmarks, get_report_results, run_benchmarks
+from bdtsim.util.strings import str_block_table
+from .command_manager import SubCommand
+
+
+class BenchmarkSubCommand(SubCommand):
+    help = 'run the benchmark suite and compare the results against a baseline'
+
+    def __init__(self, parser: argparse.ArgumentParser) -> None:
+        super(BenchmarkSubCommand, self).__init__(parser)
+        parser.add_argument('-g', '--group', choices=GROUPS, action='append', dest='groups',
+                            help='benchmark group to be run (can be used multiple times), default: all groups')
+        parser.add_argument('-k', '--filter', action='append', dest='patterns', metavar='PATTERN',
+                            help='only run benchmarks with names matching the shell-style pattern (e.g. "merkle.*",'
+                                 ' can be used multiple times)')
+        parser.add_argument('--list', action='store_true', default=False,
+                            help='print the names of the selected benchmarks instead of running them')
+        parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS,
+                            help='number of measured rounds per benchmark, default: %i' % DEFAULT_ROUNDS)
+        parser.add_argument('--warmup', type=int, default=DEFAULT_WARMUP,
+                            help='number of unmeasured calls before the measured rounds, default: %i'
+                                 % DEFAULT_WARMUP)
+        parser.add_argument('--min-time', type=float, default=DEFAULT_MIN_TIME,
+                            help='minimum duration of a micro-benchmark round in seconds, default: %s'
+                                 % str(DEFAULT_MIN_TIME))
+        parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                            help='data sizes in bytes, default: %s' % ' '.join(str(s) for s in DEFAULT_SIZES))
+        parser.add_argument('--slices-counts', type=int, nargs='+', default=list(DEFAULT_SLICES_COUNTS),
+                            help='slice counts for protocols and building blocks using slices, default: %s'
+                                 % ' '.join(str(s) for s in DEFAULT_SLICES_COUNTS))
+        parser.add_argument('--depth', type=int, default=DEFAULT_TREE_DEPTH,
+                            help='depth of the synthetic result tree for result processing and rendering benchmarks,'
+                                 ' default: %i' % DEFAULT_TREE_DEPTH)
+        parser.add_argument('-i', '--input', default=None,
+                            help='read results from a saved report (JSON) instead of running the benchmarks')
+        parser.add_argument('-o', '--output', default=None, help='write the results as JSON report to the given file'
+                                                                 ' (- for stdout)')
+        parser.add_argument('-b', '--baseline', default=None, help='baseline report (JSON) to compare the results to')
+        parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help='relative change of the median timing from which on a benchmark is considered'
+                                 ' slower/faster than the baseline, default: %s' % str(DEFAULT_THRESHOLD))
+
+    def __call__(self, args: argparse.Namespace) -> int:
+        parameters: Dict[str, Any] = {
+            'rounds': args.rounds,
+            'warmup': args.warmup,
+            'min_time': args.min_time,
+            'sizes': args.sizes,
+            'slices_counts': args.slices_counts,
+            'depth': args.depth
+        }
+
+        if args.input is not None:
+            report = self._load_report(args.input)
+            results = get_report_results(report)
+        else:
+            benchmarks = get_benchmarks(
+                groups=args.groups or GROUPS,
+                patterns=args.patterns,
+                sizes=args.sizes,
+                slices_counts=args.slices_counts,
+                depth=args.depth
+            )
+            if args.list:
+                for benchmark in benchmarks:
+                    print(benchmark.name)
+                return 0
+            results = []
+            for result in run_benchmarks(benchmarks, args.rounds, args.warmup, args.min_time):
+                results.append(result)
+                print('%s: %s' % (result.name, result.error or format_seconds(result.median)), file=sys.stderr)
+            report = create_report(results, parameters)
+
+        if args.output == '-':
+            json.dump(report, sys.stdout, indent=2)
+            sys.stdout.write('\n')
+            summary_output = sys.stderr
+        else:
+            if args.output is not None:
+                with open(args.output, 'w') as fp:
+                    json.dump(report, fp, indent=2)
+            summary_output = sys.stdout
+
+        if args.baseline is None:
+            print(self._results_table(results), file=summary_output)
+            return 1 if any(result.error is not None for result in results) else 0
+
+        comparisons = compare_results(results, get_report_results(self._load_report(args.baseline)), args.threshold)
+        rows: List[List[str]] = [['benchmark', 'baseline', 'current', 'ratio', 'status']]
+        for comparison in comparisons:
+            rows.append([
+                comparison.name,
+                format_seconds(comparison.baseline),
+                format_seconds(comparison.current),
+                '-' if comparison.ratio is None else '%.3f' % comparison.ratio,
+                comparison.status
+            ])
+        print(str_block_table(rows, column_separator='  ', row_separator=''), file=summary_output)
+        # fail for regressions, so that the command can be used for gating upgrades
+        return 1 if any(c.status in (STATUS_SLOWER, STATUS_FAILED) for c in comparisons) else 0
+
+    @staticmethod
+    def _load_report(path: str) -> Dict[str, Any]:
+        with open(path, 'r') as fp:
+            report: Dict[str, Any] = json.load(fp)
+        return report
+
+    @staticmethod
+    def _results_table(results: List[BenchmarkResult]) -> str:
+        rows: List[List[str]] = [['benchmark', 'rounds x loops', 'min', 'median', 'stdev']]
+        for result in results:
+            if result.error is not None:
+                # full error messages are logged while running and kept in the report
+                rows.append([result.name, '-', '-', '-', 'failed (%s)' % result.error.split(':', 1)[0]])
+                continue
+            rows.append([result.name, '%i x %i' % (result.rounds, result.loops), format_seconds(result.min),
+                         format_seconds(result.median), format_seconds(result.stdev)])
+        return str_block_table(rows, column_separator='  ', row_separator='')
@@ -16,31 +16,70 @@
 # limitations under the License.
 
 import argparse
+import contextlib
+import functools
+import json
 import logging
 import multiprocessing
 import os
-from multiprocessing.pool import ApplyResult
-from typing import Any, Dict, Optional, Tuple
-from queue import Queue
+import sys
+import time
+from typing import Any, Callable, Dict, Generator, Iterable, List, NamedTuple, Optional, Tuple, Union
 
 import yaml
 
 from bdtsim.account import AccountFile
+from bdtsim.bulk_configuration import DEFAULT_DATA_PROVIDER_CONFIGURATION, DEFAULT_ENVIRONMENT_CONFIGURATION, \
+    expand_simulation_configurations
+from bdtsim.bulk_progress import RUN_REPORT_FILENAME, BulkProgress, JobReport, JobStatistics, \
+    count_paths_and_transactions, peak_rss
+from bdtsim.bulk_scheduling import JobTimings
+from bdtsim.bulk_manifest import STATUS_FAILED, STATUS_SUCCESS, atomic_writer, job_status, renderer_job_key, \
+    simulation_job_key, write_atomic, write_manifest
 from bdtsim.data_provider import DataProviderManager
 from bdtsim.environment import EnvironmentManager
+from bdtsim.profiling import DEFAULT_SAMPLING_INTERVAL, Profiler
 from bdtsim.protocol import ProtocolManager, DEFAULT_ASSET_PRICE
-from bdtsim.renderer import RendererManager
+from bdtsim.renderer import Renderer, RendererManager
+from bdtsim.renderer.graphviz_mixin import GraphvizMixin
+from bdtsim.result_store import ResultFileLoader, ResultRows, ResultStore, ResultStoreWriter
 from bdtsim.simulation import Simulation
 from bdtsim.simulation_result import SimulationResult, SimulationResultSerializer
+from bdtsim.simulation_result_file import SimulationResultFileSerializer, SimulationResultFileWriter, \
+    compression_codec
+from bdtsim.tracing import CATEGORY_RENDER, span, tracing
+from bdtsim.util.filesize import FileSize
 from bdtsim.util.types import to_bool
+from bdtsim.work_queue import DEFAULT_LEASE_DURATION, DEFAULT_MAX_ATTEMPTS, WorkQueue
+from bdtsim.worker_pool import WorkerPool
 from .command_manager import SubCommand
+from .profile import add_profile_arguments
 
 
-DEFAULT_ENVIRONMENT_CONFIGURATION: Dict[str, Any] = {'name': 'PyEVM'}
-DEFAULT_DATA_PROVIDER_CONFIGURATION: Dict[str, Any] = {'name': 'RandomDataProvider'}
-
 logger = logging.getLogger(__name__)
 
+DEFAULT_MAX_TASKS_PER_CHILD = 50
+DEFAULT_PROGRESS_INTERVAL = 10.0
+DEFAULT_POLL_INTERVAL = 2.0
+MAX_AFFINITY_BATCH_SIZE = 8
+BATCHES_PER_PROCESS = 4
+RENDER_ONLY_COST_FACTOR = 0.05
+
+# simulation configuration, path of the result file and errors of failed renderers
+PipelineResult = Tuple[Dict[str, Any], str, List[Tuple[Dict[str, Any], str]]]
+
+
+class BulkJob(NamedTuple):
+    simulation_configuration: Dict[str, Any]
+    simulation_key: str
+    simulate: bool
+    renderer_configurations: List[Dict[str, Any]]
+    estimated_cost: float = 1.0
+
+
+# job, result of the pipeline or error message, job statistics, and the result store rows (if a store is configured)
+BatchResult = Tuple[BulkJob, Optional[PipelineResult], Optional[str], JobStatistics, Optional[ResultRows]]
+
 
 class BulkExecuteSubCommand(SubCommand):
     help = 'bulk execute simulations and renderings'
@@ -49,15 +88,40 @@ class BulkExecuteSubCommand(SubCommand):
         super(BulkExecuteSubCommand, self).__init__(parser)
         parser.add_argument('bulk_configuration')
         parser.add_argument('-p', '--processes', type=int, default=multiprocessing.cpu_count())
+        parser.add_argument('--max-tasks-per-child', type=int, default=DEFAULT_MAX_TASKS_PER_CHILD,
+                            help='number of tasks after which a worker process is replaced by a fresh one, '
+                                 '0 for no limit')
+        mode_group = parser.add_mutually_exclusive_group()
+        mode_group.add_argument('--force', action='store_true', default=False,
+                                help='run all jobs, even if their outputs are up to date')
+        mode_group.add_argument('--only-failed', action='store_true', default=False,
+                                help='only run jobs which failed in the previous execution')
+        parser.add_argument('--job-timeout', type=float, default=None,
+                            help='wall-clock limit (in seconds) for a single simulation including its renderings')
+        parser.add_argument('--job-max-rss', type=FileSize.parse_value, default=None,
+                            help='memory (RSS) limit for worker processes, e.g. 4G')
+        parser.add_argument('--progress', action='store_true', default=False,
+                            help='print progress to stderr (otherwise, progress is logged with level INFO)')
+        parser.add_argument('--progress-interval', type=float, default=DEFAULT_PROGRESS_INTERVAL,
+                            help='seconds between progress reports')
+        parser.add_argument('--coordinator', metavar='WORK_DIRECTORY', default=None,
+                            help='do not execute jobs locally, but write them to the given (shared) work directory '
+                                 'for execution by `bdtsim worker` processes, and wait for their results')
+        parser.add_argument('--lease-duration', type=float, default=DEFAULT_LEASE_DURATION,
+                            help='seconds after which jobs of unresponsive workers are rescheduled (coordinator mode)')
+        parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS,
+                            help='number of executions before a job is considered failed (coordinator mode)')
+        parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                            help='seconds between checks of the work directory (coordinator mode)')
+        add_profile_arguments(parser, output=False)
+        parser.add_argument('--trace', action='store_true', default=False,
+                            help='write a Chrome trace of the phases of each job (<simulation>.trace.json,'
+                                 ' pipeline mode only)')
 
     def __call__(self, args: argparse.Namespace) -> Optional[int]:
         with open(args.bulk_configuration, 'r') as fp:
             bulk_configuration = yaml.load(fp, Loader=yaml.SafeLoader)
 
-        logger.info('creating process pool with %i processes' % args.processes)
-        process_pool = multiprocessing.Pool(processes=args.processes)
-        processes: Queue[ApplyResult[Any]] = Queue()
-
         simulation_configurations = bulk_configuration.get('simulations')
         if not isinstance(simulation_configurations, list):
             raise ValueError('simulations is not a list')
@@ -69,67 +133,669 @@ class BulkExecuteSubCommand(SubCommand):
         target_directory = bulk_configuration.get('target_directory', 'bulk_output')
         os.makedirs(target_directory, exist_ok=True)
 
-        def renderer_success_callback(params: Tuple[Dict[str, Any], Dict[str, Any], bytes]) -> None:
-            sim_conf, renderer_conf, result = params
+        # in pipeline mode, workers simulate, write the result and render locally, so simulation results never
+        # have to be transferred between processes
+        pipeline = to_bool(bulk_configuration.get('pipeline', True))
+
+        # profiling options are passed to the workers (also in coordinator mode) via the bulk configuration
+        if args.profile is not None:
+            bulk_configuration['profile'] = args.profile
+            bulk_configuration['profile_interval'] = args.profile_interval
+        if args.trace:
+            bulk_configuration['trace'] = True
+        if bulk_configuration.get('profile') is not None and not pipeline and args.coordinator is None:
+            logger.warning('profiling is only supported for pipeline executions')
+        if to_bool(bulk_configuration.get('trace', False)) and not pipeline and args.coordinator is None:
+            logger.warning('tracing is only supported for pipeline executions')
+
+        # all pool callbacks hand their results over to a single writer thread
+        result_store_path = bulk_configuration.get('result_store')
+        result_store_writer = None if result_store_path is None else ResultStoreWriter(result_store_path)
+        result_store_errors: List[BaseException] = []
+
+        def result_store_error_callback(sim_conf: Dict[str, Any], simulation_key: str, error: BaseException) -> None:
+            # called from the writer thread, the simulation is executed again by the next bulk execution
+            logger.warning('failed to store simulation result (%s): %s' % (str(sim_conf), str(error)))
+            result_store_errors.append(error)
+            write_manifest(target_directory, self.get_output_filename(sim_conf, suffix='result'), simulation_key,
+                           STATUS_FAILED, 'failed to store simulation result: %s' % str(error))
+
+        def renderer_success_callback(simulation_key: str,
+                                      params: Tuple[Dict[str, Any], Dict[str, Any], Dict[str, bytes]]) -> None:
+            sim_conf, renderer_conf, outputs = params
             logger.info('renderer succeeded (%s, %s)' % (str(sim_conf), str(renderer_conf)))
-            with open(os.path.join(
-                target_directory,
-                self.get_output_filename(sim_conf, renderer_conf, suffix=renderer_conf.get('suffix'))
-            ), 'wb') as f:
-                f.write(result)
+            for output_filename, output in outputs.items():
+                self.write_output(target_directory, output_filename, output)
+                write_manifest(target_directory, output_filename, renderer_job_key(simulation_key, renderer_conf),
+                               STATUS_SUCCESS)
 
-        def renderer_error_callback(error: BaseException) -> None:
+        def renderer_error_callback(sim_conf: Dict[str, Any], simulation_key: str, renderer_conf: Dict[str, Any],
+                                    error: BaseException, _: int) -> None:
             logger.warning('renderer error: %s' % str(error))
-
-        def simulation_success_callback(params: Tuple[Dict[str, Any], SimulationResult]) -> None:
-            local_simulation_configuration, result = params
+            for output_format, output_filename in self.get_renderer_outputs(sim_conf, renderer_conf):
+                write_manifest(target_directory, output_filename, renderer_job_key(simulation_key, renderer_conf),
+                               STATUS_FAILED, str(error))
+
+        def simulation_success_callback(job: BulkJob,
+                                        params: Tuple[Dict[str, Any], SimulationResult, JobStatistics]) -> None:
+            local_simulation_configuration, result, statistics = params
+            if statistics.wall_time is not None:
+                job_timings.record(job.simulation_configuration, statistics.wall_time)
+            simulation_key = job.simulation_key
             logger.info('simulation succeeded (%s)' % str(local_simulation_configuration))
             logger.debug('writing down result')
-            with open(os.path.join(
-                    target_directory,
-                    self.get_output_filename(local_simulation_configuration, suffix='result')
-            ), 'wb') as f:
-                simulation_result_serializer = SimulationResultSerializer(
-                    compression=to_bool(bulk_configuration.get('output_compression', True)),
-                    b64encoding=to_bool(bulk_configuration.get('output_b64encoding', True))
-                )
-                f.write(simulation_result_serializer.serialize(result))
+            result_filename = self.get_output_filename(local_simulation_configuration, suffix='result')
+            serialized_result = self.get_serializer(bulk_configuration).serialize(result)
+            self.write_output(target_directory, result_filename, serialized_result)
+            write_manifest(target_directory, result_filename, simulation_key, STATUS_SUCCESS)
+            if result_store_writer is not None:
+                result_store_writer.put(local_simulation_configuration, result, functools.partial(
+                    result_store_error_callback, local_simulation_configuration, simulation_key
+                ))
+            path_count, transaction_count = count_paths_and_transactions(result)
+            progress.job_finished(JobReport(result_filename, local_simulation_configuration, True, None,
+                                            statistics._replace(path_count=path_count,
+                                                                transaction_count=transaction_count,
+                                                                result_size=len(serialized_result))),
+                                  job.estimated_cost)
 
             logger.debug('scheduling renderers')
-            for renderer_configuration in renderer_configurations:
-                processes.put(process_pool.apply_async(
+            for renderer_configuration in job.renderer_configurations:
+                worker_pool.submit(
                     func=self.run_renderer,
-                    kwds={
+                    kwargs={
                         'simulation_configuration': local_simulation_configuration,
                         'renderer_configuration': renderer_configuration,
                         'simulation_result': result
                     },
-                    callback=renderer_success_callback,
-                    error_callback=renderer_error_callback
+                    callback=functools.partial(renderer_success_callback, simulation_key),
+                    error_callback=functools.partial(renderer_error_callback, local_simulation_configuration,
+                                                     simulation_key, renderer_configuration)
+                )
+
+        def pipeline_success_callback(job: BulkJob, params: PipelineResult,
+                                      result_rows: Optional[ResultRows]) -> None:
+            local_simulation_configuration, result_filename, renderer_errors = params
+            simulated = job.simulate
+            if simulated:
+                logger.info('simulation succeeded (%s)' % str(local_simulation_configuration))
+            for renderer_configuration, error in renderer_errors:
+                logger.warning('renderer error (%s, %s): %s' % (str(local_simulation_configuration),
+                                                                str(renderer_configuration), error))
+            if simulated and result_store_writer is not None and result_rows is not None:
+                result_store_writer.put(local_simulation_configuration, result_rows, functools.partial(
+                    result_store_error_callback, local_simulation_configuration, job.simulation_key
                 ))
 
-        def simulation_error_callback(error: BaseException) -> None:
+        def simulation_error_callback(sim_conf: Dict[str, Any], simulation_key: str, error: BaseException) -> None:
             logger.warning('simulation error callback called: %s' % str(error))
+            write_manifest(target_directory, self.get_output_filename(sim_conf, suffix='result'), simulation_key,
+                           STATUS_FAILED, str(error))
+
+        def simulation_failed_callback(job: BulkJob, error: BaseException, _: int) -> None:
+            simulation_error_callback(job.simulation_configuration, job.simulation_key, error)
+            progress.job_finished(JobReport(self.get_output_filename(job.simulation_configuration, suffix='result'),
+                                            job.simulation_configuration, job.simulate, str(error), JobStatistics()),
+                                  job.estimated_cost)
+
+        def pipeline_batch_callback(batch_result: BatchResult) -> None:
+            job, pipeline_result, error, statistics, result_rows = batch_result
+            if pipeline_result is not None:
+                if job.simulate and statistics.wall_time is not None:
+                    job_timings.record(job.simulation_configuration, statistics.wall_time)
+                pipeline_success_callback(job, pipeline_result, result_rows)
+            else:
+                simulation_error_callback(job.simulation_configuration, job.simulation_key, RuntimeError(error))
+            progress.job_finished(JobReport(
+                self.get_output_filename(job.simulation_configuration, suffix='result'),
+                job.simulation_configuration, job.simulate, error, statistics
+            ), job.estimated_cost)
+
+        def batch_error_callback(batch: List[BulkJob], error: BaseException, completed: int) -> None:
+            # the job being executed failed (e.g. exceeded a limit), all remaining jobs are scheduled again
+            job = batch[completed]
+            simulation_error_callback(job.simulation_configuration, job.simulation_key, error)
+            progress.job_finished(JobReport(
+                self.get_output_filename(job.simulation_configuration, suffix='result'),
+                job.simulation_configuration, job.simulate, str(error), JobStatistics()
+            ), job.estimated_cost)
+            if completed + 1 < len(batch):
+                submit_batch(batch[completed + 1:])
+
+        def submit_batch(batch: List[BulkJob]) -> None:
+            worker_pool.submit(
+                func=self.iter_pipeline_batch,
+                kwargs={
+                    'jobs': batch,
+                    'bulk_configuration': bulk_configuration,
+                    'target_directory': target_directory
+                },
+                callback=pipeline_batch_callback,
+                error_callback=functools.partial(batch_error_callback, batch)
+            )
+
+        logger.debug('planning jobs')
+        job_timings = JobTimings(target_directory)
+        jobs: List[BulkJob] = []
+        skipped_count = 0
+        for simulation_configuration in expand_simulation_configurations(simulation_configurations):
+            simulation_key, simulate, pending_renderer_configurations = self.plan_job(
+                simulation_configuration, renderer_configurations, target_directory,
+                force=args.force, only_failed=args.only_failed, bulk_configuration=bulk_configuration
+            )
+            if not simulate and len(pending_renderer_configurations) == 0:
+                logger.debug('skipping up to date simulation (%s)' % str(simulation_configuration))
+                skipped_count += 1
+                continue
+            estimated_cost = job_timings.estimate(simulation_configuration)
+            if not simulate:
+                estimated_cost *= RENDER_ONLY_COST_FACTOR
+            jobs.append(BulkJob(simulation_configuration, simulation_key, simulate, pending_renderer_configurations,
+                                estimated_cost))
+
+        if skipped_count > 0:
+            logger.info('skipped %i simulations with up to date outputs' % skipped_count)
+
+        progress = BulkProgress(len(jobs), sum(job.estimated_cost for job in jobs), skipped_count, args.processes,
+                                output=(lambda line: print(line, file=sys.stderr)) if args.progress else None)
+
+        if args.coordinator is not None:
+            progress.start_reporter(args.progress_interval)
+            exit_code = 0
+            try:
+                self.coordinate(WorkQueue(args.coordinator), jobs, bulk_configuration, target_directory,
+                                pipeline_batch_callback, args.lease_duration, args.max_attempts, args.poll_interval)
+            except KeyboardInterrupt:
+                logger.warning('bulk execution cancelled, pending jobs remain in the work directory')
+                exit_code = 130
+            finally:
+                if result_store_writer is not None:
+                    result_store_writer.close()
+                job_timings.save()
+                progress.stop_reporter()
+                progress.write_run_report(os.path.join(target_directory, RUN_REPORT_FILENAME))
+            return exit_code or self.get_result_store_exit_code(result_store_errors)
+
+        # compile all contracts once before forking, and again in each worker for start methods other than fork
+        protocol_configurations = self.get_protocol_configurations(job.simulation_configuration for job in jobs
+                                                                   if job.simulate)
+        self.warm_up(protocol_configurations)
+        progress.start_reporter(args.progress_interval)
+
+        logger.info('creating process pool with %i processes' % args.processes)
+        worker_pool = WorkerPool(
+            processes=args.processes,
+            initializer=self.warm_up,
+            initargs=(protocol_configurations, ),
+            max_tasks_per_child=args.max_tasks_per_child if args.max_tasks_per_child > 0 else None,
+            task_timeout=args.job_timeout,
+            max_rss=args.job_max_rss
+        )
 
         logger.debug('scheduling simulations')
+        for batch in self.get_affinity_batches(jobs, args.processes):
+            if pipeline or not batch[0].simulate:
+                # renderings of existing simulation results are always applied within a single worker
+                submit_batch(batch)
+            else:
+                for job in batch:
+                    worker_pool.submit(
+                        func=self.run_measured_simulation,
+                        kwargs={
+                            'simulation_configuration': job.simulation_configuration
+                        },
+                        callback=functools.partial(simulation_success_callback, job),
+                        error_callback=functools.partial(simulation_failed_callback, job)
+                    )
+
+        exit_code = 0
+        try:
+            worker_pool.close()
+        except KeyboardInterrupt:
+            logger.warning('bulk execution cancelled, terminating worker processes')
+            worker_pool.terminate()
+            exit_code = 130
+        finally:
+            if result_store_writer is not None:
+                result_store_writer.close()
+            job_timings.save()
+            progress.stop_reporter()
+            progress.write_run_report(os.path.join(target_directory, RUN_REPORT_FILENAME))
+
+        return exit_code or self.get_result_store_exit_code(result_store_errors)
+
+    @staticmethod
+    def get_result_store_exit_code(result_store_errors: List[BaseException]) -> int:
+        if len(result_store_errors):
+            logger.warning('failed to store %i simulation results, see the warnings above' % len(result_store_errors))
+            return 1
+        return 0
+
+    @staticmethod
+    def coordinate(work_queue: WorkQueue, jobs: List[BulkJob], bulk_configuration: Dict[str, Any],
+                   target_directory: str, callback: Callable[[BatchResult], None],
+                   lease_duration: float = DEFAULT_LEASE_DURATION, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                   poll_interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        """Write jobs to a work queue, most expensive first, and wait until all of them are finished by workers.
+
+        Pending jobs and results left over from previous executions are removed. Jobs of workers whose lease expired
+        are rescheduled.
+
+        Args:
+            work_queue (WorkQueue): Work queue within the shared work directory
+            jobs (List[BulkJob]): Jobs to be executed
+            bulk_configuration (Dict[str, Any]): Bulk configuration (for output format options)
+            target_directory (str): Target directory, needs to be accessible by all workers under the same path
+            callback (Callable[[BatchResult], None]): Called for each finished job
+            lease_duration (float): Seconds after which jobs of unresponsive workers are rescheduled
+            max_attempts (int): Number of executions before a job is considered failed
+            poll_interval (float): Seconds between checks of the work directory
+        """
+        work_queue.clear()
+        remaining_jobs: Dict[str, BulkJob] = {}
+        ordered_jobs = sorted(jobs, key=lambda j: (-j.estimated_cost, BulkExecuteSubCommand.get_affinity_key(
+            j.simulation_configuration
+        )))
+        for rank, job in enumerate(ordered_jobs):
+            job_id = '%06i-%s' % (rank, job.simulation_key[:16])
+            work_queue.put(job_id, BulkExecuteSubCommand.get_work_queue_job(job, bulk_configuration, target_directory),
+                           lease_duration=lease_duration, max_attempts=max_attempts)
+            remaining_jobs[job_id] = job
+        logger.info('wrote %i jobs to work directory %s' % (len(remaining_jobs), work_queue.work_directory))
+
+        while len(remaining_jobs):
+            work_queue.requeue_expired()
+            for job_id in work_queue.get_finished():
+                if job_id not in remaining_jobs:
+                    continue
+                record = work_queue.get_result(job_id)
+                if record is not None:
+                    callback(BulkExecuteSubCommand.get_batch_result(remaining_jobs.pop(job_id), record))
+            if len(remaining_jobs):
+                time.sleep(poll_interval)
+
+    @staticmethod
+    def get_work_queue_job(job: BulkJob, bulk_configuration: Dict[str, Any],
+                           target_directory: str) -> Dict[str, Any]:
+        return {
+            'bulk_job': job._asdict(),
+            'bulk_configuration': {key: value for key, value in bulk_configuration.items()
+                                   if key not in ('simulations', 'renderers')},
+            'target_directory': os.path.abspath(target_directory)
+        }
+
+    @staticmethod
+    def get_batch_result(job: BulkJob, record: Dict[str, Any]) -> BatchResult:
+        """Convert the result record of a work queue job (see `bdtsim worker`) into a batch result."""
+        result = record.get('result') or {}
+        pipeline_result: Optional[PipelineResult] = None
+        if record.get('status') == 'success' and result.get('pipeline_result') is not None:
+            simulation_configuration, result_filename, renderer_errors = result['pipeline_result']
+            pipeline_result = (simulation_configuration, result_filename,
+                               [(renderer_configuration, error) for renderer_configuration, error in renderer_errors])
+        error = None if pipeline_result is not None else str(result.get('error') or 'unknown error')
+        statistics = JobStatistics(**{key: value for key, value in (result.get('statistics') or {}).items()
+                                      if key in JobStatistics._fields})
+        result_rows = None
+        if result.get('result_rows') is not None:
+            result_rows = ResultRows(*result['result_rows'])
+        return job, pipeline_result, error, statistics, result_rows
+
+    @staticmethod
+    def get_output_options(bulk_configuration: Dict[str, Any]) -> Dict[str, Any]:
+        """Get the options of the result file format, as included in the simulation job keys."""
+        return {
+            'output_format': bulk_configuration.get('output_format', 'pickle'),
+            'output_compression': bulk_configuration.get('output_compression', True),
+            'output_b64encoding': bulk_configuration.get('output_b64encoding', True)
+        }
+
+    @staticmethod
+    def get_serializer(bulk_configuration: Dict[str, Any]
+                       ) -> Union[SimulationResultSerializer, SimulationResultFileSerializer]:
+        output_format = bulk_configuration.get('output_format', 'pickle')
+        if output_format == 'pickle':
+            return SimulationResultSerializer(
+                compression=to_bool(bulk_configuration.get('output_compression', True)),
+                b64encoding=to_bool(bulk_configuration.get('output_b64encoding', True))
+            )
+        elif output_format == 'columnar':
+            return SimulationResultFileSerializer(
+                compression=compression_codec(bulk_configuration.get('output_compression', True))
+            )
+        else:
+            raise ValueError('unsupported output format "%s"' % output_format)
+
+    @staticmethod
+    def get_protocol_configurations(simulation_configurations: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Get the distinct protocol configurations of the given simulation configurations."""
+        protocol_configurations: Dict[str, Dict[str, Any]] = {}
         for simulation_configuration in simulation_configurations:
-            processes.put(process_pool.apply_async(
-                func=self.run_simulation,
-                kwds={
-                    'simulation_configuration': simulation_configuration
-                },
-                callback=simulation_success_callback,
-                error_callback=simulation_error_callback
-            ))
+            protocol_configuration = simulation_configuration.get('protocol')
+            if isinstance(protocol_configuration, dict):
+                protocol_configurations.setdefault(BulkExecuteSubCommand.get_affinity_key(simulation_configuration),
+                                                   protocol_configuration)
+        return list(protocol_configurations.values())
 
-        while not processes.empty():
-            process = processes.get(block=True)
-            process.wait()
+    @staticmethod
+    def warm_up(protocol_configurations: List[Dict[str, Any]]) -> None:
+        """Instantiate all given protocols once, filling the per-process contract compile cache.
+
+        Used as initializer of the worker processes. Instantiation errors are ignored here, they are reported by the
+        affected simulations.
+
+        Args:
+            protocol_configurations (List[Dict[str, Any]]): Protocol configurations (name and parameters)
+        """
+        for protocol_configuration in protocol_configurations:
+            try:
+                ProtocolManager.instantiate(
+                    name=protocol_configuration.get('name', ''),
+                    **protocol_configuration.get('parameters', {})
+                )
+            except Exception as e:
+                logger.debug('warm-up of protocol %s failed: %s' % (str(protocol_configuration), str(e)))
 
-        return 0
+    @staticmethod
+    def get_affinity_key(simulation_configuration: Dict[str, Any]) -> str:
+        """Protocol name and parameters, which determine the contracts (and solc version) used by a simulation."""
+        protocol_configuration = simulation_configuration.get('protocol', {})
+        return json.dumps([protocol_configuration.get('name'), protocol_configuration.get('parameters', {})],
+                          sort_keys=True, default=str)
+
+    @staticmethod
+    def get_affinity_batches(jobs: List[BulkJob], processes: int) -> List[List[BulkJob]]:
+        """Group jobs into batches, each executed by a single worker, ordered by descending estimated cost.
+
+        Jobs are grouped by protocol and ordered by protocol parameters, so that consecutive jobs of a worker use the
+        same solc version and contracts and hit its in-memory compile cache. Each group is split into batches of up to
+        `MAX_AFFINITY_BATCH_SIZE` jobs, whose estimated cost does not exceed the total cost divided by
+        `BATCHES_PER_PROCESS` times the number of processes (expensive jobs always form a batch on their own).
+        Simulations are never batched together with jobs only rendering existing results.
+        Dispatching the most expensive batches first (longest processing time first) avoids long running jobs
+        extending the total run time when scheduled late.
+
+        Args:
+            jobs (List[BulkJob]): Jobs to be executed
+            processes (int): Number of worker processes
+
+        Returns:
+            List[List[BulkJob]]: Job batches, most expensive first
+        """
+        groups: Dict[Tuple[str, bool], List[BulkJob]] = {}
+        for job in jobs:
+            protocol_name = str(job.simulation_configuration.get('protocol', {}).get('name'))
+            groups.setdefault((protocol_name, job.simulate), []).append(job)
+
+        batch_budget = sum(job.estimated_cost for job in jobs) / (max(processes, 1) * BATCHES_PER_PROCESS)
+        batches: List[List[BulkJob]] = []
+        for group_key in sorted(groups.keys()):
+            group = sorted(groups[group_key], key=lambda j: (-j.estimated_cost, BulkExecuteSubCommand.get_affinity_key(
+                j.simulation_configuration
+            )))
+            batch: List[BulkJob] = []
+            batch_cost = 0.0
+            for job in group:
+                if len(batch) and (len(batch) >= MAX_AFFINITY_BATCH_SIZE
+                                   or batch_cost + job.estimated_cost > batch_budget):
+                    batches.append(batch)
+                    batch, batch_cost = [], 0.0
+                batch.append(job)
+                batch_cost += job.estimated_cost
+            if len(batch):
+                batches.append(batch)
+        batches.sort(key=lambda b: sum(job.estimated_cost for job in b), reverse=True)
+        return batches
+
+    @staticmethod
+    def iter_pipeline_batch(jobs: List[BulkJob], bulk_configuration: Dict[str, Any],
+                            target_directory: str) -> Generator[BatchResult, None, None]:
+        """Run the pipelines of a batch of jobs within the current process, yielding the result of each job.
+
+        Args:
+            jobs (List[BulkJob]): Jobs to be executed
+            bulk_configuration (Dict[str, Any]): Bulk configuration (for output format options)
+            target_directory (str): Directory the result and rendering outputs are written to
+
+        Returns:
+            Generator[BatchResult, None, None]: for each job, either the result of `run_pipeline` or an error message,
+                the job statistics (the peak RSS is the peak of the worker process up to the end of the job), and the
+                result store rows of simulated jobs if `result_store` is set in the bulk configuration
+        """
+        for job in jobs:
+            start = time.monotonic()
+            try:
+                with BulkExecuteSubCommand.profile_job(job.simulation_configuration, bulk_configuration,
+                                                       target_directory), \
+                        BulkExecuteSubCommand.trace_job(job.simulation_configuration, bulk_configuration,
+                                                        target_directory):
+                    pipeline_result, simulation_result = BulkExecuteSubCommand.execute_pipeline(
+                        simulation_configuration=job.simulation_configuration,
+                        renderer_configurations=job.renderer_configurations,
+                        bulk_configuration=bulk_configuration,
+                        target_directory=target_directory,
+                        simulate=job.simulate,
+                        simulation_key=job.simulation_key
+                    )
+            except Exception as e:
+                yield job, None, str(e), JobStatistics(wall_time=time.monotonic() - start, peak_rss=peak_rss()), None
+                continue
+            wall_time = time.monotonic() - start
+            path_count, transaction_count = count_paths_and_transactions(simulation_result)
+            # the result is still in memory here, the parent process would need to load the whole result file again
+            result_rows = None
+            if job.simulate and bulk_configuration.get('result_store') is not None:
+                result_rows = ResultStore.collect_rows(job.simulation_configuration, simulation_result)
+            yield job, pipeline_result, None, JobStatistics(
+                wall_time=wall_time,
+                peak_rss=peak_rss(),
+                path_count=path_count,
+                transaction_count=transaction_count,
+                result_size=os.path.getsize(pipeline_result[1])
+            ), result_rows
+
+    @staticmethod
+    @contextlib.contextmanager
+    def profile_job(simulation_configuration: Dict[str, Any], bulk_configuration: Dict[str, Any],
+                    target_directory: str) -> Generator[None, None, None]:
+        """Profile the enclosed job execution if `profile` is set in the bulk configuration.
+
+        The profile is written to the target directory (`<simulation>.profile.folded` and `.json`), also if the job
+        failed. Profiles of all jobs can be summarized using `bdtsim profile <target directory>`.
+        """
+        profile_mode = bulk_configuration.get('profile')
+        if profile_mode is None:
+            yield
+            return
+        profiler = Profiler(str(profile_mode),
+                            interval=float(bulk_configuration.get('profile_interval', DEFAULT_SAMPLING_INTERVAL)))
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            profiler.write(os.path.join(target_directory, BulkExecuteSubCommand.get_output_filename(
+                simulation_configuration, suffix='profile'
+            )))
+
+    @staticmethod
+    @contextlib.contextmanager
+    def trace_job(simulation_configuration: Dict[str, Any], bulk_configuration: Dict[str, Any],
+                  target_directory: str) -> Generator[None, None, None]:
+        """Trace the enclosed job execution if `trace` is set in the bulk configuration.
+
+        The trace is written to the target directory (`<simulation>.trace.json`), also if the job failed.
+        """
+        if not to_bool(bulk_configuration.get('trace', False)):
+            yield
+            return
+        with tracing() as tracer:
+            try:
+                yield
+            finally:
+                BulkExecuteSubCommand.write_output(target_directory, BulkExecuteSubCommand.get_output_filename(
+                    simulation_configuration, suffix='trace.json'
+                ), json.dumps(tracer.to_chrome_trace(), default=str).encode('utf-8'))
+
+    @staticmethod
+    def plan_job(simulation_configuration: Dict[str, Any], renderer_configurations: List[Dict[str, Any]],
+                 target_directory: str, force: bool = False, only_failed: bool = False,
+                 bulk_configuration: Optional[Dict[str, Any]] = None) -> Tuple[str, bool, List[Dict[str, Any]]]:
+        """Determine which parts of a simulation job need to be (re-)executed, based on the manifests of previous runs.
+
+        Args:
+            simulation_configuration (Dict[str, Any]): Simulation configuration
+            renderer_configurations (List[Dict[str, Any]]): Configurations of all renderers
+            target_directory (str): Target directory of the bulk execution
+            force (bool): Execute everything, regardless of existing outputs
+            only_failed (bool): Only execute simulations and renderers which failed in the previous execution
+            bulk_configuration (Optional[Dict[str, Any]]): Bulk configuration (for output format options). Results
+                written with different output format options are considered outdated.
+
+        Returns:
+            Tuple[str, bool, List[Dict[str, Any]]]: simulation job key, whether to run the simulation and the
+                configurations of the renderers to be applied
+        """
+        simulation_key = simulation_job_key(simulation_configuration,
+                                            BulkExecuteSubCommand.get_output_options(bulk_configuration or {}))
+        if force:
+            return simulation_key, True, list(renderer_configurations)
+
+        result_status = job_status(
+            target_directory,
+            BulkExecuteSubCommand.get_output_filename(simulation_configuration, suffix='result'),
+            simulation_key
+        )
+        if only_failed:
+            simulate = result_status == STATUS_FAILED
+        else:
+            simulate = result_status != STATUS_SUCCESS
+        if not simulate and result_status != STATUS_SUCCESS:
+            # without a simulation result, there is nothing to render
+            return simulation_key, False, []
+
+        pending_renderer_configurations = []
+        for renderer_configuration in renderer_configurations:
+            renderer_key = renderer_job_key(simulation_key, renderer_configuration)
+            output_statuses = {job_status(target_directory, output_filename, renderer_key) for _, output_filename
+                               in BulkExecuteSubCommand.get_renderer_outputs(simulation_configuration,
+                                                                             renderer_configuration)}
+            if STATUS_FAILED in output_statuses or (output_statuses != {STATUS_SUCCESS}
+                                                    and (simulate or not only_failed)):
+                pending_renderer_configurations.append(renderer_configuration)
+        return simulation_key, simulate, pending_renderer_configurations
+
+    @staticmethod
+    def run_pipeline(simulation_configuration: Dict[str, Any], renderer_configurations: List[Dict[str, Any]],
+                     bulk_configuration: Dict[str, Any], target_directory: str, simulate: bool = True,
+                     simulation_key: Optional[str] = None) -> PipelineResult:
+        """Simulate, write the result file and apply all renderers within the current process.
+
+        See `execute_pipeline` for the arguments.
+        """
+        pipeline_result, _ = BulkExecuteSubCommand.execute_pipeline(simulation_configuration, renderer_configurations,
+                                                                    bulk_configuration, target_directory, simulate,
+                                                                    simulation_key)
+        return pipeline_result
 
     @staticmethod
-    def run_simulation(simulation_configuration: Dict[str, Any]) -> Tuple[Dict[str, Any], SimulationResult]:
+    def execute_pipeline(simulation_configuration: Dict[str, Any], renderer_configurations: List[Dict[str, Any]],
+                         bulk_configuration: Dict[str, Any], target_directory: str, simulate: bool = True,
+                         simulation_key: Optional[str] = None) -> Tuple[PipelineResult, SimulationResult]:
+        """Simulate, write the result file and apply all renderers within the current process.
+
+        Args:
+            simulation_configuration (Dict[str, Any]): Simulation configuration
+            renderer_configurations (List[Dict[str, Any]]): Configurations of the renderers to be applied
+            bulk_configuration (Dict[str, Any]): Bulk configuration (for output format options)
+            target_directory (str): Directory the result and rendering outputs are written to
+            simulate (bool): Whether to run the simulation. If not, the existing result file is loaded.
+            simulation_key (Optional[str]): Job key of the simulation. If set, manifests are written for all outputs.
+
+        Returns:
+            Tuple[PipelineResult, SimulationResult]: simulation configuration, path of the result file and the errors
+                of failed renderers, and the simulation result
+        """
+        result_filename = os.path.join(
+            target_directory,
+            BulkExecuteSubCommand.get_output_filename(simulation_configuration, suffix='result')
+        )
+        serializer = BulkExecuteSubCommand.get_serializer(bulk_configuration)
+        if not simulate:
+            simulation_result = ResultFileLoader(result_filename, serializer)()
+        elif isinstance(serializer, SimulationResultFileSerializer):
+            # columnar results are streamed to a temporary file while simulating, which is renamed when complete
+            tmp_result_filename = '%s.%i.tmp' % (result_filename, os.getpid())
+            try:
+                with open(tmp_result_filename, 'wb') as fp:
+                    with serializer.create_writer(fp) as result_writer:
+                        result_writer.add_metadata('simulation_configuration', simulation_configuration)
+                        _, simulation_result = BulkExecuteSubCommand.run_simulation(simulation_configuration,
+                                                                                    result_writer)
+                os.replace(tmp_result_filename, result_filename)
+            finally:
+                if os.path.exists(tmp_result_filename):
+                    os.remove(tmp_result_filename)
+        else:
+            _, simulation_result = BulkExecuteSubCommand.run_simulation(simulation_configuration)
+            BulkExecuteSubCommand.write_output(target_directory, os.path.basename(result_filename),
+                                               serializer.serialize(simulation_result))
+        if simulate and simulation_key is not None:
+            write_manifest(target_directory, os.path.basename(result_filename), simulation_key, STATUS_SUCCESS)
+
+        renderer_errors: List[Tuple[Dict[str, Any], str]] = []
+        for renderer_configuration in renderer_configurations:
+            renderer_outputs = BulkExecuteSubCommand.get_renderer_outputs(simulation_configuration,
+                                                                          renderer_configuration)
+            renderer_key = None
+            if simulation_key is not None:
+                renderer_key = renderer_job_key(simulation_key, renderer_configuration)
+            try:
+                renderer = RendererManager.instantiate(
+                    name=renderer_configuration.get('name', ''),
+                    **renderer_configuration.get('parameters', {})
+                )
+                with span('render', CATEGORY_RENDER, renderer=renderer_configuration.get('name')):
+                    if renderer_configuration.get('output_formats') is not None:
+                        outputs = BulkExecuteSubCommand.render_formats(renderer, renderer_configuration,
+                                                                       simulation_result)
+                        for output_format, output_filename in renderer_outputs:
+                            BulkExecuteSubCommand.write_output(target_directory, output_filename,
+                                                               outputs[str(output_format)])
+                    else:
+                        # renderer output is streamed into a temporary file, replacing the output file when complete
+                        with atomic_writer(os.path.join(target_directory, renderer_outputs[0][1])) as fp:
+                            renderer.render_to(simulation_result, fp)
+            except Exception as e:
+                renderer_errors.append((renderer_configuration, str(e)))
+                if renderer_key is not None:
+                    for _, output_filename in renderer_outputs:
+                        write_manifest(target_directory, output_filename, renderer_key, STATUS_FAILED, str(e))
+                continue
+            if renderer_key is not None:
+                for _, output_filename in renderer_outputs:
+                    write_manifest(target_directory, output_filename, renderer_key, STATUS_SUCCESS)
+
+        return (simulation_configuration, result_filename, renderer_errors), simulation_result
+
+    @staticmethod
+    def run_measured_simulation(simulation_configuration: Dict[str, Any]
+                                ) -> Tuple[Dict[str, Any], SimulationResult, JobStatistics]:
+        """Run a simulation as `run_simulation` does, measuring its wall time and the peak RSS of the worker.
+
+        Returns:
+            Tuple[Dict[str, Any], SimulationResult, JobStatistics]: simulation configuration, simulation result and
+                the job statistics (only wall time and peak RSS are set)
+        """
+        start = time.monotonic()
+        _, simulation_result = BulkExecuteSubCommand.run_simulation(simulation_configuration)
+        statistics = JobStatistics(wall_time=time.monotonic() - start, peak_rss=peak_rss())
+        return simulation_configuration, simulation_result, statistics
+
+    @staticmethod
+    def run_simulation(simulation_configuration: Dict[str, Any],
+                       result_writer: Optional[SimulationResultFileWriter] = None
+                       ) -> Tuple[Dict[str, Any], SimulationResult]:
         protocol_configuration = simulation_configuration.get('protocol')
         environment_configuration = simulation_configuration.get('environment')
         data_provider_configuration = simulation_configuration.get('data_provider')
@@ -170,6 +836,7 @@ class BulkExecuteSubCommand(SubCommand):
             buyer=account_file.buyer,
             protocol_path_coercion=simulation_configuration.get('protocol_path'),
             price=simulation_configuration.get('price', DEFAULT_ASSET_PRICE),
+            result_writer=result_writer
         )
 
         simulation_result = simulation.run()
@@ -177,13 +844,71 @@ class BulkExecuteSubCommand(SubCommand):
 
     @staticmethod
     def run_renderer(simulation_configuration: Dict[str, Any], renderer_configuration: Dict[str, Any],
-                     simulation_result: SimulationResult) -> Tuple[Dict[str, Any], Dict[str, Any], bytes]:
+                     simulation_result: SimulationResult
+                     ) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, bytes]]:
+        """Apply a renderer to a simulation result.
+
+        Returns:
+            Tuple[Dict[str, Any], Dict[str, Any], Dict[str, bytes]]: simulation configuration, renderer configuration
+                and the rendered outputs by output filename
+        """
         renderer = RendererManager.instantiate(
             name=renderer_configuration.get('name', ''),
             **renderer_configuration.get('parameters', {})
         )
-        result = renderer.render(simulation_result)
-        return simulation_configuration, renderer_configuration, result
+        renderer_outputs = BulkExecuteSubCommand.get_renderer_outputs(simulation_configuration, renderer_configuration)
+        if renderer_configuration.get('output_formats') is not None:
+            outputs = BulkExecuteSubCommand.render_formats(renderer, renderer_configuration, simulation_result)
+            return simulation_configuration, renderer_configuration, {
+                output_filename: outputs[str(output_format)] for output_format, output_filename in renderer_outputs
+            }
+        return simulation_configuration, renderer_configuration, {
+            renderer_outputs[0][1]: renderer.render(simulation_result)
+        }
+
+    @staticmethod
+    def render_formats(renderer: Renderer, renderer_configuration: Dict[str, Any],
+                       simulation_result: SimulationResult) -> Dict[str, bytes]:
+        """Render a simulation result into all `output_formats` of a renderer configuration at once.
+
+        The dot source is created once, the conversions into the output formats are executed concurrently.
+        """
+        if not isinstance(renderer, GraphvizMixin):
+            raise ValueError('renderer %s does not support output_formats' % str(renderer_configuration.get('name')))
+        return renderer.render_formats(simulation_result,
+                                       BulkExecuteSubCommand.get_output_formats(renderer_configuration))
+
+    @staticmethod
+    def get_output_formats(renderer_configuration: Dict[str, Any]) -> List[str]:
+        output_formats = renderer_configuration.get('output_formats')
+        if isinstance(output_formats, str):
+            return [output_format.strip() for output_format in output_formats.split(',')]
+        if not isinstance(output_formats, list) or len(output_formats) == 0:
+            raise ValueError('output_formats needs to be a non-empty list')
+        return [str(output_format) for output_format in output_formats]
+
+    @staticmethod
+    def get_renderer_outputs(simulation_configuration: Dict[str, Any],
+                             renderer_configuration: Dict[str, Any]) -> List[Tuple[Optional[str], str]]:
+        """Output formats and filenames of a renderer.
+
+        Renderers configured with `output_formats` create one output per format, using the format as filename suffix.
+
+        Returns:
+            List[Tuple[Optional[str], str]]: output format (None for renderers without `output_formats`) and output
+                filename of each output
+        """
+        if renderer_configuration.get('output_formats') is None:
+            return [(None, BulkExecuteSubCommand.get_output_filename(
+                simulation_configuration, renderer_configuration, suffix=renderer_configuration.get('suffix')
+            ))]
+        return [(output_format, BulkExecuteSubCommand.get_output_filename(
+            simulation_configuration, renderer_configuration, suffix=output_format
+        )) for output_format in BulkExecuteSubCommand.get_output_formats(renderer_configuration)]
+
+    @staticmethod
+    def write_output(target_directory: str, filename: str, data: bytes) -> None:
+        write_atomic(os.path.join(target_directory, filename), data)
 
     @staticmethod
     def get_output_filename(simulation_configuration: Dict[str, Any],
@@ -204,6 +929,11 @@ class BulkExecuteSubCommand(SubCommand):
             component2str(simulation_configuration.get('data_provider', DEFAULT_DATA_PROVIDER_CONFIGURATION))
         ])
 
+        # sweep axes not covered by component parameters (e.g. price)
+        for axis, value in simulation_configuration.get('sweep', {}).items():
+            if axis.split('.')[0] not in ('protocol', 'environment', 'data_provider'):
+                output += '_%s=%s' % (axis, value)
+
         if renderer_configuration is not None:
             output += '_%s' % component2str(renderer_configuration)
 
@@ -16,8 +16,10 @@
 # limitations under the License.
 
 import argparse
+import importlib
 import logging
-from typing import Dict, Optional, Type
+import sys
+from typing import Dict, List, Optional, Sequence, Type, Union
 
 import bdtsim
 
@@ -39,19 +41,60 @@ class CommandManager(object):
                                            choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
                                            help='set log level for bdtsim')
         self._command_parser = self._argument_parser.add_subparsers(title='command', dest='command', required=True)
+        self._registrations: Dict[str, Union[Type[SubCommand], str]] = {}
         self._subcommands: Dict[str, SubCommand] = {}
 
-    def register_subcommand(self, subcommand: str, cls: Type[SubCommand]) -> None:
-        if not issubclass(cls, SubCommand):
+    def register_subcommand(self, subcommand: str, cls: Union[Type[SubCommand], str]) -> None:
+        """Register a subcommand.
+
+        Args:
+            subcommand (str): Name of the subcommand
+            cls (Union[Type[SubCommand], str]): SubCommand class, or its location (`module:class`). Subcommands given
+                by their location are only imported if used (or for printing the general help).
+        """
+        if not isinstance(cls, str) and not issubclass(cls, SubCommand):
             raise ValueError('cls is not a subclass of SubCommand')
-        self._subcommands[subcommand] = cls(self._command_parser.add_parser(subcommand, help=cls.help))
+        self._registrations[subcommand] = cls
+
+    @staticmethod
+    def _load(cls: Union[Type[SubCommand], str]) -> Type[SubCommand]:
+        if not isinstance(cls, str):
+            return cls
+        module_name, class_name = cls.split(':')
+        loaded = getattr(importlib.import_module(module_name), class_name)
+        if not issubclass(loaded, SubCommand):
+            raise ValueError('%s is not a subclass of SubCommand' % cls)
+        return loaded  # type: ignore
+
+    def _get_selected_subcommand(self, args: Sequence[str]) -> Optional[str]:
+        # skip global arguments, the first positional argument is the subcommand
+        arg_iterator = iter(args)
+        for arg in arg_iterator:
+            if arg in ('-l', '--log-level'):
+                next(arg_iterator, None)
+            elif not arg.startswith('-'):
+                return arg if arg in self._registrations else None
+        return None
+
+    def _add_subcommands(self, args: Sequence[str]) -> None:
+        selected = self._get_selected_subcommand(args)
+        for subcommand, cls in self._registrations.items():
+            if selected is None or subcommand == selected:
+                # selected subcommand, or general help/error message listing all subcommands
+                loaded = self._load(cls)
+                self._subcommands[subcommand] = loaded(self._command_parser.add_parser(subcommand, help=loaded.help))
+            else:
+                self._command_parser.add_parser(subcommand)
 
     def get_subcommand(self, subcommand: str) -> SubCommand:
         return self._subcommands[subcommand]
 
-    def run(self) -> Optional[int]:
-        args = self._argument_parser.parse_args()
+    def run(self, args: Optional[List[str]] = None) -> Optional[int]:
+        if args is None:
+            args = sys.argv[1:]
+        self._add_subcommands(args)
+        parsed_args = self._argument_parser.parse_args(args)
         logger = logging.getLogger(bdtsim.__name__)
-        logger.setLevel(logging.getLevelName(args.log_level))
-        subcommand = self.get_subcommand(args.command)
-        return subcommand(args)
+        logger.setLevel(logging.getLevelName(parsed_args.log_level))
+        subcommand = self.get_subcommand(parsed_args.command)
+        return subcommand(parsed_args)
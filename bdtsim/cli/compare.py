@@ -0,0 +1,99 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import csv
+import io
+import sys
+from typing import Any, List
+
+from bdtsim.comparison import ComparisonEntry, VALUE_COLUMNS, get_curves, get_curves_table, get_table, \
+    iter_result_files, iter_result_store, render_curves_svg
+from bdtsim.result_store import HONESTY_CLASSES
+from bdtsim.simulation_result import SimulationResultSerializer
+from bdtsim.util.types import to_bool
+from .command_manager import SubCommand
+
+
+class CompareSubCommand(SubCommand):
+    help = 'compare multiple simulation results (e.g. of a bulk execution)'
+
+    def __init__(self, parser: argparse.ArgumentParser) -> None:
+        super(CompareSubCommand, self).__init__(parser)
+        parser.add_argument('results', nargs='*', help='result files or directories containing result files')
+        parser.add_argument('--result-store', action='append', dest='result_stores', default=[],
+                            help='additionally compare the simulations of a result store created by bulk-execute')
+        parser.add_argument('--input-compression', default=True, help='treat non-columnar result files as gzip'
+                                                                      ' compressed data, default: true')
+        parser.add_argument('--input-b64encoding', default=True, help='decode base64 encoding of non-columnar result'
+                                                                      ' files, default: true')
+        parser.add_argument('--curve', metavar='PARAMETER', default=None,
+                            help='create curves over the given numeric parameter (e.g. data_provider.size or'
+                                 ' protocol.slices_count) instead of a comparison table')
+        parser.add_argument('--value', default='total_tx_fees_max',
+                            help='value shown by curves, one of %s, or total_<value> for the sum of seller and buyer,'
+                                 ' default: total_tx_fees_max' % ', '.join(VALUE_COLUMNS))
+        parser.add_argument('--honesty', choices=HONESTY_CLASSES, default='hh',
+                            help='honesty class the curve values are taken from, default: hh')
+        parser.add_argument('--series', action='append', default=None,
+                            help='parameters distinguishing curves (can be used multiple times), default: protocol')
+        parser.add_argument('--log-x', action='store_true', default=False, help='logarithmic x axis (svg only)')
+        parser.add_argument('--log-y', action='store_true', default=False, help='logarithmic y axis (svg only)')
+        parser.add_argument('-f', '--format', choices=('csv', 'svg'), default='csv',
+                            help='output format, svg is supported for curves only, default: csv')
+        parser.add_argument('-o', '--output', default='-', help='Output file to be used, default: stdout')
+
+    def __call__(self, args: argparse.Namespace) -> int:
+        if len(args.results) == 0 and len(args.result_stores) == 0:
+            raise ValueError('no results to be compared, provide result files or --result-store')
+        if args.format == 'svg' and args.curve is None:
+            raise ValueError('svg output is supported for curves (--curve) only')
+
+        serializer = SimulationResultSerializer(
+            compression=to_bool(args.input_compression),
+            b64encoding=to_bool(args.input_b64encoding)
+        )
+        # result summaries are loaded one by one and only their reduced form is kept
+        entries: List[ComparisonEntry] = list(iter_result_files(args.results, serializer))
+        for result_store in args.result_stores:
+            entries.extend(iter_result_store(result_store))
+
+        if args.curve is None:
+            output = self._get_csv(*get_table(entries))
+        else:
+            curves = get_curves(entries, args.curve, args.value, args.honesty, args.series or ['protocol'])
+            if args.format == 'svg':
+                output = render_curves_svg(curves, args.curve, '%s (%s)' % (args.value, args.honesty),
+                                           log_x=args.log_x, log_y=args.log_y)
+            else:
+                output = self._get_csv(*get_curves_table(curves, args.curve))
+
+        if args.output == '-':
+            sys.stdout.buffer.write(output)
+            sys.stdout.buffer.flush()
+        else:
+            with open(args.output, 'wb') as fp:
+                fp.write(output)
+        return 0
+
+    @staticmethod
+    def _get_csv(columns: List[str], rows: List[List[Any]]) -> bytes:
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(columns)
+        writer.writerows(rows)
+        return output.getvalue().encode('utf-8')
@@ -17,26 +17,24 @@
 
 from typing import Optional
 
-from .bulk_execute import BulkExecuteSubCommand
 from .command_manager import CommandManager
-from .environment_info import EnvironmentInfoSubCommand
-from .list_data_providers import ListDataProvidersSubCommand
-from .list_environments import ListEnvironmentsSubCommand
-from .list_protocols import ListProtocolsSubCommand
-from .list_renderers import ListRenderersSubCommand
-from .render import RenderSubCommand
-
-from .run import RunSubCommand
 
 
 def main() -> Optional[int]:
     command_manager = CommandManager()
-    command_manager.register_subcommand('bulk-execute', BulkExecuteSubCommand)
-    command_manager.register_subcommand('environment-info', EnvironmentInfoSubCommand)
-    command_manager.register_subcommand('list-protocols', ListProtocolsSubCommand)
-    command_manager.register_subcommand('list-environments', ListEnvironmentsSubCommand)
-    command_manager.register_subcommand('list-data-providers', ListDataProvidersSubCommand)
-    command_manager.register_subcommand('list-renderers', ListRenderersSubCommand)
-    command_manager.register_subcommand('render', RenderSubCommand)
-    command_manager.register_subcommand('run', RunSubCommand)
+    # subcommands are imported only when used, keeping the startup time of the command line interface low
+    command_manager.register_subcommand('benchmark', 'bdtsim.cli.benchmark:BenchmarkSubCommand')
+    command_manager.register_subcommand('bulk-execute', 'bdtsim.cli.bulk_execute:BulkExecuteSubCommand')
+    command_manager.register_subcommand('compare', 'bdtsim.cli.compare:CompareSubCommand')
+    command_manager.register_subcommand('environment-info', 'bdtsim.cli.environment_info:EnvironmentInfoSubCommand')
+    command_manager.register_subcommand('list-protocols', 'bdtsim.cli.list_protocols:ListProtocolsSubCommand')
+    command_manager.register_subcommand('list-environments', 'bdtsim.cli.list_environments:ListEnvironmentsSubCommand')
+    command_manager.register_subcommand('list-data-providers',
+                                        'bdtsim.cli.list_data_providers:ListDataProvidersSubCommand')
+    command_manager.register_subcommand('list-renderers', 'bdtsim.cli.list_renderers:ListRenderersSubCommand')
+    command_manager.register_subcommand('profile', 'bdtsim.cli.profile:ProfileSubCommand')
+    command_manager.register_subcommand('query', 'bdtsim.cli.query:QuerySubCommand')
+    command_manager.register_subcommand('render', 'bdtsim.cli.render:RenderSubCommand')
+    command_manager.register_subcommand('run', 'bdtsim.cli.run:RunSubCommand')
+    command_manager.register_subcommand('worker', 'bdtsim.cli.worker:WorkerSubCommand')
     return command_manager.run()
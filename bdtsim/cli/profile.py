@@ -0,0 +1,205 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import sys
+from typing import Any, Dict, Generator, List, Optional
+
+from bdtsim.profiling import COLLAPSED_SUFFIX, DEFAULT_SAMPLING_INTERVAL, PROFILE_MODE_CPROFILE, \
+    PROFILE_MODE_TRACEMALLOC, PROFILE_MODES, PROFILE_VALUE_NAMES, Profile, Profiler
+from bdtsim.tracing import Tracer, summarize_trace, tracing
+from bdtsim.util.filesize import FileSize
+from bdtsim.util.strings import str_block_table
+from .command_manager import SubCommand
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_OUTPUT = 'bdtsim-profile'
+DEFAULT_TOP_FRAMES = 20
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser, output: bool = True) -> None:
+    """Add the profiling options (`--profile`, `--profile-interval` and optionally `--profile-output`) to a parser."""
+    parser.add_argument('--profile', choices=PROFILE_MODES, default=None,
+                        help='profile the execution: deterministic (cprofile), statistical (sampling) or memory'
+                             ' allocations (tracemalloc)')
+    parser.add_argument('--profile-interval', type=float, default=DEFAULT_SAMPLING_INTERVAL,
+                        help='seconds between two samples of the sampling profiler, default: %s'
+                             % str(DEFAULT_SAMPLING_INTERVAL))
+    if output:
+        parser.add_argument('--profile-output', default=DEFAULT_PROFILE_OUTPUT,
+                            help='filename prefix of the profile outputs (<prefix>.folded, <prefix>.json and for'
+                                 ' cprofile <prefix>.prof), default: %s' % DEFAULT_PROFILE_OUTPUT)
+
+
+@contextlib.contextmanager
+def profiling(args: argparse.Namespace) -> Generator[None, None, None]:
+    """Profile the enclosed code if requested by the `--profile` option, writing the profile and printing its summary
+    to stderr afterwards (also if the code failed).
+
+    Args:
+        args (argparse.Namespace): Parsed arguments, see `add_profile_arguments`
+    """
+    if args.profile is None:
+        yield
+        return
+    profiler = Profiler(args.profile, interval=args.profile_interval)
+    profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        paths = profiler.write(args.profile_output)
+        logger.info('profile written to %s' % ', '.join(paths))
+        print(format_profile_summary(profiler.profile), file=sys.stderr)
+
+
+def add_trace_arguments(parser: argparse.ArgumentParser, embed: bool = False) -> None:
+    """Add the tracing options (`--trace` and optionally `--trace-embed`) to a parser."""
+    parser.add_argument('--trace', metavar='FILE', default=None,
+                        help='record the durations of the simulation, protocol, environment, compile and render phases'
+                             ' and write them as Chrome trace (JSON) to the given file')
+    if embed:
+        parser.add_argument('--trace-embed', action='store_true', default=False,
+                            help='store the trace of the simulation in the simulation result')
+
+
+@contextlib.contextmanager
+def trace_execution(args: argparse.Namespace) -> Generator[Optional[Tracer], None, None]:
+    """Trace the enclosed code if requested by the `--trace` (or `--trace-embed`) option, writing the trace and printing
+    its summary to stderr afterwards (also if the code failed).
+
+    Args:
+        args (argparse.Namespace): Parsed arguments, see `add_trace_arguments`
+
+    Returns:
+        Generator[Optional[Tracer], None, None]: the active tracer, None if tracing is disabled
+    """
+    if args.trace is None and not getattr(args, 'trace_embed', False):
+        yield None
+        return
+    with tracing() as tracer:
+        try:
+            yield tracer
+        finally:
+            trace = tracer.to_chrome_trace()
+            if args.trace is not None:
+                with open(args.trace, 'w') as fp:
+                    json.dump(trace, fp, default=str)
+                logger.info('trace written to %s' % args.trace)
+                print(format_trace_summary(trace), file=sys.stderr)
+
+
+def format_trace_summary(trace: Dict[str, Any]) -> str:
+    """Format the span durations of a trace, aggregated per span name, as text table."""
+    rows: List[List[str]] = [['span', 'count', 'total', 'mean', 'max']]
+    for name, entry in summarize_trace(trace).items():
+        durations = ['%.1f ms' % (entry[key] * 1000) for key in ('total', 'mean', 'max')]
+        rows.append([name, str(int(entry['count']))] + durations)
+    return str_block_table(rows, column_separator='  ', row_separator='')
+
+
+def format_value(value: int, unit: str) -> str:
+    if unit == 'us':
+        return '%.1f ms' % (value / 1000)
+    if unit == 'bytes':
+        return '%sB' % FileSize.format_human_readable(value, 1) if value > 0 else '0B'
+    return str(value)
+
+
+def format_profile_summary(profile: Profile, top_frames: int = DEFAULT_TOP_FRAMES) -> str:
+    """Format the subsystem breakdown and the frames with the highest self values of a profile as text tables."""
+    total = profile.total
+
+    def share(value: int) -> str:
+        return '%.1f%%' % (100 * value / total) if total > 0 else '-'
+
+    header = 'profile: %s, total %s' % (profile.mode, format_value(total, profile.unit))
+    if profile.mode == PROFILE_MODE_TRACEMALLOC:
+        header += ' allocated at the end, peak %s' % format_value(int(profile.metadata.get('peak_memory', 0)),
+                                                                  profile.unit)
+    elif profile.mode != PROFILE_MODE_CPROFILE:
+        header += ' %s' % profile.unit
+
+    value_name = PROFILE_VALUE_NAMES[profile.mode]
+    subsystem_rows: List[List[str]] = [['subsystem', value_name, 'share']]
+    for subsystem, value in profile.subsystem_breakdown().items():
+        subsystem_rows.append([subsystem, format_value(value, profile.unit), share(value)])
+    frame_rows: List[List[str]] = [['frame (self)', value_name, 'share']]
+    for frame, value in profile.top_frames(top_frames):
+        frame_rows.append([frame, format_value(value, profile.unit), share(value)])
+    return '\n'.join([
+        header,
+        '',
+        str_block_table(subsystem_rows, column_separator='  ', row_separator=''),
+        '',
+        str_block_table(frame_rows, column_separator='  ', row_separator='')
+    ])
+
+
+class ProfileSubCommand(SubCommand):
+    help = 'summarize and merge profiles written by --profile (e.g. of all jobs of a bulk execution)'
+
+    def __init__(self, parser: argparse.ArgumentParser) -> None:
+        super(ProfileSubCommand, self).__init__(parser)
+        parser.add_argument('profiles', nargs='+',
+                            help='profiles (<prefix>.folded) or directories containing profiles')
+        parser.add_argument('--top', type=int, default=DEFAULT_TOP_FRAMES,
+                            help='number of frames with the highest self values to be shown, default: %i'
+                                 % DEFAULT_TOP_FRAMES)
+        parser.add_argument('-o', '--output', default=None,
+                            help='write the merged collapsed stacks to the given file (- for stdout)')
+
+    def __call__(self, args: argparse.Namespace) -> int:
+        merged: Optional[Profile] = None
+        paths = self.get_profile_paths(args.profiles)
+        if len(paths) == 0:
+            raise ValueError('no profiles found')
+        for path in paths:
+            profile = Profile.load(path)
+            if merged is None:
+                merged = Profile(profile.mode)
+            merged += profile
+        assert merged is not None
+        merged.metadata['profiles'] = len(paths)
+
+        if args.output is not None:
+            if args.output == '-':
+                merged.write_collapsed(sys.stdout)
+                print(format_profile_summary(merged, args.top), file=sys.stderr)
+                return 0
+            with open(args.output, 'w') as fp:
+                merged.write_collapsed(fp)
+        print('%i profiles' % len(paths))
+        print(format_profile_summary(merged, args.top))
+        return 0
+
+    @staticmethod
+    def get_profile_paths(profiles: List[str]) -> List[str]:
+        paths: List[str] = []
+        for profile in profiles:
+            if os.path.isdir(profile):
+                paths.extend(sorted(os.path.join(profile, filename) for filename in os.listdir(profile)
+                                    if filename.endswith(COLLAPSED_SUFFIX)))
+            else:
+                paths.append(profile)
+        return paths
@@ -0,0 +1,75 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import csv
+import os
+import sys
+from typing import Any, List, Tuple
+
+from bdtsim.result_store import HONESTY_CLASSES, QUERY_OPERATORS, ResultStore
+from .command_manager import SubCommand
+
+
+class QuerySubCommand(SubCommand):
+    help = 'query a result store created by bulk-execute'
+
+    def __init__(self, parser: argparse.ArgumentParser) -> None:
+        super(QuerySubCommand, self).__init__(parser)
+        parser.add_argument('result_store', help='SQLite result store file')
+        parser.add_argument('sql', nargs='?', help='SQL query to be executed, filter options are ignored if provided')
+        parser.add_argument('-s', '--select', default='*',
+                            help='columns or expressions to be selected from the results view, default: *')
+        parser.add_argument('--protocol', help='limit to simulations of the given protocol')
+        parser.add_argument('--parameter', nargs=3, action='append', dest='parameters', default=[],
+                            metavar=('KEY', 'OPERATOR', 'VALUE'),
+                            help='limit to simulations with matching parameter, operator is one of %s'
+                                 % ', '.join(QUERY_OPERATORS))
+        parser.add_argument('--honesty', choices=HONESTY_CLASSES,
+                            help='limit to final nodes of the given honesty class (seller first, h=honest,'
+                                 ' m=malicious)')
+        parser.add_argument('--account', help='limit to aggregations of the given account (e.g. Seller)')
+        parser.add_argument('-o', '--output', default='-', help='Output file to be used (CSV), default: stdout')
+
+    def __call__(self, args: argparse.Namespace) -> int:
+        if not os.path.isfile(args.result_store):
+            raise ValueError('result store %s does not exist' % args.result_store)
+
+        with ResultStore(args.result_store) as result_store:
+            if args.sql is not None:
+                columns, rows = result_store.query(args.sql)
+            else:
+                columns, rows = result_store.query_results(
+                    select=args.select,
+                    protocol=args.protocol,
+                    parameters=[(key, operator, value) for key, operator, value in args.parameters],
+                    honesty=args.honesty,
+                    account=args.account
+                )
+
+        if args.output == '-':
+            self._write_csv(sys.stdout, columns, rows)
+        else:
+            with open(args.output, 'w', newline='') as fp:
+                self._write_csv(fp, columns, rows)
+        return 0
+
+    @staticmethod
+    def _write_csv(fp: Any, columns: List[str], rows: List[Tuple[Any, ...]]) -> None:
+        writer = csv.writer(fp)
+        writer.writerow(columns)
+        writer.writerows(rows)
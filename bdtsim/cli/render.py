@@ -17,12 +17,15 @@
 
 import argparse
 import sys
-from typing import Dict
+from typing import Any, BinaryIO, Callable, Dict, Union
 
 from bdtsim.renderer import RendererManager
-from bdtsim.simulation_result import SimulationResultSerializer
+from bdtsim.simulation_result import SimulationResult, SimulationResultSerializer, SimulationResultSummary
+from bdtsim.simulation_result_file import SimulationResultFileReader, MAGIC, is_simulation_result_file
+from bdtsim.tracing import CATEGORY_RENDER, span
 from bdtsim.util.types import to_bool
 from .command_manager import SubCommand
+from .profile import add_profile_arguments, add_trace_arguments, profiling, trace_execution
 
 
 class RenderSubCommand(SubCommand):
@@ -33,45 +36,90 @@ class RenderSubCommand(SubCommand):
         parser.add_argument('renderer', choices=RendererManager.renderers.keys(), help='Renderer to be used')
         parser.add_argument('-i', '--input', default='-', help='Input file to be used, default: stdin')
         parser.add_argument('--input-compression', default=True, help='treat the input as gzip compressed data'
-                                                                      ' (after base64 decoding), default: true')
+                                                                      ' (after base64 decoding), default: true;'
+                                                                      ' ignored for columnar input')
         parser.add_argument('--input-b64encoding', default=True, help='decode base64 encoding'
-                                                                      ' (done before decompressing), default: true')
+                                                                      ' (done before decompressing), default: true;'
+                                                                      ' ignored for columnar input')
         parser.add_argument('-o', '--output', default='-', help='Output file to be used, default: stdout')
         parser.add_argument('-r', '--renderer-parameter', nargs=2, action='append', dest='parameters',
                             default=[], metavar=('KEY', 'VALUE'), help='additional parameters for the renderer')
+        add_profile_arguments(parser)
+        add_trace_arguments(parser)
 
     def __call__(self, args: argparse.Namespace) -> int:
-        # prepare parameters
-        parameters: Dict[str, str] = {}
-        for key, value in args.parameters:
-            parameters[key.replace('-', '_')] = value
+        with profiling(args), trace_execution(args):
+            # prepare parameters
+            parameters: Dict[str, str] = {}
+            for key, value in args.parameters:
+                parameters[key.replace('-', '_')] = value
 
-        # instantiate renderer
-        renderer = RendererManager.instantiate(
-            args.renderer,
-            **parameters
-        )
+            # instantiate renderer
+            renderer = RendererManager.instantiate(
+                args.renderer,
+                **parameters
+            )
 
-        # load input data
-        if args.input == '-':
-            data = sys.stdin.buffer.read()
+            # renderers only requiring the summary can skip loading the result tree with all transactions
+            if renderer.summary_only:
+                with span('load_result', CATEGORY_RENDER, summary_only=True):
+                    summary = self.load_simulation_result_summary(args)
+                with span('render', CATEGORY_RENDER, renderer=args.renderer):
+                    self._write_output(args, lambda fp: fp.write(renderer.render_summary(summary)))
+            else:
+                # streaming renderers write their output while walking the result tree
+                with span('load_result', CATEGORY_RENDER, summary_only=False):
+                    simulation_result = self.load_simulation_result(args)
+                with span('render', CATEGORY_RENDER, renderer=args.renderer):
+                    self._write_output(args, lambda fp: renderer.render_to(simulation_result, fp))
+
+            return 0
+
+    @staticmethod
+    def _write_output(args: argparse.Namespace, write: Callable[[BinaryIO], Any]) -> None:
+        if args.output == '-':
+            write(sys.stdout.buffer)
+            sys.stdout.buffer.flush()
         else:
+            with open(args.output, 'wb') as fp:
+                write(fp)
+
+    @staticmethod
+    def load_simulation_result(args: argparse.Namespace) -> SimulationResult:
+        source = RenderSubCommand._open_input(args)
+        if isinstance(source, SimulationResultFileReader):
+            with source as reader:
+                return reader.load()
+        return RenderSubCommand._get_serializer(args).unserialize(source)
+
+    @staticmethod
+    def load_simulation_result_summary(args: argparse.Namespace) -> SimulationResultSummary:
+        source = RenderSubCommand._open_input(args)
+        if isinstance(source, SimulationResultFileReader):
+            with source as reader:
+                return reader.load_summary()
+        return RenderSubCommand._get_serializer(args).unserialize(source).summary
+
+    @staticmethod
+    def _open_input(args: argparse.Namespace) -> Union[SimulationResultFileReader, bytes]:
+        # columnar result files are memory-mapped instead of being read completely
+        if args.input != '-':
+            with open(args.input, 'rb') as fp:
+                columnar_input = fp.read(len(MAGIC)) == MAGIC
+            if columnar_input:
+                return SimulationResultFileReader(args.input)
             with open(args.input, 'rb') as fp:
                 data = fp.read()
+        else:
+            data = sys.stdin.buffer.read()
+
+        if is_simulation_result_file(data):
+            return SimulationResultFileReader(data)
+        return data
 
-        serializer = SimulationResultSerializer(
+    @staticmethod
+    def _get_serializer(args: argparse.Namespace) -> SimulationResultSerializer:
+        return SimulationResultSerializer(
             compression=to_bool(args.input_compression),
             b64encoding=to_bool(args.input_b64encoding)
         )
-
-        simulation_result = serializer.unserialize(data)
-
-        result = renderer.render(simulation_result)
-
-        if args.output == '-':
-            sys.stdout.buffer.write(result)
-        else:
-            with open(args.output, 'wb') as fp:
-                fp.write(result)
-
-        return 0
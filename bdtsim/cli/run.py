@@ -16,8 +16,9 @@
 # limitations under the License.
 
 import argparse
+import os
 import sys
-from typing import Dict
+from typing import BinaryIO, Dict, Optional
 
 from bdtsim.account import AccountFile
 from bdtsim.data_provider import DataProviderManager
@@ -25,9 +26,11 @@ from bdtsim.environment import EnvironmentManager
 from bdtsim.protocol import ProtocolManager, DEFAULT_ASSET_PRICE
 from bdtsim.simulation import Simulation
 from bdtsim.simulation_result import SimulationResultSerializer
+from bdtsim.simulation_result_file import SimulationResultFileWriter, compression_codec
 from bdtsim.util.argparse import ProtocolPathCoercionParameter
 from bdtsim.util.types import to_bool
 from .command_manager import SubCommand
+from .profile import add_profile_arguments, add_trace_arguments, profiling, trace_execution
 
 
 class RunSubCommand(SubCommand):
@@ -53,67 +56,105 @@ class RunSubCommand(SubCommand):
                             dest='data_provider_parameters', default=[], metavar=('KEY', 'VALUE'),
                             help='pass additional parameters to the data provider')
         parser.add_argument('-o', '--output', default='-', help='Output file to be used, default: stdout')
+        parser.add_argument('--output-format', choices=['pickle', 'columnar'], default='pickle',
+                            help='format of the generated output; columnar output is written while the simulation is'
+                                 ' running, default: pickle')
         parser.add_argument('--output-compression', default=True, help='do a gzip compression on the generated output'
-                                                                       ' (before base64 encoding), default: true')
+                                                                       ' (before base64 encoding), default: true;'
+                                                                       ' columnar output also supports gzip/zstd/none')
         parser.add_argument('--output-b64encoding', default=True, help='encode the output using the base64 standard'
                                                                        ' (after compression), default: true')
+        add_profile_arguments(parser)
+        add_trace_arguments(parser, embed=True)
 
     def __call__(self, args: argparse.Namespace) -> int:
-        protocol_parameters: Dict[str, str] = {}
-        environment_parameters: Dict[str, str] = {}
-        data_provider_parameters: Dict[str, str] = {}
-
-        for arg, dest in [
-            (args.protocol_parameters, protocol_parameters),
-            (args.environment_parameters, environment_parameters),
-            (args.data_provider_parameters, data_provider_parameters)
-        ]:
-            for key, value in arg:
-                dest[key.replace('-', '_')] = value
-
-        protocol = ProtocolManager.instantiate(
-            args.protocol,
-            **protocol_parameters
-        )
-
-        account_file = AccountFile(path=args.account_file)
-
-        environment = EnvironmentManager.instantiate(
-            name=args.environment,
-            operator=account_file.operator,
-            seller=account_file.seller,
-            buyer=account_file.buyer,
-            **environment_parameters
-        )
-
-        data_provider = DataProviderManager.instantiate(
-            args.data_provider,
-            **data_provider_parameters
-        )
-
-        simulation = Simulation(
-            protocol=protocol,
-            environment=environment,
-            data_provider=data_provider,
-            operator=account_file.operator,
-            seller=account_file.seller,
-            buyer=account_file.buyer,
-            protocol_path_coercion=args.protocol_path,
-            price=args.price,
-        )
-
-        simulation_result = simulation.run()
-        simulation_result_serializer = SimulationResultSerializer(
-            compression=to_bool(args.output_compression),
-            b64encoding=to_bool(args.output_b64encoding)
-        )
-
-        result_output = simulation_result_serializer.serialize(simulation_result)
-
-        if args.output == '-':
-            sys.stdout.buffer.write(result_output)
-        else:
-            with open(args.output, 'wb') as fp:
-                fp.write(result_output)
-
-        return 0
+        with profiling(args), trace_execution(args) as tracer:
+            protocol_parameters: Dict[str, str] = {}
+            environment_parameters: Dict[str, str] = {}
+            data_provider_parameters: Dict[str, str] = {}
+
+            for arg, dest in [
+                (args.protocol_parameters, protocol_parameters),
+                (args.environment_parameters, environment_parameters),
+                (args.data_provider_parameters, data_provider_parameters)
+            ]:
+                for key, value in arg:
+                    dest[key.replace('-', '_')] = value
+
+            protocol = ProtocolManager.instantiate(
+                args.protocol,
+                **protocol_parameters
+            )
+
+            account_file = AccountFile(path=args.account_file)
+
+            environment = EnvironmentManager.instantiate(
+                name=args.environment,
+                operator=account_file.operator,
+                seller=account_file.seller,
+                buyer=account_file.buyer,
+                **environment_parameters
+            )
+
+            data_provider = DataProviderManager.instantiate(
+                args.data_provider,
+                **data_provider_parameters
+            )
+
+            output_fp: Optional[BinaryIO] = None
+            result_writer: Optional[SimulationResultFileWriter] = None
+            if args.output_format == 'columnar':
+                output_fp = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+
+            completed = False
+            try:
+                if output_fp is not None:
+                    result_writer = SimulationResultFileWriter(output_fp, compression_codec(args.output_compression))
+
+                simulation = Simulation(
+                    protocol=protocol,
+                    environment=environment,
+                    data_provider=data_provider,
+                    operator=account_file.operator,
+                    seller=account_file.seller,
+                    buyer=account_file.buyer,
+                    protocol_path_coercion=args.protocol_path,
+                    price=args.price,
+                    result_writer=result_writer
+                )
+
+                simulation_result = simulation.run()
+
+                if args.trace_embed and tracer is not None:
+                    simulation_result.trace = tracer.to_chrome_trace()
+                    if result_writer is not None:
+                        result_writer.add_metadata('trace', simulation_result.trace)
+
+                if result_writer is not None:
+                    # result has already been streamed during the simulation
+                    result_writer.close()
+                completed = True
+            finally:
+                if output_fp is not None and args.output != '-':
+                    output_fp.close()
+                    if not completed:
+                        # do not leave a truncated result file behind
+                        os.remove(args.output)
+
+            if result_writer is not None:
+                return 0
+
+            simulation_result_serializer = SimulationResultSerializer(
+                compression=to_bool(args.output_compression),
+                b64encoding=to_bool(args.output_b64encoding)
+            )
+
+            result_output = simulation_result_serializer.serialize(simulation_result)
+
+            if args.output == '-':
+                sys.stdout.buffer.write(result_output)
+            else:
+                with open(args.output, 'wb') as fp:
+                    fp.write(result_output)
+
+            return 0
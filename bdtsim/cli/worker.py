@@ -0,0 +1,110 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from bdtsim.work_queue import DEFAULT_LEASE_DURATION, WorkQueue, default_worker_id
+from .bulk_execute import BulkExecuteSubCommand, BulkJob
+from .command_manager import SubCommand
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 2.0
+
+
+class WorkerSubCommand(SubCommand):
+    help = 'execute jobs of a distributed bulk execution (see bulk-execute --coordinator)'
+
+    def __init__(self, parser: argparse.ArgumentParser) -> None:
+        super(WorkerSubCommand, self).__init__(parser)
+        parser.add_argument('work_directory', help='shared work directory of the coordinator')
+        parser.add_argument('--worker-id', default=None, help='worker ID recorded in claimed jobs, default: host:pid')
+        parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                            help='seconds between checks for new jobs')
+        parser.add_argument('--exit-when-idle', action='store_true', default=False,
+                            help='exit when there are no pending jobs, instead of waiting for new ones')
+        parser.add_argument('--max-jobs', type=int, default=None, help='exit after executing the given number of jobs')
+
+    def __call__(self, args: argparse.Namespace) -> int:
+        work_queue = WorkQueue(args.work_directory)
+        worker_id = args.worker_id or default_worker_id()
+        executed_jobs = 0
+        while args.max_jobs is None or executed_jobs < args.max_jobs:
+            work_queue.requeue_expired()
+            claimed = work_queue.claim(worker_id)
+            if claimed is None:
+                if args.exit_when_idle:
+                    break
+                time.sleep(args.poll_interval)
+                continue
+            job_id, job_file = claimed
+            logger.info('executing job %s' % job_id)
+            self.execute(work_queue, job_id, job_file)
+            executed_jobs += 1
+        logger.info('worker %s executed %i jobs' % (worker_id, executed_jobs))
+        return 0
+
+    @staticmethod
+    def execute(work_queue: WorkQueue, job_id: str, job_file: Dict[str, Any]) -> None:
+        """Execute a claimed job, renewing its lease until finished, and record the result in the work queue.
+
+        Args:
+            work_queue (WorkQueue): Work queue
+            job_id (str): ID of the claimed job
+            job_file (Dict[str, Any]): Job file contents as returned by `WorkQueue.claim`
+        """
+        job_description = job_file['job']
+        job = BulkJob(**job_description['bulk_job'])
+        lease_duration = float(job_file.get('lease_duration', DEFAULT_LEASE_DURATION))
+
+        stop_heartbeat = threading.Event()
+
+        def heartbeat() -> None:
+            while not stop_heartbeat.wait(lease_duration / 3):
+                if not work_queue.renew(job_id):
+                    logger.warning('lost lease of job %s' % job_id)
+                    return
+
+        heartbeat_thread = threading.Thread(target=heartbeat, name='lease-%s' % job_id, daemon=True)
+        heartbeat_thread.start()
+        try:
+            _, pipeline_result, error, statistics, result_rows = next(BulkExecuteSubCommand.iter_pipeline_batch(
+                jobs=[job],
+                bulk_configuration=job_description['bulk_configuration'],
+                target_directory=job_description['target_directory']
+            ))
+        finally:
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+
+        result: Dict[str, Optional[Any]] = {
+            'pipeline_result': pipeline_result,
+            'error': error,
+            'statistics': statistics._asdict(),
+            'result_rows': result_rows
+        }
+        if error is None:
+            work_queue.complete(job_id, job_file, result)
+        elif work_queue.fail(job_id, job_file, error, result):
+            logger.warning('job %s failed, will be retried: %s' % (job_id, error))
+        else:
+            logger.warning('job %s failed: %s' % (job_id, error))
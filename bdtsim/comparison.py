@@ -0,0 +1,340 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Comparison of multiple simulation results (e.g. the outputs of a bulk execution).
+
+Each result is reduced to a `ComparisonEntry`, containing the configuration parameters of the simulation and the value
+intervals of seller and buyer per honesty class (see `bdtsim.result_store.HONESTY_CLASSES`). Only result summaries are
+loaded, and each summary is dropped after being reduced, so hundreds of results can be compared at once.
+"""
+
+import html
+import json
+import math
+import os
+from typing import Any, Dict, Generator, List, NamedTuple, Optional, Sequence, Tuple
+
+from bdtsim.result_store import AGGREGATION_FIELDS, HONESTY_CLASSES, ResultStore, honesty_class
+from bdtsim.simulation_result import SimulationResultSerializer, SimulationResultSummary
+from bdtsim.simulation_result_file import MAGIC, SimulationResultFileReader
+
+
+ROLES = ('seller', 'buyer')
+METRICS = ('tx_fees', 'tx_count', 'funds_diff', 'balance_diff', 'item_share')
+VALUE_COLUMNS = ['%s_%s_%s' % (role, metric, bound) for role in ROLES for metric in METRICS for bound in ('min', 'max')]
+
+RESULT_FILE_SUFFIX = '.result'
+
+SVG_COLORS = ('#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22',
+              '#17becf')
+
+
+class ComparisonEntry(NamedTuple):
+    name: str
+    parameters: Dict[str, Any]
+    # value intervals by honesty class and value column (see VALUE_COLUMNS), classes without final nodes are missing
+    values: Dict[str, Dict[str, Any]]
+
+
+def get_configuration_parameters(simulation_configuration: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Flatten a simulation configuration into parameters for comparison.
+
+    Component names are given as `protocol`, `environment` and `data_provider`, component parameters as
+    `<component>.<key>` (e.g. `protocol.slices_count`), other values (e.g. `price`) by their key.
+    """
+    parameters: Dict[str, Any] = {}
+    for key, value in (simulation_configuration or {}).items():
+        if key in ('protocol', 'environment', 'data_provider') and isinstance(value, dict):
+            parameters[key] = value.get('name')
+            for parameter_key, parameter_value in (value.get('parameters') or {}).items():
+                parameters['%s.%s' % (key, parameter_key)] = parameter_value
+        elif key not in ('description', 'sweep') and value is not None:
+            parameters[key] = value
+    return parameters
+
+
+def create_entry(name: str, simulation_configuration: Optional[Dict[str, Any]],
+                 summary: SimulationResultSummary) -> ComparisonEntry:
+    """Reduce a simulation result summary to its value intervals per honesty class."""
+    values: Dict[str, Dict[str, Any]] = {}
+    for final_node in summary.final_nodes:
+        final_node_class = honesty_class(final_node.account_completely_honest(summary.seller),
+                                         final_node.account_completely_honest(summary.buyer))
+        class_values = values.setdefault(final_node_class, {})
+        for role, account in zip(ROLES, (summary.seller, summary.buyer)):
+            entry = final_node.aggregation_summary.get(account)
+            for metric in METRICS:
+                for bound, func in (('min', min), ('max', max)):
+                    value = 0 if entry is None else getattr(entry, '%s_%s' % (metric, bound))
+                    column = '%s_%s_%s' % (role, metric, bound)
+                    class_values[column] = value if column not in class_values else func(class_values[column], value)
+    return ComparisonEntry(name, get_configuration_parameters(simulation_configuration), values)
+
+
+def find_result_files(paths: Sequence[str]) -> List[str]:
+    """Get result files, directories are searched (non-recursively) for files ending with `.result`."""
+    result_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            result_files.extend(sorted(os.path.join(path, filename) for filename in os.listdir(path)
+                                       if filename.endswith(RESULT_FILE_SUFFIX)))
+        else:
+            result_files.append(path)
+    return result_files
+
+
+def load_result_summary(path: str, serializer: Optional[SimulationResultSerializer] = None
+                        ) -> Tuple[Optional[Dict[str, Any]], SimulationResultSummary]:
+    """Load the summary and (if available) the simulation configuration of a result file.
+
+    Columnar result files are memory-mapped and only their summary section is read. Other result files are loaded
+    completely, as they do not provide a separate summary.
+
+    Returns:
+        Tuple[Optional[Dict[str, Any]], SimulationResultSummary]: simulation configuration (stored by bulk executions
+            in columnar result files) and result summary
+    """
+    with open(path, 'rb') as fp:
+        columnar = fp.read(len(MAGIC)) == MAGIC
+    if columnar:
+        with SimulationResultFileReader(path) as reader:
+            return reader.metadata.get('simulation_configuration'), reader.load_summary()
+    with open(path, 'rb') as fp:
+        data = fp.read()
+    return None, (serializer or SimulationResultSerializer()).unserialize(data).summary
+
+
+def iter_result_files(paths: Sequence[str], serializer: Optional[SimulationResultSerializer] = None
+                      ) -> Generator[ComparisonEntry, None, None]:
+    for path in find_result_files(paths):
+        simulation_configuration, summary = load_result_summary(path, serializer)
+        name = os.path.basename(path)
+        if name.endswith(RESULT_FILE_SUFFIX):
+            name = name[:-len(RESULT_FILE_SUFFIX)]
+        yield create_entry(name, simulation_configuration, summary)
+
+
+def iter_result_store(path: str) -> Generator[ComparisonEntry, None, None]:
+    """Read comparison entries from a result store, using the stored final node aggregations.
+
+    Aggregations of the accounts `Seller` and `Buyer` are used for the seller and buyer values.
+    """
+    fields = [field for field in AGGREGATION_FIELDS if not field.endswith('_mean')]
+    aggregates = ', '.join('%s(%s)' % ('min' if field.endswith('_min') else 'max', field) for field in fields)
+    with ResultStore(path) as result_store:
+        _, simulations = result_store.query('SELECT id, configuration FROM simulations ORDER BY id')
+        for simulation_id, configuration in simulations:
+            # final nodes without transactions of an account have no aggregation row, their values are 0
+            _, class_counts = result_store.query(
+                'SELECT honesty, count(*) FROM nodes WHERE simulation = ? AND final = 1 GROUP BY honesty',
+                (simulation_id, )
+            )
+            final_node_counts: Dict[str, int] = {str(honesty): int(count) for honesty, count in class_counts}
+            values: Dict[str, Dict[str, Any]] = {
+                honesty: {column: 0 for column in VALUE_COLUMNS} for honesty in final_node_counts.keys()
+            }
+            _, rows = result_store.query(
+                'SELECT honesty, account, count(*), %s FROM aggregations WHERE simulation = ? '
+                'GROUP BY honesty, account' % aggregates, (simulation_id, )
+            )
+            for row in rows:
+                role = str(row[1]).lower()
+                if role not in ROLES or row[0] not in values:
+                    continue
+                complete = row[2] == final_node_counts[row[0]]
+                for field, value in zip(fields, row[3:]):
+                    if not complete:
+                        value = min(value, 0) if field.endswith('_min') else max(value, 0)
+                    values[row[0]]['%s_%s' % (role, field)] = value
+            simulation_configuration = json.loads(configuration)
+            yield ComparisonEntry(
+                str(simulation_configuration.get('description') or 'simulation %i' % simulation_id),
+                get_configuration_parameters(simulation_configuration),
+                values
+            )
+
+
+def get_table(entries: Sequence[ComparisonEntry]) -> Tuple[List[str], List[List[Any]]]:
+    """Create a comparison table with one row per result and honesty class.
+
+    All results get a row for each honesty class (aligned in the order of `HONESTY_CLASSES`), values of honesty
+    classes without final nodes are left empty.
+
+    Returns:
+        Tuple[List[str], List[List[Any]]]: column names and rows
+    """
+    parameter_keys: List[str] = []
+    for entry in entries:
+        for key in entry.parameters.keys():
+            if key not in parameter_keys:
+                parameter_keys.append(key)
+    columns = ['name'] + parameter_keys + ['honesty'] + VALUE_COLUMNS
+    rows: List[List[Any]] = []
+    for entry in entries:
+        for honesty in HONESTY_CLASSES:
+            class_values = entry.values.get(honesty, {})
+            rows.append([entry.name] + [entry.parameters.get(key) for key in parameter_keys] + [honesty] + [
+                class_values.get(column) for column in VALUE_COLUMNS
+            ])
+    return columns, rows
+
+
+def get_curves(entries: Sequence[ComparisonEntry], x: str, y: str, honesty: str = 'hh',
+               series: Sequence[str] = ('protocol', )) -> Dict[str, List[Tuple[float, float]]]:
+    """Get curves of a value over a (numeric) parameter, e.g. the gas costs over the data size.
+
+    Args:
+        entries (Sequence[ComparisonEntry]): Comparison entries
+        x (str): Parameter used as x value (e.g. `data_provider.size`)
+        y (str): Value column (see `VALUE_COLUMNS`, e.g. `buyer_tx_fees_max`). Columns starting with `total_` are summed
+            up over seller and buyer (e.g. `total_tx_fees_max`)
+        honesty (str): Honesty class the values are taken from
+        series (Sequence[str]): Parameters distinguishing the curves
+
+    Returns:
+        Dict[str, List[Tuple[float, float]]]: points (sorted by x) by series name. Results without the x parameter or
+            without final nodes of the honesty class are skipped. For multiple results with the same x value, minimum
+            values (`*_min`) or maximum values (other columns) are used.
+    """
+    if honesty not in HONESTY_CLASSES:
+        raise ValueError('unsupported honesty class "%s"' % honesty)
+    columns = ['%s_%s' % (role, y[len('total_'):]) for role in ROLES] if y.startswith('total_') else [y]
+    for column in columns:
+        if column not in VALUE_COLUMNS:
+            raise ValueError('unsupported value "%s"' % y)
+    func = min if y.endswith('_min') else max
+
+    points: Dict[str, Dict[float, float]] = {}
+    for entry in entries:
+        class_values = entry.values.get(honesty)
+        if class_values is None or entry.parameters.get(x) is None:
+            continue
+        x_value = float(entry.parameters[x])
+        y_value = float(sum(class_values[column] for column in columns))
+        series_name = ', '.join(str(entry.parameters.get(key)) for key in series)
+        series_points = points.setdefault(series_name, {})
+        series_points[x_value] = y_value if x_value not in series_points else func(series_points[x_value], y_value)
+    return {series_name: sorted(series_points.items()) for series_name, series_points in points.items()}
+
+
+def get_curves_table(curves: Dict[str, List[Tuple[float, float]]], x: str) -> Tuple[List[str], List[List[Any]]]:
+    """Create a table with one row per x value and one column per curve."""
+    series_names = list(curves.keys())
+    values: Dict[float, Dict[str, float]] = {}
+    for series_name, points in curves.items():
+        for x_value, y_value in points:
+            values.setdefault(x_value, {})[series_name] = y_value
+    return [x] + series_names, [
+        [_number(x_value)] + [_number(values[x_value].get(series_name)) for series_name in series_names]
+        for x_value in sorted(values.keys())
+    ]
+
+
+def _number(value: Optional[float]) -> Any:
+    if value is not None and value.is_integer():
+        return int(value)
+    return value
+
+
+def _ticks(low: float, high: float, log: bool) -> List[float]:
+    if log:
+        return [10.0 ** exponent for exponent in range(math.floor(math.log10(low)), math.ceil(math.log10(high)) + 1)]
+    if low == high:
+        return [low]
+    step = 10 ** math.floor(math.log10((high - low) / 5))
+    for factor in (1, 2, 5, 10):
+        if (high - low) / (step * factor) <= 6:
+            step *= factor
+            break
+    return [step * index for index in range(math.floor(low / step), math.ceil(high / step) + 1)]
+
+
+def render_curves_svg(curves: Dict[str, List[Tuple[float, float]]], x_label: str, y_label: str,
+                      log_x: bool = False, log_y: bool = False, width: int = 800, height: int = 500) -> bytes:
+    """Render curves as SVG line chart.
+
+    Args:
+        curves (Dict[str, List[Tuple[float, float]]]): points by series name, as created by `get_curves`
+        x_label (str): Label of the x axis
+        y_label (str): Label of the y axis
+        log_x (bool): Use a logarithmic x axis (e.g. for data sizes)
+        log_y (bool): Use a logarithmic y axis
+        width (int): Image width
+        height (int): Image height
+
+    Returns:
+        bytes: SVG document
+    """
+    margin_left, margin_right, margin_top, margin_bottom = 90, 200, 20, 60
+    plot_width = width - margin_left - margin_right
+    plot_height = height - margin_top - margin_bottom
+
+    points = [point for series_points in curves.values() for point in series_points
+              if (not log_x or point[0] > 0) and (not log_y or point[1] > 0)]
+    if len(points) == 0:
+        raise ValueError('no data points to be rendered')
+    x_ticks = _ticks(min(x for x, _ in points), max(x for x, _ in points), log_x)
+    y_ticks = _ticks(min(y for _, y in points), max(y for _, y in points), log_y)
+
+    def scale(value: float, ticks: List[float], log: bool, length: int) -> float:
+        low, high = ticks[0], ticks[-1]
+        if log:
+            value, low, high = math.log10(value), math.log10(low), math.log10(high)
+        return 0.5 * length if high == low else (value - low) / (high - low) * length
+
+    def position(x: float, y: float) -> Tuple[float, float]:
+        return (margin_left + scale(x, x_ticks, log_x, plot_width),
+                margin_top + plot_height - scale(y, y_ticks, log_y, plot_height))
+
+    lines = [
+        '<svg xmlns="http://www.w3.org/2000/svg" width="%i" height="%i" font-family="Arial" font-size="12">'
+        % (width, height),
+        '<rect width="100%" height="100%" fill="white"/>',
+        '<rect x="%i" y="%i" width="%i" height="%i" fill="none" stroke="black"/>'
+        % (margin_left, margin_top, plot_width, plot_height)
+    ]
+    for tick in x_ticks:
+        tick_x, _ = position(tick, y_ticks[0])
+        lines.append('<line x1="%.1f" y1="%i" x2="%.1f" y2="%i" stroke="#ddd"/>'
+                     % (tick_x, margin_top, tick_x, margin_top + plot_height))
+        lines.append('<text x="%.1f" y="%i" text-anchor="middle">%s</text>'
+                     % (tick_x, margin_top + plot_height + 16, '%g' % tick))
+    for tick in y_ticks:
+        _, tick_y = position(x_ticks[0], tick)
+        lines.append('<line x1="%i" y1="%.1f" x2="%i" y2="%.1f" stroke="#ddd"/>'
+                     % (margin_left, tick_y, margin_left + plot_width, tick_y))
+        lines.append('<text x="%i" y="%.1f" text-anchor="end">%s</text>' % (margin_left - 6, tick_y + 4, '%g' % tick))
+    lines.append('<text x="%.1f" y="%i" text-anchor="middle">%s</text>'
+                 % (margin_left + plot_width / 2, height - 16, html.escape(x_label)))
+    lines.append('<text transform="translate(16 %.1f) rotate(-90)" text-anchor="middle">%s</text>'
+                 % (margin_top + plot_height / 2, html.escape(y_label)))
+
+    for index, (series_name, series_points) in enumerate(curves.items()):
+        color = SVG_COLORS[index % len(SVG_COLORS)]
+        coordinates = [position(x, y) for x, y in series_points if (not log_x or x > 0) and (not log_y or y > 0)]
+        lines.append('<polyline fill="none" stroke="%s" stroke-width="2" points="%s"/>' % (
+            color, ' '.join('%.1f,%.1f' % coordinate for coordinate in coordinates)
+        ))
+        for coordinate in coordinates:
+            lines.append('<circle cx="%.1f" cy="%.1f" r="3" fill="%s"/>' % (coordinate + (color, )))
+        legend_y = margin_top + 10 + 20 * index
+        lines.append('<line x1="%i" y1="%i" x2="%i" y2="%i" stroke="%s" stroke-width="2"/>'
+                     % (width - margin_right + 15, legend_y, width - margin_right + 35, legend_y, color))
+        lines.append('<text x="%i" y="%i">%s</text>'
+                     % (width - margin_right + 40, legend_y + 4, html.escape(series_name)))
+    lines.append('</svg>')
+    return ('\n'.join(lines) + '\n').encode('utf-8')
@@ -15,20 +15,30 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
+import json
 import logging
 import os
 import shutil
 import tempfile
+from collections import OrderedDict
 from typing import Any, Dict, Generator, Optional, Tuple
 
 import jinja2  # type: ignore
 import solcx  # type: ignore
 
+from bdtsim.tracing import CATEGORY_COMPILE, span
+
 
 SOLC_DEFAULT_VERSION = 'v0.6.1'
+COMPILE_CACHE_SIZE = 256
 
 logger = logging.getLogger(__name__)
 
+# per-process caches, shared by all contracts compiled within a (worker) process
+_compile_cache: 'OrderedDict[str, Tuple[Dict[str, Any], str]]' = OrderedDict()
+_installed_solc_versions: Dict[str, bool] = {}
+
 
 class Contract(object):
     def __init__(self, abi: Dict[str, Any], bytecode: str, address: Optional[str] = None) -> None:
@@ -79,17 +89,69 @@ class SolidityContract(Contract):
     @staticmethod
     def compile(contract_name: str, contract_code: str, compiler_kwargs: Optional[Dict[str, Any]] = None,
                 solc_version: str = SOLC_DEFAULT_VERSION) -> Tuple[Dict[str, Any], str]:
-        # configure solc
-        logger.debug('Checking for solc version %s' % solc_version)
-        if solc_version not in solcx.get_installed_solc_versions():
-            logger.debug('solc %s not found, installing...' % solc_version)
-            solcx.install_solc(solc_version)
+        if compiler_kwargs is None:
+            compiler_kwargs = {}
+        else:
+            compiler_kwargs = dict(compiler_kwargs)
+        if 'import_remappings' in compiler_kwargs:
+            # may be a generator, which can be consumed only once
+            compiler_kwargs['import_remappings'] = list(compiler_kwargs['import_remappings'])
+
+        with span('compile', CATEGORY_COMPILE, contract=contract_name, solc_version=solc_version) as compile_span:
+            cache_key = SolidityContract.compile_cache_key(contract_name, contract_code, compiler_kwargs, solc_version)
+            cached = _compile_cache.get(cache_key)
+            compile_span.set('cached', cached is not None)
+            if cached is not None:
+                logger.debug('Using cached compilation result for contract "%s"' % contract_name)
+                _compile_cache.move_to_end(cache_key)
+                return cached
+
+            # configure solc
+            SolidityContract.ensure_solc_version(solc_version)
+            compile_result = solcx.compile_source(
+                source=contract_code,
+                **compiler_kwargs
+            )['<stdin>:' + contract_name]
+            result: Tuple[Dict[str, Any], str] = (compile_result.get('abi'), compile_result.get('bin'))
+
+        _compile_cache[cache_key] = result
+        while len(_compile_cache) > COMPILE_CACHE_SIZE:
+            _compile_cache.popitem(last=False)
+        return result
+
+    @staticmethod
+    def ensure_solc_version(solc_version: str) -> None:
+        """Install (if required) and select the given solc version."""
+        if not _installed_solc_versions.get(solc_version, False):
+            logger.debug('Checking for solc version %s' % solc_version)
+            if solc_version not in solcx.get_installed_solc_versions():
+                logger.debug('solc %s not found, installing...' % solc_version)
+                solcx.install_solc(solc_version)
+            _installed_solc_versions[solc_version] = True
         solcx.set_solc_version(solc_version, silent=True)
-        compile_result = solcx.compile_source(
-            source=contract_code,
-            **compiler_kwargs
-        )['<stdin>:' + contract_name]
-        return compile_result.get('abi'), compile_result.get('bin')
+
+    @staticmethod
+    def compile_cache_key(contract_name: str, contract_code: str, compiler_kwargs: Dict[str, Any],
+                          solc_version: str) -> str:
+        """Key identifying a compilation, including the contents of all files imported via import remappings.
+
+        Import remappings point to temporary directories, so the remapping targets are represented by the hash of
+        their contents instead of their path.
+        """
+        sha256 = hashlib.sha256()
+        sha256.update(json.dumps([contract_name, solc_version]).encode('utf-8'))
+        sha256.update(hashlib.sha256(contract_code.encode('utf-8')).digest())
+        for key, value in sorted(compiler_kwargs.items()):
+            if key == 'import_remappings':
+                for remapping in value:
+                    prefix, _, target = str(remapping).partition('=')
+                    sha256.update(prefix.encode('utf-8'))
+                    if os.path.isfile(target):
+                        with open(target, 'rb') as fp:
+                            sha256.update(hashlib.sha256(fp.read()).digest())
+            else:
+                sha256.update(json.dumps([key, value], sort_keys=True, default=str).encode('utf-8'))
+        return sha256.hexdigest()
 
 
 class SolidityContractCollection(object):
@@ -15,10 +15,28 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from typing import Dict, Tuple, TYPE_CHECKING
+
+from bdtsim.registry import lazy_attributes
 from .data_provider import DataProvider
 from .data_provider_manager import DataProviderManager
-from .random_data_provider import RandomDataProvider
-from .file_data_provider import FileDataProvider
+
+if TYPE_CHECKING:
+    from .random_data_provider import RandomDataProvider
+    from .file_data_provider import FileDataProvider
+
+# built-in data providers (module relative to this package and class), imported when used
+DATA_PROVIDERS: Dict[str, Tuple[str, ...]] = {
+    'RandomDataProvider': ('.random_data_provider', 'RandomDataProvider'),
+    'FileDataProvider': ('.file_data_provider', 'FileDataProvider')
+}
+
+for data_provider_name, (data_provider_module, *data_provider_attributes) in DATA_PROVIDERS.items():
+    DataProviderManager.register_lazy(data_provider_name, __name__ + data_provider_module, *data_provider_attributes)
+
+__getattr__ = lazy_attributes(__name__, {
+    attributes[0]: module for module, *attributes in DATA_PROVIDERS.values()
+})
 
 __all__ = [
     'DataProvider',
@@ -15,31 +15,39 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Any, Dict, Type
+from typing import Any, Dict, Type, TYPE_CHECKING
 
-from .data_provider import DataProvider
+from bdtsim.registry import Registration, register_lazy
 
-
-class DataProviderRegistration(object):
-    def __init__(self, cls: Type[DataProvider], *args: Any, **kwargs: Any) -> None:
-        self.cls = cls
-        self.args = args
-        self.kwargs = kwargs
+if TYPE_CHECKING:
+    from .data_provider import DataProvider
 
 
 class DataProviderManager(object):
-    data_providers: Dict[str, DataProviderRegistration] = {}
+    data_providers: Dict[str, Registration['DataProvider']] = {}
 
     def __init__(self) -> None:
         raise NotImplementedError('This class is not to be instantiated')
 
     @staticmethod
-    def register(name: str, cls: Type[DataProvider], *args: Any, **kwargs: Any) -> None:
+    def register(name: str, cls: Type['DataProvider'], *args: Any, **kwargs: Any) -> None:
+        from .data_provider import DataProvider
         if not issubclass(cls, DataProvider):
             raise ValueError('Provided class is not a subclass of DataProvider')
-        DataProviderManager.data_providers[name] = DataProviderRegistration(cls, *args, **kwargs)
+        DataProviderManager.data_providers[name] = Registration(cls, *args, **kwargs)
+
+    @staticmethod
+    def register_lazy(name: str, module: str, attribute: str, *arg_attributes: str) -> None:
+        """Register a data provider by the module providing it, which is imported when the data provider is used.
+
+        Args:
+            name (str): Name of the data provider
+            module (str): Absolute name of the module providing the data provider
+            attribute (str): Name of the data provider class within the module
+            *arg_attributes (str): Names of module attributes passed as leading arguments to the data provider class
+        """
+        register_lazy(DataProviderManager.data_providers, name, module, attribute, *arg_attributes)
 
     @staticmethod
-    def instantiate(name: str, **kwargs: Any) -> DataProvider:
-        data_provider = DataProviderManager.data_providers[name]
-        return data_provider.cls(*data_provider.args, **{**data_provider.kwargs, **kwargs})
+    def instantiate(name: str, **kwargs: Any) -> 'DataProvider':
+        return DataProviderManager.data_providers[name].instantiate(**kwargs)
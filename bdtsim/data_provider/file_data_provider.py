@@ -18,7 +18,6 @@
 from typing import BinaryIO, Optional
 
 from .data_provider import DataProvider
-from .data_provider_manager import DataProviderManager
 
 
 class FileDataProvider(DataProvider):
@@ -45,6 +44,3 @@ class FileDataProvider(DataProvider):
         if self._fp is not None:
             self._fp.close()
             self._fp = None
-
-
-DataProviderManager.register('FileDataProvider', FileDataProvider)
@@ -20,7 +20,6 @@ from io import BytesIO
 from typing import BinaryIO, Optional
 
 from .data_provider import DataProvider
-from .data_provider_manager import DataProviderManager
 
 
 class RandomDataProvider(DataProvider):
@@ -40,6 +39,3 @@ class RandomDataProvider(DataProvider):
             random.seed(self._seed)
             self._mem_file = BytesIO(bytearray(random.getrandbits(8) for _ in range(self._size)))
         return self._mem_file
-
-
-DataProviderManager.register('RandomDataProvider', RandomDataProvider)
@@ -15,10 +15,32 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from .environment import Environment
+from typing import Dict, Tuple, TYPE_CHECKING
+
+from bdtsim.registry import lazy_attributes
 from .environment_manager import EnvironmentManager
-from .pyevm import PyEVMEnvironment
-from .web3_environments import Web3Environment
+
+if TYPE_CHECKING:
+    from .environment import Environment
+    from .pyevm import PyEVMEnvironment
+    from .web3_environments import Web3Environment
+
+# built-in environments (module relative to this package, class and names of module attributes passed as leading
+# arguments to the class), imported when used
+ENVIRONMENTS: Dict[str, Tuple[str, ...]] = {
+    'PyEVM': ('.pyevm', 'PyEVMEnvironment'),
+    'Web3HTTP': ('.web3_environments', 'Web3Environment', 'HTTPProvider'),
+    'Web3Websocket': ('.web3_environments', 'Web3Environment', 'WebsocketProvider'),
+    'Web3IPC': ('.web3_environments', 'Web3Environment', 'IPCProvider')
+}
+
+for environment_name, (environment_module, *environment_attributes) in ENVIRONMENTS.items():
+    EnvironmentManager.register_lazy(environment_name, __name__ + environment_module, *environment_attributes)
+
+__getattr__ = lazy_attributes(__name__, {
+    'Environment': '.environment',
+    **{attributes[0]: module for module, *attributes in ENVIRONMENTS.values()}
+})
 
 __all__ = [
     'Environment',
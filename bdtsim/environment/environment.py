@@ -31,6 +31,7 @@ from bdtsim.account import Account
 from bdtsim.account_related_diff_collection import FundsDiffCollection, ItemShareCollection
 from bdtsim.contract import Contract
 from bdtsim.simulation_result import TransactionLogEntry
+from bdtsim.tracing import CATEGORY_ENVIRONMENT, span
 
 
 logger = logging.getLogger(__name__)
@@ -159,74 +160,86 @@ class Environment(object):
         if not item_share_indicator_amount == 0 and item_share_indicator_beneficiary is None:
             raise ValueError('when sharing item, beneficiary must be defined')
 
-        tx_dict = {
-            'from': account.wallet_address,
-            'nonce': self._web3.eth.get_transaction_count(account.wallet_address, 'pending'),
-            'value': value,
-            'chainId': self._chain_id,
-            'gas': 4000000
-        }
-        if to is not None:
-            tx_dict['to'] = to.wallet_address
-
-        if factory is not None:
-            tx_dict = factory.buildTransaction(tx_dict)
-        else:
-            tx_dict['gas'] = 21000
-
-        if self._gas_price is not None:
-            tx_dict['gasPrice'] = self._gas_price
-        else:
-            tx_dict['gasPrice'] = self._web3.eth.generate_gas_price(tx_dict)
-        tx_signed = self._web3.eth.account.sign_transaction(tx_dict, private_key=account.wallet_private_key)
-
-        # collect current account balances
-        balances_before: Dict[Account, int] = {}
-        for tmp_account in self.seller, self.buyer, self.operator:
-            balances_before.update({tmp_account: self._web3.eth.get_balance(tmp_account.wallet_address, 'latest')})
-
-        logger.debug('Submitting transaction %s...' % str(tx_dict))
-        tx_hash = self._web3.eth.send_raw_transaction(tx_signed.rawTransaction)
-
-        tx_receipt = None
-        while tx_receipt is None:
-            logger.debug('Waiting for transaction receipt (hash is %s)...' % str(tx_hash.hex()))
-            try:
-                tx_receipt = self._web3.eth.wait_for_transaction_receipt(tx_hash, timeout=10)
-            except TimeExhausted:
-                pass
-
-        if not allow_failure and not tx_receipt['status']:
-            raise RuntimeError('Transaction execution not successful')
-
-        logger.debug('Got receipt %s' % str(tx_receipt))
-
-        # collect current account balances
-        funds_diff_collection = FundsDiffCollection()
-        for tmp_account in self.seller, self.buyer, self.operator:
-            balance_after = self._web3.eth.get_balance(tmp_account.wallet_address, 'latest')
-            balance_diff = balance_after - balances_before.get(tmp_account)
-            if balance_diff != 0:
-                funds_diff_collection += FundsDiffCollection({tmp_account: balance_diff})
-
-        # adjustment for paid transaction fees (should NOT be contained in FundsDiffCollection, therefore re-adding)
-        funds_diff_collection += FundsDiffCollection({account: tx_receipt['gasUsed'] * 1000000000})
-
-        if not funds_diff_collection.is_neutral:
-            logger.debug('Funds diff: %s' % ', '.join(['%s: %i' % (k, v) for k, v in funds_diff_collection.items()]))
-
-        if item_share_indicator_amount == 0:
-            item_share_collection = ItemShareCollection()
-        else:
-            item_share_collection = ItemShareCollection({
-                account: -item_share_indicator_amount,
-                item_share_indicator_beneficiary: item_share_indicator_amount
-            })
+        with span('send_transaction', CATEGORY_ENVIRONMENT, account=account.name, description=description) as tx_span:
+            with span('build_transaction', CATEGORY_ENVIRONMENT):
+                tx_dict = {
+                    'from': account.wallet_address,
+                    'nonce': self._web3.eth.get_transaction_count(account.wallet_address, 'pending'),
+                    'value': value,
+                    'chainId': self._chain_id,
+                    'gas': 4000000
+                }
+                if to is not None:
+                    tx_dict['to'] = to.wallet_address
+
+                if factory is not None:
+                    tx_dict = factory.buildTransaction(tx_dict)
+                else:
+                    tx_dict['gas'] = 21000
+
+            with span('estimate_gas_price', CATEGORY_ENVIRONMENT):
+                if self._gas_price is not None:
+                    tx_dict['gasPrice'] = self._gas_price
+                else:
+                    tx_dict['gasPrice'] = self._web3.eth.generate_gas_price(tx_dict)
+
+            with span('sign_transaction', CATEGORY_ENVIRONMENT):
+                tx_signed = self._web3.eth.account.sign_transaction(tx_dict, private_key=account.wallet_private_key)
+
+            # collect current account balances
+            with span('balance_diff', CATEGORY_ENVIRONMENT):
+                balances_before: Dict[Account, int] = {}
+                for tmp_account in self.seller, self.buyer, self.operator:
+                    balance_before = self._web3.eth.get_balance(tmp_account.wallet_address, 'latest')
+                    balances_before.update({tmp_account: balance_before})
+
+            logger.debug('Submitting transaction %s...' % str(tx_dict))
+            with span('submit_transaction', CATEGORY_ENVIRONMENT):
+                tx_hash = self._web3.eth.send_raw_transaction(tx_signed.rawTransaction)
+
+            with span('wait_for_receipt', CATEGORY_ENVIRONMENT):
+                tx_receipt = None
+                while tx_receipt is None:
+                    logger.debug('Waiting for transaction receipt (hash is %s)...' % str(tx_hash.hex()))
+                    try:
+                        tx_receipt = self._web3.eth.wait_for_transaction_receipt(tx_hash, timeout=10)
+                    except TimeExhausted:
+                        pass
+            tx_span.set('gas_used', tx_receipt['gasUsed'])
+
+            if not allow_failure and not tx_receipt['status']:
+                raise RuntimeError('Transaction execution not successful')
+
+            logger.debug('Got receipt %s' % str(tx_receipt))
+
+            # collect current account balances
+            with span('balance_diff', CATEGORY_ENVIRONMENT):
+                funds_diff_collection = FundsDiffCollection()
+                for tmp_account in self.seller, self.buyer, self.operator:
+                    balance_after = self._web3.eth.get_balance(tmp_account.wallet_address, 'latest')
+                    balance_diff = balance_after - balances_before.get(tmp_account)
+                    if balance_diff != 0:
+                        funds_diff_collection += FundsDiffCollection({tmp_account: balance_diff})
+
+            # adjustment for paid transaction fees (should NOT be contained in FundsDiffCollection, therefore re-adding)
+            funds_diff_collection += FundsDiffCollection({account: tx_receipt['gasUsed'] * tx_dict['gasPrice']})
+
+            if not funds_diff_collection.is_neutral:
+                logger.debug('Funds diff: %s' % ', '.join(['%s: %i' % (k, v)
+                                                           for k, v in funds_diff_collection.items()]))
+
+            if item_share_indicator_amount == 0:
+                item_share_collection = ItemShareCollection()
+            else:
+                item_share_collection = ItemShareCollection({
+                    account: -item_share_indicator_amount,
+                    item_share_indicator_beneficiary: item_share_indicator_amount
+                })
 
-        if self.transaction_callback is not None:
-            self.transaction_callback(TransactionLogEntry(account, tx_dict, dict(tx_receipt), description,
-                                                          funds_diff_collection, item_share_collection))
-        return tx_receipt
+            if self.transaction_callback is not None:
+                self.transaction_callback(TransactionLogEntry(account, tx_dict, dict(tx_receipt), description,
+                                                              funds_diff_collection, item_share_collection))
+            return tx_receipt
 
     def indicate_item_share(self, account: Account, amount: float, beneficiary: Optional[Account]) -> None:
         if amount == 0:
@@ -15,31 +15,39 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Any, Dict, Type
+from typing import Any, Dict, Type, TYPE_CHECKING
 
-from .environment import Environment
+from bdtsim.registry import Registration, register_lazy
 
-
-class EnvironmentRegistration(object):
-    def __init__(self, cls: Type[Environment], *args: Any, **kwargs: Any) -> None:
-        self.cls = cls
-        self.args = args
-        self.kwargs = kwargs
+if TYPE_CHECKING:
+    from .environment import Environment
 
 
 class EnvironmentManager(object):
-    environments: Dict[str, EnvironmentRegistration] = {}
+    environments: Dict[str, Registration['Environment']] = {}
 
     def __init__(self) -> None:
         raise NotImplementedError('This class is not to be instantiated')
 
     @staticmethod
-    def register(name: str, cls: Type[Environment], *args: Any, **kwargs: Any) -> None:
+    def register(name: str, cls: Type['Environment'], *args: Any, **kwargs: Any) -> None:
+        from .environment import Environment
         if not issubclass(cls, Environment):
             raise ValueError('Provided class is not a subclass of Environment')
-        EnvironmentManager.environments[name] = EnvironmentRegistration(cls, *args, **kwargs)
+        EnvironmentManager.environments[name] = Registration(cls, *args, **kwargs)
+
+    @staticmethod
+    def register_lazy(name: str, module: str, attribute: str, *arg_attributes: str) -> None:
+        """Register an environment by the module providing it, which is imported when the environment is used.
+
+        Args:
+            name (str): Name of the environment
+            module (str): Absolute name of the module providing the environment
+            attribute (str): Name of the environment class within the module
+            *arg_attributes (str): Names of module attributes passed as leading arguments to the environment class
+        """
+        register_lazy(EnvironmentManager.environments, name, module, attribute, *arg_attributes)
 
     @staticmethod
-    def instantiate(name: str, **kwargs: Any) -> Environment:
-        environment = EnvironmentManager.environments[name]
-        return environment.cls(*environment.args, **{**environment.kwargs, **kwargs})
+    def instantiate(name: str, **kwargs: Any) -> 'Environment':
+        return EnvironmentManager.environments[name].instantiate(**kwargs)
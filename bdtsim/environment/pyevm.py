@@ -26,7 +26,6 @@ from web3.types import TxParams, Wei
 
 from bdtsim.account import Account
 from .environment import Environment
-from .environment_manager import EnvironmentManager
 
 
 logger = logging.getLogger(__name__)
@@ -99,6 +98,3 @@ def pyevm_gas_price_strategy(web3: Web3, transaction_params: Optional[TxParams])
     https://web3py.readthedocs.io/en/stable/gas_price.html#creating-a-gas-price-strategy
     """
     return Wei(1000000000)
-
-
-EnvironmentManager.register('PyEVM', PyEVMEnvironment)
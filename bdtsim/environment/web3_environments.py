@@ -24,7 +24,6 @@ from web3.types import TxParams, Wei
 
 from bdtsim.account import Account
 from .environment import Environment
-from .environment_manager import EnvironmentManager
 
 
 class Web3Environment(Environment):
@@ -54,6 +53,5 @@ class Web3Environment(Environment):
         pass
 
 
-EnvironmentManager.register('Web3HTTP', Web3Environment, HTTPProvider)
-EnvironmentManager.register('Web3Websocket', Web3Environment, WebsocketProvider)
-EnvironmentManager.register('Web3IPC', Web3Environment, IPCProvider)
+# the provider classes are passed to Web3Environment by the registrations of the Web3 environments
+__all__ = ['Web3Environment', 'HTTPProvider', 'IPCProvider', 'WebsocketProvider']
@@ -0,0 +1,342 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Price and gas price parametric simulation results.
+
+Transaction fees are recorded in gas units and funds diffs do not contain transaction fees, so the balance diff of an
+account for any gas price is `funds_diff - tx_fees * gas_price`. Funds diffs usually depend linearly on the asset
+price. By simulating a protocol for a few probe prices, the funds diffs of each final node can be stored as coefficient
+pairs `base + factor * price`, which allows to evaluate the results for arbitrary (price, gas price) points without
+running the simulation again.
+
+This only works if the protocol behaves the same for all prices. Before creating the coefficients, the probe results
+are compared (decisions, transactions and gas usage of the whole result tree) and the linearity of all funds diffs is
+verified with an additional probe. If one of the checks fails, `PriceDependencyError` is raised and
+`ParametricSimulation` falls back to running real simulations for each price.
+"""
+
+import logging
+from fractions import Fraction
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from bdtsim.account import Account
+from bdtsim.protocol import DEFAULT_ASSET_PRICE
+from bdtsim.simulation import Simulation
+from bdtsim.simulation_result import ResultNode, ResultNodeSummary, SimulationResult, SimulationResultSummary, \
+    TransactionLogCollection
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROBE_PRICES = (DEFAULT_ASSET_PRICE, 2 * DEFAULT_ASSET_PRICE, 3 * DEFAULT_ASSET_PRICE)
+
+
+class PriceDependencyError(Exception):
+    pass
+
+
+def _number(value: Fraction) -> Union[int, float]:
+    if value.denominator == 1:
+        return value.numerator
+    return float(value)
+
+
+def result_signature(simulation_result: SimulationResult) -> Tuple[Any, ...]:
+    """Structure of a simulation result, which needs to be independent of the price for parametric results.
+
+    Contains all decisions of the execution result tree (in traversal order) and for every transaction the sending
+    account, description and gas usage. Timestamps, transaction values and funds diffs are not part of the signature.
+    """
+    def tx_log_signature(tx_log_list: Any) -> Tuple[Any, ...]:
+        return tuple((tx.account, tx.description, int(tx.tx_receipt['gasUsed'])) for tx in tx_log_list)
+
+    def node_signature(node: ResultNode) -> Tuple[Any, ...]:
+        return (
+            tuple(tx_log_signature(tx_log_list) for tx_log_list in node.tx_collection),
+            tuple(
+                ((decision.choice.subject, decision.choice.description, decision.outcome), node_signature(child))
+                for decision, child in node.children.items()
+            )
+        )
+
+    return (
+        tx_log_signature(simulation_result.preparation_transactions),
+        node_signature(simulation_result.execution_result_root),
+        tx_log_signature(simulation_result.cleanup_transactions)
+    )
+
+
+class ParametricAggregationEntry(NamedTuple):
+    """Aggregation summary entry with funds diffs given as `base + factor * price` and fees in gas units"""
+    account: Account
+    tx_fees_min: int
+    tx_fees_max: int
+    tx_fees_mean: float
+    tx_count_min: int
+    tx_count_max: int
+    tx_count_mean: float
+    funds_diff_min_base: Fraction
+    funds_diff_min_factor: Fraction
+    funds_diff_max_base: Fraction
+    funds_diff_max_factor: Fraction
+    item_share_min: float
+    item_share_max: float
+
+    def evaluate(self, price: int, gas_price: int) -> TransactionLogCollection.Aggregation.Entry:
+        """Evaluate the entry for the given price and gas price.
+
+        Balance diffs are computed from the funds diff bounds and the fee bounds. They are exact if the aggregated
+        transaction lists do not differ in their funds diffs and fees, otherwise they are bounds.
+        """
+        funds_diff_min = _number(self.funds_diff_min_base + self.funds_diff_min_factor * price)
+        funds_diff_max = _number(self.funds_diff_max_base + self.funds_diff_max_factor * price)
+        return TransactionLogCollection.Aggregation.Entry(
+            account=self.account,
+            tx_fees_min=self.tx_fees_min,
+            tx_fees_max=self.tx_fees_max,
+            tx_fees_mean=self.tx_fees_mean,
+            tx_count_min=self.tx_count_min,
+            tx_count_max=self.tx_count_max,
+            tx_count_mean=self.tx_count_mean,
+            funds_diff_min=funds_diff_min,  # type: ignore
+            funds_diff_max=funds_diff_max,  # type: ignore
+            balance_diff_min=funds_diff_min - self.tx_fees_max * gas_price,  # type: ignore
+            balance_diff_max=funds_diff_max - self.tx_fees_min * gas_price,  # type: ignore
+            item_share_min=self.item_share_min,
+            item_share_max=self.item_share_max
+        )
+
+
+class ParametricResultNode(object):
+    def __init__(self, node_summary: ResultNodeSummary, entries: Dict[Account, ParametricAggregationEntry]) -> None:
+        """Parametric aggregation summary of a final result node.
+
+        Args:
+            node_summary (ResultNodeSummary): Summary of the final node (used for the honesty flags)
+            entries (Dict[Account, ParametricAggregationEntry]): Parametric aggregation summary entries per account
+        """
+        self.node_summary = node_summary
+        self.entries = entries
+
+    def evaluate(self, price: int, gas_price: int) -> ResultNodeSummary:
+        aggregation_summary = TransactionLogCollection.Aggregation(TransactionLogCollection())
+        for account, entry in self.entries.items():
+            aggregation_summary[account] = entry.evaluate(price, gas_price)
+        return ResultNodeSummary(
+            all_honest=self.node_summary.all_accounts_completely_honest(),
+            honesty={account: False for account in self.node_summary.dishonest_accounts},
+            aggregation_summary=aggregation_summary
+        )
+
+
+class ParametricSimulationResult(object):
+    def __init__(self, operator: Account, seller: Account, buyer: Account, final_nodes: List[ParametricResultNode],
+                 price: Optional[int] = None) -> None:
+        """Simulation result summary which can be evaluated for arbitrary prices and gas prices.
+
+        Args:
+            operator (Account): The operator account
+            seller (Account): The seller account
+            buyer (Account): The buyer account
+            final_nodes (List[ParametricResultNode]): Parametric summaries of all final nodes
+            price (Optional[int]): If set, the result is only parametric regarding the gas price and can only be
+                evaluated for this price.
+        """
+        self.operator = operator
+        self.seller = seller
+        self.buyer = buyer
+        self.final_nodes = final_nodes
+        self.price = price
+
+    @property
+    def price_parametric(self) -> bool:
+        return self.price is None
+
+    @staticmethod
+    def from_simulation_result(simulation_result: SimulationResult, price: int) -> 'ParametricSimulationResult':
+        """Create a result which is parametric regarding the gas price only."""
+        return ParametricSimulationResult.from_probes([(price, simulation_result)])
+
+    @staticmethod
+    def from_probes(probes: Sequence[Tuple[int, SimulationResult]]) -> 'ParametricSimulationResult':
+        """Create a parametric result from simulation results for different prices.
+
+        Args:
+            probes (Sequence[Tuple[int, SimulationResult]]): (price, simulation result) pairs. Two different prices are
+                required for price parametric results, every additional probe is used for verifying linearity.
+                A single probe results in a result that is parametric regarding the gas price only.
+
+        Returns:
+            ParametricSimulationResult: the parametric simulation result
+
+        Raises:
+            PriceDependencyError: if the probe results indicate that the protocol behaves differently depending on the
+                price
+        """
+        if len(probes) == 0:
+            raise ValueError('at least one probe is required')
+        prices = [price for price, _ in probes]
+        if len(set(prices)) != len(prices):
+            raise ValueError('probe prices must be distinct')
+
+        reference_price, reference = probes[0]
+        reference_signature = result_signature(reference)
+        for price, probe in probes[1:]:
+            if result_signature(probe) != reference_signature:
+                raise PriceDependencyError('result structure for price %d differs from result structure for price %d'
+                                           % (price, reference_price))
+
+        summaries = [probe.summary for _, probe in probes]
+        final_nodes = []
+        for node_index, reference_node in enumerate(summaries[0].final_nodes):
+            entries: Dict[Account, ParametricAggregationEntry] = {}
+            for account, entry in reference_node.aggregation_summary.items():
+                probe_entries = [s.final_nodes[node_index].aggregation_summary[account] for s in summaries]
+                funds_diff_min = ParametricSimulationResult._fit(
+                    prices, [e.funds_diff_min for e in probe_entries], account, node_index
+                )
+                funds_diff_max = ParametricSimulationResult._fit(
+                    prices, [e.funds_diff_max for e in probe_entries], account, node_index
+                )
+                entries[account] = ParametricAggregationEntry(
+                    account=account,
+                    tx_fees_min=entry.tx_fees_min,
+                    tx_fees_max=entry.tx_fees_max,
+                    tx_fees_mean=entry.tx_fees_mean,
+                    tx_count_min=entry.tx_count_min,
+                    tx_count_max=entry.tx_count_max,
+                    tx_count_mean=entry.tx_count_mean,
+                    funds_diff_min_base=funds_diff_min[0],
+                    funds_diff_min_factor=funds_diff_min[1],
+                    funds_diff_max_base=funds_diff_max[0],
+                    funds_diff_max_factor=funds_diff_max[1],
+                    item_share_min=entry.item_share_min,
+                    item_share_max=entry.item_share_max
+                )
+            final_nodes.append(ParametricResultNode(reference_node, entries))
+
+        return ParametricSimulationResult(
+            operator=reference.operator,
+            seller=reference.seller,
+            buyer=reference.buyer,
+            final_nodes=final_nodes,
+            price=reference_price if len(probes) == 1 else None
+        )
+
+    def evaluate(self, price: int, gas_price: int) -> SimulationResultSummary:
+        """Evaluate the result for a single (price, gas price) point."""
+        return self.evaluate_grid([price], [gas_price])[(price, gas_price)]
+
+    def evaluate_grid(self, prices: Sequence[int],
+                      gas_prices: Sequence[int]) -> Dict[Tuple[int, int], SimulationResultSummary]:
+        """Evaluate the result for all combinations of the given prices and gas prices in a single pass.
+
+        Args:
+            prices (Sequence[int]): Prices (in Wei)
+            gas_prices (Sequence[int]): Gas prices (in Wei)
+
+        Returns:
+            Dict[Tuple[int, int], SimulationResultSummary]: result summaries, indexed by (price, gas price)
+        """
+        if not self.price_parametric and any(price != self.price for price in prices):
+            raise ValueError('result is not price parametric and can only be evaluated for price %s' % self.price)
+
+        points = [(price, gas_price) for price in prices for gas_price in gas_prices]
+        final_nodes: Dict[Tuple[int, int], List[ResultNodeSummary]] = {point: [] for point in points}
+        for node in self.final_nodes:
+            for point in points:
+                final_nodes[point].append(node.evaluate(*point))
+        return {
+            point: SimulationResultSummary(self.operator, self.seller, self.buyer, point_final_nodes)
+            for point, point_final_nodes in final_nodes.items()
+        }
+
+    @staticmethod
+    def _fit(prices: List[int], values: List[int], account: Account, node_index: int) -> Tuple[Fraction, Fraction]:
+        if len(prices) == 1:
+            return Fraction(values[0]), Fraction(0)
+        factor = Fraction(values[1] - values[0], prices[1] - prices[0])
+        base = values[0] - factor * prices[0]
+        for price, value in zip(prices[2:], values[2:]):
+            if base + factor * price != value:
+                raise PriceDependencyError('funds diff of %s (final node %d) does not depend linearly on the price'
+                                           % (account.name, node_index))
+        return base, factor
+
+
+class ParametricSimulation(object):
+    def __init__(self, simulation_factory: Callable[[int], Simulation],
+                 probe_prices: Sequence[int] = DEFAULT_PROBE_PRICES) -> None:
+        """Evaluate simulations for many (price, gas price) points.
+
+        Args:
+            simulation_factory (Callable[[int], Simulation]): Creates a simulation (with a fresh environment) for the
+                given price
+            probe_prices (Sequence[int]): Prices to be simulated for creating and verifying the parametric result.
+                At least three prices are recommended, since the third one is used for verifying linearity.
+        """
+        if len(probe_prices) < 2:
+            raise ValueError('at least two probe prices are required')
+        self._simulation_factory = simulation_factory
+        self._probe_prices = probe_prices
+        self._parametric_result: Optional[ParametricSimulationResult] = None
+        self._price_dependency: Optional[PriceDependencyError] = None
+        self._simulation_results: Dict[int, SimulationResult] = {}
+
+    def run(self) -> ParametricSimulationResult:
+        """Run the probe simulations and create the parametric result.
+
+        Raises:
+            PriceDependencyError: if the protocol behaves differently depending on the price
+        """
+        if self._parametric_result is None and self._price_dependency is None:
+            probes = [(price, self._simulate(price)) for price in self._probe_prices]
+            try:
+                self._parametric_result = ParametricSimulationResult.from_probes(probes)
+            except PriceDependencyError as e:
+                self._price_dependency = e
+        if self._price_dependency is not None:
+            raise self._price_dependency
+        assert self._parametric_result is not None
+        return self._parametric_result
+
+    def evaluate_grid(self, prices: Sequence[int],
+                      gas_prices: Sequence[int]) -> Dict[Tuple[int, int], SimulationResultSummary]:
+        """Evaluate all combinations of the given prices and gas prices.
+
+        Uses the parametric result if possible, otherwise the simulation is run for every price (gas prices are still
+        evaluated parametrically).
+        """
+        try:
+            return self.run().evaluate_grid(prices, gas_prices)
+        except PriceDependencyError as e:
+            logger.info('falling back to simulating each price: %s' % str(e))
+
+        results: Dict[Tuple[int, int], SimulationResultSummary] = {}
+        for price in prices:
+            results.update(ParametricSimulationResult.from_simulation_result(
+                self._simulate(price), price
+            ).evaluate_grid([price], gas_prices))
+        return results
+
+    def _simulate(self, price: int) -> SimulationResult:
+        simulation_result = self._simulation_results.get(price)
+        if simulation_result is None:
+            logger.debug('simulating price %d' % price)
+            simulation_result = self._simulation_factory(price).run()
+            self._simulation_results[price] = simulation_result
+        return simulation_result
@@ -0,0 +1,450 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Profiling of simulations and renderings, with flamegraph-compatible output.
+
+Three modes are supported:
+
+  * `cprofile`: deterministic profiling using `cProfile`. Values are microseconds. Since `cProfile` only records
+    caller/callee pairs, call stacks are reconstructed by distributing the time of each function over its callers.
+  * `sampling`: statistical profiling, sampling the call stack of the profiled thread periodically. Values are sample
+    counts. The overhead is low and independent of the number of function calls.
+  * `tracemalloc`: memory allocations still held when profiling stops (e.g. the simulation result). Values are bytes.
+
+Profiles are written as collapsed stacks (one `frame;frame;...;frame value` line per call stack, as consumed by
+flamegraph.pl, speedscope and others) and as JSON summary containing a breakdown of the profile by subsystem.
+"""
+
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, IO, List, Optional, Tuple
+from types import CodeType, FrameType
+
+
+PROFILE_MODE_CPROFILE = 'cprofile'
+PROFILE_MODE_SAMPLING = 'sampling'
+PROFILE_MODE_TRACEMALLOC = 'tracemalloc'
+PROFILE_MODES = (PROFILE_MODE_CPROFILE, PROFILE_MODE_SAMPLING, PROFILE_MODE_TRACEMALLOC)
+PROFILE_UNITS = {
+    PROFILE_MODE_CPROFILE: 'us',
+    PROFILE_MODE_SAMPLING: 'samples',
+    PROFILE_MODE_TRACEMALLOC: 'bytes'
+}
+PROFILE_VALUE_NAMES = {
+    PROFILE_MODE_CPROFILE: 'time',
+    PROFILE_MODE_SAMPLING: 'samples',
+    PROFILE_MODE_TRACEMALLOC: 'memory'
+}
+
+DEFAULT_SAMPLING_INTERVAL = 0.005
+DEFAULT_TRACEMALLOC_FRAMES = 64
+
+COLLAPSED_SUFFIX = '.folded'
+SUMMARY_SUFFIX = '.json'
+PSTATS_SUFFIX = '.prof'
+
+SUBSYSTEM_COMPILE = 'compile'
+SUBSYSTEM_EVM = 'evm'
+SUBSYSTEM_RPC = 'rpc'
+SUBSYSTEM_PROTOCOL = 'protocol'
+SUBSYSTEM_RESULT_COLLECTION = 'result-collection'
+SUBSYSTEM_RENDER = 'render'
+SUBSYSTEM_IMPORT = 'import'
+SUBSYSTEM_OTHER = 'other'
+
+# phases are assigned to a call stack if any of its frames matches (e.g. aggregations computed by renderers count
+# as rendering)
+PHASE_SUBSYSTEMS: List[Tuple[str, Tuple[str, ...]]] = [
+    (SUBSYSTEM_COMPILE, ('solcx/', 'bdtsim/contract.py')),
+    # collects the results while simulating, despite its location
+    (SUBSYSTEM_RESULT_COLLECTION, ('bdtsim/renderer/result_collector.py', )),
+    (SUBSYSTEM_RENDER, ('bdtsim/renderer/', 'graphviz/')),
+    # modules imported lazily on first use
+    (SUBSYSTEM_IMPORT, ('<frozen importlib', ))
+]
+# layers are assigned by the innermost matching frame (e.g. py-evm code called via web3 counts as EVM); shared
+# libraries (hashing, RLP, ABI encoding, ...) are not listed and count for the layer using them
+LAYER_SUBSYSTEMS: List[Tuple[str, Tuple[str, ...]]] = [
+    (SUBSYSTEM_EVM, ('eth/', 'trie/', 'eth_bloom/', 'py_ecc/', 'blake2b/')),
+    (SUBSYSTEM_RPC, ('web3/', 'eth_tester/', 'eth_account/', 'requests/', 'urllib3/', 'websockets/',
+                     'bdtsim/environment/')),
+    (SUBSYSTEM_RESULT_COLLECTION, ('bdtsim/simulation_result.py', 'bdtsim/simulation_result_file.py',
+                                   'bdtsim/result_store.py', 'bdtsim/parametric_simulation.py')),
+    (SUBSYSTEM_PROTOCOL, ('bdtsim/protocol/', 'bdtsim/data_provider/', 'bdtsim/util/xor.py'))
+]
+SUBSYSTEMS = (SUBSYSTEM_COMPILE, SUBSYSTEM_EVM, SUBSYSTEM_RPC, SUBSYSTEM_PROTOCOL, SUBSYSTEM_RESULT_COLLECTION,
+              SUBSYSTEM_RENDER, SUBSYSTEM_IMPORT, SUBSYSTEM_OTHER)
+
+# frame labels are "function (path:line)", or "path:line" for tracemalloc frames
+_FRAME_PATH_PATTERN = re.compile(r'(?:^|\()([^()]+):\d+\)?$')
+_short_paths: Dict[str, str] = {}
+
+Stack = Tuple[str, ...]
+
+
+def short_path(filename: str) -> str:
+    """Path of a source file relative to the `sys.path` entry containing it (e.g. `web3/eth.py`)."""
+    cached = _short_paths.get(filename)
+    if cached is not None:
+        return cached
+    if filename.startswith('<'):
+        return filename  # e.g. <frozen importlib._bootstrap>, <string>
+    path = os.path.abspath(filename)
+    result = filename
+    prefixes = sorted((os.path.abspath(entry or os.curdir) for entry in sys.path), key=len, reverse=True)
+    for prefix in prefixes:
+        if path.startswith(prefix + os.sep):
+            result = path[len(prefix) + 1:]
+            break
+    result = result.replace(os.sep, '/')
+    _short_paths[filename] = result
+    return result
+
+
+def frame_label(function_name: str, filename: str, line: int) -> str:
+    if filename == '~':
+        return function_name  # built-in functions (cProfile)
+    return '%s (%s:%i)' % (function_name, short_path(filename), line)
+
+
+def frame_path(label: str) -> Optional[str]:
+    match = _FRAME_PATH_PATTERN.search(label)
+    return None if match is None else match.group(1)
+
+
+def _matches(path: Optional[str], prefixes: Tuple[str, ...]) -> bool:
+    return path is not None and any(path.startswith(prefix) for prefix in prefixes)
+
+
+def classify_stack(stack: Stack) -> str:
+    """Determine the subsystem a call stack (outermost frame first) belongs to.
+
+    Args:
+        stack (Stack): Frame labels, outermost first
+
+    Returns:
+        str: One of `SUBSYSTEMS`
+    """
+    paths = [frame_path(label) for label in stack]
+    for subsystem, prefixes in PHASE_SUBSYSTEMS:
+        if any(_matches(path, prefixes) for path in paths):
+            return subsystem
+    for path in reversed(paths):
+        for subsystem, prefixes in LAYER_SUBSYSTEMS:
+            if _matches(path, prefixes):
+                return subsystem
+    return SUBSYSTEM_OTHER
+
+
+class Profile(object):
+    def __init__(self, mode: str, stacks: Optional[Dict[Stack, int]] = None,
+                 metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Profile consisting of values (time, samples or bytes, depending on the mode) per call stack.
+
+        Args:
+            mode (str): Profiling mode (one of `PROFILE_MODES`)
+            stacks (Optional[Dict[Stack, int]]): Values per call stack (frame labels, outermost first)
+            metadata (Optional[Dict[str, Any]]): Additional information stored in the summary (e.g. wall time)
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError('unsupported profiling mode "%s"' % mode)
+        self._mode = mode
+        self._stacks: Dict[Stack, int] = dict(stacks or {})
+        self._metadata: Dict[str, Any] = dict(metadata or {})
+
+    @property
+    def mode(self) -> str:
+        return self._mode
+
+    @property
+    def unit(self) -> str:
+        return PROFILE_UNITS[self._mode]
+
+    @property
+    def stacks(self) -> Dict[Stack, int]:
+        return self._stacks
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self._metadata
+
+    @property
+    def total(self) -> int:
+        return sum(self._stacks.values())
+
+    def add(self, stack: Stack, value: int) -> None:
+        if value > 0:
+            self._stacks[stack] = self._stacks.get(stack, 0) + value
+
+    def __iadd__(self, other: 'Profile') -> 'Profile':
+        if other.mode != self._mode:
+            raise ValueError('cannot merge %s profile into %s profile' % (other.mode, self._mode))
+        for stack, value in other.stacks.items():
+            self.add(stack, value)
+        if 'wall_time' in other.metadata:
+            self._metadata['wall_time'] = self._metadata.get('wall_time', 0.0) + other.metadata['wall_time']
+        if 'peak_memory' in other.metadata:
+            self._metadata['peak_memory'] = max(self._metadata.get('peak_memory', 0), other.metadata['peak_memory'])
+        return self
+
+    def subsystem_breakdown(self) -> Dict[str, int]:
+        """Values per subsystem (see `classify_stack`), in the order of `SUBSYSTEMS`."""
+        breakdown = {subsystem: 0 for subsystem in SUBSYSTEMS}
+        for stack, value in self._stacks.items():
+            breakdown[classify_stack(stack)] += value
+        return breakdown
+
+    def top_frames(self, count: int = 20) -> List[Tuple[str, int]]:
+        """Frames with the highest self values (innermost frame of the call stacks)."""
+        frames: Dict[str, int] = {}
+        for stack, value in self._stacks.items():
+            if len(stack):
+                frames[stack[-1]] = frames.get(stack[-1], 0) + value
+        return sorted(frames.items(), key=lambda item: (-item[1], item[0]))[:count]
+
+    def write_collapsed(self, fp: IO[str]) -> None:
+        for stack, value in sorted(self._stacks.items()):
+            fp.write('%s %i\n' % (';'.join(stack), value))
+
+    @staticmethod
+    def read_collapsed(fp: IO[str], mode: str) -> 'Profile':
+        profile = Profile(mode)
+        for line in fp:
+            line = line.rstrip('\n')
+            if not line.strip():
+                continue
+            stack, _, value = line.rpartition(' ')
+            if not stack:
+                raise ValueError('invalid collapsed stack line "%s"' % line)
+            profile.add(tuple(stack.split(';')), int(value))
+        return profile
+
+    def get_summary(self, top_frames: int = 20) -> Dict[str, Any]:
+        return {
+            'mode': self._mode,
+            'unit': self.unit,
+            'total': self.total,
+            'subsystems': self.subsystem_breakdown(),
+            'top_frames': [{'frame': frame, 'value': value} for frame, value in self.top_frames(top_frames)],
+            'metadata': self._metadata
+        }
+
+    def write(self, prefix: str) -> List[str]:
+        """Write the collapsed stacks (`<prefix>.folded`) and the summary (`<prefix>.json`).
+
+        Returns:
+            List[str]: Paths of the written files
+        """
+        with open(prefix + COLLAPSED_SUFFIX, 'w') as fp:
+            self.write_collapsed(fp)
+        with open(prefix + SUMMARY_SUFFIX, 'w') as fp:
+            json.dump(self.get_summary(), fp, indent=2, default=str)
+        return [prefix + COLLAPSED_SUFFIX, prefix + SUMMARY_SUFFIX]
+
+    @staticmethod
+    def load(path: str) -> 'Profile':
+        """Load a profile from a collapsed stacks file, taking the mode from the summary written alongside.
+
+        Args:
+            path (str): Path of the collapsed stacks file (`<prefix>.folded`) or of the summary (`<prefix>.json`)
+
+        Returns:
+            Profile: Loaded profile
+        """
+        prefix = path[:-len(COLLAPSED_SUFFIX)] if path.endswith(COLLAPSED_SUFFIX) else path
+        prefix = prefix[:-len(SUMMARY_SUFFIX)] if prefix.endswith(SUMMARY_SUFFIX) else prefix
+        with open(prefix + SUMMARY_SUFFIX, 'r') as fp:
+            summary = json.load(fp)
+        with open(prefix + COLLAPSED_SUFFIX, 'r') as fp:
+            profile = Profile.read_collapsed(fp, str(summary.get('mode')))
+        profile.metadata.update(summary.get('metadata') or {})
+        return profile
+
+
+def _cprofile_stacks(stats: Dict[Any, Any], unit: float = 1e-6) -> Dict[Stack, int]:
+    """Reconstruct call stacks from `cProfile` statistics.
+
+    The cumulative time of a function is split over its callees by the cumulative time recorded per caller/callee
+    pair, recursively starting at the functions without callers. Recursive calls are attributed to the outermost call,
+    so the total of all stacks equals the profiled time, but stacks are an approximation if a function is called from
+    different call paths.
+
+    Args:
+        stats (Dict[Any, Any]): `cProfile.Profile.stats` (after `create_stats`)
+        unit (float): Unit of the values in seconds
+
+    Returns:
+        Dict[Stack, int]: Values per call stack
+    """
+    callees: Dict[Any, Dict[Any, float]] = {}
+    for function, (_, _, _, _, callers) in stats.items():
+        for caller, caller_stats in callers.items():
+            callees.setdefault(caller, {})[function] = caller_stats[3]
+    labels = {function: frame_label(function[2], function[0], function[1]) for function in stats}
+    total = sum(entry[2] for entry in stats.values())
+    # prune call paths below the resolution of the output, bounding the work for heavily branching call graphs
+    threshold = max(unit / 2, total * 1e-6)
+    stacks: Dict[Stack, float] = {}
+
+    def visit(function: Any, path: Stack, visited: Tuple[Any, ...], time_share: float) -> None:
+        inline_time, cumulative_time = stats[function][2], stats[function][3]
+        function_callees = {callee: callee_time for callee, callee_time in callees.get(function, {}).items()
+                            if callee in stats and callee_time > 0}
+        callee_total = sum(function_callees.values())
+        if cumulative_time <= 0 or callee_total <= 0:
+            stacks[path] = stacks.get(path, 0.0) + time_share
+            return
+        # the times of caller/callee pairs overlap for recursion via other functions (e.g. nested imports), so the
+        # time spent in callees is distributed proportionally to the pair times
+        callee_share = time_share * max(cumulative_time - inline_time, 0.0) / cumulative_time
+        self_time = time_share - callee_share
+        for callee, callee_time in function_callees.items():
+            share = callee_share * callee_time / callee_total
+            if callee in visited or share < threshold:
+                self_time += share
+                continue
+            visit(callee, path + (labels[callee],), visited + (callee,), share)
+        stacks[path] = stacks.get(path, 0.0) + self_time
+
+    for function, entry in stats.items():
+        if not entry[4]:
+            visit(function, (labels[function],), (function,), entry[3])
+    return {stack: int(round(value / unit)) for stack, value in stacks.items() if round(value / unit) > 0}
+
+
+class Profiler(object):
+    def __init__(self, mode: str, interval: float = DEFAULT_SAMPLING_INTERVAL,
+                 frames: int = DEFAULT_TRACEMALLOC_FRAMES) -> None:
+        """Profiler for the calling thread (`cprofile`, `sampling`) or the whole process (`tracemalloc`).
+
+        Can be used as context manager, the profile is available via `profile` after stopping.
+
+        Args:
+            mode (str): Profiling mode (one of `PROFILE_MODES`)
+            interval (float): Seconds between two samples (`sampling` mode)
+            frames (int): Maximum number of frames stored per allocation (`tracemalloc` mode)
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError('unsupported profiling mode "%s"' % mode)
+        self._mode = mode
+        self._interval = interval
+        self._frames = frames
+        self._profile: Optional[Profile] = None
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._stop_sampling = threading.Event()
+        self._sample_stacks: Dict[Stack, int] = {}
+        self._code_labels: Dict[CodeType, str] = {}
+        self._start_time: Optional[float] = None
+
+    @property
+    def mode(self) -> str:
+        return self._mode
+
+    @property
+    def profile(self) -> Profile:
+        if self._profile is None:
+            raise ValueError('profiler has not been stopped yet')
+        return self._profile
+
+    def __enter__(self) -> 'Profiler':
+        self.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self._profile = None
+        self._start_time = time.monotonic()
+        if self._mode == PROFILE_MODE_CPROFILE:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        elif self._mode == PROFILE_MODE_SAMPLING:
+            self._sample_stacks = {}
+            self._stop_sampling.clear()
+            self._sampler = threading.Thread(target=self._sample, args=(threading.get_ident(), ),
+                                             name='profile-sampler', daemon=True)
+            self._sampler.start()
+        else:
+            tracemalloc.start(self._frames)
+
+    def stop(self) -> Profile:
+        metadata: Dict[str, Any] = {'wall_time': time.monotonic() - (self._start_time or time.monotonic())}
+        if self._mode == PROFILE_MODE_CPROFILE:
+            assert self._cprofile is not None
+            self._cprofile.disable()
+            self._cprofile.create_stats()
+            stacks = _cprofile_stacks(self._cprofile.stats)
+        elif self._mode == PROFILE_MODE_SAMPLING:
+            assert self._sampler is not None
+            self._stop_sampling.set()
+            self._sampler.join()
+            stacks = self._sample_stacks
+            metadata['interval'] = self._interval
+        else:
+            snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+            metadata['peak_memory'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            stacks = {}
+            for statistic in snapshot.statistics('traceback'):
+                # frames are ordered from the oldest to the most recent one
+                stack = tuple('%s:%i' % (short_path(frame.filename), frame.lineno) for frame in statistic.traceback)
+                stacks[stack] = stacks.get(stack, 0) + statistic.size
+        self._profile = Profile(self._mode, stacks, metadata)
+        return self._profile
+
+    def write(self, prefix: str) -> List[str]:
+        """Write the profile (see `Profile.write`), and the raw `cProfile` statistics (`<prefix>.prof`) if available.
+
+        Returns:
+            List[str]: Paths of the written files
+        """
+        paths = self.profile.write(prefix)
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(prefix + PSTATS_SUFFIX)
+            paths.append(prefix + PSTATS_SUFFIX)
+        return paths
+
+    def _sample(self, thread_id: int) -> None:
+        while not self._stop_sampling.wait(self._interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                return
+            stack = self._frame_stack(frame)
+            if self._stop_sampling.is_set():
+                return  # sampled while stopping the profiler
+            self._sample_stacks[stack] = self._sample_stacks.get(stack, 0) + 1
+
+    def _frame_stack(self, frame: Optional[FrameType]) -> Stack:
+        labels: List[str] = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._code_labels.get(code)
+            if label is None:
+                label = frame_label(code.co_name, code.co_filename, code.co_firstlineno)
+                self._code_labels[code] = label
+            labels.append(label)
+            frame = frame.f_back
+        labels.reverse()
+        return tuple(labels)
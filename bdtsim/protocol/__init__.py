@@ -15,14 +15,42 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from .protocol import Protocol, DEFAULT_ASSET_PRICE
+from typing import Dict, Tuple, TYPE_CHECKING
+
+from bdtsim.registry import lazy_attributes
 from .protocol_manager import ProtocolManager
 from .exceptions import ProtocolError, ProtocolInitializationError, ProtocolExecutionError
-from .delgado import DelgadoBasic, DelgadoReusableLibrary, DelgadoReusableContract
-from .fairswap import FairSwap, FairSwapReusable
-from .simplepayment import SimplePaymentPrepaidProtocol, SimplePaymentPrepaidDirectProtocol,\
-    SimplePaymentPostpaidProtocol, SimplePaymentPostpaidDirectProtocol
-from .smartjudge import SmartJudge
+
+if TYPE_CHECKING:
+    from .protocol import Protocol, DEFAULT_ASSET_PRICE
+    from .delgado import DelgadoBasic, DelgadoReusableLibrary, DelgadoReusableContract
+    from .fairswap import FairSwap, FairSwapReusable
+    from .simplepayment import SimplePaymentPrepaidProtocol, SimplePaymentPrepaidDirectProtocol,\
+        SimplePaymentPostpaidProtocol, SimplePaymentPostpaidDirectProtocol
+    from .smartjudge import SmartJudge
+
+# built-in protocols (module relative to this package and class), imported when used
+PROTOCOLS: Dict[str, Tuple[str, ...]] = {
+    'Delgado': ('.delgado.delgado', 'DelgadoBasic'),
+    'Delgado-ReusableLibrary': ('.delgado.delgado', 'DelgadoReusableLibrary'),
+    'Delgado-ReusableContract': ('.delgado.delgado', 'DelgadoReusableContract'),
+    'FairSwap': ('.fairswap.fairswap', 'FairSwap'),
+    'FairSwap-Reusable': ('.fairswap.fairswap', 'FairSwapReusable'),
+    'SimplePayment-prepaid': ('.simplepayment.simplepayment', 'SimplePaymentPrepaidProtocol'),
+    'SimplePayment-prepaid-direct': ('.simplepayment.simplepayment', 'SimplePaymentPrepaidDirectProtocol'),
+    'SimplePayment-postpaid': ('.simplepayment.simplepayment', 'SimplePaymentPostpaidProtocol'),
+    'SimplePayment-postpaid-direct': ('.simplepayment.simplepayment', 'SimplePaymentPostpaidDirectProtocol'),
+    'SmartJudge-FairSwap': ('.smartjudge.smartjudge', 'SmartJudge')
+}
+
+for protocol_name, (protocol_module, *protocol_attributes) in PROTOCOLS.items():
+    ProtocolManager.register_lazy(protocol_name, __name__ + protocol_module, *protocol_attributes)
+
+__getattr__ = lazy_attributes(__name__, {
+    'Protocol': '.protocol',
+    'DEFAULT_ASSET_PRICE': '.protocol',
+    **{attributes[0]: module for module, *attributes in PROTOCOLS.values()}
+})
 
 __all__ = [
     'Protocol', 'DEFAULT_ASSET_PRICE',
@@ -26,7 +26,7 @@ from bdtsim.account import Account
 from bdtsim.contract import SolidityContract, SolidityContractCollection
 from bdtsim.data_provider import DataProvider
 from bdtsim.environment import Environment
-from bdtsim.protocol import Protocol, ProtocolManager, DEFAULT_ASSET_PRICE
+from bdtsim.protocol import Protocol, DEFAULT_ASSET_PRICE
 from bdtsim.protocol_path import ProtocolPath
 
 
@@ -205,8 +205,3 @@ class DelgadoReusableContract(DelgadoBasic):
             raise RuntimeError('Contract not initialized!')
         session_id = self.get_session_id(seller, buyer, pubkey_y)
         environment.send_contract_transaction(self.contract, beneficiary, 'refund', session_id)
-
-
-ProtocolManager.register('Delgado', DelgadoBasic)
-ProtocolManager.register('Delgado-ReusableLibrary', DelgadoReusableLibrary)
-ProtocolManager.register('Delgado-ReusableContract', DelgadoReusableContract)
@@ -27,7 +27,7 @@ from bdtsim.account import Account
 from bdtsim.contract import SolidityContract
 from bdtsim.data_provider import DataProvider
 from bdtsim.environment import Environment
-from bdtsim.protocol import Protocol, ProtocolManager, ProtocolInitializationError, ProtocolExecutionError,\
+from bdtsim.protocol import Protocol, ProtocolInitializationError, ProtocolExecutionError,\
     DEFAULT_ASSET_PRICE
 from bdtsim.protocol_path import ProtocolPath
 from bdtsim.util.bytes import generate_bytes
@@ -455,7 +455,3 @@ class FairSwapReusable(FairSwap):
             proof_out,
             proof_in1
         )
-
-
-ProtocolManager.register('FairSwap', FairSwap)
-ProtocolManager.register('FairSwap-Reusable', FairSwapReusable)
@@ -15,31 +15,39 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Any, Dict, Type
+from typing import Any, Dict, Type, TYPE_CHECKING
 
-from bdtsim.protocol import Protocol
+from bdtsim.registry import Registration, register_lazy
 
-
-class ProtocolRegistration(object):
-    def __init__(self, cls: Type[Protocol], *args: Any, **kwargs: Any) -> None:
-        self.cls = cls
-        self.args = args
-        self.kwargs = kwargs
+if TYPE_CHECKING:
+    from .protocol import Protocol
 
 
 class ProtocolManager(object):
-    protocols: Dict[str, ProtocolRegistration] = {}
+    protocols: Dict[str, Registration['Protocol']] = {}
 
     def __init__(self) -> None:
         raise NotImplementedError('This class is not to be instantiated')
 
     @staticmethod
-    def register(name: str, cls: Type[Protocol], *args: Any, **kwargs: Any) -> None:
+    def register(name: str, cls: Type['Protocol'], *args: Any, **kwargs: Any) -> None:
+        from .protocol import Protocol
         if not issubclass(cls, Protocol):
             raise ValueError('Provided class is not a subclass of Protocol')
-        ProtocolManager.protocols[name] = ProtocolRegistration(cls, *args, **kwargs)
+        ProtocolManager.protocols[name] = Registration(cls, *args, **kwargs)
+
+    @staticmethod
+    def register_lazy(name: str, module: str, attribute: str, *arg_attributes: str) -> None:
+        """Register a protocol by the module providing it, which is imported when the protocol is used.
+
+        Args:
+            name (str): Name of the protocol
+            module (str): Absolute name of the module providing the protocol
+            attribute (str): Name of the protocol class within the module
+            *arg_attributes (str): Names of module attributes passed as leading arguments to the protocol class
+        """
+        register_lazy(ProtocolManager.protocols, name, module, attribute, *arg_attributes)
 
     @staticmethod
-    def instantiate(name: str, **kwargs: Any) -> Protocol:
-        environment = ProtocolManager.protocols[name]
-        return environment.cls(*environment.args, **{**environment.kwargs, **kwargs})
+    def instantiate(name: str, **kwargs: Any) -> 'Protocol':
+        return ProtocolManager.protocols[name].instantiate(**kwargs)
@@ -22,7 +22,7 @@ from bdtsim.contract import SolidityContract
 from bdtsim.data_provider import DataProvider
 from bdtsim.environment import Environment
 from bdtsim.account import Account
-from bdtsim.protocol import Protocol, ProtocolManager, DEFAULT_ASSET_PRICE
+from bdtsim.protocol import Protocol, DEFAULT_ASSET_PRICE
 from bdtsim.protocol_path import ProtocolPath
 
 
@@ -130,9 +130,3 @@ class SimplePaymentPostpaidDirectProtocol(AbstractSimplePaymentProtocol):
                 pass  # do not pay
         else:
             pass  # do not handover item, buyer will not pay
-
-
-ProtocolManager.register('SimplePayment-prepaid', SimplePaymentPrepaidProtocol)
-ProtocolManager.register('SimplePayment-prepaid-direct', SimplePaymentPrepaidDirectProtocol)
-ProtocolManager.register('SimplePayment-postpaid', SimplePaymentPostpaidProtocol)
-ProtocolManager.register('SimplePayment-postpaid-direct', SimplePaymentPostpaidDirectProtocol)
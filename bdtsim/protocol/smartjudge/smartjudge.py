@@ -26,7 +26,7 @@ from bdtsim.account import Account
 from bdtsim.contract import SolidityContractCollection
 from bdtsim.data_provider import DataProvider
 from bdtsim.environment import Environment
-from bdtsim.protocol import Protocol, ProtocolManager, ProtocolInitializationError, ProtocolExecutionError,\
+from bdtsim.protocol import Protocol, ProtocolInitializationError, ProtocolExecutionError,\
     DEFAULT_ASSET_PRICE
 from bdtsim.protocol.fairswap import encoding, merkle
 from bdtsim.protocol_path import ProtocolPath
@@ -367,6 +367,3 @@ class SmartJudge(Protocol):
                     encrypted_merkle_tree.get_proof(error.in1)
                 )
                 return
-
-
-ProtocolManager.register('SmartJudge-FairSwap', SmartJudge)
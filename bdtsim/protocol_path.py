@@ -16,9 +16,10 @@
 # limitations under the License.
 
 import time
-from typing import Any, Callable, List, Optional, Tuple, cast
+from typing import Any, Callable, Dict, List, Optional, Tuple, cast
 
 from .account import Account
+from .tracing import CATEGORY_PROTOCOL, span
 
 
 class Choice(object):
@@ -155,82 +156,181 @@ class ProtocolPathCoercion(List[Optional[List[str]]]):
     pass
 
 
+class ProtocolPathNode(object):
+    """Node of the decision prefix trie shared by all protocol paths of a simulation.
+
+    Every node represents the decision sequence leading to it. The choice to be made at a node is interned, i.e. all
+    children (and therefore all protocol paths passing this node) share the same Choice object. Children are addressed
+    by the index of the chosen option.
+    """
+    __slots__ = ('parent', 'root', 'index', 'decision', 'depth', 'choice', 'children')
+
+    def __init__(self, parent: Optional['ProtocolPathNode'] = None, index: int = -1,
+                 decision: Optional[Decision] = None) -> None:
+        self.parent = parent
+        self.index = index
+        self.decision = decision
+        self.root: ProtocolPathNode = self if parent is None else parent.root
+        self.depth: int = 0 if parent is None else parent.depth + 1
+        self.choice: Optional[Choice] = None
+        self.children: Dict[int, ProtocolPathNode] = {}
+
+    def intern_choice(self, subject: Account, description: str, options: Tuple[str, ...],
+                      honest_options: Optional[Tuple[str, ...]] = None) -> Choice:
+        if self.choice is None:
+            self.choice = Choice(
+                subject=subject,
+                options=options,
+                honest_options=honest_options,
+                description=description
+            )
+        else:
+            self.validate_choice(self.choice, subject, description, options, honest_options)
+        return self.choice
+
+    def child(self, index: int, timestamp: Optional[float] = None) -> 'ProtocolPathNode':
+        child = self.children.get(index)
+        if child is None:
+            if self.choice is None:
+                raise RuntimeError('cannot create child for a node without choice')
+            child = ProtocolPathNode(self, index, Decision(
+                choice=self.choice,
+                outcome=self.choice.options[index],
+                timestamp=timestamp
+            ))
+            self.children[index] = child
+        return child
+
+    def attach(self, decision: Decision) -> 'ProtocolPathNode':
+        if self.choice is None:
+            self.choice = decision.choice
+        elif self.choice is not decision.choice:
+            raise ValueError('decision does not belong to the choice of this node')
+        index = self.choice.options.index(decision.outcome)
+        child = self.children.get(index)
+        if child is None:
+            child = ProtocolPathNode(self, index, decision)
+            self.children[index] = child
+        return child
+
+    def path_nodes(self, stop: Optional['ProtocolPathNode'] = None) -> List['ProtocolPathNode']:
+        """Nodes from (excluding) `stop`, or the root if not given, down to (including) this node."""
+        nodes = []
+        node: Optional[ProtocolPathNode] = self
+        while node is not None and node is not stop and node.decision is not None:
+            nodes.append(node)
+            node = node.parent
+        nodes.reverse()
+        return nodes
+
+    @staticmethod
+    def validate_choice(choice: Choice, subject: Account, description: str, options: Tuple[str, ...],
+                        honest_options: Optional[Tuple[str, ...]] = None) -> None:
+        if choice.subject != subject:
+            raise ValueError('subject should match existing decisions\'s subject')
+        if choice.options != options:
+            raise ValueError('options should match existing decisions\'s options')
+        if choice.honest_options != (honest_options or (options[0], )):
+            raise ValueError('honest options should match existing decisions\'s honest options')
+        if choice.description != description:
+            raise ValueError('description should match existing decisions\'s description')
+
+
 class ProtocolPath(object):
-    """One possible path through a protocol iteration."""
+    """One possible path through a protocol iteration.
+
+    Protocol paths are represented as a position in a decision prefix trie (see ProtocolPathNode). Alternatives
+    share the trie of the path they were derived from, so creating, comparing and hashing them does not copy any
+    decisions. Only the decisions made by a path (which carry the timestamp of the path) are kept per path.
+    """
+    __slots__ = ('_coercion', '_initial_node', '_head', '_cursor', '_replay_nodes', '_decisions', '_decision_callback')
 
     def __init__(self, initial_decisions: Optional[List[Decision]] = None,
                  coercion: Optional[ProtocolPathCoercion] = None) -> None:
-        self._initial_decisions: List[Decision] = initial_decisions or []
-        self._coercion: ProtocolPathCoercion = coercion or ProtocolPathCoercion()
-        self._new_decisions: List[Decision] = []
-        self._decisions_index: int = 0
+        node = ProtocolPathNode()
+        for decision in initial_decisions or []:
+            node = node.attach(decision)
+        self._init(node, coercion or ProtocolPathCoercion())
+
+    def _init(self, initial_node: ProtocolPathNode, coercion: ProtocolPathCoercion) -> None:
+        self._coercion = coercion
+        self._initial_node = initial_node
+        self._head = initial_node
+        self._cursor = initial_node.root
+        self._replay_nodes: Optional[List[ProtocolPathNode]] = None
+        self._decisions: List[Decision] = []  # decisions made by this path, by depth - 1
         self._decision_callback: Optional[Callable[[Decision], None]] = None
 
+    @classmethod
+    def from_node(cls, initial_node: ProtocolPathNode,
+                  coercion: Optional[ProtocolPathCoercion] = None) -> 'ProtocolPath':
+        protocol_path: ProtocolPath = cls.__new__(cls)
+        protocol_path._init(initial_node, coercion or ProtocolPathCoercion())
+        return protocol_path
+
     def decide(self, subject: Account, description: str, options: Tuple[str, ...],
                honest_options: Optional[Tuple[str, ...]] = None) -> Decision:
-        if len(self.decisions) == self._decisions_index:  # we have no decision yet
-            # check for outcome coercion
-            outcome: Optional[str] = None
-            if len(self._coercion) <= self._decisions_index or self._coercion[self._decisions_index] is None:
-                outcome = options[0]
+        with span('decide', CATEGORY_PROTOCOL, subject=subject.name, description=description) as decide_span:
+            cursor = self._cursor
+            if cursor is self._head:  # we have no decision yet
+                choice = cursor.intern_choice(subject, description, options, honest_options)
+
+                # check for outcome coercion
+                outcome_index: Optional[int] = None
+                if len(self._coercion) <= cursor.depth or self._coercion[cursor.depth] is None:
+                    outcome_index = 0
+                else:
+                    for index, variant in enumerate(choice.options):
+                        if variant in cast('List[str]', self._coercion[cursor.depth]):
+                            outcome_index = index
+                            break
+                    if outcome_index is None:
+                        raise RuntimeError('No accepted outcome available. Choose from: %s' % ', '.join(options))
+
+                node = cursor.child(outcome_index)
+                self._head = node
             else:
-                for variant in options:
-                    if variant in cast('List[str]', self._coercion[self._decisions_index]):
-                        outcome = variant
-                        break
-                if outcome is None:
-                    raise RuntimeError('No accepted outcome available. Choose from: %s' % ', '.join(options))
-
-            # create decision object
-            self._new_decisions.append(Decision(
-                choice=Choice(
-                    subject=subject,
-                    options=options,
-                    honest_options=honest_options,
-                    description=description
-                ),
-                outcome=outcome,
-                timestamp=time.time()
-            ))
-
-        decision = self.decisions[self._decisions_index]
-
-        if decision.choice.subject != subject:
-            raise ValueError('subject should match existing decisions\'s subject')
-        if decision.choice.options != options:
-            raise ValueError('options should match existing decisions\'s options')
-        if decision.choice.honest_options != (honest_options or (options[0], )):
-            raise ValueError('honest options should match existing decisions\'s honest options')
-        if decision.choice.description != description:
-            raise ValueError('description should match existing decisions\'s description')
-
-        # if there is a pre-defined decision, set timestamp when it was used (now)
-        if decision.timestamp is None:
-            decision.timestamp = time.time()
-
-        # do some decision validity checks
-        if decision.choice.subject != subject:
-            raise ValueError('Account provided does not match pre-defined decision account %s'
-                             % str(decision.choice.subject))
-        if decision.choice.options != options:
-            raise ValueError('Possible variants do not match')
-
-        self._decisions_index += 1
-        if self._decision_callback is not None:
-            self._decision_callback(decision)
-        return decision
+                if self._replay_nodes is None:
+                    self._replay_nodes = self._initial_node.path_nodes()
+                node = self._replay_nodes[cursor.depth]
+                ProtocolPathNode.validate_choice(cast(Choice, cursor.choice), subject, description, options,
+                                                 honest_options)
+
+            # trie nodes (and their decisions) are shared by all paths passing them, so every path gets its own
+            # decision, with the timestamp when it was used (now) unless pre-defined
+            node_decision = cast(Decision, node.decision)
+            decision = Decision(node_decision.choice, node_decision.outcome,
+                                node_decision.timestamp if node_decision.timestamp is not None else time.time())
+            decide_span.set('outcome', decision.outcome)
+
+            self._cursor = node
+            self._decisions.append(decision)
+            if self._decision_callback is not None:
+                self._decision_callback(decision)
+            return decision
+
+    def _get_decisions(self, nodes: List[ProtocolPathNode]) -> List[Decision]:
+        # decisions made by this path, and the (shared) trie decisions of initial decisions not replayed yet
+        decisions = self._decisions
+        return [decisions[node.depth - 1] if node.depth <= len(decisions) else cast(Decision, node.decision)
+                for node in nodes]
 
     @property
     def initial_decisions(self) -> List[Decision]:
-        return self._initial_decisions
+        return self._get_decisions(self._initial_node.path_nodes())
 
     @property
     def new_decisions(self) -> List[Decision]:
-        return self._new_decisions
+        return self._get_decisions(self._head.path_nodes(self._initial_node))
 
     @property
     def decisions(self) -> List[Decision]:
-        return self.initial_decisions + self.new_decisions
+        return self._get_decisions(self._head.path_nodes())
+
+    @property
+    def node(self) -> ProtocolPathNode:
+        """Trie node representing all decisions of this protocol path made so far."""
+        return self._head
 
     @property
     def decision_callback(self) -> Optional[Callable[[Decision], None]]:
@@ -242,25 +342,19 @@ class ProtocolPath(object):
 
     def get_alternatives(self) -> List['ProtocolPath']:
         alternatives = []
-        for new_decision_index in range(len(self.new_decisions)):
-            decision_head = self.new_decisions[new_decision_index]
-            for option in decision_head.choice.options:
+        for node in self._head.path_nodes(self._initial_node):
+            parent = cast(ProtocolPathNode, node.parent)
+            choice = cast(Choice, parent.choice)
+            coercion = self._coercion[parent.depth] if len(self._coercion) > parent.depth else None
+            for index, option in enumerate(choice.options):
                 # filter current option
-                if decision_head.outcome == option:
+                if index == node.index:
                     continue
                 # filter coercions
-                if (len(self._coercion) > new_decision_index
-                        and self._coercion[new_decision_index] is not None
-                        and option not in cast('List[str]', self._coercion[new_decision_index])):
+                if coercion is not None and option not in coercion:
                     continue
                 # add alternative protocol path
-                alternatives.append(ProtocolPath(
-                    self.initial_decisions + self.new_decisions[:new_decision_index] + [Decision(
-                        choice=decision_head.choice,
-                        outcome=option,
-                        timestamp=None
-                    )]
-                ))
+                alternatives.append(ProtocolPath.from_node(parent.child(index), self._coercion))
         return alternatives
 
     def all_accounts_completely_honest(self) -> bool:
@@ -283,6 +377,11 @@ class ProtocolPath(object):
 
     def __eq__(self, other: Any) -> bool:
         if isinstance(other, ProtocolPath):
+            if self._head.root is other._head.root:
+                # within the same trie, every decision sequence is represented by exactly one node
+                return self._initial_node is other._initial_node and self._head is other._head
+            elif self._initial_node.depth != other._initial_node.depth or self._head.depth != other._head.depth:
+                return False
             return self.initial_decisions == other.initial_decisions and self.new_decisions == other.new_decisions
         else:
             return NotImplemented
@@ -290,6 +389,9 @@ class ProtocolPath(object):
     def __ne__(self, other: Any) -> bool:
         return not self.__eq__(other)
 
+    def __hash__(self) -> int:
+        return hash((self._initial_node.depth, self._head.depth, self._head.decision))
+
     def __repr__(self) -> str:
         initial_decisions_str = map(lambda d: str(d), self.initial_decisions)
         new_decisions_str = map(lambda d: str(d), self.new_decisions)
@@ -0,0 +1,137 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Registrations of pluggable components (protocols, environments, data providers, renderers).
+
+Components can be registered lazily by the module and class name providing them. Such modules (and all their
+dependencies) are only imported when the component is actually used, so listing components or using a single one does
+not require importing all of them.
+"""
+
+import importlib
+import sys
+from typing import Any, Callable, Dict, Generic, Tuple, TypeVar
+
+
+T = TypeVar('T')
+
+
+class Registration(Generic[T]):
+    def __init__(self, cls: Callable[..., T], *args: Any, **kwargs: Any) -> None:
+        self._cls = cls
+        self._args = args
+        self._kwargs = kwargs
+
+    @property
+    def cls(self) -> Callable[..., T]:
+        return self._cls
+
+    @property
+    def args(self) -> Tuple[Any, ...]:
+        return self._args
+
+    @property
+    def kwargs(self) -> Dict[str, Any]:
+        return self._kwargs
+
+    def instantiate(self, **kwargs: Any) -> T:
+        return self.cls(*self.args, **{**self.kwargs, **kwargs})
+
+
+def _unresolved(*args: Any, **kwargs: Any) -> Any:
+    raise RuntimeError('lazy registration has not been resolved')
+
+
+class LazyRegistration(Registration[T]):
+    def __init__(self, registrations: Dict[str, Registration[T]], name: str, module: str, attribute: str,
+                 *arg_attributes: str) -> None:
+        """Placeholder for a component whose module has not been imported yet.
+
+        When accessing the registered class, the module is imported and the placeholder is replaced by the actual
+        registration.
+
+        Args:
+            registrations (Dict[str, Registration[T]]): Registrations this placeholder is part of
+            name (str): Name of the component
+            module (str): Absolute name of the module providing the component
+            attribute (str): Name of the component class within the module
+            *arg_attributes (str): Names of module attributes passed as leading arguments to the component class
+        """
+        super(LazyRegistration, self).__init__(_unresolved)
+        self._registrations = registrations
+        self._name = name
+        self._module = module
+        self._attribute = attribute
+        self._arg_attributes = arg_attributes
+        self._resolved = False
+
+    @property
+    def module(self) -> str:
+        return self._module
+
+    def resolve(self) -> Registration[T]:
+        if not self._resolved:
+            module = importlib.import_module(self._module)
+            try:
+                self._cls = getattr(module, self._attribute)
+                self._args = tuple(getattr(module, arg_attribute) for arg_attribute in self._arg_attributes)
+            except AttributeError as e:
+                raise ImportError('module %s does not provide %s: %s' % (self._module, self._name, str(e)))
+            self._resolved = True
+        registration: Registration[T] = Registration(self._cls, *self._args)
+        if self._registrations.get(self._name) is self:
+            self._registrations[self._name] = registration
+        return registration
+
+    @property
+    def cls(self) -> Callable[..., T]:
+        return self.resolve().cls
+
+    @property
+    def args(self) -> Tuple[Any, ...]:
+        return self.resolve().args
+
+
+def register_lazy(registrations: Dict[str, Registration[T]], name: str, module: str, attribute: str,
+                  *arg_attributes: str) -> None:
+    """Register a component by the module providing it, unless the component is registered already.
+
+    See `LazyRegistration` for the arguments.
+    """
+    if name not in registrations:
+        registrations[name] = LazyRegistration(registrations, name, module, attribute, *arg_attributes)
+
+
+def lazy_attributes(package: str, attributes: Dict[str, str]) -> Callable[[str], Any]:
+    """Create a module level `__getattr__` function (PEP 562), importing attributes from their modules on first access.
+
+    Args:
+        package (str): Name of the package the function is created for
+        attributes (Dict[str, str]): Modules (relative to the package) by attribute name
+
+    Returns:
+        Callable[[str], Any]: `__getattr__` function for the package
+    """
+    def __getattr__(name: str) -> Any:
+        module = attributes.get(name)
+        if module is None:
+            raise AttributeError('module %r has no attribute %r' % (package, name))
+        value = getattr(importlib.import_module(module, package), name)
+        setattr(sys.modules[package], name, value)  # subsequent accesses do not call __getattr__ anymore
+        return value
+
+    return __getattr__
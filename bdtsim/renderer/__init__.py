@@ -15,18 +15,46 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from .game_tree import GameTreeRenderer
-from .graphviz_dot import GraphvizDotRenderer
-from .payoff_matrix import PayoffMatrix
-from .renderer import Renderer
+from typing import Dict, Tuple, TYPE_CHECKING
+
+from bdtsim.registry import lazy_attributes
 from .renderer_manager import RendererManager
-from .result_collector import ResultCollector
 
+if TYPE_CHECKING:
+    from .game_tree import GameTreeRenderer
+    from .graphviz_dot import GraphvizDotRenderer
+    from .html_explorer import HtmlTreeRenderer
+    from .leaf_export import LeafExportRenderer
+    from .payoff_matrix import PayoffMatrix, PayoffMatrixRenderer
+    from .renderer import Renderer
+    from .result_collector import ResultCollector
+
+# built-in renderers (module relative to this package and class), imported when used
+RENDERERS: Dict[str, Tuple[str, ...]] = {
+    'game-tree': ('.game_tree', 'GameTreeRenderer'),
+    'dot': ('.graphviz_dot', 'GraphvizDotRenderer'),
+    'html': ('.html_explorer', 'HtmlTreeRenderer'),
+    'leaf-export': ('.leaf_export', 'LeafExportRenderer'),
+    'payoff-matrix': ('.payoff_matrix', 'PayoffMatrixRenderer')
+}
+
+for renderer_name, (renderer_module, *renderer_attributes) in RENDERERS.items():
+    RendererManager.register_lazy(renderer_name, __name__ + renderer_module, *renderer_attributes)
+
+__getattr__ = lazy_attributes(__name__, {
+    'PayoffMatrix': '.payoff_matrix',
+    'Renderer': '.renderer',
+    'ResultCollector': '.result_collector',
+    **{attributes[0]: module for module, *attributes in RENDERERS.values()}
+})
 
 __all__ = [
     'GameTreeRenderer',
     'GraphvizDotRenderer',
+    'HtmlTreeRenderer',
+    'LeafExportRenderer',
     'PayoffMatrix',
+    'PayoffMatrixRenderer',
     'Renderer',
     'RendererManager',
     'ResultCollector'
@@ -0,0 +1,80 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import BinaryIO, Iterator, List, Optional
+
+from graphviz import Digraph  # type: ignore
+
+
+class DotStream(object):
+    def __init__(self, graph: Digraph, fp: BinaryIO) -> None:
+        """Replacement for the statement list (`body`) of a graphviz graph, writing statements to a stream immediately.
+
+        Statements are formatted by graphviz as usual, so the written dot source is identical to `graph.source` (plus
+        trailing newline), but no statement is kept in memory. Graph, node and edge attributes of the graph need to be
+        set before the first statement is added, `close` needs to be called after the last one.
+
+        Args:
+            graph (Digraph): Graph whose statements are to be written
+            fp (BinaryIO): Output stream
+        """
+        self._graph = graph
+        self._fp = fp
+        self._tail: Optional[str] = None
+        self._closed = False
+
+    def _start(self) -> None:
+        if self._tail is not None:
+            return
+        # header and attribute statements, as generated by graphviz for an empty graph
+        body = self._graph.body
+        self._graph.body = []
+        try:
+            lines: List[str] = list(iter(self._graph))
+        finally:
+            self._graph.body = body
+        for line in lines[:-1]:
+            self._write(line)
+        self._tail = lines[-1]
+
+    def _write(self, line: str) -> None:
+        self._fp.write(line.encode('utf-8') + b'\n')
+
+    def append(self, line: str) -> None:
+        if self._closed:
+            raise ValueError('dot stream is closed')
+        self._start()
+        self._write(line)
+
+    def extend(self, lines: Iterator[str]) -> None:
+        for line in lines:
+            self.append(line)
+
+    def __iter__(self) -> Iterator[str]:
+        # statements written already are not available anymore
+        return iter(())
+
+    def __len__(self) -> int:
+        return 0
+
+    def close(self) -> None:
+        """Write the closing brace of the graph."""
+        if self._closed:
+            return
+        self._start()
+        self._write(self._tail or '}')
+        self._closed = True
@@ -15,41 +15,100 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Any, Callable, Optional
+import hashlib
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
 
 from graphviz import Digraph  # type: ignore
 
+from bdtsim.account import Account
 from bdtsim.protocol_path import Decision, Choice
 from bdtsim.simulation_result import SimulationResult, ResultNode
+from bdtsim.util.types import to_bool
+from .dot_stream import DotStream
 from .graphviz_mixin import GraphvizMixin
 from .renderer import Renderer, ValueType
-from .renderer_manager import RendererManager
+
+
+SUMMARY_ATTRIBUTES = (
+    ('TX Fees', 'tx_fees', ValueType.GAS),
+    ('TX Count', 'tx_count', ValueType.PLAIN),
+    ('Funds Diff', 'funds_diff', ValueType.WEI),
+    ('Bal. Diff', 'balance_diff', ValueType.WEI),
+    ('Item Share', 'item_share', ValueType.PLAIN)
+)
 
 
 class GameTreeRenderer(Renderer, GraphvizMixin):
     def __init__(self, output_format: Optional[str] = None, graphviz_renderer: Optional[str] = None,
-                 graphviz_formatter: Optional[str] = None, *args: Any, **kwargs: Any) -> None:
+                 graphviz_formatter: Optional[str] = None, max_depth: Optional[int] = None,
+                 collapse_subtrees: bool = False, merge_leaves: bool = False, *args: Any, **kwargs: Any) -> None:
+        """Create a game tree of a simulation result using graphviz dot.
+
+        Args:
+            output_format (Optional[str]): The graphviz output format, `None` for the dot source
+            graphviz_renderer (Optional[str]): The graphviz renderer used for rendering
+            graphviz_formatter (Optional[str]): The graphviz formatter used for rendering
+            max_depth (Optional[int]): Number of choice levels to be shown, deeper subtrees are summarized by a single
+                node with value intervals
+            collapse_subtrees (bool): Show structurally equivalent subtrees (same choices, outcomes and final node
+                values) only once
+            merge_leaves (bool): Merge final nodes with identical values and honesty below the same choice node
+            *args (Any): Collector for unrecognized positional arguments
+            **kwargs (Any): Collector for unrecognized keyword arguments
+        """
         Renderer.__init__(self, *args, **kwargs)
         self._output_format = output_format
         self._graphviz_renderer = graphviz_renderer
         self._graphviz_formatter = graphviz_formatter
+        self._max_depth = int(max_depth) if max_depth is not None else None
+        self._collapse_subtrees = to_bool(collapse_subtrees)
+        self._merge_leaves = to_bool(merge_leaves)
 
-    def render(self, simulation_result: SimulationResult) -> bytes:
-        gt = SimulationGameTree(
+    def create_graph(self, simulation_result: SimulationResult, output: Optional[BinaryIO] = None) -> Digraph:
+        return SimulationGameTree(
             simulation_result=simulation_result,
-            autoscale_func=self.autoscale
+            autoscale_func=self.autoscale,
+            output=output,
+            max_depth=self._max_depth,
+            collapse_subtrees=self._collapse_subtrees,
+            merge_leaves=self._merge_leaves
         )
+
+    def render(self, simulation_result: SimulationResult) -> bytes:
         return self.render_graph(
-            graph=gt,
+            graph=self.create_graph(simulation_result),
             output_format=self._output_format,
             graphviz_renderer=self._graphviz_renderer,
             graphviz_formatter=self._graphviz_formatter
         )
 
+    def render_to(self, simulation_result: SimulationResult, fp: BinaryIO) -> None:
+        if self._output_format is not None:
+            fp.write(self.render(simulation_result))
+            return
+        self.create_graph(simulation_result, output=fp)
+
+
+# honesty of seller and buyer on the path to a node
+Honesty = Tuple[bool, bool]
+
 
 class SimulationGameTree(Digraph):  # type: ignore
     def __init__(self, simulation_result: SimulationResult,
-                 autoscale_func: Optional[Callable[[Any, ValueType], Any]] = None) -> None:
+                 autoscale_func: Optional[Callable[[Any, ValueType], Any]] = None,
+                 output: Optional[BinaryIO] = None, max_depth: Optional[int] = None,
+                 collapse_subtrees: bool = False, merge_leaves: bool = False) -> None:
+        """Game tree of a simulation result as graphviz graph.
+
+        Args:
+            simulation_result (SimulationResult): Simulation result
+            autoscale_func (Optional[Callable[[Any, ValueType], Any]]): Function for scaling values
+            output (Optional[BinaryIO]): If set, the dot source is written to this stream while walking the result tree,
+                instead of being kept in memory
+            max_depth (Optional[int]): Number of choice levels to be shown, see `GameTreeRenderer`
+            collapse_subtrees (bool): Show structurally equivalent subtrees only once, see `GameTreeRenderer`
+            merge_leaves (bool): Merge identical sibling final nodes, see `GameTreeRenderer`
+        """
         super(SimulationGameTree, self).__init__(
             name='gametree',
             graph_attr={
@@ -65,15 +124,29 @@ class SimulationGameTree(Digraph):  # type: ignore
 
         self._simulation_result = simulation_result
         self._autoscale_func = autoscale_func
+        self._max_depth = max_depth
+        self._collapse_subtrees = collapse_subtrees
+        self._merge_leaves = merge_leaves
+        self._subjects: Tuple[Account, Account] = (simulation_result.seller, simulation_result.buyer)
+
+        # node labels and subtree signatures, by node identity and honesty on the path to the node
+        self._labels: Dict[Tuple[int, Honesty], str] = {}
+        self._signatures: Dict[Tuple[int, Honesty], str] = {}
+        # IDs of rendered nodes by subtree signature, for collapsing equivalent subtrees
+        self._rendered_subtrees: Dict[str, str] = {}
 
         self._generated_node_count = 0
         self._generated_subgraph_count = 0
+        if output is not None:
+            self.body = DotStream(self, output)
         self.attr(_attributes={
             'rankdir': 'LR',
             'splines': 'true'
         })
 
         self._render_simulation_result()
+        if isinstance(self.body, DotStream):
+            self.body.close()
 
     def _autoscale(self, value: Any, value_type: ValueType) -> Any:
         if self._autoscale_func is None:
@@ -82,22 +155,71 @@ class SimulationGameTree(Digraph):  # type: ignore
             return self._autoscale_func(value, value_type)
 
     def _render_simulation_result(self) -> None:
-        self._process_node(self._simulation_result.execution_result_root)
+        self._process_node(self._simulation_result.execution_result_root, (True, True), 0)
+
+    def _child_honesty(self, honesty: Honesty, decision: Decision) -> Honesty:
+        if decision.is_honest():
+            return honesty
+        return (honesty[0] and decision.choice.subject != self._subjects[0],
+                honesty[1] and decision.choice.subject != self._subjects[1])
+
+    def _is_summarized(self, node: ResultNode, depth: int) -> bool:
+        return self._max_depth is not None and depth >= self._max_depth and len(node.children) > 0
 
-    def _process_node(self, node: ResultNode) -> str:
-        if len(node.children):
+    def _process_node(self, node: ResultNode, honesty: Honesty, depth: int) -> str:
+        if self._collapse_subtrees:
+            signature = self._get_signature(node, honesty, depth)
+            node_id = self._rendered_subtrees.get(signature)
+            if node_id is not None:
+                return node_id
+
+        if self._is_summarized(node, depth):
+            node_id = self._create_summary_node(node, honesty)
+        elif len(node.children):
             # choice node
             choice = list(node.children.keys())[0].choice
             node_id = self._create_choice_node(choice)
 
+            merged_leaves: Dict[str, str] = {}
             for child_decision, child_node in node.children.items():
-                child_nid = self._process_node(child_node)
+                child_honesty = self._child_honesty(honesty, child_decision)
+                if self._merge_leaves and len(child_node.children) == 0:
+                    label = self._get_final_node_label(child_node, child_honesty)
+                    child_nid = merged_leaves.get(label)
+                    if child_nid is None:
+                        child_nid = self._process_node(child_node, child_honesty, depth + 1)
+                        merged_leaves[label] = child_nid
+                else:
+                    child_nid = self._process_node(child_node, child_honesty, depth + 1)
                 self._create_decision_edge(node_id, child_nid, child_decision)
         else:
-            node_id = self._create_final_node(node)
+            node_id = self._create_final_node(node, honesty)
 
+        if self._collapse_subtrees:
+            self._rendered_subtrees[signature] = node_id
         return node_id
 
+    def _get_signature(self, node: ResultNode, honesty: Honesty, depth: int) -> str:
+        """Hash over the rendered content of a subtree (choices, outcomes and node labels)."""
+        key = (id(node), honesty)
+        signature = self._signatures.get(key)
+        if signature is not None:
+            return signature
+        if self._is_summarized(node, depth):
+            content = 'summary:%s' % self._get_summary_node_label(node, honesty)
+        elif len(node.children):
+            choice = list(node.children.keys())[0].choice
+            content = 'choice:%s:%s:%s' % (choice.subject.name, choice.description, ':'.join(
+                '%s/%s/%s' % (decision.outcome, decision.is_honest(),
+                              self._get_signature(child, self._child_honesty(honesty, decision), depth + 1))
+                for decision, child in node.children.items()
+            ))
+        else:
+            content = 'final:%s' % self._get_final_node_label(node, honesty)
+        signature = hashlib.sha1(content.encode('utf-8')).hexdigest()
+        self._signatures[key] = signature
+        return signature
+
     def _create_unique_node_id(self) -> str:
         self._generated_node_count += 1
         return 'node_%d' % self._generated_node_count
@@ -122,50 +244,109 @@ class SimulationGameTree(Digraph):  # type: ignore
         )
         return nid
 
-    def _create_final_node(self, node: ResultNode) -> str:
-        # prepare label
+    @staticmethod
+    def _honesty_indicator(honest: bool) -> str:
+        if honest:
+            return '<font color="blue">✓</font>'
+        else:
+            return '<font color="red">✗</font>'
+
+    def _format_interval(self, value_min: Any, value_max: Any, value_type: ValueType) -> str:
+        if value_min == value_max:
+            return str(self._autoscale(value_min, value_type))
+        return '[%s, %s]' % (
+            str(self._autoscale(value_min, value_type)),
+            str(self._autoscale(value_max, value_type))
+        )
+
+    def _get_final_node_label(self, node: ResultNode, honesty: Honesty) -> str:
+        key = (id(node), honesty)
+        label = self._labels.get(key)
+        if label is not None:
+            return label
+
         label_lines = []
-        for subject in (self._simulation_result.seller, self._simulation_result.buyer):
-            if node.account_completely_honest(subject):
-                honesty_indicator = '<font color="blue">✓</font>'
-            else:
-                honesty_indicator = '<font color="red">✗</font>'
-
-            label_lines.append('<b>%s %s</b>' % (honesty_indicator, subject.name))
-            aggregation_summary = node.aggregation_summary
+        aggregation_summary = node.aggregation_summary
+        for subject, subject_honest in zip(self._subjects, honesty):
+            label_lines.append('<b>%s %s</b>' % (self._honesty_indicator(subject_honest), subject.name))
             subject_summary = aggregation_summary.get(subject)
 
-            for summary_label, summary_attr, summary_type in (
-                ('TX Fees', 'tx_fees', ValueType.GAS),
-                ('TX Count', 'tx_count', ValueType.PLAIN),
-                ('Funds Diff', 'funds_diff', ValueType.WEI),
-                ('Bal. Diff', 'balance_diff', ValueType.WEI),
-                ('Item Share', 'item_share', ValueType.PLAIN)
-            ):
+            for summary_label, summary_attr, summary_type in SUMMARY_ATTRIBUTES:
                 if subject_summary is None:
                     label_lines.append('<i>%s</i>: 0' % summary_label)
                 else:
-                    value_min = getattr(subject_summary, summary_attr + '_min')
-                    value_max = getattr(subject_summary, summary_attr + '_max')
-                    if value_min == value_max:
-                        value_str = str(self._autoscale(value_min, summary_type))
-                    else:
-                        value_str = '[%s, %s]' % (
-                            str(self._autoscale(value_min, summary_type)),
-                            str(self._autoscale(value_max, summary_type))
-                        )
-
                     label_lines.append('<i>%s</i>: %s' % (
                         summary_label,
-                        value_str
+                        self._format_interval(getattr(subject_summary, summary_attr + '_min'),
+                                              getattr(subject_summary, summary_attr + '_max'), summary_type)
                     ))
 
-        # create dot node
+        label = '<%s>' % '<br/>'.join(label_lines)
+        self._labels[key] = label
+        return label
+
+    def _create_final_node(self, node: ResultNode, honesty: Honesty) -> str:
         nid = self._create_unique_node_id()
         self.node(
             name=nid,
             shape='note',
-            label='<%s>' % '<br/>'.join(label_lines)
+            label=self._get_final_node_label(node, honesty)
+        )
+        return nid
+
+    def _get_summary_node_label(self, node: ResultNode, honesty: Honesty) -> str:
+        key = (id(node), honesty)
+        label = self._labels.get(key)
+        if label is not None:
+            return label
+
+        # collect honesty and value intervals over all final nodes of the subtree
+        final_node_count = 0
+        honest_counts = [0, 0]
+        intervals: List[Dict[str, List[Any]]] = [{}, {}]
+        stack: List[Tuple[ResultNode, Honesty]] = [(node, honesty)]
+        while len(stack):
+            current_node, current_honesty = stack.pop()
+            if len(current_node.children):
+                stack.extend((child, self._child_honesty(current_honesty, decision))
+                             for decision, child in current_node.children.items())
+                continue
+            final_node_count += 1
+            aggregation_summary = current_node.aggregation_summary
+            for index, subject in enumerate(self._subjects):
+                honest_counts[index] += int(current_honesty[index])
+                subject_summary = aggregation_summary.get(subject)
+                for _, summary_attr, _ in SUMMARY_ATTRIBUTES:
+                    value_min = 0 if subject_summary is None else getattr(subject_summary, summary_attr + '_min')
+                    value_max = 0 if subject_summary is None else getattr(subject_summary, summary_attr + '_max')
+                    interval = intervals[index].get(summary_attr)
+                    if interval is None:
+                        intervals[index][summary_attr] = [value_min, value_max]
+                    else:
+                        interval[0] = min(interval[0], value_min)
+                        interval[1] = max(interval[1], value_max)
+
+        label_lines = ['<b>%d final nodes</b>' % final_node_count]
+        for index, subject in enumerate(self._subjects):
+            label_lines.append('<b>%s %s</b> (%d/%d honest)' % (
+                self._honesty_indicator(honest_counts[index] == final_node_count), subject.name, honest_counts[index],
+                final_node_count
+            ))
+            for summary_label, summary_attr, summary_type in SUMMARY_ATTRIBUTES:
+                value_min, value_max = intervals[index][summary_attr]
+                label_lines.append('<i>%s</i>: %s' % (summary_label,
+                                                      self._format_interval(value_min, value_max, summary_type)))
+
+        label = '<%s>' % '<br/>'.join(label_lines)
+        self._labels[key] = label
+        return label
+
+    def _create_summary_node(self, node: ResultNode, honesty: Honesty) -> str:
+        nid = self._create_unique_node_id()
+        self.node(
+            name=nid,
+            shape='box3d',
+            label=self._get_summary_node_label(node, honesty)
         )
         return nid
 
@@ -177,6 +358,3 @@ class SimulationGameTree(Digraph):  # type: ignore
             label=decision.outcome,
             color=color
         )
-
-
-RendererManager.register('game-tree', GameTreeRenderer)
@@ -15,7 +15,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Any, Callable, List, NamedTuple, Optional
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Sequence, Tuple
 from uuid import uuid4
 
 from graphviz import Digraph  # type: ignore
@@ -24,9 +24,9 @@ from bdtsim.protocol_path import Decision
 from bdtsim.simulation_result import SimulationResult, ResultNode, TransactionLogList, TransactionLogCollection, \
     TransactionLogEntry
 from bdtsim.util.types import to_bool
+from .dot_stream import DotStream
 from .graphviz_mixin import GraphvizMixin
 from .renderer import Renderer, ValueType
-from .renderer_manager import RendererManager
 
 
 class GraphvizDotRenderer(Renderer, GraphvizMixin):
@@ -56,21 +56,34 @@ class GraphvizDotRenderer(Renderer, GraphvizMixin):
         self._show_transactions = to_bool(show_transactions)
         self._show_transaction_duplicates = to_bool(show_transaction_duplicates)
 
-    def render(self, simulation_result: SimulationResult) -> bytes:
-        graph = ResultGraph(
+    def create_graph(self, simulation_result: SimulationResult) -> Digraph:
+        return ResultGraph(
             simulation_result=simulation_result,
             show_transactions=self._show_transactions,
             show_transaction_duplicates=self._show_transaction_duplicates,
             autoscale_func=self.autoscale
         )
 
+    def render(self, simulation_result: SimulationResult) -> bytes:
         return self.render_graph(
-            graph=graph,
+            graph=self.create_graph(simulation_result),
             output_format=self._output_format,
             graphviz_renderer=self._graphviz_renderer,
             graphviz_formatter=self._graphviz_formatter
         )
 
+    def render_to(self, simulation_result: SimulationResult, fp: BinaryIO) -> None:
+        if self._output_format is not None:
+            fp.write(self.render(simulation_result))
+            return
+        ResultGraph(
+            simulation_result=simulation_result,
+            show_transactions=self._show_transactions,
+            show_transaction_duplicates=self._show_transaction_duplicates,
+            autoscale_func=self.autoscale,
+            output=fp
+        )
+
 
 class NodeTemplate(object):
     def __init__(self, name: str, *args: Any, **kwargs: Any) -> None:
@@ -109,31 +122,21 @@ class EdgeTemplate(object):
         return not self.__eq__(other)
 
 
-class TransactionPathPartTuple(NamedTuple):
-    node_template: Optional[NodeTemplate]
-    edge_template: EdgeTemplate
-
-    def __eq__(self, other: Any) -> bool:
-        if isinstance(self, TransactionPathPartTuple):
-            if self.node_template is None and other.node_template is None:
-                return True
-            elif self.node_template is None:
-                return False
-            elif self.edge_template is None:
-                return False
-            return bool(self.node_template.args == other.node_template.args
-                        and self.node_template.kwargs == other.node_template.kwargs)
-        else:
-            return NotImplemented
-
-    def __ne__(self, other: Any) -> bool:
-        return not self.__eq__(other)
-
-
 class ResultGraph(Digraph):  # type: ignore
     def __init__(self, simulation_result: SimulationResult, show_transactions: bool = False,
                  show_transaction_duplicates: bool = False,
-                 autoscale_func: Optional[Callable[[Any, ValueType], Any]] = None) -> None:
+                 autoscale_func: Optional[Callable[[Any, ValueType], Any]] = None,
+                 output: Optional[BinaryIO] = None) -> None:
+        """Simulation result as graphviz graph.
+
+        Args:
+            simulation_result (SimulationResult): Simulation result
+            show_transactions (bool): Add transactions edges to graph
+            show_transaction_duplicates(bool): Add multiple edges for identical transaction
+            autoscale_func (Optional[Callable[[Any, ValueType], Any]]): Function for scaling values
+            output (Optional[BinaryIO]): If set, the dot source is written to this stream while walking the result tree,
+                instead of being kept in memory
+        """
         super(ResultGraph, self).__init__(
             graph_attr=[
                 ('rankdir', 'LR'),
@@ -150,11 +153,15 @@ class ResultGraph(Digraph):  # type: ignore
         self._show_transactions = show_transactions
         self._show_transaction_duplicates = show_transaction_duplicates
         self._autoscale_func = autoscale_func
+        if output is not None:
+            self.body = DotStream(self, output)
 
         start_node_uuid = self._add_start_node()
         self._walk_result_nodes(start_node_uuid, simulation_result.execution_result_root)
         self._walk_preparation_nodes(simulation_result.preparation_transactions)
         self._walk_cleanup_nodes(simulation_result.cleanup_transactions)
+        if isinstance(self.body, DotStream):
+            self.body.close()
 
     def _autoscale(self, value: Any, value_type: ValueType) -> Any:
         if self._autoscale_func is None:
@@ -199,39 +206,38 @@ class ResultGraph(Digraph):  # type: ignore
         # create start node
         transaction_start_uuid = self._add_transaction_node()
 
-        # collect possible paths
-        node_template: Optional[NodeTemplate]
-        edge_template: EdgeTemplate
-        transaction_graph_paths = []
+        # identical transaction paths (same transaction labels) are rendered once, with their multiplicity
+        path_counts: Dict[Tuple[str, ...], int] = {}
         for tx_log_list in tx_collection:
-            candidate_path = []
-            prev_transaction_uuid = transaction_start_uuid
-            for tx_log_entry in tx_log_list[:-1]:
-                node_template = self._generate_transaction_node()
-                edge_template = self._generate_transaction_edge(prev_transaction_uuid, node_template.name, tx_log_entry)
-                candidate_path.append(TransactionPathPartTuple(node_template, edge_template))
-                prev_transaction_uuid = node_template.name
-            candidate_path.append(TransactionPathPartTuple(
-                None,
-                self._generate_transaction_edge(prev_transaction_uuid, target_node_uuid, tx_log_list[-1]))
-            )
+            path_signature = tuple(self._get_transaction_edge_label(tx_log_entry) for tx_log_entry in tx_log_list)
             if self._show_transaction_duplicates:
-                transaction_graph_paths.append(candidate_path)
+                self._add_transaction_path(transaction_start_uuid, target_node_uuid, path_signature)
             else:
-                if candidate_path not in transaction_graph_paths:
-                    transaction_graph_paths.append(candidate_path)
-
-        # generate actual nodes/edges
-        for path in transaction_graph_paths:
-            for node_template, edge_template in path[:-1]:
-                if node_template is None:
-                    raise RuntimeError('node_template should only be None in last element of path list')
-                node_template.generate(self)
-                edge_template.generate(self)
-            path[-1][1].generate(self)
+                path_counts[path_signature] = path_counts.get(path_signature, 0) + 1
+
+        for path_signature, multiplicity in path_counts.items():
+            self._add_transaction_path(transaction_start_uuid, target_node_uuid, path_signature, multiplicity)
 
         return transaction_start_uuid
 
+    def _add_transaction_path(self, start_uuid: str, target_uuid: str, labels: Sequence[str],
+                              multiplicity: int = 1) -> None:
+        if len(labels) == 0:
+            self.edge(start_uuid, target_uuid)
+            return
+        prev_transaction_uuid = start_uuid
+        for index, label in enumerate(labels):
+            if index == 0 and multiplicity > 1:
+                label += '<br/><i>%d×</i>' % multiplicity
+            if index < len(labels) - 1:
+                node_template = self._generate_transaction_node()
+                node_template.generate(self)
+                transaction_uuid = node_template.name
+            else:
+                transaction_uuid = target_uuid
+            EdgeTemplate(prev_transaction_uuid, transaction_uuid, label='<%s>' % label).generate(self)
+            prev_transaction_uuid = transaction_uuid
+
     def _walk_cleanup_nodes(self, transactions: TransactionLogList) -> None:
         self._walk_operator_nodes('Cleanup', transactions)
 
@@ -325,6 +331,13 @@ class ResultGraph(Digraph):  # type: ignore
         edge_template.generate(self)
 
     def _generate_transaction_edge(self, src: str, dest: str, tx_log: TransactionLogEntry) -> EdgeTemplate:
+        return EdgeTemplate(
+            src,
+            dest,
+            label='<%s>' % self._get_transaction_edge_label(tx_log)
+        )
+
+    def _get_transaction_edge_label(self, tx_log: TransactionLogEntry) -> str:
         label = '<b>%s: %s</b> (%s Gas, Bal. %s)' % (
             tx_log.account.name,
             tx_log.description or 'n.a.',
@@ -335,12 +348,7 @@ class ResultGraph(Digraph):  # type: ignore
             label += '<br/><b>Funds Diffs:</b>'
             for account, value in tx_log.funds_diff_collection.items():
                 label += '<br />%s: %i' % (account.name, self._autoscale(value, ValueType.WEI))
-
-        return EdgeTemplate(
-            src,
-            dest,
-            label='<%s>' % label
-        )
+        return label
 
     @staticmethod
     def _uuid() -> str:
@@ -353,6 +361,3 @@ class ResultGraph(Digraph):  # type: ignore
     @staticmethod
     def _get_label_lines_for_tx_collection(tx_collection: TransactionLogCollection) -> List[str]:
         return [str(entry) for entry in tx_collection.aggregation.values()]
-
-
-RendererManager.register('dot', GraphvizDotRenderer)
@@ -14,29 +14,73 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import concurrent.futures
+from typing import Dict, List, Optional, Sequence, cast
 
-import os
-import tempfile
-from typing import Optional, cast
+import graphviz  # type: ignore
+from graphviz import Digraph
 
-from graphviz import Digraph  # type: ignore
+from bdtsim.simulation_result import SimulationResult
 
 
 class GraphvizMixin(object):
+    # set by renderers using the mixin
+    _graphviz_renderer: Optional[str] = None
+    _graphviz_formatter: Optional[str] = None
+
     @staticmethod
     def render_graph(graph: Digraph, output_format: Optional[str] = None, graphviz_renderer: Optional[str] = None,
                      graphviz_formatter: Optional[str] = None) -> bytes:
         if output_format is None:
             return cast(bytes, graph.source.encode('utf-8')) + b'\n'
         else:
-            tmp_dot_output_fp, tmp_dot_output_filename = tempfile.mkstemp()
-            graph.render(
-                filename=tmp_dot_output_filename,
-                format=output_format,
-                renderer=graphviz_renderer,
-                formatter=graphviz_formatter
-            )
-            with open(tmp_dot_output_filename + '.' + output_format, 'rb') as fp:
-                dot_output = fp.read()
-            os.remove(tmp_dot_output_filename)
-            return dot_output
+            # dot source and rendered output are passed via stdin/stdout of the dot process
+            return GraphvizMixin.pipe_source(cast(bytes, graph.source.encode('utf-8')) + b'\n', output_format,
+                                             graphviz_renderer, graphviz_formatter)
+
+    @staticmethod
+    def pipe_source(source: bytes, output_format: str, graphviz_renderer: Optional[str] = None,
+                    graphviz_formatter: Optional[str] = None) -> bytes:
+        return cast(bytes, graphviz.pipe('dot', output_format, source, renderer=graphviz_renderer,
+                                         formatter=graphviz_formatter))
+
+    @staticmethod
+    def pipe_formats(source: bytes, output_formats: Sequence[str], graphviz_renderer: Optional[str] = None,
+                     graphviz_formatter: Optional[str] = None) -> Dict[str, bytes]:
+        """Convert a dot source into multiple output formats, running one dot process per format concurrently.
+
+        Args:
+            source (bytes): Dot source
+            output_formats (Sequence[str]): Output formats supported by graphviz
+            graphviz_renderer (Optional[str]): The graphviz renderer used for rendering
+            graphviz_formatter (Optional[str]): The graphviz formatter used for rendering
+
+        Returns:
+            Dict[str, bytes]: rendered output per output format
+        """
+        formats: List[str] = list(dict.fromkeys(output_formats))
+        if len(formats) == 0:
+            return {}
+        # the threads only wait for the dot processes, so the GIL is not an issue here
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(formats)) as executor:
+            futures = {output_format: executor.submit(GraphvizMixin.pipe_source, source, output_format,
+                                                      graphviz_renderer, graphviz_formatter)
+                       for output_format in formats}
+            return {output_format: future.result() for output_format, future in futures.items()}
+
+    def create_graph(self, simulation_result: SimulationResult) -> Digraph:
+        """Create the graph of a simulation result. Needs to be overwritten by renderers using the mixin."""
+        raise NotImplementedError()
+
+    def render_formats(self, simulation_result: SimulationResult, output_formats: Sequence[str]) -> Dict[str, bytes]:
+        """Render a simulation result into multiple output formats, creating the dot source only once.
+
+        Args:
+            simulation_result (SimulationResult): Simulation result to be rendered
+            output_formats (Sequence[str]): Output formats supported by graphviz
+
+        Returns:
+            Dict[str, bytes]: rendered output per output format
+        """
+        source = cast(bytes, self.create_graph(simulation_result).source.encode('utf-8')) + b'\n'
+        return self.pipe_formats(source, output_formats, self._graphviz_renderer, self._graphviz_formatter)
@@ -0,0 +1,342 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import html
+import io
+import json
+from collections import deque
+from typing import Any, BinaryIO, Deque, Dict, List, Optional, Tuple
+
+from bdtsim.account import Account
+from bdtsim.simulation_result import ResultNode, SimulationResult, TransactionLogCollection, TransactionLogList
+from .renderer import Renderer, ValueType
+
+
+DEFAULT_CHUNK_SIZE = 1000
+
+VALUE_ATTRIBUTES = (
+    ('TX Fees', 'tx_fees', ValueType.GAS),
+    ('TX Count', 'tx_count', ValueType.PLAIN),
+    ('Funds Diff', 'funds_diff', ValueType.WEI),
+    ('Bal. Diff', 'balance_diff', ValueType.WEI),
+    ('Item Share', 'item_share', ValueType.PLAIN)
+)
+
+# integers beyond this limit can not be represented exactly by JavaScript numbers and are written as strings
+MAX_SAFE_INTEGER = 2 ** 53 - 1
+
+PAGE_HEAD = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>%(title)s</title>
+<style>
+body { font-family: Arial, sans-serif; font-size: 14px; margin: 0; display: flex; height: 100vh; }
+#tree { flex: 1; overflow: auto; padding: 1em; }
+#details { width: 40%%; overflow: auto; padding: 1em; border-left: 1px solid #ccc; }
+ul { list-style: none; padding-left: 1.5em; margin: 0; }
+.toggle { display: inline-block; width: 1em; cursor: pointer; }
+.label { cursor: pointer; }
+.label.selected { background: #ddd; }
+.honest { color: blue; }
+.dishonest { color: red; }
+.more { cursor: pointer; color: #666; font-style: italic; }
+table { border-collapse: collapse; }
+td, th { border: 1px solid #ccc; padding: 2px 6px; text-align: right; }
+</style>
+</head>
+<body>
+<div id="tree"></div>
+<div id="details"><i>Select a node for details.</i></div>
+<script type="application/json" id="meta">%(meta)s</script>
+'''
+
+PAGE_TAIL = '''<script>
+(function () {
+  'use strict';
+  var meta = JSON.parse(document.getElementById('meta').textContent);
+  var chunks = {};
+  var selected = null;
+
+  function chunk(prefix, id) {
+    // chunks are parsed on first access only
+    var key = prefix + '-' + Math.floor(id / meta.chunk_size);
+    if (!(key in chunks)) {
+      chunks[key] = JSON.parse(document.getElementById(key).textContent);
+    }
+    return chunks[key][id % meta.chunk_size];
+  }
+
+  function element(tag, className, text) {
+    var e = document.createElement(tag);
+    if (className) { e.className = className; }
+    if (text !== undefined) { e.textContent = text; }
+    return e;
+  }
+
+  function honesty(flags) {
+    var fragment = document.createDocumentFragment();
+    meta.subjects.forEach(function (subject, index) {
+      var honest = (flags >> index) & 1;
+      var text = (honest ? ' \\u2713 ' : ' \\u2717 ') + subject;
+      fragment.appendChild(element('span', honest ? 'honest' : 'dishonest', text));
+    });
+    return fragment;
+  }
+
+  function showDetails(id) {
+    var node = chunk('n', id), detail = chunk('d', id);
+    var container = document.getElementById('details');
+    container.textContent = '';
+    container.appendChild(element('h3', null, node[0] === null ? 'Start' : 'Path: ' + path(id).join(', ')));
+    container.appendChild(honesty(node[5]));
+    var table = element('table'), header = element('tr');
+    header.appendChild(element('th', null, ''));
+    meta.values.forEach(function (label) { header.appendChild(element('th', null, label)); });
+    table.appendChild(header);
+    Object.keys(detail[0]).forEach(function (account) {
+      var row = element('tr');
+      row.appendChild(element('th', null, account));
+      detail[0][account].forEach(function (interval) {
+        var text = interval[0] == interval[1] ? interval[0] : '[' + interval[0] + ', ' + interval[1] + ']';
+        row.appendChild(element('td', null, text));
+      });
+      table.appendChild(row);
+    });
+    container.appendChild(element('h4', null, 'Aggregation (path from start)'));
+    container.appendChild(table);
+    container.appendChild(element('h4', null, 'Transactions of this node'));
+    if (detail[1].length === 0) { container.appendChild(element('i', null, 'none')); }
+    detail[1].forEach(function (tx_list) {
+      container.appendChild(element('b', null, tx_list[0] + '\\u00d7'));
+      var list = element('ol');
+      tx_list[1].forEach(function (tx) {
+        var text = tx[0] + ': ' + (tx[1] || 'n.a.') + ' (' + tx[2] + ' Gas, Bal. ' + tx[3] + ')';
+        Object.keys(tx[4]).forEach(function (account) { text += ', ' + account + ' funds ' + tx[4][account]; });
+        list.appendChild(element('li', null, text));
+      });
+      container.appendChild(list);
+    });
+  }
+
+  function path(id) {
+    var outcomes = [];
+    for (var node = chunk('n', id); node[6] !== null; node = chunk('n', node[6])) { outcomes.unshift(node[0]); }
+    return outcomes;
+  }
+
+  function createItem(id) {
+    var node = chunk('n', id);
+    var item = element('li');
+    var toggle = element('span', 'toggle', node[4].length ? '\\u25b8' : '');
+    var label = element('span', 'label');
+    if (node[0] !== null) {
+      label.appendChild(element('span', node[1] ? 'honest' : 'dishonest', node[0]));
+      label.appendChild(document.createTextNode(' \\u2192 '));
+    }
+    if (node[4].length) {
+      label.appendChild(element('b', null, node[2]));
+      label.appendChild(document.createTextNode(': ' + (node[3] || '')));
+    } else {
+      label.appendChild(honesty(node[5]));
+    }
+    label.onclick = function () {
+      if (selected) { selected.classList.remove('selected'); }
+      selected = label;
+      label.classList.add('selected');
+      showDetails(id);
+    };
+    item.appendChild(toggle);
+    item.appendChild(label);
+    var children = null;
+    toggle.onclick = function () {
+      if (!node[4].length) { return; }
+      if (children === null) {
+        children = element('ul');
+        appendChildren(children, node[4], 0);
+        item.appendChild(children);
+      } else {
+        children.style.display = children.style.display === 'none' ? '' : 'none';
+      }
+      toggle.textContent = children.style.display === 'none' ? '\\u25b8' : '\\u25be';
+    };
+    return item;
+  }
+
+  function appendChildren(list, ids, offset) {
+    // large numbers of siblings are added in batches
+    var end = Math.min(ids.length, offset + meta.batch_size);
+    for (var i = offset; i < end; i++) { list.appendChild(createItem(ids[i])); }
+    if (end < ids.length) {
+      var more = element('li', 'more', 'show more (' + (ids.length - end) + ' remaining)');
+      more.onclick = function () { list.removeChild(more); appendChildren(list, ids, end); };
+      list.appendChild(more);
+    }
+  }
+
+  var root = element('ul');
+  root.appendChild(createItem(0));
+  document.getElementById('tree').appendChild(root);
+  // expand and select the start node
+  root.firstChild.childNodes[0].onclick();
+  root.firstChild.childNodes[1].onclick();
+})();
+</script>
+</body>
+</html>
+'''
+
+
+class HtmlTreeRenderer(Renderer):
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE, batch_size: int = 100, title: Optional[str] = None,
+                 *args: Any, **kwargs: Any) -> None:
+        """Create a self-contained HTML page for exploring the result tree in the browser.
+
+        The tree is stored as compact JSON chunks within the page, which are parsed only when the according subtree is
+        expanded (node chunks) or a node is selected (detail chunks with aggregations and transactions). Nodes are
+        numbered in breadth-first order, so the chunks of the upper tree levels are sufficient for the initial view.
+
+        Args:
+            chunk_size (int): Number of nodes per JSON chunk
+            batch_size (int): Number of sibling nodes shown at once when expanding a node
+            title (Optional[str]): Page title
+            *args (Any): Collector for unrecognized positional arguments
+            **kwargs (Any): Collector for unrecognized keyword arguments
+        """
+        super(HtmlTreeRenderer, self).__init__(*args, **kwargs)
+        self._chunk_size = int(chunk_size)
+        self._batch_size = int(batch_size)
+        self._title = title
+        self._scaled_values: Dict[Tuple[Any, ValueType], Any] = {}
+        if self._chunk_size < 1 or self._batch_size < 1:
+            raise ValueError('chunk_size and batch_size need to be positive')
+
+    def render(self, simulation_result: SimulationResult) -> bytes:
+        output = io.BytesIO()
+        self.render_to(simulation_result, output)
+        return output.getvalue()
+
+    def render_to(self, simulation_result: SimulationResult, fp: BinaryIO) -> None:
+        subjects = (simulation_result.seller, simulation_result.buyer)
+        fp.write((PAGE_HEAD % {
+            'title': html.escape(self._title or 'Game Tree: %s vs. %s' % (subjects[0].name, subjects[1].name)),
+            'meta': self._dump({
+                'chunk_size': self._chunk_size,
+                'batch_size': self._batch_size,
+                'subjects': [subject.name for subject in subjects],
+                'values': [label for label, _, _ in VALUE_ATTRIBUTES]
+            })
+        }).encode('utf-8'))
+
+        node_chunk: List[Any] = []
+        detail_chunk: List[Any] = []
+        chunk_index = 0
+        next_id = 1
+        # breadth-first walk, children get their IDs when their parent is written
+        # node, node ID, parent ID, incoming decision outcome and honesty, honesty flags, parent aggregation
+        queue: Deque[Tuple[ResultNode, int, Optional[int], Optional[str], Optional[bool], int,
+                           Optional[TransactionLogCollection.Aggregation]]] = deque()
+        queue.append((simulation_result.execution_result_root, 0, None, None, None, 3, None))
+        while len(queue):
+            node, node_id, parent_id, outcome, decision_honest, honesty, parent_aggregation = queue.popleft()
+
+            aggregation = TransactionLogCollection.Aggregation(TransactionLogCollection())
+            if parent_aggregation is not None:
+                aggregation += parent_aggregation
+            aggregation += node.tx_collection.aggregation
+
+            subject_name: Optional[str] = None
+            description: Optional[str] = None
+            child_ids: List[int] = []
+            for decision, child in node.children.items():
+                subject_name = decision.choice.subject.name
+                description = decision.choice.description
+                child_honesty = honesty
+                if not decision.is_honest():
+                    for index, subject in enumerate(subjects):
+                        if decision.choice.subject == subject:
+                            child_honesty &= ~(1 << index)
+                queue.append((child, next_id, node_id, decision.outcome, decision.is_honest(), child_honesty,
+                              aggregation))
+                child_ids.append(next_id)
+                next_id += 1
+
+            node_chunk.append([outcome, decision_honest, subject_name, description, child_ids, honesty, parent_id])
+            detail_chunk.append([self._get_aggregation_data(aggregation), self._get_transaction_data(node)])
+            if len(node_chunk) == self._chunk_size:
+                self._write_chunk(fp, chunk_index, node_chunk, detail_chunk)
+                node_chunk, detail_chunk = [], []
+                chunk_index += 1
+        if len(node_chunk):
+            self._write_chunk(fp, chunk_index, node_chunk, detail_chunk)
+
+        fp.write(PAGE_TAIL.encode('utf-8'))
+
+    def _write_chunk(self, fp: BinaryIO, chunk_index: int, node_chunk: List[Any], detail_chunk: List[Any]) -> None:
+        for prefix, data in (('n', node_chunk), ('d', detail_chunk)):
+            fp.write(('<script type="application/json" id="%s-%d">%s</script>\n' % (
+                prefix, chunk_index, self._dump(data)
+            )).encode('utf-8'))
+
+    @staticmethod
+    def _dump(data: Any) -> str:
+        # "</" would terminate the script element
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False).replace('</', '<\\/')
+
+    def _scale(self, value: Any, value_type: ValueType) -> Any:
+        # the same values occur in many nodes, scale each of them only once
+        key = (value, value_type)
+        scaled_value = self._scaled_values.get(key)
+        if scaled_value is None:
+            scaled_value = self.autoscale(value, value_type)
+            if isinstance(scaled_value, int) and abs(scaled_value) > MAX_SAFE_INTEGER:
+                scaled_value = str(scaled_value)
+            self._scaled_values[key] = scaled_value
+        return scaled_value
+
+    def _get_aggregation_data(self, aggregation: TransactionLogCollection.Aggregation) -> Dict[str, List[List[Any]]]:
+        return {account.name: [
+            [self._scale(getattr(entry, attribute + '_min'), value_type),
+             self._scale(getattr(entry, attribute + '_max'), value_type)]
+            for _, attribute, value_type in VALUE_ATTRIBUTES
+        ] for account, entry in aggregation.items()}
+
+    def _get_transaction_data(self, node: ResultNode) -> List[List[Any]]:
+        # identical transaction lists (e.g. of repeated executions) are included once, with their multiplicity
+        tx_lists: Dict[str, List[Any]] = {}
+        for tx_log_list in node.tx_collection:
+            if len(tx_log_list) == 0:
+                continue
+            data = self._dump(self._get_transaction_list_data(tx_log_list))
+            if data in tx_lists:
+                tx_lists[data][0] += 1
+            else:
+                tx_lists[data] = [1, json.loads(data)]
+        return list(tx_lists.values())
+
+    def _get_transaction_list_data(self, tx_log_list: TransactionLogList) -> List[List[Any]]:
+        def funds_diffs(funds_diff_collection: Dict[Account, int]) -> Dict[str, Any]:
+            return {account.name: self._scale(value, ValueType.WEI)
+                    for account, value in funds_diff_collection.items() if value != 0}
+
+        return [[
+            tx_log.account.name,
+            tx_log.description,
+            self._scale(int(tx_log.tx_receipt['gasUsed']), ValueType.GAS),
+            self._scale(-int(tx_log.tx_receipt['gasUsed']) * int(tx_log.tx_dict['gasPrice']), ValueType.WEI),
+            funds_diffs(tx_log.funds_diff_collection)
+        ] for tx_log in tx_log_list]
@@ -0,0 +1,131 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import csv
+import io
+import json
+from typing import Any, BinaryIO, Dict, Generator, List, Optional, Tuple
+
+from bdtsim.simulation_result import ResultNode, SimulationResult, TransactionLogCollection
+from .renderer import Renderer, ValueType
+
+
+OUTPUT_FORMATS = ('csv', 'jsonl')
+
+VALUE_ATTRIBUTES = (
+    ('tx_fees', ValueType.GAS),
+    ('tx_count', ValueType.PLAIN),
+    ('funds_diff', ValueType.WEI),
+    ('balance_diff', ValueType.WEI),
+    ('item_share', ValueType.PLAIN)
+)
+
+ROLES = ('seller', 'buyer')
+
+COLUMNS = ['path', 'depth'] + ['%s_honest' % role for role in ROLES] + [
+    '%s_%s_%s' % (role, attribute, bound)
+    for role in ROLES for attribute, _ in VALUE_ATTRIBUTES for bound in ('min', 'max')
+]
+
+
+class LeafExportRenderer(Renderer):
+    def __init__(self, output_format: str = 'csv', *args: Any, **kwargs: Any) -> None:
+        """Export one row per final node of the result tree, for analysis with external tools (e.g. pandas).
+
+        Each row contains the protocol path leading to the final node (as comma separated outcomes, as accepted by
+        `--protocol-path`), the honesty of seller and buyer and the intervals of the aggregated values. Rows are
+        written while walking the result tree.
+
+        Args:
+            output_format (str): `csv` or `jsonl` (one JSON object per line)
+            *args (Any): Collector for unrecognized positional arguments
+            **kwargs (Any): Collector for unrecognized keyword arguments
+        """
+        super(LeafExportRenderer, self).__init__(*args, **kwargs)
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError('unsupported output format "%s", supported: %s' % (output_format,
+                                                                                ', '.join(OUTPUT_FORMATS)))
+        self._output_format = output_format
+
+    def render(self, simulation_result: SimulationResult) -> bytes:
+        output = io.BytesIO()
+        self.render_to(simulation_result, output)
+        return output.getvalue()
+
+    def render_to(self, simulation_result: SimulationResult, fp: BinaryIO) -> None:
+        if self._output_format == 'csv':
+            text_fp = io.TextIOWrapper(fp, encoding='utf-8', newline='')
+            writer = csv.DictWriter(text_fp, fieldnames=COLUMNS)
+            writer.writeheader()
+            for row in self.iter_rows(simulation_result):
+                writer.writerow(row)
+            text_fp.flush()
+            text_fp.detach()  # do not close the underlying stream
+        else:
+            for row in self.iter_rows(simulation_result):
+                fp.write(json.dumps(row).encode('utf-8') + b'\n')
+
+    def iter_rows(self, simulation_result: SimulationResult) -> Generator[Dict[str, Any], None, None]:
+        """Walk the result tree depth-first and yield a row for each final node.
+
+        Honesty and aggregated values are accumulated on the way down, so only the current path is kept in memory
+        (in addition to the result tree itself).
+
+        Args:
+            simulation_result (SimulationResult): Simulation result
+
+        Returns:
+            Generator[Dict[str, Any], None, None]: rows, with keys as in `COLUMNS`
+        """
+        subjects = (simulation_result.seller, simulation_result.buyer)
+        path: List[str] = []
+        # node, depth, incoming outcome, honesty of seller and buyer, aggregation of the parent node
+        stack: List[Tuple[ResultNode, int, Optional[str], Tuple[bool, bool],
+                          Optional[TransactionLogCollection.Aggregation]]] = [
+            (simulation_result.execution_result_root, 0, None, (True, True), None)
+        ]
+        while len(stack):
+            node, depth, outcome, honesty, parent_aggregation = stack.pop()
+            del path[max(depth - 1, 0):]
+            if outcome is not None:
+                path.append(outcome)
+
+            aggregation = TransactionLogCollection.Aggregation(TransactionLogCollection())
+            if parent_aggregation is not None:
+                aggregation += parent_aggregation
+            aggregation += node.tx_collection.aggregation
+
+            if len(node.children):
+                # reversed, to visit the children in their original order
+                for decision, child in reversed(list(node.children.items())):
+                    child_honesty = honesty
+                    if not decision.is_honest():
+                        child_honesty = (honesty[0] and decision.choice.subject != subjects[0],
+                                         honesty[1] and decision.choice.subject != subjects[1])
+                    stack.append((child, depth + 1, decision.outcome, child_honesty, aggregation))
+                continue
+
+            row: Dict[str, Any] = {'path': ','.join(path), 'depth': depth}
+            for role, subject_honest in zip(ROLES, honesty):
+                row['%s_honest' % role] = subject_honest
+            for role, subject in zip(ROLES, subjects):
+                entry = aggregation.get(subject)
+                for attribute, value_type in VALUE_ATTRIBUTES:
+                    for bound in ('min', 'max'):
+                        value = 0 if entry is None else getattr(entry, '%s_%s' % (attribute, bound))
+                        row['%s_%s_%s' % (role, attribute, bound)] = self.autoscale(value, value_type)
+            yield row
@@ -19,10 +19,9 @@ from math import ceil
 from typing import Any, Callable, Generator, List, Optional, Tuple
 
 from bdtsim.account import Account
-from bdtsim.simulation_result import SimulationResult, TransactionLogCollection
+from bdtsim.simulation_result import SimulationResult, SimulationResultSummary, TransactionLogCollection
 from bdtsim.util.strings import str_block_table
 from .renderer import Renderer, ValueType
-from .renderer_manager import RendererManager
 
 
 class PayoffMatrixAccountCell(object):
@@ -247,15 +246,21 @@ class PayoffMatrix(object):
     @staticmethod
     def from_simulation_result(simulation_result: SimulationResult,
                                autoscale_func: Optional[Callable[[Any, ValueType], Any]] = None) -> 'PayoffMatrix':
+        return PayoffMatrix.from_simulation_result_summary(simulation_result.summary, autoscale_func)
+
+    @staticmethod
+    def from_simulation_result_summary(simulation_result_summary: SimulationResultSummary,
+                                       autoscale_func: Optional[Callable[[Any, ValueType], Any]] = None
+                                       ) -> 'PayoffMatrix':
         # initialize aggregation summary lists
         asl_hh = []
         asl_hm = []
         asl_mh = []
         asl_mm = []
 
-        for final_node in simulation_result.execution_result_root.final_nodes:
-            seller_honest = final_node.account_completely_honest(simulation_result.seller)
-            buyer_honest = final_node.account_completely_honest(simulation_result.buyer)
+        for final_node in simulation_result_summary.final_nodes:
+            seller_honest = final_node.account_completely_honest(simulation_result_summary.seller)
+            buyer_honest = final_node.account_completely_honest(simulation_result_summary.buyer)
 
             if seller_honest and buyer_honest:
                 asl_hh.append(final_node.aggregation_summary)
@@ -269,45 +274,47 @@ class PayoffMatrix(object):
                 raise RuntimeError('Should be impossible to reach hear! Please contact developers.')
 
         return PayoffMatrix(
-            seller=simulation_result.seller,
-            buyer=simulation_result.buyer,
+            seller=simulation_result_summary.seller,
+            buyer=simulation_result_summary.buyer,
             cell_hh=PayoffMatrixCell.from_aggregation_summary_list(
                 aggregation_summary_list=asl_hh,
-                seller=simulation_result.seller,
-                buyer=simulation_result.buyer,
+                seller=simulation_result_summary.seller,
+                buyer=simulation_result_summary.buyer,
                 autoscale_func=autoscale_func
             ),
             cell_hm=PayoffMatrixCell.from_aggregation_summary_list(
                 aggregation_summary_list=asl_hm,
-                seller=simulation_result.seller,
-                buyer=simulation_result.buyer,
+                seller=simulation_result_summary.seller,
+                buyer=simulation_result_summary.buyer,
                 autoscale_func=autoscale_func
             ),
             cell_mh=PayoffMatrixCell.from_aggregation_summary_list(
                 aggregation_summary_list=asl_mh,
-                seller=simulation_result.seller,
-                buyer=simulation_result.buyer,
+                seller=simulation_result_summary.seller,
+                buyer=simulation_result_summary.buyer,
                 autoscale_func=autoscale_func
             ),
             cell_mm=PayoffMatrixCell.from_aggregation_summary_list(
                 aggregation_summary_list=asl_mm,
-                seller=simulation_result.seller,
-                buyer=simulation_result.buyer,
+                seller=simulation_result_summary.seller,
+                buyer=simulation_result_summary.buyer,
                 autoscale_func=autoscale_func
             )
         )
 
 
 class PayoffMatrixRenderer(Renderer):
+    summary_only = True
+
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super(PayoffMatrixRenderer, self).__init__(*args, **kwargs)
 
     def render(self, simulation_result: SimulationResult) -> bytes:
-        payoff_matrix = PayoffMatrix.from_simulation_result(
-            simulation_result=simulation_result,
+        return self.render_summary(simulation_result.summary)
+
+    def render_summary(self, simulation_result_summary: SimulationResultSummary) -> bytes:
+        payoff_matrix = PayoffMatrix.from_simulation_result_summary(
+            simulation_result_summary=simulation_result_summary,
             autoscale_func=self.autoscale
         )
         return str(payoff_matrix).encode('utf-8') + b'\n'
-
-
-RendererManager.register('payoff-matrix', PayoffMatrixRenderer)
@@ -16,9 +16,9 @@
 # limitations under the License.
 
 from enum import Enum
-from typing import Any, Optional, Union
+from typing import Any, BinaryIO, Optional, Union
 
-from bdtsim.simulation_result import SimulationResult
+from bdtsim.simulation_result import SimulationResult, SimulationResultSummary
 
 
 class ValueType(Enum):
@@ -28,6 +28,9 @@ class ValueType(Enum):
 
 
 class Renderer(object):
+    # renderers which only need the result summary set this to True and implement render_summary()
+    summary_only = False
+
     def __init__(self, wei_scaling: Union[int, float, str] = 1, gas_scaling: Union[int, float, str] = 1,
                  *args: Any, **kwargs: Any) -> None:
         """Initialize Renderer
@@ -60,6 +63,29 @@ class Renderer(object):
         """
         raise NotImplementedError()
 
+    def render_to(self, simulation_result: SimulationResult, fp: BinaryIO) -> None:
+        """Render a simulation result into a binary stream.
+
+        Renderers able to write their output incrementally overwrite this, the default implementation writes the
+        output of `render`.
+
+        Args:
+            simulation_result (SimulationResult): simulation result to be rendered
+            fp (BinaryIO): stream the output is written to
+        """
+        fp.write(self.render(simulation_result))
+
+    def render_summary(self, simulation_result_summary: SimulationResultSummary) -> bytes:
+        """Render a simulation result summary. Needs to be overwritten by OutputFormat subclasses with summary_only.
+
+        Args:
+            simulation_result_summary (SimulationResultSummary): simulation result summary to be rendered
+
+        Returns:
+            None
+        """
+        raise NotImplementedError()
+
     def scale_wei(self, value: int, scaling: Optional[Union[int, float, str]] = None) -> Union[float, int]:
         """
 
@@ -15,31 +15,39 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Any, Dict, Type
+from typing import Any, Dict, Type, TYPE_CHECKING
 
-from .renderer import Renderer
+from bdtsim.registry import Registration, register_lazy
 
-
-class RendererRegistration(object):
-    def __init__(self, cls: Type[Renderer], *args: Any, **kwargs: Any) -> None:
-        self.cls = cls
-        self.args = args
-        self.kwargs = kwargs
+if TYPE_CHECKING:
+    from .renderer import Renderer
 
 
 class RendererManager(object):
-    renderers: Dict[str, RendererRegistration] = {}
+    renderers: Dict[str, Registration['Renderer']] = {}
 
     def __init__(self) -> None:
         raise NotImplementedError('This class is not to be instantiated')
 
     @staticmethod
-    def register(name: str, cls: Type[Renderer], *args: Any, **kwargs: Any) -> None:
+    def register(name: str, cls: Type['Renderer'], *args: Any, **kwargs: Any) -> None:
+        from .renderer import Renderer
         if not issubclass(cls, Renderer):
             raise ValueError('Provided class is not a subclass of DataProvider')
-        RendererManager.renderers[name] = RendererRegistration(cls, *args, **kwargs)
+        RendererManager.renderers[name] = Registration(cls, *args, **kwargs)
+
+    @staticmethod
+    def register_lazy(name: str, module: str, attribute: str, *arg_attributes: str) -> None:
+        """Register a renderer by the module providing it, which is imported when the renderer is used.
+
+        Args:
+            name (str): Name of the renderer
+            module (str): Absolute name of the module providing the renderer
+            attribute (str): Name of the renderer class within the module
+            *arg_attributes (str): Names of module attributes passed as leading arguments to the renderer class
+        """
+        register_lazy(RendererManager.renderers, name, module, attribute, *arg_attributes)
 
     @staticmethod
-    def instantiate(name: str, **kwargs: Any) -> Renderer:
-        renderer = RendererManager.renderers[name]
-        return renderer.cls(*renderer.args, **{**renderer.kwargs, **kwargs})
+    def instantiate(name: str, **kwargs: Any) -> 'Renderer':
+        return RendererManager.renderers[name].instantiate(**kwargs)
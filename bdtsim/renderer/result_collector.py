@@ -23,15 +23,20 @@ from bdtsim.account import Account
 from bdtsim.environment import Environment
 from bdtsim.protocol_path import ProtocolPath, Decision
 from bdtsim.simulation_result import SimulationResult, ResultNode, TransactionLogEntry, TransactionLogList
+from bdtsim.simulation_result_file import SimulationResultFileWriter, PHASE_PREPARATION, PHASE_EXECUTION, \
+    PHASE_CLEANUP
 
 
 logger = logging.getLogger(__name__)
 
 
 class SimpleTransactionMonitor(object):
-    def __init__(self, environment: Environment, transactions_target: TransactionLogList) -> None:
+    def __init__(self, environment: Environment, transactions_target: TransactionLogList,
+                 result_writer: Optional[SimulationResultFileWriter] = None, phase: int = PHASE_PREPARATION) -> None:
         self._environment = environment
         self._transactions_target = transactions_target
+        self._result_writer = result_writer
+        self._phase = phase
 
     def _transaction_callback(self, tx_log_entry: TransactionLogEntry) -> None:
         self._transactions_target.append(tx_log_entry)
@@ -42,14 +47,17 @@ class SimpleTransactionMonitor(object):
     def __exit__(self, exception_type: Optional[Type[BaseException]], exception: Optional[BaseException],
                  traceback: Optional[TracebackType]) -> None:
         self._environment.transaction_callback = None
+        if self._result_writer is not None:
+            self._result_writer.add_transaction_list(self._phase, self._transactions_target)
 
 
 class ExecutionTransactionMonitor(object):
-    def __init__(self, environment: Environment, protocol_path: ProtocolPath,
-                 execution_result_root: ResultNode) -> None:
+    def __init__(self, environment: Environment, protocol_path: ProtocolPath, execution_result_root: ResultNode,
+                 result_writer: Optional[SimulationResultFileWriter] = None) -> None:
         self._environment = environment
         self._protocol_path = protocol_path
         self._execution_result_root = execution_result_root
+        self._result_writer = result_writer
 
         self._current_execution_result_node: Optional[ResultNode] = None
         self._current_transactions: TransactionLogList = TransactionLogList()
@@ -57,15 +65,24 @@ class ExecutionTransactionMonitor(object):
     def _decision_callback(self, decision: Decision) -> None:
         if self._current_execution_result_node is None:
             raise RuntimeError()
-        self._current_execution_result_node.tx_collection.append(self._current_transactions)
+        self._finish_transaction_list(self._current_execution_result_node)
         self._current_transactions = TransactionLogList()
         self._current_execution_result_node = self._current_execution_result_node.child(decision)
+        if self._result_writer is not None:
+            self._result_writer.add_node(self._current_execution_result_node, decision)
+
+    def _finish_transaction_list(self, node: ResultNode) -> None:
+        node.tx_collection.append(self._current_transactions)
+        if self._result_writer is not None:
+            self._result_writer.add_transaction_list(PHASE_EXECUTION, self._current_transactions, node)
 
     def _transaction_callback(self, tx_log_entry: TransactionLogEntry) -> None:
         self._current_transactions.append(tx_log_entry)
 
     def __enter__(self) -> None:
         self._current_execution_result_node = self._execution_result_root
+        if self._result_writer is not None:
+            self._result_writer.add_node(self._execution_result_root)
         self._environment.transaction_callback = self._transaction_callback
         self._protocol_path.decision_callback = self._decision_callback
 
@@ -73,20 +90,41 @@ class ExecutionTransactionMonitor(object):
                  traceback: Optional[TracebackType]) -> None:
         if self._current_execution_result_node is None:
             raise RuntimeError()
-        self._current_execution_result_node.tx_collection.append(self._current_transactions)
+        self._finish_transaction_list(self._current_execution_result_node)
         self._protocol_path.decision_callback = None
         self._environment.transaction_callback = None
 
 
 class ResultCollector(object):
-    def __init__(self, operator: Account, seller: Account, buyer: Account) -> None:
+    def __init__(self, operator: Account, seller: Account, buyer: Account,
+                 result_writer: Optional[SimulationResultFileWriter] = None) -> None:
+        """Collect the results of a simulation.
+
+        Args:
+            operator (Account): The operator account
+            seller (Account): The seller account
+            buyer (Account): The buyer account
+            result_writer (Optional[SimulationResultFileWriter]): If provided, collected results are additionally
+                streamed to this writer while the simulation is running.
+        """
         self.simulation_result = SimulationResult(operator, seller, buyer)
+        self._result_writer = result_writer
+        if self._result_writer is not None:
+            self._result_writer.begin(operator, seller, buyer)
 
     def monitor_preparation(self, environment: Environment) -> SimpleTransactionMonitor:
-        return SimpleTransactionMonitor(environment, self.simulation_result.preparation_transactions)
+        return SimpleTransactionMonitor(environment, self.simulation_result.preparation_transactions,
+                                        self._result_writer, PHASE_PREPARATION)
 
     def monitor_execution(self, environment: Environment, protocol_path: ProtocolPath) -> ExecutionTransactionMonitor:
-        return ExecutionTransactionMonitor(environment, protocol_path, self.simulation_result.execution_result_root)
+        return ExecutionTransactionMonitor(environment, protocol_path, self.simulation_result.execution_result_root,
+                                           self._result_writer)
 
     def monitor_cleanup(self, environment: Environment) -> SimpleTransactionMonitor:
-        return SimpleTransactionMonitor(environment, self.simulation_result.cleanup_transactions)
+        return SimpleTransactionMonitor(environment, self.simulation_result.cleanup_transactions,
+                                        self._result_writer, PHASE_CLEANUP)
+
+    def finish(self) -> None:
+        """Finish result collection. Writes the result summary if results are streamed to a result writer."""
+        if self._result_writer is not None:
+            self._result_writer.write_summary(self.simulation_result.summary)
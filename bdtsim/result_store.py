@@ -0,0 +1,504 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""SQLite based store for the results of multiple simulations.
+
+Each stored simulation gets a row in the `simulations` table, which is identified by the hash of the canonical
+simulation configuration (storing a simulation again replaces the previously stored one). Its component parameters
+are stored in the `parameters` table (with an additional numeric representation for range queries). The execution
+result tree is stored in the `nodes` table, where each node (except the root node) holds the decision leading to it.
+Transactions are stored in the `transactions` table, the aggregation summaries of all final nodes in the
+`aggregations` table.
+
+Final nodes are classified by the honesty of seller and buyer (seller first), using the honesty classes `hh`, `hm`,
+`mh` and `mm` (`h` = honest, `m` = malicious), as in the payoff matrix.
+
+The `results` view joins aggregations with the simulation configuration and is the main entry point for queries.
+
+The rows of a simulation can be collected separately from storing them (see `ResultStore.collect_rows`), e.g. within
+the worker process which still holds the simulation result in memory.
+"""
+
+import itertools
+import json
+import logging
+import sqlite3
+import threading
+from queue import Queue
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union, cast
+
+from bdtsim.bulk_configuration import canonical_hash
+from bdtsim.protocol import DEFAULT_ASSET_PRICE
+from bdtsim.simulation_result import ResultNode, SimulationResult, SimulationResultSerializer, \
+    TransactionLogCollection, TransactionLogList
+from bdtsim.simulation_result_file import SimulationResultFileSerializer
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 2
+
+HONESTY_CLASSES = ('hh', 'hm', 'mh', 'mm')
+
+PHASE_PREPARATION = 'preparation'
+PHASE_EXECUTION = 'execution'
+PHASE_CLEANUP = 'cleanup'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS simulations (
+    id INTEGER PRIMARY KEY,
+    protocol TEXT NOT NULL,
+    environment TEXT NOT NULL,
+    data_provider TEXT NOT NULL,
+    price INTEGER,
+    description TEXT,
+    configuration TEXT NOT NULL,
+    sweep TEXT,
+    configuration_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS simulations_protocol ON simulations (protocol);
+CREATE UNIQUE INDEX IF NOT EXISTS simulations_configuration_hash ON simulations (configuration_hash);
+
+CREATE TABLE IF NOT EXISTS parameters (
+    simulation INTEGER NOT NULL REFERENCES simulations (id),
+    component TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT,
+    numeric_value REAL
+);
+CREATE INDEX IF NOT EXISTS parameters_key_value ON parameters (key, value);
+CREATE INDEX IF NOT EXISTS parameters_key_numeric_value ON parameters (key, numeric_value);
+CREATE INDEX IF NOT EXISTS parameters_simulation ON parameters (simulation);
+
+CREATE TABLE IF NOT EXISTS nodes (
+    simulation INTEGER NOT NULL REFERENCES simulations (id),
+    id INTEGER NOT NULL,
+    parent INTEGER,
+    subject TEXT,
+    description TEXT,
+    outcome TEXT,
+    honest INTEGER,
+    timestamp REAL,
+    final INTEGER NOT NULL,
+    honesty TEXT,
+    PRIMARY KEY (simulation, id)
+);
+CREATE INDEX IF NOT EXISTS nodes_honesty ON nodes (honesty);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    simulation INTEGER NOT NULL REFERENCES simulations (id),
+    node INTEGER,
+    phase TEXT NOT NULL,
+    list INTEGER NOT NULL,
+    account TEXT NOT NULL,
+    description TEXT,
+    gas_used INTEGER,
+    gas_price INTEGER,
+    funds_diff TEXT,
+    item_share TEXT
+);
+CREATE INDEX IF NOT EXISTS transactions_simulation_node ON transactions (simulation, node);
+CREATE INDEX IF NOT EXISTS transactions_account ON transactions (account);
+
+CREATE TABLE IF NOT EXISTS aggregations (
+    simulation INTEGER NOT NULL REFERENCES simulations (id),
+    node INTEGER NOT NULL,
+    honesty TEXT NOT NULL,
+    account TEXT NOT NULL,
+    tx_fees_min INTEGER,
+    tx_fees_max INTEGER,
+    tx_fees_mean REAL,
+    tx_count_min INTEGER,
+    tx_count_max INTEGER,
+    tx_count_mean REAL,
+    funds_diff_min INTEGER,
+    funds_diff_max INTEGER,
+    balance_diff_min INTEGER,
+    balance_diff_max INTEGER,
+    item_share_min REAL,
+    item_share_max REAL
+);
+CREATE INDEX IF NOT EXISTS aggregations_simulation ON aggregations (simulation);
+CREATE INDEX IF NOT EXISTS aggregations_honesty_account ON aggregations (honesty, account);
+CREATE INDEX IF NOT EXISTS aggregations_account ON aggregations (account);
+
+CREATE VIEW IF NOT EXISTS results AS
+    SELECT s.protocol, s.environment, s.data_provider, s.price, s.description, s.sweep, a.*
+    FROM aggregations a JOIN simulations s ON a.simulation = s.id;
+'''
+
+AGGREGATION_FIELDS = TransactionLogCollection.Aggregation.Entry._fields[1:]
+
+QUERY_OPERATORS = ('=', '!=', '<', '<=', '>', '>=')
+
+_SQLITE_INTEGER_MAX = 2 ** 63 - 1
+
+
+def _integer(value: Any) -> Any:
+    # SQLite integers are limited to 64 bit, larger Wei values (> ~9.2 Eth) are stored as real numbers
+    if isinstance(value, int) and not -_SQLITE_INTEGER_MAX <= value <= _SQLITE_INTEGER_MAX:
+        return float(value)
+    return value
+
+
+def _numeric(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ResultRows(NamedTuple):
+    """Rows of a single simulation, without the leading simulation id (which is assigned when storing them)."""
+    simulation: Tuple[Any, ...]
+    parameters: List[Tuple[Any, ...]]
+    nodes: List[Tuple[Any, ...]]
+    transactions: List[Tuple[Any, ...]]
+    aggregations: List[Tuple[Any, ...]]
+
+
+# simulation configuration, simulation result (or its rows) and error callback
+_QueueItem = Tuple[Dict[str, Any], Union[SimulationResult, ResultRows], Optional[Callable[[BaseException], None]]]
+
+
+def honesty_class(seller_honest: bool, buyer_honest: bool) -> str:
+    return '%s%s' % ('h' if seller_honest else 'm', 'h' if buyer_honest else 'm')
+
+
+class ResultStore(object):
+    def __init__(self, path: str) -> None:
+        """Store simulation results in a SQLite database.
+
+        Args:
+            path (str): Path of the SQLite database file. Will be created if it does not exist.
+        """
+        self._connection = sqlite3.connect(path)
+        if self._connection.execute('PRAGMA user_version').fetchone()[0] == 1:
+            # simulations stored with schema version 1 have no configuration hash and are never replaced
+            self._connection.execute('ALTER TABLE simulations ADD COLUMN configuration_hash TEXT')
+        self._connection.executescript(SCHEMA)
+        self._connection.execute('PRAGMA user_version = %d' % SCHEMA_VERSION)
+        self._connection.commit()
+
+    def __enter__(self) -> 'ResultStore':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def store(self, simulation_configuration: Dict[str, Any], simulation_result: SimulationResult) -> int:
+        """Store a simulation result together with the configuration it has been created with.
+
+        Args:
+            simulation_configuration (Dict[str, Any]): Simulation configuration (as used for bulk execution)
+            simulation_result (SimulationResult): Simulation result to be stored
+
+        Returns:
+            int: id of the stored simulation
+        """
+        return self.store_rows(self.collect_rows(simulation_configuration, simulation_result))
+
+    def store_rows(self, rows: ResultRows) -> int:
+        """Store the rows of a simulation, as collected by `collect_rows`.
+
+        A previously stored simulation with the same canonical configuration is replaced.
+
+        Args:
+            rows (ResultRows): Rows to be stored
+
+        Returns:
+            int: id of the stored simulation
+        """
+        with self._connection:
+            configuration_hash = rows.simulation[-1]
+            for previous_id, in self._connection.execute('SELECT id FROM simulations WHERE configuration_hash = ?',
+                                                         (configuration_hash, )).fetchall():
+                for table in 'parameters', 'nodes', 'transactions', 'aggregations':
+                    self._connection.execute('DELETE FROM %s WHERE simulation = ?' % table, (previous_id, ))
+                self._connection.execute('DELETE FROM simulations WHERE id = ?', (previous_id, ))
+            cursor = self._connection.execute(
+                'INSERT INTO simulations (protocol, environment, data_provider, price, description, configuration, '
+                'sweep, configuration_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                tuple(rows.simulation)
+            )
+            simulation_id = cast(int, cursor.lastrowid)
+            for table, columns, table_rows in (
+                ('parameters', 4, rows.parameters),
+                ('nodes', 9, rows.nodes),
+                ('transactions', 9, rows.transactions),
+                ('aggregations', 3 + len(AGGREGATION_FIELDS), rows.aggregations)
+            ):
+                self._connection.executemany('INSERT INTO %s VALUES (%s)' % (table, ', '.join(['?'] * (1 + columns))),
+                                             [(simulation_id, *row) for row in table_rows])
+        return simulation_id
+
+    @staticmethod
+    def collect_rows(simulation_configuration: Dict[str, Any], simulation_result: SimulationResult) -> ResultRows:
+        """Collect the rows of a simulation result, without storing them.
+
+        Args:
+            simulation_configuration (Dict[str, Any]): Simulation configuration (as used for bulk execution)
+            simulation_result (SimulationResult): Simulation result to be stored
+
+        Returns:
+            ResultRows: rows of all tables
+        """
+        simulation_row = (
+            (simulation_configuration.get('protocol') or {}).get('name'),
+            (simulation_configuration.get('environment') or {}).get('name', 'PyEVM'),
+            (simulation_configuration.get('data_provider') or {}).get('name', 'RandomDataProvider'),
+            _integer(simulation_configuration.get('price', DEFAULT_ASSET_PRICE)),
+            simulation_configuration.get('description'),
+            json.dumps(simulation_configuration, sort_keys=True, default=str),
+            None if simulation_configuration.get('sweep') is None else json.dumps(
+                simulation_configuration['sweep'], sort_keys=True, default=str
+            ),
+            canonical_hash(simulation_configuration)
+        )
+
+        parameter_rows: List[Tuple[Any, ...]] = []
+        for component in 'protocol', 'environment', 'data_provider':
+            parameters = (simulation_configuration.get(component) or {}).get('parameters') or {}
+            parameter_rows.extend((component, key, str(value), _numeric(value)) for key, value in parameters.items())
+
+        rows = ResultRows(simulation_row, parameter_rows, [], [], [])
+        ResultStore._collect_tree(rows, simulation_result)
+        return rows
+
+    def query(self, sql: str, parameters: Sequence[Any] = ()) -> Tuple[List[str], List[Tuple[Any, ...]]]:
+        """Execute a (read-only) query.
+
+        Args:
+            sql (str): SQL query
+            parameters (Sequence[Any]): Query parameters
+
+        Returns:
+            Tuple[List[str], List[Tuple[Any, ...]]]: column names and result rows
+        """
+        cursor = self._connection.execute(sql, parameters)
+        columns = [column[0] for column in cursor.description or []]
+        return columns, cursor.fetchall()
+
+    def query_results(self, select: str = '*', protocol: Optional[str] = None,
+                      parameters: Optional[List[Tuple[str, str, str]]] = None, honesty: Optional[str] = None,
+                      account: Optional[str] = None) -> Tuple[List[str], List[Tuple[Any, ...]]]:
+        """Query the results view.
+
+        Args:
+            select (str): Columns/expressions to be selected, e.g. `max(funds_diff_max)`
+            protocol (Optional[str]): Limit to simulations of this protocol
+            parameters (Optional[List[Tuple[str, str, str]]]): Limit to simulations with matching parameters, given as
+                (key, operator, value). Numeric values are compared numerically.
+            honesty (Optional[str]): Limit to final nodes of the given honesty class (`hh`, `hm`, `mh`, `mm`)
+            account (Optional[str]): Limit to aggregations of the given account (e.g. `Seller`)
+
+        Returns:
+            Tuple[List[str], List[Tuple[Any, ...]]]: column names and result rows
+        """
+        conditions = []
+        values: List[Any] = []
+        if protocol is not None:
+            conditions.append('protocol = ?')
+            values.append(protocol)
+        for key, operator, value in parameters or []:
+            if operator not in QUERY_OPERATORS:
+                raise ValueError('unsupported operator "%s"' % operator)
+            numeric_value = _numeric(value)
+            conditions.append('simulation IN (SELECT simulation FROM parameters WHERE key = ? AND %s %s ?)' % (
+                'value' if numeric_value is None else 'numeric_value', operator
+            ))
+            values.extend([key, value if numeric_value is None else numeric_value])
+        if honesty is not None:
+            if honesty not in HONESTY_CLASSES:
+                raise ValueError('unsupported honesty class "%s"' % honesty)
+            conditions.append('honesty = ?')
+            values.append(honesty)
+        if account is not None:
+            conditions.append('account = ?')
+            values.append(account)
+
+        sql = 'SELECT %s FROM results' % select
+        if len(conditions):
+            sql += ' WHERE %s' % ' AND '.join(conditions)
+        return self.query(sql, values)
+
+    @staticmethod
+    def _collect_tree(rows: ResultRows, simulation_result: SimulationResult) -> None:
+        seller = simulation_result.seller
+        buyer = simulation_result.buyer
+        node_rows = rows.nodes
+        aggregation_rows = rows.aggregations
+        transaction_rows = rows.transactions
+        list_ids = itertools.count()
+
+        ResultStore._collect_transactions(transaction_rows, None, PHASE_PREPARATION, next(list_ids),
+                                          simulation_result.preparation_transactions)
+
+        # depth-first traversal, passing down the honesty of seller and buyer
+        stack: List[Tuple[ResultNode, Optional[int], Any, bool, bool]] = [
+            (simulation_result.execution_result_root, None, None, True, True)
+        ]
+        while len(stack):
+            node, parent_id, decision, seller_honest, buyer_honest = stack.pop()
+            node_id = len(node_rows)
+            final = len(node.children) == 0
+            honesty = honesty_class(seller_honest, buyer_honest)
+            node_rows.append((
+                node_id,
+                parent_id,
+                None if decision is None else decision.choice.subject.name,
+                None if decision is None else decision.choice.description,
+                None if decision is None else decision.outcome,
+                None if decision is None else decision.is_honest(),
+                None if decision is None else decision.timestamp,
+                final,
+                honesty if final else None
+            ))
+
+            for tx_log_list in node.tx_collection:
+                ResultStore._collect_transactions(transaction_rows, node_id, PHASE_EXECUTION, next(list_ids),
+                                                  tx_log_list)
+
+            if final:
+                for entry in node.aggregation_summary.values():
+                    aggregation_rows.append((node_id, honesty, entry.account.name) + tuple(
+                        _integer(getattr(entry, field)) for field in AGGREGATION_FIELDS
+                    ))
+
+            for child_decision, child in reversed(list(node.children.items())):
+                honest = child_decision.is_honest()
+                stack.append((
+                    child, node_id, child_decision,
+                    seller_honest and (honest or child_decision.choice.subject != seller),
+                    buyer_honest and (honest or child_decision.choice.subject != buyer)
+                ))
+
+        ResultStore._collect_transactions(transaction_rows, None, PHASE_CLEANUP, next(list_ids),
+                                          simulation_result.cleanup_transactions)
+
+    @staticmethod
+    def _collect_transactions(rows: List[Tuple[Any, ...]], node_id: Optional[int], phase: str, list_id: int,
+                              tx_log_list: TransactionLogList) -> None:
+        for tx in tx_log_list:
+            rows.append((
+                node_id,
+                phase,
+                list_id,
+                tx.account.name,
+                tx.description,
+                _integer(tx.tx_receipt.get('gasUsed')),
+                _integer(tx.tx_dict.get('gasPrice')),
+                json.dumps({account.name: value for account, value in tx.funds_diff_collection.items()}),
+                json.dumps({account.name: value for account, value in tx.item_share_collection.items()})
+            ))
+
+
+class ResultFileLoader(object):
+    def __init__(self, path: str,
+                 serializer: Union[SimulationResultSerializer, SimulationResultFileSerializer]) -> None:
+        """Load a serialized simulation result from a file when called.
+
+        Args:
+            path (str): Path of the result file
+            serializer (Union[SimulationResultSerializer, SimulationResultFileSerializer]): Serializer used for the
+                result file
+        """
+        self._path = path
+        self._serializer = serializer
+
+    def __call__(self) -> SimulationResult:
+        with open(self._path, 'rb') as fp:
+            return self._serializer.unserialize(fp.read())
+
+
+class ResultStoreWriter(object):
+    def __init__(self, path: str) -> None:
+        """Write simulation results to a ResultStore from a single background thread.
+
+        SQLite connections must not be shared between threads, and concurrent write transactions would block each
+        other. Results are therefore put into a queue (e.g. from process pool callbacks) and written by a dedicated
+        writer thread, which owns the database connection.
+
+        If the store cannot be opened, all queued results fail. Failures are reported to the error callbacks passed
+        to `put`, which are called from the writer thread.
+
+        Args:
+            path (str): Path of the SQLite database file
+        """
+        self._path = path
+        self._queue: Queue[Optional[_QueueItem]] = Queue()
+        self._thread = threading.Thread(target=self._run, name='ResultStoreWriter', daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> 'ResultStoreWriter':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def put(self, simulation_configuration: Dict[str, Any], simulation_result: Union[SimulationResult, ResultRows],
+            error_callback: Optional[Callable[[BaseException], None]] = None) -> None:
+        """Queue a simulation result for being stored.
+
+        Args:
+            simulation_configuration (Dict[str, Any]): Simulation configuration
+            simulation_result (Union[SimulationResult, ResultRows]): Simulation result, or its rows as collected by
+                `ResultStore.collect_rows` (e.g. within the worker process which created the simulation result)
+            error_callback (Optional[Callable[[BaseException], None]]): Called with the error if the result could not
+                be stored. If not set, the error is logged.
+        """
+        self._queue.put((simulation_configuration, simulation_result, error_callback))
+
+    def close(self) -> None:
+        """Write all queued results and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self) -> None:
+        result_store: Optional[ResultStore] = None
+        open_error: Optional[BaseException] = None
+        try:
+            result_store = ResultStore(self._path)
+        except Exception as e:
+            open_error = e
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                simulation_configuration, simulation_result, error_callback = item
+                try:
+                    if result_store is None:
+                        raise RuntimeError('failed to open result store %s: %s' % (self._path, str(open_error)))
+                    if isinstance(simulation_result, SimulationResult):
+                        result_store.store(simulation_configuration, simulation_result)
+                    else:
+                        result_store.store_rows(simulation_result)
+                except Exception as e:
+                    if error_callback is not None:
+                        error_callback(e)
+                    else:
+                        logger.warning('failed to store simulation result (%s): %s' % (
+                            str(simulation_configuration), str(e)
+                        ))
+        finally:
+            if result_store is not None:
+                result_store.close()
@@ -26,6 +26,8 @@ from bdtsim.renderer import ResultCollector
 from bdtsim.protocol import Protocol, DEFAULT_ASSET_PRICE
 from bdtsim.protocol_path import ProtocolPath, ProtocolPathCoercion
 from bdtsim.simulation_result import SimulationResult
+from bdtsim.simulation_result_file import SimulationResultFileWriter
+from bdtsim.tracing import CATEGORY_SIMULATION, span
 
 
 logger = logging.getLogger(__name__)
@@ -34,7 +36,7 @@ logger = logging.getLogger(__name__)
 class Simulation(object):
     def __init__(self, protocol: Protocol, environment: Environment, data_provider: DataProvider, operator: Account,
                  seller: Account, buyer: Account, protocol_path_coercion: Optional[ProtocolPathCoercion] = None,
-                 price: int = DEFAULT_ASSET_PRICE) -> None:
+                 price: int = DEFAULT_ASSET_PRICE, result_writer: Optional[SimulationResultFileWriter] = None) -> None:
         self._protocol = protocol
         self._environment = environment
         self._data_provider = data_provider
@@ -43,14 +45,16 @@ class Simulation(object):
         self._buyer = buyer
         self._protocol_path_coercion: ProtocolPathCoercion = protocol_path_coercion or ProtocolPathCoercion()
         self._price = price
+        self._result_writer = result_writer
 
         self._protocol_path_queue: Queue[ProtocolPath] = Queue()
 
     def run(self) -> SimulationResult:
-        result_collector = ResultCollector(self._operator, self._seller, self._buyer)
+        result_collector = ResultCollector(self._operator, self._seller, self._buyer, self._result_writer)
 
         logger.debug('Preparing environment for simulation...')
-        with result_collector.monitor_preparation(self._environment):
+        with result_collector.monitor_preparation(self._environment), \
+                span('prepare_simulation', CATEGORY_SIMULATION):
             self._protocol.prepare_simulation(self._environment, self._operator)
         logger.debug('Finished preparing the environment for simulation')
 
@@ -59,28 +63,32 @@ class Simulation(object):
         while not self._protocol_path_queue.empty():
             protocol_path = self._protocol_path_queue.get(block=False)
 
-            with result_collector.monitor_execution(self._environment, protocol_path):
+            with result_collector.monitor_execution(self._environment, protocol_path), \
+                    span('iteration', CATEGORY_SIMULATION, path=protocol_path.coercion_str):
                 logger.debug('Simulation will follow path %s (coercion string: \'%s\')'
                              % (str(protocol_path), protocol_path.coercion_str))
 
                 logger.debug('Preparing environment for iteration...')
-                self._protocol.prepare_iteration(self._environment, self._operator)
+                with span('prepare_iteration', CATEGORY_SIMULATION):
+                    self._protocol.prepare_iteration(self._environment, self._operator)
                 logger.debug('Finished preparing the environment for iteration')
 
                 self._data_provider.file_pointer.seek(0, 0)
                 logger.debug('Starting protocol execution...')
-                self._protocol.execute(
-                    protocol_path=protocol_path,
-                    environment=self._environment,
-                    data_provider=self._data_provider,
-                    seller=self._seller,
-                    buyer=self._buyer,
-                    price=self._price
-                )
+                with span('execute', CATEGORY_SIMULATION):
+                    self._protocol.execute(
+                        protocol_path=protocol_path,
+                        environment=self._environment,
+                        data_provider=self._data_provider,
+                        seller=self._seller,
+                        buyer=self._buyer,
+                        price=self._price
+                    )
                 logger.debug('Finished protocol execution')
 
                 logger.debug('Starting cleanup for iteration...')
-                self._protocol.cleanup_iteration(self._environment, self._operator)
+                with span('cleanup_iteration', CATEGORY_SIMULATION):
+                    self._protocol.cleanup_iteration(self._environment, self._operator)
                 logger.debug('Finished cleaning up the iteration')
 
                 logger.debug('Collecting alternative paths...')
@@ -92,6 +100,9 @@ class Simulation(object):
             self._protocol_path_queue.task_done()
 
         logger.debug('Simulation finished. Cleaning up...')
-        self._protocol.cleanup_simulation(self._environment, self._operator)
+        with span('cleanup_simulation', CATEGORY_SIMULATION):
+            self._protocol.cleanup_simulation(self._environment, self._operator)
         logger.debug('Finished cleaning up the simulation')
+        with span('collect_result', CATEGORY_SIMULATION):
+            result_collector.finish()
         return result_collector.simulation_result
@@ -16,7 +16,6 @@
 # limitations under the License.
 
 import base64
-import copy
 import gzip
 import itertools
 import logging
@@ -79,79 +78,30 @@ class TransactionLogList(List[TransactionLogEntry]):
 
         def __init__(self, tx_log_list: 'TransactionLogList') -> None:
             super(TransactionLogList.Aggregation, self).__init__()
+            # accumulate per account in mutable lists (tx_fees, tx_count, funds_diff, balance_diff, item_share) and
+            # create the immutable entries once all transactions have been processed
+            totals: Dict[Account, List[Any]] = {}
             for tx in tx_log_list:
-                # work on log line
-                entry = self.get(tx.account)
-                if entry is None:
-                    entry = TransactionLogList.Aggregation.Entry(
-                        tx.account,                                                       # account
-                        int(tx.tx_receipt['gasUsed']),                                    # tx_fees
-                        1,                                                                # tx_count
-                        0,                                                                # funds_diff
-                        - (int(tx.tx_receipt['gasUsed']) * int(tx.tx_dict['gasPrice'])),  # balance_diff
-                        0                                                                 # item_share
-                    )
-                    self.update({tx.account: entry})
-                else:
-                    entry = TransactionLogList.Aggregation.Entry(
-                        tx.account,
-                        entry.tx_fees + int(tx.tx_receipt['gasUsed']),
-                        entry.tx_count + 1,
-                        entry.funds_diff,
-                        entry.balance_diff - (int(tx.tx_receipt['gasUsed']) * int(tx.tx_dict['gasPrice'])),
-                        entry.item_share
-                    )
-                    self.update({tx.account: entry})
-                # work on all fund diffs
+                gas_used = int(tx.tx_receipt['gasUsed'])
+                total = totals.get(tx.account)
+                if total is None:
+                    total = totals[tx.account] = [0, 0, 0, 0, 0]
+                total[0] += gas_used
+                total[1] += 1
+                total[3] -= gas_used * int(tx.tx_dict['gasPrice'])
                 for account, funds_diff in tx.funds_diff_collection.items():
-                    funds_diff_entry = self.get(account)
-                    if funds_diff_entry is None:
-                        self.update({
-                            account: TransactionLogList.Aggregation.Entry(
-                                account,
-                                0,
-                                0,
-                                funds_diff,
-                                funds_diff,
-                                0
-                            )
-                        })
-                    else:
-                        self.update({
-                            account: TransactionLogList.Aggregation.Entry(
-                                account,
-                                entry.tx_fees,
-                                entry.tx_count,
-                                funds_diff_entry.funds_diff + funds_diff,
-                                entry.balance_diff + funds_diff,
-                                entry.item_share
-                            )
-                        })
-                # work on all item shares
+                    total = totals.get(account)
+                    if total is None:
+                        total = totals[account] = [0, 0, 0, 0, 0]
+                    total[2] += funds_diff
+                    total[3] += funds_diff
                 for account, item_share in tx.item_share_collection.items():
-                    item_share_entry = self.get(account)
-                    if item_share_entry is None:
-                        self.update({
-                            account: TransactionLogList.Aggregation.Entry(
-                                account,
-                                0,
-                                0,
-                                0,
-                                0,
-                                item_share
-                            )
-                        })
-                    else:
-                        self.update({
-                            account: TransactionLogList.Aggregation.Entry(
-                                account,
-                                entry.tx_fees,
-                                entry.tx_count,
-                                entry.funds_diff,
-                                entry.balance_diff,
-                                item_share_entry.item_share + item_share
-                            )
-                        })
+                    total = totals.get(account)
+                    if total is None:
+                        total = totals[account] = [0, 0, 0, 0, 0]
+                    total[4] += item_share
+            for account, total in totals.items():
+                self[account] = TransactionLogList.Aggregation.Entry(account, *total)
 
     def __init__(self) -> None:
         super(TransactionLogList, self).__init__()
@@ -172,6 +122,10 @@ class TransactionLogList(List[TransactionLogEntry]):
             self._aggregation = TransactionLogList.Aggregation(self)
         return self._aggregation
 
+    @aggregation.setter
+    def aggregation(self, aggregation: 'TransactionLogList.Aggregation') -> None:
+        self._aggregation = aggregation
+
 
 class TransactionLogCollection(List[TransactionLogList]):
     class Aggregation(Dict[Account, 'TransactionLogCollection.Aggregation.Entry']):
@@ -231,48 +185,43 @@ class TransactionLogCollection(List[TransactionLogList]):
 
         def __init__(self, tx_log_collection: 'TransactionLogCollection') -> None:
             super(TransactionLogCollection.Aggregation, self).__init__()
+            # gather the values of all transaction log lists column-wise per account, then reduce every column at once
+            columns: Dict[Account, Tuple[List[int], List[int], List[int], List[int], List[float]]] = {}
             for tx_log_list in tx_log_collection:
-                for tx_list_aggregation_entry in tx_log_list.aggregation.values():
-                    e = self.get(tx_list_aggregation_entry.account)
-                    if e is None:
-                        self.update({tx_list_aggregation_entry.account: TransactionLogCollection.Aggregation.Entry(
-                            account=tx_list_aggregation_entry.account,
-                            tx_fees_min=tx_list_aggregation_entry.tx_fees,
-                            tx_fees_max=tx_list_aggregation_entry.tx_fees,
-                            tx_fees_mean=tx_list_aggregation_entry.tx_fees / len(tx_log_collection),
-                            tx_count_min=tx_list_aggregation_entry.tx_count,
-                            tx_count_max=tx_list_aggregation_entry.tx_count,
-                            tx_count_mean=tx_list_aggregation_entry.tx_count / len(tx_log_collection),
-                            funds_diff_min=tx_list_aggregation_entry.funds_diff,
-                            funds_diff_max=tx_list_aggregation_entry.funds_diff,
-                            balance_diff_min=tx_list_aggregation_entry.balance_diff,
-                            balance_diff_max=tx_list_aggregation_entry.balance_diff,
-                            item_share_min=tx_list_aggregation_entry.item_share,
-                            item_share_max=tx_list_aggregation_entry.item_share
-                        )})
-                    else:
-                        self.update({tx_list_aggregation_entry.account: TransactionLogCollection.Aggregation.Entry(
-                            account=tx_list_aggregation_entry.account,
-                            tx_fees_min=min(e.tx_fees_min, tx_list_aggregation_entry.tx_fees),
-                            tx_fees_max=max(e.tx_fees_max, tx_list_aggregation_entry.tx_fees),
-                            tx_fees_mean=e.tx_fees_mean + (tx_list_aggregation_entry.tx_fees / len(tx_log_collection)),
-                            tx_count_min=min(e.tx_count_min, tx_list_aggregation_entry.tx_count),
-                            tx_count_max=max(e.tx_count_max, tx_list_aggregation_entry.tx_count),
-                            tx_count_mean=e.tx_count_mean + tx_list_aggregation_entry.tx_count / len(tx_log_collection),
-                            funds_diff_min=min(e.funds_diff_min, tx_list_aggregation_entry.funds_diff),
-                            funds_diff_max=max(e.funds_diff_max, tx_list_aggregation_entry.funds_diff),
-                            balance_diff_min=min(e.balance_diff_min, tx_list_aggregation_entry.balance_diff),
-                            balance_diff_max=max(e.balance_diff_max, tx_list_aggregation_entry.balance_diff),
-                            item_share_min=min(e.item_share_min, tx_list_aggregation_entry.item_share),
-                            item_share_max=max(e.item_share_max, tx_list_aggregation_entry.item_share)
-                        )})
+                for entry in tx_log_list.aggregation.values():
+                    account_columns = columns.get(entry.account)
+                    if account_columns is None:
+                        account_columns = columns[entry.account] = ([], [], [], [], [])
+                    account_columns[0].append(entry.tx_fees)
+                    account_columns[1].append(entry.tx_count)
+                    account_columns[2].append(entry.funds_diff)
+                    account_columns[3].append(entry.balance_diff)
+                    account_columns[4].append(entry.item_share)
+            count = len(tx_log_collection)
+            for account, (tx_fees, tx_count, funds_diff, balance_diff, item_share) in columns.items():
+                self[account] = TransactionLogCollection.Aggregation.Entry(
+                    account=account,
+                    tx_fees_min=min(tx_fees),
+                    tx_fees_max=max(tx_fees),
+                    tx_fees_mean=sum(tx_fees) / count,
+                    tx_count_min=min(tx_count),
+                    tx_count_max=max(tx_count),
+                    tx_count_mean=sum(tx_count) / count,
+                    funds_diff_min=min(funds_diff),
+                    funds_diff_max=max(funds_diff),
+                    balance_diff_min=min(balance_diff),
+                    balance_diff_max=max(balance_diff),
+                    item_share_min=min(item_share),
+                    item_share_max=max(item_share)
+                )
 
         def __iadd__(self, other: 'TransactionLogCollection.Aggregation') -> 'TransactionLogCollection.Aggregation':
             if isinstance(other, TransactionLogCollection.Aggregation):
                 for remote_entry in other.values():
                     local_entry = self.get(remote_entry.account)
                     if local_entry is None:
-                        self.update({remote_entry.account: copy.deepcopy(remote_entry)})
+                        # entries are immutable, no need to copy them
+                        self.update({remote_entry.account: remote_entry})
                     else:
                         self.update({remote_entry.account: TransactionLogCollection.Aggregation.Entry(
                             account=remote_entry.account,
@@ -382,14 +331,85 @@ class AggregationAttributeHelper(object):
         return getattr(aggregation.get(self._account), self._attribute)
 
 
-class SimulationResult(object):
-    def __init__(self, operator: Account, seller: Account, buyer: Account) -> None:
-        self.preparation_transactions = TransactionLogList()
-        self.execution_result_root = ResultNode()
-        self.cleanup_transactions = TransactionLogList()
+class ResultNodeSummary(object):
+    def __init__(self, all_honest: bool, honesty: Dict[Account, bool],
+                 aggregation_summary: TransactionLogCollection.Aggregation) -> None:
+        """Precomputed honesty flags and aggregation summary of a final result node.
+
+        Provides the same evaluation interface as ResultNode, so it can be used in place of a final node wherever only
+        honesty and aggregations are required.
+
+        Args:
+            all_honest (bool): Whether all decisions leading to the node were honest
+            honesty (Dict[Account, bool]): Whether the decisions of the account leading to the node were all honest.
+                Accounts without decisions do not need to be listed and are considered honest.
+            aggregation_summary (TransactionLogCollection.Aggregation): Aggregation summary of the node
+        """
+        self._all_honest = all_honest
+        self._honesty = honesty
+        self._aggregation_summary = aggregation_summary
+
+    def all_accounts_completely_honest(self) -> bool:
+        return self._all_honest
+
+    def account_completely_honest(self, account: Account) -> bool:
+        return self._honesty.get(account, True)
+
+    @property
+    def dishonest_accounts(self) -> List[Account]:
+        return [account for account, honest in self._honesty.items() if not honest]
+
+    @property
+    def aggregation_summary(self) -> TransactionLogCollection.Aggregation:
+        return self._aggregation_summary
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, ResultNodeSummary):
+            return (self._all_honest == other._all_honest and
+                    set(self.dishonest_accounts) == set(other.dishonest_accounts) and
+                    self._aggregation_summary == other._aggregation_summary)
+        else:
+            return NotImplemented
+
+    def __ne__(self, other: Any) -> bool:
+        return not self.__eq__(other)
+
+
+class SimulationResultSummary(object):
+    def __init__(self, operator: Account, seller: Account, buyer: Account,
+                 final_nodes: List[ResultNodeSummary]) -> None:
+        """Summary of a simulation result, sufficient for all evaluations based on final node aggregations.
+
+        Args:
+            operator (Account): The operator account
+            seller (Account): The seller account
+            buyer (Account): The buyer account
+            final_nodes (List[ResultNodeSummary]): Summaries of all final nodes of the execution result tree
+        """
         self.operator = operator
         self.seller = seller
         self.buyer = buyer
+        self.final_nodes = final_nodes
+
+    @staticmethod
+    def from_result_root(operator: Account, seller: Account, buyer: Account,
+                         execution_result_root: ResultNode) -> 'SimulationResultSummary':
+        final_nodes: List[ResultNodeSummary] = []
+        # depth-first traversal (in the order of ResultNode.final_nodes), passing down honesty flags
+        stack: List[Tuple[ResultNode, bool, Dict[Account, bool]]] = [(execution_result_root, True, {})]
+        while len(stack):
+            node, all_honest, honesty = stack.pop()
+            if len(node.children) == 0:
+                final_nodes.append(ResultNodeSummary(all_honest, honesty, node.aggregation_summary))
+                continue
+            for decision, child in reversed(list(node.children.items())):
+                if decision.is_honest():
+                    stack.append((child, all_honest, honesty))
+                else:
+                    child_honesty = dict(honesty)
+                    child_honesty[decision.choice.subject] = False
+                    stack.append((child, False, child_honesty))
+        return SimulationResultSummary(operator, seller, buyer, final_nodes)
 
     def get_important_execution_results(self) -> List[Tuple[str, TransactionLogCollection.Aggregation]]:
         all_honest_results = []
@@ -397,7 +417,7 @@ class SimulationResult(object):
         buyer_honest_results = []
         nobody_honest_results = []
 
-        for node in self.execution_result_root.final_nodes:
+        for node in self.final_nodes:
             if node.all_accounts_completely_honest():
                 all_honest_results.append(node.aggregation_summary)
             elif node.account_completely_honest(self.seller):
@@ -430,13 +450,11 @@ class SimulationResult(object):
         return important_results
 
     def __eq__(self, other: Any) -> bool:
-        if isinstance(other, SimulationResult):
-            return (self.preparation_transactions == other.preparation_transactions and
-                    self.execution_result_root == other.execution_result_root and
-                    self.cleanup_transactions == other.cleanup_transactions and
-                    self.operator == other.operator and
+        if isinstance(other, SimulationResultSummary):
+            return (self.operator == other.operator and
                     self.seller == other.seller and
-                    self.buyer == other.buyer)
+                    self.buyer == other.buyer and
+                    self.final_nodes == other.final_nodes)
         else:
             return NotImplemented
 
@@ -453,6 +471,42 @@ class SimulationResult(object):
         return aggr_func(results_filtered, key=AggregationAttributeHelper(account, attribute))
 
 
+class SimulationResult(object):
+    # Chrome trace of the simulation (see bdtsim.tracing), if embedded. Class attribute for results pickled before.
+    trace: Optional[Dict[str, Any]] = None
+
+    def __init__(self, operator: Account, seller: Account, buyer: Account) -> None:
+        self.preparation_transactions = TransactionLogList()
+        self.execution_result_root = ResultNode()
+        self.cleanup_transactions = TransactionLogList()
+        self.operator = operator
+        self.seller = seller
+        self.buyer = buyer
+        self.trace = None
+
+    @property
+    def summary(self) -> SimulationResultSummary:
+        return SimulationResultSummary.from_result_root(self.operator, self.seller, self.buyer,
+                                                        self.execution_result_root)
+
+    def get_important_execution_results(self) -> List[Tuple[str, TransactionLogCollection.Aggregation]]:
+        return self.summary.get_important_execution_results()
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, SimulationResult):
+            return (self.preparation_transactions == other.preparation_transactions and
+                    self.execution_result_root == other.execution_result_root and
+                    self.cleanup_transactions == other.cleanup_transactions and
+                    self.operator == other.operator and
+                    self.seller == other.seller and
+                    self.buyer == other.buyer)
+        else:
+            return NotImplemented
+
+    def __ne__(self, other: Any) -> bool:
+        return not self.__eq__(other)
+
+
 class SimulationResultSerializer(object):
     def __init__(self, compression: bool = True, b64encoding: bool = True):
         self._compression = compression
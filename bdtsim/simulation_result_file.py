@@ -0,0 +1,584 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Versioned columnar file format for simulation results.
+
+A result file consists of a fixed header, a sequence of self-describing blocks and a footer::
+
+    header:  MAGIC (8 bytes) | version (uint16) | codec (uint8) | reserved (uint8)
+    block:   table (uint8) | row count (uint32) | payload length (uint64) | payload
+    footer:  block index (JSON) | footer offset (uint64) | END_MAGIC (8 bytes)
+
+Each block payload contains a compressed JSON object mapping column names to column values. Blocks are written as
+soon as enough rows have been collected, which allows streaming a result while the simulation is still running. The
+footer contains the offsets of all blocks, so readers only need to decode the blocks of the tables they are interested
+in. If the footer is missing (e.g. because the simulation was aborted), readers fall back to scanning the blocks.
+
+The summary table is written last and holds the honesty flags and aggregation summaries of all final nodes. Evaluations
+which only need those (e.g. the payoff matrix) can be done by reading the summary table only. Loading the complete
+result (`SimulationResultFileReader.load`) still builds the whole execution tree in memory.
+"""
+
+import gzip
+import io
+import json
+import mmap
+import struct
+from typing import Any, BinaryIO, Dict, Generator, List, Optional, Tuple, Union, cast
+
+from hexbytes.main import HexBytes
+
+from bdtsim.account import Account
+from bdtsim.account_related_diff_collection import FundsDiffCollection, ItemShareCollection
+from bdtsim.protocol_path import Choice, Decision
+from bdtsim.simulation_result import ResultNode, ResultNodeSummary, SimulationResult, SimulationResultSummary, \
+    TransactionLogCollection, TransactionLogEntry, TransactionLogList
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+MAGIC = b'BDTSIMR\x00'
+END_MAGIC = b'BDTSIMR\xff'
+FORMAT_VERSION = 1
+DEFAULT_BLOCK_SIZE = 4096
+
+CODEC_NONE = 0
+CODEC_GZIP = 1
+CODEC_ZSTD = 2
+CODECS = {
+    'none': CODEC_NONE,
+    'gzip': CODEC_GZIP,
+    'zstd': CODEC_ZSTD
+}
+
+PHASE_PREPARATION = 0
+PHASE_EXECUTION = 1
+PHASE_CLEANUP = 2
+
+TABLE_METADATA = 0
+TABLE_ACCOUNTS = 1
+TABLE_CHOICES = 2
+TABLE_DECISIONS = 3
+TABLE_NODES = 4
+TABLE_TRANSACTION_LISTS = 5
+TABLE_TRANSACTIONS = 6
+TABLE_AGGREGATIONS = 7
+TABLE_SUMMARY = 8
+
+TABLE_COLUMNS: Dict[int, Tuple[str, ...]] = {
+    TABLE_METADATA: ('key', 'value'),
+    TABLE_ACCOUNTS: ('id', 'name', 'private_key'),
+    TABLE_CHOICES: ('id', 'subject', 'description', 'options', 'honest_options'),
+    TABLE_DECISIONS: ('id', 'choice', 'outcome', 'timestamp'),
+    TABLE_NODES: ('id', 'parent', 'decision'),
+    TABLE_TRANSACTION_LISTS: ('id', 'phase', 'node', 'length'),
+    TABLE_TRANSACTIONS: ('list', 'account', 'description', 'tx_dict', 'tx_receipt', 'funds_diff', 'item_share'),
+    TABLE_AGGREGATIONS: ('list', 'account', 'tx_fees', 'tx_count', 'funds_diff', 'balance_diff', 'item_share'),
+    TABLE_SUMMARY: ('all_honest', 'dishonest_accounts', 'aggregation')
+}
+
+# fields of the aggregation summary entries as stored in the summary table (following the account id)
+_SUMMARY_FIELDS = TransactionLogCollection.Aggregation.Entry._fields[1:]
+
+_HEADER = struct.Struct('>8sHBB')
+_BLOCK_HEADER = struct.Struct('>BIQ')
+_TRAILER = struct.Struct('>Q8s')
+
+
+def compression_codec(value: Any) -> str:
+    """Map a compression option (codec name or boolean-like value) to a codec name.
+
+    Args:
+        value (Any): `gzip`, `zstd` or `none`, or a boolean-like value (true means `gzip`)
+
+    Returns:
+        str: codec name
+    """
+    str_value = str(value).lower()
+    if str_value in CODECS:
+        return str_value
+    elif str_value in ['true', 'yes', 'y', '1']:
+        return 'gzip'
+    elif str_value in ['false', 'no', 'n', '0']:
+        return 'none'
+    else:
+        raise ValueError('%s is not a supported compression codec' % str_value)
+
+
+def is_simulation_result_file(data: Union[bytes, memoryview]) -> bool:
+    return bytes(data[:len(MAGIC)]) == MAGIC
+
+
+def _compress(codec: int, data: bytes) -> bytes:
+    if codec == CODEC_NONE:
+        return data
+    elif codec == CODEC_GZIP:
+        return gzip.compress(data)
+    elif codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError('zstd compression requires the zstandard package to be installed')
+        return cast(bytes, zstandard.ZstdCompressor().compress(data))
+    else:
+        raise ValueError('unsupported codec %d' % codec)
+
+
+def _decompress(codec: int, data: bytes) -> bytes:
+    if codec == CODEC_NONE:
+        return data
+    elif codec == CODEC_GZIP:
+        return gzip.decompress(data)
+    elif codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError('zstd compressed results require the zstandard package to be installed')
+        return cast(bytes, zstandard.ZstdDecompressor().decompress(data))
+    else:
+        raise ValueError('unsupported codec %d' % codec)
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, bytes):
+        # HexBytes.hex() adds a 0x prefix, therefore convert to plain bytes first
+        return {'$b': bytes(value).hex()}
+    elif isinstance(value, (list, tuple)):
+        return [_encode_value(v) for v in value]
+    elif hasattr(value, 'items'):
+        return {str(k): _encode_value(v) for k, v in value.items()}
+    else:
+        return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if len(value) == 1 and '$b' in value:
+            return HexBytes(bytes.fromhex(value['$b']))
+        return {k: _decode_value(v) for k, v in value.items()}
+    elif isinstance(value, list):
+        return [_decode_value(v) for v in value]
+    else:
+        return value
+
+
+class SimulationResultFileWriter(object):
+    def __init__(self, fp: BinaryIO, compression: str = 'gzip', block_size: int = DEFAULT_BLOCK_SIZE) -> None:
+        """Write simulation results in the columnar result file format.
+
+        Args:
+            fp (BinaryIO): Binary stream the result is written to. Seeking is not required.
+            compression (str): Block compression codec (`gzip`, `zstd` or `none`)
+            block_size (int): Number of rows collected per table before a block is written
+        """
+        if compression not in CODECS:
+            raise ValueError('unsupported compression codec "%s"' % compression)
+        if compression == 'zstd' and zstandard is None:
+            raise RuntimeError('zstd compression requires the zstandard package to be installed')
+
+        self._fp = fp
+        self._codec = CODECS[compression]
+        self._block_size = block_size
+        self._offset = 0
+        self._block_index: List[Tuple[int, int, int, int]] = []
+        self._rows: Dict[int, List[Tuple[Any, ...]]] = {table: [] for table in TABLE_COLUMNS.keys()}
+        self._account_ids: Dict[Account, int] = {}
+        self._choice_ids: Dict[Choice, int] = {}
+        self._node_ids: Dict[int, int] = {}  # indexed by id() of the (unhashable) result nodes
+        self._list_count = 0
+        self._closed = False
+
+        self._write(_HEADER.pack(MAGIC, FORMAT_VERSION, self._codec, 0))
+
+    def __enter__(self) -> 'SimulationResultFileWriter':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def begin(self, operator: Account, seller: Account, buyer: Account) -> None:
+        """Write the result metadata. Needs to be called before any nodes or transactions are added."""
+        self._add_row(TABLE_METADATA, ('format_version', FORMAT_VERSION))
+        for key, account in ('operator', operator), ('seller', seller), ('buyer', buyer):
+            self._add_row(TABLE_METADATA, (key, self._account_id(account)))
+        # metadata should be readable even if the writer does not finish properly
+        self._flush_table(TABLE_METADATA)
+        self._flush_table(TABLE_ACCOUNTS)
+
+    def add_metadata(self, key: str, value: Any) -> None:
+        """Add additional (JSON serializable) metadata, e.g. the simulation configuration."""
+        self._add_row(TABLE_METADATA, (key, value))
+
+    def add_node(self, node: ResultNode, decision: Optional[Decision] = None) -> int:
+        """Register a result node (if not already done) and return its id."""
+        node_id = self._node_ids.get(id(node))
+        if node_id is not None:
+            return node_id
+
+        if node.parent is None:
+            parent_id = -1
+        else:
+            parent_id = self.add_node(node.parent)
+            if decision is None:
+                decision = list(node.parent.children.keys())[list(node.parent.children.values()).index(node)]
+
+        # decisions are identified by the id of the node they are leading to
+        node_id = len(self._node_ids)
+        self._node_ids[id(node)] = node_id
+        if decision is not None:
+            self._add_row(TABLE_DECISIONS, (node_id, self._choice_id(decision.choice), decision.outcome,
+                                            decision.timestamp))
+        self._add_row(TABLE_NODES, (node_id, parent_id, node_id if decision is not None else -1))
+        return node_id
+
+    def add_transaction_list(self, phase: int, tx_log_list: TransactionLogList,
+                             node: Optional[ResultNode] = None) -> None:
+        """Add a (completed) transaction list, either of a result node or of the preparation/cleanup phase."""
+        node_id = -1 if node is None else self.add_node(node)
+        list_id = self._list_count
+        self._list_count += 1
+        self._add_row(TABLE_TRANSACTION_LISTS, (list_id, phase, node_id, len(tx_log_list)))
+
+        for tx in tx_log_list:
+            self._add_row(TABLE_TRANSACTIONS, (
+                list_id,
+                self._account_id(tx.account),
+                tx.description,
+                _encode_value(tx.tx_dict),
+                _encode_value(tx.tx_receipt),
+                [[self._account_id(account), value] for account, value in tx.funds_diff_collection.items()],
+                [[self._account_id(account), value] for account, value in tx.item_share_collection.items()]
+            ))
+
+        for entry in tx_log_list.aggregation.values():
+            self._add_row(TABLE_AGGREGATIONS, (
+                list_id,
+                self._account_id(entry.account),
+                entry.tx_fees,
+                entry.tx_count,
+                entry.funds_diff,
+                entry.balance_diff,
+                entry.item_share
+            ))
+
+    def write_simulation_result(self, simulation_result: SimulationResult) -> None:
+        """Write a complete in-memory simulation result."""
+        self.begin(simulation_result.operator, simulation_result.seller, simulation_result.buyer)
+        self.add_transaction_list(PHASE_PREPARATION, simulation_result.preparation_transactions)
+
+        nodes = [simulation_result.execution_result_root]
+        while len(nodes):
+            node = nodes.pop(0)
+            self.add_node(node)
+            for tx_log_list in node.tx_collection:
+                self.add_transaction_list(PHASE_EXECUTION, tx_log_list, node)
+            nodes.extend(node.children.values())
+
+        self.add_transaction_list(PHASE_CLEANUP, simulation_result.cleanup_transactions)
+        self.write_summary(simulation_result.summary)
+        if simulation_result.trace is not None:
+            self.add_metadata('trace', simulation_result.trace)
+
+    def write_summary(self, summary: SimulationResultSummary) -> None:
+        """Write the summary of the final nodes. Needs to be called once after all nodes have been completed."""
+        for node in summary.final_nodes:
+            self._add_row(TABLE_SUMMARY, (
+                node.all_accounts_completely_honest(),
+                [self._account_id(account) for account in node.dishonest_accounts],
+                [[self._account_id(entry.account)] + [getattr(entry, field) for field in _SUMMARY_FIELDS]
+                 for entry in node.aggregation_summary.values()]
+            ))
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        for table in TABLE_COLUMNS.keys():
+            self._flush_table(table)
+        footer = json.dumps({'blocks': self._block_index}).encode('utf-8')
+        footer_offset = self._offset
+        self._write(footer)
+        self._write(_TRAILER.pack(footer_offset, END_MAGIC))
+        self._fp.flush()
+        self._closed = True
+
+    def _account_id(self, account: Account) -> int:
+        account_id = self._account_ids.get(account)
+        if account_id is None:
+            account_id = len(self._account_ids)
+            self._account_ids[account] = account_id
+            self._add_row(TABLE_ACCOUNTS, (account_id, account.name, bytes(account.wallet_private_key).hex()))
+        return account_id
+
+    def _choice_id(self, choice: Choice) -> int:
+        choice_id = self._choice_ids.get(choice)
+        if choice_id is None:
+            choice_id = len(self._choice_ids)
+            self._choice_ids[choice] = choice_id
+            self._add_row(TABLE_CHOICES, (choice_id, self._account_id(choice.subject), choice.description,
+                                          list(choice.options), list(choice.honest_options)))
+        return choice_id
+
+    def _add_row(self, table: int, row: Tuple[Any, ...]) -> None:
+        rows = self._rows[table]
+        rows.append(row)
+        if len(rows) >= self._block_size:
+            self._flush_table(table)
+
+    def _flush_table(self, table: int) -> None:
+        # rows referenced by other tables have to be written first
+        for dependency in range(table):
+            if len(self._rows[dependency]):
+                self._flush_table(dependency)
+
+        rows = self._rows[table]
+        if len(rows) == 0:
+            return
+        columns = TABLE_COLUMNS[table]
+        payload = _compress(self._codec, json.dumps(
+            {column: [row[index] for row in rows] for index, column in enumerate(columns)},
+            separators=(',', ':')
+        ).encode('utf-8'))
+        self._block_index.append((table, self._offset, len(payload), len(rows)))
+        self._write(_BLOCK_HEADER.pack(table, len(rows), len(payload)))
+        self._write(payload)
+        self._rows[table] = []
+
+    def _write(self, data: bytes) -> None:
+        self._fp.write(data)
+        self._offset += len(data)
+
+
+class SimulationResultFileReader(object):
+    def __init__(self, source: Union[str, bytes]) -> None:
+        """Read simulation results written in the columnar result file format.
+
+        Args:
+            source (Union[str, bytes]): Path of the result file (will be memory-mapped) or the file contents
+        """
+        self._mmap: Optional[mmap.mmap] = None
+        if isinstance(source, str):
+            with open(source, 'rb') as fp:
+                self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            self._data = memoryview(cast(bytes, self._mmap))
+        else:
+            self._data = memoryview(source)
+
+        if len(self._data) < _HEADER.size or not is_simulation_result_file(self._data):
+            raise ValueError('not a simulation result file')
+        magic, self._version, self._codec, _ = _HEADER.unpack_from(self._data, 0)
+        if self._version > FORMAT_VERSION:
+            raise ValueError('unsupported result file version %d' % self._version)
+
+        self._block_index = self._read_block_index()
+        self._metadata: Optional[Dict[str, Any]] = None
+        self._accounts: Optional[Dict[int, Account]] = None
+
+    def __enter__(self) -> 'SimulationResultFileReader':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._data.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    @property
+    def version(self) -> int:
+        return cast(int, self._version)
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        if self._metadata is None:
+            self._metadata = {row['key']: row['value'] for row in self.iter_rows(TABLE_METADATA)}
+        return self._metadata
+
+    @property
+    def accounts(self) -> Dict[int, Account]:
+        if self._accounts is None:
+            self._accounts = {
+                row['id']: Account(row['name'], row['private_key']) for row in self.iter_rows(TABLE_ACCOUNTS)
+            }
+        return self._accounts
+
+    def has_table(self, table: int) -> bool:
+        return any(block[0] == table for block in self._block_index)
+
+    @property
+    def has_summary(self) -> bool:
+        return self.has_table(TABLE_SUMMARY)
+
+    def iter_rows(self, table: int) -> Generator[Dict[str, Any], None, None]:
+        """Iterate over the rows of a table, decoding only the blocks belonging to this table."""
+        columns = TABLE_COLUMNS[table]
+        for block_table, offset, length, row_count in self._block_index:
+            if block_table != table:
+                continue
+            payload_offset = offset + _BLOCK_HEADER.size
+            block = json.loads(_decompress(self._codec, bytes(self._data[payload_offset:payload_offset + length])))
+            values = [block[column] for column in columns]
+            for row_index in range(row_count):
+                yield {column: values[index][row_index] for index, column in enumerate(columns)}
+
+    def load(self, include_transactions: bool = True) -> SimulationResult:
+        """Load the simulation result.
+
+        Args:
+            include_transactions (bool): Load individual transactions. If `False`, transaction lists remain empty but
+                carry their precomputed aggregation, which is sufficient for all aggregation based evaluations.
+
+        Returns:
+            SimulationResult: the loaded simulation result
+        """
+        accounts = self.accounts
+        simulation_result = SimulationResult(
+            operator=accounts[self.metadata['operator']],
+            seller=accounts[self.metadata['seller']],
+            buyer=accounts[self.metadata['buyer']]
+        )
+
+        choices: Dict[int, Choice] = {}
+        for row in self.iter_rows(TABLE_CHOICES):
+            choices[row['id']] = Choice(
+                subject=accounts[row['subject']],
+                options=tuple(row['options']),
+                honest_options=tuple(row['honest_options']),
+                description=row['description']
+            )
+
+        decisions: Dict[int, Decision] = {}
+        for row in self.iter_rows(TABLE_DECISIONS):
+            decisions[row['id']] = Decision(choices[row['choice']], row['outcome'], row['timestamp'])
+
+        nodes: Dict[int, ResultNode] = {}
+        for row in self.iter_rows(TABLE_NODES):
+            if row['parent'] == -1:
+                node = simulation_result.execution_result_root
+            else:
+                node = nodes[row['parent']].child(decisions[row['decision']])
+            nodes[row['id']] = node
+
+        tx_log_lists: Dict[int, TransactionLogList] = {}
+        for row in self.iter_rows(TABLE_TRANSACTION_LISTS):
+            if row['phase'] == PHASE_PREPARATION:
+                tx_log_list = simulation_result.preparation_transactions
+            elif row['phase'] == PHASE_CLEANUP:
+                tx_log_list = simulation_result.cleanup_transactions
+            else:
+                tx_log_list = TransactionLogList()
+                nodes[row['node']].tx_collection.append(tx_log_list)
+            tx_log_lists[row['id']] = tx_log_list
+
+        if include_transactions:
+            for row in self.iter_rows(TABLE_TRANSACTIONS):
+                tx_log_lists[row['list']].append(TransactionLogEntry(
+                    account=accounts[row['account']],
+                    tx_dict=_decode_value(row['tx_dict']),
+                    tx_receipt=_decode_value(row['tx_receipt']),
+                    description=row['description'],
+                    funds_diff_collection=FundsDiffCollection({accounts[a]: v for a, v in row['funds_diff']}),
+                    item_share_collection=ItemShareCollection({accounts[a]: v for a, v in row['item_share']})
+                ))
+        else:
+            aggregations: Dict[int, TransactionLogList.Aggregation] = {}
+            for row in self.iter_rows(TABLE_AGGREGATIONS):
+                aggregation = aggregations.get(row['list'])
+                if aggregation is None:
+                    aggregation = TransactionLogList.Aggregation(TransactionLogList())
+                    aggregations[row['list']] = aggregation
+                account = accounts[row['account']]
+                aggregation[account] = TransactionLogList.Aggregation.Entry(
+                    account, row['tx_fees'], row['tx_count'], row['funds_diff'], row['balance_diff'],
+                    row['item_share']
+                )
+            for list_id, tx_log_list in tx_log_lists.items():
+                aggregation = aggregations.get(list_id)
+                if aggregation is None:
+                    aggregation = TransactionLogList.Aggregation(TransactionLogList())
+                tx_log_list.aggregation = aggregation
+
+        simulation_result.trace = self.metadata.get('trace')
+        return simulation_result
+
+    def load_summary(self) -> SimulationResultSummary:
+        """Load the summary of the simulation result.
+
+        Only the summary table is read. For files without summary (e.g. aborted simulations), the summary is computed
+        from the result tree, loaded without individual transactions.
+
+        Returns:
+            SimulationResultSummary: the loaded simulation result summary
+        """
+        if not self.has_summary:
+            return self.load(include_transactions=False).summary
+
+        accounts = self.accounts
+        final_nodes = []
+        for row in self.iter_rows(TABLE_SUMMARY):
+            aggregation_summary = TransactionLogCollection.Aggregation(TransactionLogCollection())
+            for values in row['aggregation']:
+                account = accounts[values[0]]
+                aggregation_summary[account] = TransactionLogCollection.Aggregation.Entry(account, *values[1:])
+            final_nodes.append(ResultNodeSummary(
+                all_honest=row['all_honest'],
+                honesty={accounts[account_id]: False for account_id in row['dishonest_accounts']},
+                aggregation_summary=aggregation_summary
+            ))
+        return SimulationResultSummary(
+            operator=accounts[self.metadata['operator']],
+            seller=accounts[self.metadata['seller']],
+            buyer=accounts[self.metadata['buyer']],
+            final_nodes=final_nodes
+        )
+
+    def _read_block_index(self) -> List[Tuple[int, int, int, int]]:
+        if len(self._data) >= _HEADER.size + _TRAILER.size:
+            footer_offset, end_magic = _TRAILER.unpack_from(self._data, len(self._data) - _TRAILER.size)
+            if end_magic == END_MAGIC:
+                footer = json.loads(bytes(self._data[footer_offset:len(self._data) - _TRAILER.size]))
+                return [cast(Tuple[int, int, int, int], tuple(block)) for block in footer['blocks']]
+
+        # footer missing (e.g. aborted simulation): scan all complete blocks
+        block_index = []
+        offset = _HEADER.size
+        while offset + _BLOCK_HEADER.size <= len(self._data):
+            table, row_count, length = _BLOCK_HEADER.unpack_from(self._data, offset)
+            if table not in TABLE_COLUMNS or offset + _BLOCK_HEADER.size + length > len(self._data):
+                break
+            block_index.append((table, offset, length, row_count))
+            offset += _BLOCK_HEADER.size + length
+        return block_index
+
+
+class SimulationResultFileSerializer(object):
+    def __init__(self, compression: str = 'gzip', block_size: int = DEFAULT_BLOCK_SIZE) -> None:
+        self._compression = compression
+        self._block_size = block_size
+
+    def create_writer(self, fp: BinaryIO) -> SimulationResultFileWriter:
+        return SimulationResultFileWriter(fp, self._compression, self._block_size)
+
+    def serialize(self, simulation_result: SimulationResult) -> bytes:
+        output = io.BytesIO()
+        with self.create_writer(output) as writer:
+            writer.write_simulation_result(simulation_result)
+        return output.getvalue()
+
+    def unserialize(self, data: bytes) -> SimulationResult:
+        with SimulationResultFileReader(data) as reader:
+            return reader.load()
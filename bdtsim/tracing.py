@@ -0,0 +1,198 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Span based tracing of simulation phases.
+
+Spans are recorded by the module-level active tracer only. While no tracer is active, `span` returns a shared no-op
+span, so instrumented code paths cost a function call per span. Traces are exported in the Chrome trace event format,
+which can be viewed in chrome://tracing, Perfetto or speedscope.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Generator, List, Optional, TextIO
+
+
+CATEGORY_SIMULATION = 'simulation'
+CATEGORY_PROTOCOL = 'protocol'
+CATEGORY_ENVIRONMENT = 'environment'
+CATEGORY_COMPILE = 'compile'
+CATEGORY_RENDER = 'render'
+
+
+class Span(object):
+    def __init__(self, tracer: 'Tracer', name: str, category: str, args: Dict[str, Any]) -> None:
+        """Timed section of a trace, recorded by its tracer when the span is exited.
+
+        Args:
+            tracer (Tracer): Tracer recording the span
+            name (str): Span name, e.g. `send_transaction`
+            category (str): Span category, i.e. the instrumented layer
+            args (Dict[str, Any]): Additional (JSON serializable) information shown with the span
+        """
+        self._tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0.0
+        self.duration = 0.0
+        self.thread_id = 0
+
+    def set(self, key: str, value: Any) -> None:
+        """Add information to the span which is only known after it was started, e.g. a transaction hash."""
+        self.args[key] = value
+
+    def __enter__(self) -> 'Span':
+        self.thread_id = threading.get_ident()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, *args: Any) -> None:
+        self.duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self._tracer.record(self)
+
+
+class NoOpSpan(object):
+    """Span returned while tracing is disabled."""
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> 'NoOpSpan':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+
+_NO_OP_SPAN = NoOpSpan()
+
+
+class Tracer(object):
+    def __init__(self) -> None:
+        """Collects the spans of all threads of the current process."""
+        self._origin = time.perf_counter()
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    @property
+    def spans(self) -> List[Span]:
+        return list(self._spans)
+
+    def span(self, name: str, category: str, **args: Any) -> Span:
+        return Span(self, name, category, args)
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Export the recorded spans as complete (`X`) events of the Chrome trace event format.
+
+        Returns:
+            Dict[str, Any]: JSON serializable trace, timestamps are microseconds since the tracer was created
+        """
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = []
+        for span in sorted(self.spans, key=lambda s: s.start):
+            events.append({
+                'name': span.name,
+                'cat': span.category,
+                'ph': 'X',
+                'ts': round((span.start - self._origin) * 1e6, 3),
+                'dur': round(span.duration * 1e6, 3),
+                'pid': pid,
+                'tid': span.thread_id,
+                'args': span.args
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write(self, fp: TextIO) -> None:
+        json.dump(self.to_chrome_trace(), fp, default=str)
+
+    def get_summary(self) -> Dict[str, Dict[str, float]]:
+        return summarize_trace(self.to_chrome_trace())
+
+
+def summarize_trace(trace: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """Aggregate the span durations of a Chrome trace per span name.
+
+    Args:
+        trace (Dict[str, Any]): Trace as returned by `Tracer.to_chrome_trace`
+
+    Returns:
+        Dict[str, Dict[str, float]]: count, total, mean and max duration (in seconds) per span name, in order of the
+            first occurrence
+    """
+    summary: Dict[str, Dict[str, float]] = {}
+    for event in trace.get('traceEvents', []):
+        if event.get('ph') != 'X':
+            continue
+        duration = float(event['dur']) / 1e6
+        entry = summary.setdefault(event['name'], {'count': 0, 'total': 0.0, 'mean': 0.0, 'max': 0.0})
+        entry['count'] += 1
+        entry['total'] += duration
+        entry['max'] = max(entry['max'], duration)
+    for entry in summary.values():
+        entry['mean'] = entry['total'] / entry['count']
+    return summary
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Optional[Tracer]:
+    """Get the active tracer, None if tracing is disabled."""
+    return _tracer
+
+
+def span(name: str, category: str, **args: Any) -> Any:
+    """Create a span of the active tracer, to be used as context manager.
+
+    Args:
+        name (str): Span name
+        category (str): Span category, one of the `CATEGORY_*` constants
+        **args (Any): Additional (JSON serializable) information shown with the span
+
+    Returns:
+        Union[Span, NoOpSpan]: the span, a shared no-op span if tracing is disabled
+    """
+    if _tracer is None:
+        return _NO_OP_SPAN
+    return _tracer.span(name, category, **args)
+
+
+@contextlib.contextmanager
+def tracing(tracer: Optional[Tracer] = None) -> Generator[Tracer, None, None]:
+    """Activate a tracer for the enclosed code, restoring the previously active tracer afterwards.
+
+    Args:
+        tracer (Optional[Tracer]): Tracer to be activated, a new one if not given
+    """
+    global _tracer
+    previous = _tracer
+    active = tracer or Tracer()
+    _tracer = active
+    try:
+        yield active
+    finally:
+        _tracer = previous
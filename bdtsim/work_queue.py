@@ -0,0 +1,256 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Job queue in a shared directory, for distributing bulk executions across hosts.
+
+The work directory contains one JSON file per job in one of the following subdirectories:
+
+  * `pending`: jobs waiting for a worker
+  * `claimed`: jobs being executed. Workers claim jobs by renaming them from `pending` to `claimed`, which succeeds for
+    exactly one worker. The modification time of a claimed job file is its lease, which is renewed by the executing
+    worker. Jobs with an expired lease (crashed or disconnected workers) are moved back to `pending`.
+  * `done`: results of finished (succeeded, or failed after all attempts) jobs
+
+All files are written atomically, so the work directory can be shared via any filesystem with atomic renames (e.g.
+local filesystems and NFS).
+"""
+
+import json
+import logging
+import os
+import socket
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from bdtsim.bulk_manifest import write_atomic
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_DURATION = 60.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+PENDING_DIRECTORY = 'pending'
+CLAIMED_DIRECTORY = 'claimed'
+DONE_DIRECTORY = 'done'
+
+STATUS_SUCCESS = 'success'
+STATUS_FAILED = 'failed'
+
+
+def default_worker_id() -> str:
+    return '%s:%i' % (socket.gethostname(), os.getpid())
+
+
+class WorkQueue(object):
+    def __init__(self, work_directory: str) -> None:
+        """Job queue within a (shared) work directory.
+
+        Args:
+            work_directory (str): Work directory, created if not existing
+        """
+        self._work_directory = work_directory
+        for directory in (PENDING_DIRECTORY, CLAIMED_DIRECTORY, DONE_DIRECTORY):
+            os.makedirs(os.path.join(work_directory, directory), exist_ok=True)
+
+    @property
+    def work_directory(self) -> str:
+        return self._work_directory
+
+    def _path(self, directory: str, job_id: str) -> str:
+        return os.path.join(self._work_directory, directory, '%s.json' % job_id)
+
+    def _list(self, directory: str) -> List[str]:
+        return sorted(filename[:-5] for filename in os.listdir(os.path.join(self._work_directory, directory))
+                      if filename.endswith('.json'))
+
+    @staticmethod
+    def _read(path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, 'r') as fp:
+                data = json.load(fp)
+        except (OSError, ValueError):
+            return None
+        return data if isinstance(data, dict) else None
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def put(self, job_id: str, job: Dict[str, Any], lease_duration: float = DEFAULT_LEASE_DURATION,
+            max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> None:
+        """Add a job to the queue, replacing the result of a previous execution.
+
+        Jobs are claimed in the order of their IDs. A job currently claimed by a worker is not added again.
+
+        Args:
+            job_id (str): Job ID, used as filename
+            job (Dict[str, Any]): Job description (JSON serializable)
+            lease_duration (float): Time (in seconds) after which a job is considered abandoned if its executing
+                worker does not renew the lease
+            max_attempts (int): Number of executions before a job is considered failed
+        """
+        self._remove(self._path(DONE_DIRECTORY, job_id))
+        if os.path.exists(self._path(CLAIMED_DIRECTORY, job_id)):
+            return
+        write_atomic(self._path(PENDING_DIRECTORY, job_id), json.dumps({
+            'job': job,
+            'attempts': 0,
+            'max_attempts': max_attempts,
+            'lease_duration': lease_duration,
+            'errors': []
+        }, indent=2, default=str).encode('utf-8'))
+
+    def claim(self, worker_id: Optional[str] = None) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Claim the next pending job.
+
+        Args:
+            worker_id (Optional[str]): ID of the claiming worker, recorded in the job file
+
+        Returns:
+            Optional[Tuple[str, Dict[str, Any]]]: job ID and job file contents, None if there are no pending jobs
+        """
+        for job_id in self._list(PENDING_DIRECTORY):
+            pending_path = self._path(PENDING_DIRECTORY, job_id)
+            claimed_path = self._path(CLAIMED_DIRECTORY, job_id)
+            try:
+                # start the lease before the rename, so the job is never claimed with an expired lease
+                os.utime(pending_path)
+                os.rename(pending_path, claimed_path)
+            except FileNotFoundError:
+                continue  # claimed by another worker
+            job_file = self._read(claimed_path)
+            if job_file is None:
+                continue
+            job_file['worker'] = worker_id or default_worker_id()
+            write_atomic(claimed_path, json.dumps(job_file, indent=2, default=str).encode('utf-8'))
+            return job_id, job_file
+        return None
+
+    def renew(self, job_id: str) -> bool:
+        """Renew the lease of a claimed job.
+
+        Returns:
+            bool: False if the job is not claimed anymore (e.g. since the lease expired)
+        """
+        try:
+            os.utime(self._path(CLAIMED_DIRECTORY, job_id))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def complete(self, job_id: str, job_file: Dict[str, Any], result: Dict[str, Any]) -> bool:
+        """Finish a claimed job successfully.
+
+        Args:
+            job_id (str): Job ID
+            job_file (Dict[str, Any]): Job file contents as returned by `claim`
+            result (Dict[str, Any]): Result data (JSON serializable)
+
+        Returns:
+            bool: False if the job was not claimed anymore (the result is recorded anyway)
+        """
+        return self._finish(job_id, job_file, STATUS_SUCCESS, result)
+
+    def fail(self, job_id: str, job_file: Dict[str, Any], error: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        """Record a failed execution of a claimed job, which is retried until reaching its maximum number of attempts.
+
+        Args:
+            job_id (str): Job ID
+            job_file (Dict[str, Any]): Job file contents as returned by `claim`
+            error (str): Error message
+            result (Optional[Dict[str, Any]]): Result data (JSON serializable)
+
+        Returns:
+            bool: True if the job will be retried
+        """
+        return self._fail(job_id, job_file, error, result, self._path(CLAIMED_DIRECTORY, job_id))
+
+    def _fail(self, job_id: str, job_file: Dict[str, Any], error: str, result: Optional[Dict[str, Any]],
+              claimed_path: str) -> bool:
+        job_file = dict(job_file, attempts=int(job_file.get('attempts', 0)) + 1,
+                        errors=list(job_file.get('errors', [])) + [error])
+        job_file.pop('worker', None)
+        if job_file['attempts'] < int(job_file.get('max_attempts', DEFAULT_MAX_ATTEMPTS)):
+            logger.info('job %s failed (attempt %i), scheduling retry: %s' % (job_id, job_file['attempts'], error))
+            write_atomic(self._path(PENDING_DIRECTORY, job_id),
+                         json.dumps(job_file, indent=2, default=str).encode('utf-8'))
+            self._remove(claimed_path)
+            return True
+        self._finish(job_id, job_file, STATUS_FAILED, dict(result or {}, error=error), claimed_path)
+        return False
+
+    def _finish(self, job_id: str, job_file: Dict[str, Any], status: str, result: Dict[str, Any],
+                claimed_path: Optional[str] = None) -> bool:
+        write_atomic(self._path(DONE_DIRECTORY, job_id), json.dumps({
+            'status': status,
+            'worker': job_file.get('worker'),
+            'attempts': int(job_file.get('attempts', 0)) + (1 if status == STATUS_SUCCESS else 0),
+            'errors': job_file.get('errors', []),
+            'result': result
+        }, indent=2, default=str).encode('utf-8'))
+        return self._remove(claimed_path or self._path(CLAIMED_DIRECTORY, job_id))
+
+    def requeue_expired(self) -> List[str]:
+        """Move claimed jobs with expired leases back to the pending jobs (or mark them failed after the last attempt).
+
+        Returns:
+            List[str]: IDs of the affected jobs
+        """
+        expired = []
+        now = time.time()
+        for job_id in self._list(CLAIMED_DIRECTORY):
+            claimed_path = self._path(CLAIMED_DIRECTORY, job_id)
+            job_file = self._read(claimed_path)
+            try:
+                lease_age = now - os.path.getmtime(claimed_path)
+            except FileNotFoundError:
+                continue
+            if job_file is None or lease_age <= float(job_file.get('lease_duration', DEFAULT_LEASE_DURATION)):
+                continue
+            # rename first, so that only one process requeues the job
+            expired_path = '%s.%s.expired' % (claimed_path, default_worker_id())
+            try:
+                os.rename(claimed_path, expired_path)
+            except FileNotFoundError:
+                continue
+            logger.warning('lease of job %s (worker %s) expired' % (job_id, str(job_file.get('worker'))))
+            self._fail(job_id, job_file, 'lease expired (worker %s)' % str(job_file.get('worker')), None,
+                       expired_path)
+            expired.append(job_id)
+        return expired
+
+    def clear(self) -> None:
+        """Remove all pending jobs and results (jobs currently claimed by workers are kept)."""
+        for directory in (PENDING_DIRECTORY, DONE_DIRECTORY):
+            for job_id in self._list(directory):
+                self._remove(self._path(directory, job_id))
+
+    def get_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get the result of a finished job, None if the job is not finished (yet)."""
+        return self._read(self._path(DONE_DIRECTORY, job_id))
+
+    def get_finished(self) -> List[str]:
+        return self._list(DONE_DIRECTORY)
+
+    def get_counts(self) -> Dict[str, int]:
+        return {directory: len(self._list(directory))
+                for directory in (PENDING_DIRECTORY, CLAIMED_DIRECTORY, DONE_DIRECTORY)}
@@ -0,0 +1,348 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Process pool with per-task wall-clock and memory limits.
+
+In contrast to `multiprocessing.Pool`, each worker is connected to the parent process by its own pipe, so the parent
+always knows which task a worker is executing. Workers exceeding the wall-clock or RSS limit of their task are
+killed and replaced by fresh workers, the task fails with a `WorkerPoolError`, and all other tasks keep running.
+Workers dying during their initialization are replaced as well, pending tasks only fail after repeated failures.
+
+Tasks returning a generator stream their items to the parent process. The limits apply to each item separately, i.e.
+the deadline of a task is reset whenever an item is received.
+"""
+
+import inspect
+import logging
+import multiprocessing
+import os
+import pickle
+import time
+from multiprocessing.connection import Connection, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 0.5
+DEFAULT_MAX_INIT_FAILURES = 3
+
+_MESSAGE_READY = 'ready'
+_MESSAGE_ITEM = 'item'
+_MESSAGE_DONE = 'done'
+_MESSAGE_ERROR = 'error'
+
+
+class WorkerPoolError(Exception):
+    pass
+
+
+class TaskTimeoutError(WorkerPoolError):
+    pass
+
+
+class TaskMemoryError(WorkerPoolError):
+    pass
+
+
+class WorkerDiedError(WorkerPoolError):
+    pass
+
+
+def current_rss(pid: int) -> Optional[int]:
+    """Current resident set size of a process in bytes (only available on systems providing /proc)."""
+    try:
+        with open('/proc/%i/statm' % pid, 'r') as fp:
+            return int(fp.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _picklable_exception(error: BaseException) -> BaseException:
+    try:
+        pickle.dumps(error)
+        return error
+    except Exception:
+        return RuntimeError('%s: %s' % (type(error).__name__, str(error)))
+
+
+def _worker_main(connection: Connection, initializer: Optional[Callable[..., Any]], initargs: Tuple[Any, ...],
+                 max_tasks: Optional[int]) -> None:
+    if initializer is not None:
+        initializer(*initargs)
+    connection.send((_MESSAGE_READY, None))
+    completed_tasks = 0
+    while max_tasks is None or completed_tasks < max_tasks:
+        try:
+            task = connection.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if task is None:
+            break
+        func, kwargs = task
+        try:
+            result = func(**kwargs)
+            if inspect.isgenerator(result):
+                for item in result:
+                    connection.send((_MESSAGE_ITEM, item))
+            else:
+                connection.send((_MESSAGE_ITEM, result))
+            connection.send((_MESSAGE_DONE, None))
+        except Exception as e:
+            connection.send((_MESSAGE_ERROR, _picklable_exception(e)))
+        completed_tasks += 1
+    connection.close()
+
+
+class _Task(object):
+    def __init__(self, func: Callable[..., Any], kwargs: Dict[str, Any], callback: Optional[Callable[[Any], None]],
+                 error_callback: Optional[Callable[[BaseException, int], None]]) -> None:
+        self.func = func
+        self.kwargs = kwargs
+        self.callback = callback
+        self.error_callback = error_callback
+        self.items = 0
+
+
+class _Worker(object):
+    def __init__(self, process: multiprocessing.process.BaseProcess, connection: Connection) -> None:
+        self.process = process
+        self.connection = connection
+        self.ready = False
+        self.task: Optional[_Task] = None
+        self.deadline: Optional[float] = None
+        self.tasks_started = 0
+
+
+class WorkerPool(object):
+    def __init__(self, processes: int, initializer: Optional[Callable[..., Any]] = None,
+                 initargs: Tuple[Any, ...] = (), max_tasks_per_child: Optional[int] = None,
+                 task_timeout: Optional[float] = None, max_rss: Optional[int] = None,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 max_init_failures: int = DEFAULT_MAX_INIT_FAILURES) -> None:
+        """Create a worker pool.
+
+        Args:
+            processes (int): Number of worker processes
+            initializer (Optional[Callable[..., Any]]): Function called by each worker process on start
+            initargs (Tuple[Any, ...]): Arguments for the initializer
+            max_tasks_per_child (Optional[int]): Number of tasks after which a worker is replaced, None for no limit
+            task_timeout (Optional[float]): Wall-clock limit (in seconds) of a task, or of a single item for tasks
+                returning a generator
+            max_rss (Optional[int]): Limit for the resident set size (in bytes) of a worker process
+            poll_interval (float): Interval (in seconds) for checking the limits
+            max_init_failures (int): Number of consecutive worker processes dying during initialization after which
+                all pending tasks fail (dead workers are replaced until then)
+        """
+        if processes < 1:
+            raise ValueError('processes must be >= 1')
+        self._processes = processes
+        self._initializer = initializer
+        self._initargs = initargs
+        self._max_tasks_per_child = max_tasks_per_child
+        self._task_timeout = task_timeout
+        self._max_rss = max_rss
+        self._poll_interval = poll_interval
+        self._max_init_failures = max_init_failures
+        self._init_failures = 0
+        self._context = multiprocessing.get_context()
+        self._workers: List[_Worker] = []
+        self._pending: List[_Task] = []
+        self._closed = False
+
+    def __enter__(self) -> 'WorkerPool':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.terminate()
+
+    @property
+    def running(self) -> int:
+        """Number of tasks currently being executed."""
+        return len([worker for worker in self._workers if worker.task is not None])
+
+    @property
+    def pending(self) -> int:
+        """Number of tasks waiting for a free worker."""
+        return len(self._pending)
+
+    def submit(self, func: Callable[..., Any], kwargs: Optional[Dict[str, Any]] = None,
+               callback: Optional[Callable[[Any], None]] = None,
+               error_callback: Optional[Callable[[BaseException, int], None]] = None) -> None:
+        """Submit a task. May also be called from within callbacks.
+
+        Args:
+            func (Callable[..., Any]): Function to be executed (needs to be picklable)
+            kwargs (Optional[Dict[str, Any]]): Keyword arguments for the function
+            callback (Optional[Callable[[Any], None]]): Called with the result, or with each item for functions
+                returning a generator
+            error_callback (Optional[Callable[[BaseException, int], None]]): Called with the error and the number of
+                items received before the error occurred
+        """
+        if self._closed:
+            raise RuntimeError('worker pool is closed')
+        self._pending.append(_Task(func, kwargs or {}, callback, error_callback))
+
+    def join(self) -> None:
+        """Execute all submitted tasks (including tasks submitted by callbacks) and wait for their completion."""
+        while len(self._pending) or self.running:
+            self._dispatch()
+            connections = [w.connection for w in self._workers if w.task is not None or not w.ready]
+            for connection in wait(connections, timeout=self._poll_interval):
+                worker = next((w for w in self._workers if w.connection is connection), None)
+                if worker is not None:
+                    self._receive(worker)
+            self._check_limits()
+
+    def close(self) -> None:
+        """Stop all (idle) workers after all tasks have been executed."""
+        self.join()
+        self._closed = True
+        for worker in self._workers:
+            try:
+                worker.connection.send(None)
+            except (OSError, ValueError):
+                pass
+        for worker in self._workers:
+            worker.process.join()
+            worker.connection.close()
+        self._workers = []
+
+    def terminate(self) -> None:
+        """Kill all workers immediately, dropping pending and running tasks."""
+        self._closed = True
+        self._pending = []
+        for worker in self._workers:
+            self._kill(worker)
+        self._workers = []
+
+    def _start_worker(self) -> _Worker:
+        parent_connection, child_connection = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_connection, self._initializer, self._initargs, self._max_tasks_per_child),
+            daemon=True
+        )
+        process.start()
+        child_connection.close()
+        worker = _Worker(process, parent_connection)
+        self._workers.append(worker)
+        return worker
+
+    def _kill(self, worker: _Worker) -> None:
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join()
+        worker.connection.close()
+
+    def _dispatch(self) -> None:
+        # replace workers which exited after reaching max_tasks_per_child
+        for exited_worker in list(self._workers):
+            if exited_worker.task is None and (not exited_worker.process.is_alive() or (
+                    self._max_tasks_per_child is not None
+                    and exited_worker.tasks_started >= self._max_tasks_per_child)):
+                self._workers.remove(exited_worker)
+                exited_worker.process.join()
+                exited_worker.connection.close()
+
+        while len(self._pending):
+            worker: Optional[_Worker] = next((w for w in self._workers if w.ready and w.task is None), None)
+            if worker is None:
+                # workers are started on demand, tasks are dispatched once a worker finished its initialization
+                if len(self._workers) < self._processes:
+                    self._start_worker()
+                    continue
+                return
+            task = self._pending.pop(0)
+            worker.task = task
+            worker.tasks_started += 1
+            worker.deadline = None if self._task_timeout is None else time.monotonic() + self._task_timeout
+            try:
+                worker.connection.send((task.func, task.kwargs))
+            except (OSError, ValueError, pickle.PicklingError) as e:
+                self._fail(worker, e, replace=not isinstance(e, pickle.PicklingError))
+
+    def _receive(self, worker: _Worker) -> None:
+        try:
+            message_type, payload = worker.connection.recv()
+        except (EOFError, OSError):
+            if not worker.ready:
+                self._init_failed(worker)
+                return
+            self._fail(worker, WorkerDiedError('worker process died (exit code %s)' % str(worker.process.exitcode)),
+                       replace=True)
+            return
+        task = worker.task
+        if message_type == _MESSAGE_READY:
+            worker.ready = True
+            self._init_failures = 0
+        elif task is None:
+            return
+        elif message_type == _MESSAGE_ITEM:
+            task.items += 1
+            if self._task_timeout is not None:
+                worker.deadline = time.monotonic() + self._task_timeout
+            if task.callback is not None:
+                task.callback(payload)
+        elif message_type == _MESSAGE_DONE:
+            worker.task = None
+            worker.deadline = None
+        else:
+            self._fail(worker, payload, replace=False)
+
+    def _init_failed(self, worker: _Worker) -> None:
+        # pending tasks are dispatched to a replacement worker, started on demand by the next dispatch
+        self._kill(worker)
+        self._workers.remove(worker)
+        self._init_failures += 1
+        error = WorkerDiedError('worker process died during initialization (exit code %s)'
+                                % str(worker.process.exitcode))
+        logger.warning('%s, attempt %i of %i' % (str(error), self._init_failures, self._max_init_failures))
+        if self._init_failures < self._max_init_failures:
+            return
+        self._init_failures = 0
+        pending, self._pending = self._pending, []
+        for task in pending:
+            if task.error_callback is not None:
+                task.error_callback(error, 0)
+
+    def _check_limits(self) -> None:
+        now = time.monotonic()
+        for worker in list(self._workers):
+            if worker.task is None:
+                continue
+            if worker.deadline is not None and now > worker.deadline:
+                self._fail(worker, TaskTimeoutError('task exceeded the time limit of %s seconds' % self._task_timeout),
+                           replace=True)
+                continue
+            if self._max_rss is not None:
+                rss = current_rss(worker.process.pid or 0)
+                if rss is not None and rss > self._max_rss:
+                    self._fail(worker, TaskMemoryError('worker exceeded the memory limit (RSS %i > %i bytes)' % (
+                        rss, self._max_rss
+                    )), replace=True)
+
+    def _fail(self, worker: _Worker, error: BaseException, replace: bool) -> None:
+        task = worker.task
+        worker.task = None
+        worker.deadline = None
+        if replace:
+            logger.warning('terminating worker process %s: %s' % (str(worker.process.pid), str(error)))
+            self._kill(worker)
+            self._workers.remove(worker)
+        if task is not None and task.error_callback is not None:
+            task.error_callback(error, task.items)
@@ -0,0 +1,82 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any, Callable, Optional
+from unittest import TestCase
+
+from bdtsim.benchmark import GROUP_MACRO, GROUP_MICRO, STATUS_FAILED, STATUS_FASTER, STATUS_NEW, STATUS_OK, \
+    STATUS_SLOWER, Benchmark, BenchmarkResult, compare_results, create_report, create_synthetic_result, \
+    get_benchmarks, get_report_results, run_benchmark, run_benchmarks
+
+
+def result(name: str, median: float, error: Optional[str] = None) -> BenchmarkResult:
+    return BenchmarkResult(name, GROUP_MICRO, {}, 1, 1, median, median, median, 0.0, error)
+
+
+class BenchmarkTest(TestCase):
+    def test_selection(self) -> None:
+        benchmarks = get_benchmarks(groups=[GROUP_MICRO], patterns=['merkle.*'], sizes=[1024], slices_counts=[4])
+        self.assertEqual(['merkle.build[size=1024,slices=4]', 'merkle.proof[size=1024,slices=4]'],
+                         [benchmark.name for benchmark in benchmarks])
+        macro_names = [benchmark.name for benchmark in get_benchmarks(groups=[GROUP_MACRO], depth=3)]
+        self.assertIn('simulation.SimplePayment-prepaid-direct[size=4096]', macro_names)
+        self.assertIn('render.payoff-matrix[depth=3]', macro_names)
+        self.assertTrue(all(name.startswith(('simulation.', 'render.')) for name in macro_names))
+
+    def test_run_micro_benchmarks(self) -> None:
+        benchmarks = get_benchmarks(groups=[GROUP_MICRO], sizes=[256], slices_counts=[4], depth=2)
+        results = list(run_benchmarks(benchmarks, rounds=2, warmup=0, min_time=0))
+        self.assertEqual([benchmark.name for benchmark in benchmarks], [r.name for r in results])
+        for benchmark_result in results:
+            self.assertIsNone(benchmark_result.error, benchmark_result.name)
+            self.assertEqual(2, benchmark_result.rounds)
+            self.assertLessEqual(benchmark_result.min, benchmark_result.median)
+
+    def test_run_macro_benchmarks(self) -> None:
+        benchmarks = get_benchmarks(groups=[GROUP_MACRO], patterns=['simulation.SimplePayment-prepaid-direct*',
+                                                                    'render.payoff-matrix*'], sizes=[64], depth=2)
+        self.assertEqual(2, len(benchmarks))
+        for benchmark_result in run_benchmarks(benchmarks, rounds=1, warmup=0):
+            self.assertIsNone(benchmark_result.error, benchmark_result.name)
+            self.assertEqual(1, benchmark_result.loops)
+
+    def test_failing_benchmark(self) -> None:
+        def setup() -> Callable[[], Any]:
+            raise ValueError('broken')
+
+        benchmark_result = run_benchmark(Benchmark('broken', GROUP_MICRO, setup, {}), rounds=1)
+        self.assertEqual('ValueError: broken', benchmark_result.error)
+
+    def test_synthetic_result(self) -> None:
+        simulation_result = create_synthetic_result(depth=3)
+        self.assertEqual(2 ** 3, len(simulation_result.execution_result_root.final_nodes))
+
+    def test_report(self) -> None:
+        results = [result('a', 1.0), result('b', 2.0, 'ValueError: broken')]
+        report = create_report(results, {'rounds': 1})
+        self.assertEqual(results, get_report_results(report))
+        self.assertIn('python_version', report['environment'])
+        self.assertRaises(ValueError, get_report_results, dict(report, format_version=-1))
+
+    def test_compare(self) -> None:
+        baseline = [result('ok', 1.0), result('slower', 1.0), result('faster', 1.0), result('failed', 1.0)]
+        current = [result('ok', 1.05), result('slower', 1.2), result('faster', 0.8), result('failed', 0, 'Error'),
+                   result('new', 1.0)]
+        self.assertEqual([
+            ('ok', STATUS_OK), ('slower', STATUS_SLOWER), ('faster', STATUS_FASTER), ('failed', STATUS_FAILED),
+            ('new', STATUS_NEW)
+        ], [(c.name, c.status) for c in compare_results(current, baseline, threshold=0.1)])
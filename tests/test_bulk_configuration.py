@@ -0,0 +1,80 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+
+from bdtsim.bulk_configuration import canonical_hash, expand_simulation_configurations, sweep_values
+
+
+class BulkConfigurationTest(TestCase):
+    def test_sweep_values(self) -> None:
+        self.assertEqual([4, 8, 12], sweep_values({'range': [4, 12, 4]}))
+        self.assertEqual([1, 2, 3], sweep_values({'range': [1, 3]}))
+        self.assertEqual([3, 1], sweep_values({'range': [3, 0, -2]}))
+        self.assertEqual([256, 512, 1024, 2048], sweep_values({'geom': [256, 2048, 2]}))
+        self.assertEqual(21, len(sweep_values({'geom': [256, 1048576 * 256, 2]})))
+        self.assertEqual(['a', 'b'], sweep_values({'values': ['a', 'b']}))
+        self.assertRaises(ValueError, sweep_values, {'range': [1, 3, 0]})
+        self.assertRaises(ValueError, sweep_values, {'geom': [1, 3]})
+        self.assertRaises(ValueError, sweep_values, {'values': []})
+
+    def test_expand(self) -> None:
+        configurations = list(expand_simulation_configurations([{
+            'protocol': {
+                'name': {'values': ['FairSwap', 'FairSwap-Reusable']},
+                'parameters': {'slices_count': {'geom': [4, 16, 2], 'zip': 'scale'}}
+            },
+            'data_provider': {
+                'name': 'RandomDataProvider',
+                'parameters': {'size': {'geom': [256, 1024, 2], 'zip': 'scale'}}
+            }
+        }]))
+        self.assertEqual(6, len(configurations))
+        self.assertEqual({
+            'protocol': {'name': 'FairSwap', 'parameters': {'slices_count': 8}},
+            'data_provider': {'name': 'RandomDataProvider', 'parameters': {'size': 512}},
+            'sweep': {
+                'protocol.name': 'FairSwap',
+                'protocol.parameters.slices_count': 8,
+                'data_provider.parameters.size': 512
+            }
+        }, configurations[1])
+        self.assertEqual('FairSwap-Reusable', configurations[3]['protocol']['name'])
+
+        self.assertRaises(ValueError, list, expand_simulation_configurations([{
+            'protocol': {'name': 'FairSwap', 'parameters': {'slices_count': {'values': [1, 2], 'zip': 'a'}}},
+            'price': {'values': [1, 2, 3], 'zip': 'a'}
+        }]))
+
+    def test_deduplication(self) -> None:
+        configurations = list(expand_simulation_configurations([
+            {'protocol': {'name': 'FairSwap', 'parameters': {'slices_count': {'range': [4, 8, 4]}}}},
+            {'protocol': {'name': 'FairSwap', 'parameters': {'slices_count': 8}}, 'description': 'duplicate'},
+            {'protocol': {'name': 'FairSwap', 'parameters': {'slices_count': 8}}, 'environment': {'name': 'PyEVM'}}
+        ]))
+        self.assertEqual(2, len(configurations))
+
+    def test_canonical_hash(self) -> None:
+        self.assertEqual(
+            canonical_hash({'protocol': {'name': 'FairSwap'}}),
+            canonical_hash({'protocol': {'name': 'FairSwap', 'parameters': {}}, 'environment': {'name': 'PyEVM'},
+                            'price': 1000000000000000000, 'account_file': None})
+        )
+        self.assertNotEqual(
+            canonical_hash({'protocol': {'name': 'FairSwap'}}),
+            canonical_hash({'protocol': {'name': 'FairSwap'}, 'price': 1})
+        )
@@ -0,0 +1,59 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import List
+from unittest import TestCase
+
+from bdtsim.bulk_progress import BulkProgress, JobReport, JobStatistics, count_paths_and_transactions
+from bdtsim.simulation_result import ResultNode
+from test_simulation_result_file import create_simulation_result
+
+
+class BulkProgressTest(TestCase):
+    def test_count_paths_and_transactions(self) -> None:
+        simulation_result = create_simulation_result()
+        path_count, transaction_count = count_paths_and_transactions(simulation_result)
+        self.assertEqual(len(simulation_result.execution_result_root.final_nodes), path_count)
+
+        def count_transactions(node: ResultNode) -> int:
+            return sum(len(tx_list) for tx_list in node.tx_collection) + sum(
+                count_transactions(child) for child in node.children.values()
+            )
+
+        self.assertEqual(count_transactions(simulation_result.execution_result_root), transaction_count)
+        self.assertGreater(transaction_count, 0)
+
+    def test_progress(self) -> None:
+        lines: List[str] = []
+        progress = BulkProgress(jobs_total=3, cost_total=4.0, jobs_skipped=2, processes=2, output=lines.append)
+        self.assertIsNone(progress.eta())
+        progress.job_finished(JobReport('a.result', {}, True, None, JobStatistics(
+            wall_time=1.0, path_count=10, transaction_count=20, result_size=100
+        )), estimated_cost=2.0)
+        progress.job_finished(JobReport('b.result', {}, True, 'failed', JobStatistics()), estimated_cost=1.0)
+        eta = progress.eta()
+        self.assertIsNotNone(eta)
+        progress.stop_reporter()
+        self.assertEqual(1, len(lines))
+        self.assertIn('1/3 jobs done, 1 running, 1 failed, 2 skipped', lines[0])
+
+        run_report = progress.get_run_report()
+        self.assertEqual((10, 20), (run_report['paths'], run_report['transactions']))
+        self.assertEqual(['success', 'failed'], [job['status'] for job in run_report['jobs']])
+        self.assertEqual(100, run_report['jobs'][0]['result_size'])
+        self.assertIsNone(run_report['jobs'][1]['wall_time'])
+        self.assertIsNotNone(run_report['finished'])
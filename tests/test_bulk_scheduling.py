@@ -0,0 +1,62 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import tempfile
+from typing import Any, Dict
+from unittest import TestCase
+
+from bdtsim.bulk_scheduling import JobTimings, heuristic_cost
+
+
+def simulation_configuration(protocol: str, size: int, slices_count: int = 8) -> Dict[str, Any]:
+    return {
+        'protocol': {'name': protocol, 'parameters': {'slices_count': slices_count}},
+        'data_provider': {'name': 'RandomDataProvider', 'parameters': {'size': size}}
+    }
+
+
+class JobTimingsTest(TestCase):
+    def test_heuristic_cost(self) -> None:
+        self.assertLess(heuristic_cost(simulation_configuration('FairSwap', 1024)),
+                        heuristic_cost(simulation_configuration('FairSwap', 1048576)))
+        self.assertLess(heuristic_cost(simulation_configuration('FairSwap', 1024, 4)),
+                        heuristic_cost(simulation_configuration('FairSwap', 1024, 1024)))
+        # defaults of the protocol and data provider implementations are used for missing parameters
+        self.assertEqual(heuristic_cost(simulation_configuration('FairSwap', 1048576, 1024)),
+                         heuristic_cost({'protocol': {'name': 'FairSwap'}}))
+
+    def test_estimate(self) -> None:
+        with tempfile.TemporaryDirectory() as target_directory:
+            job_timings = JobTimings(target_directory)
+            self.assertEqual(heuristic_cost(simulation_configuration('FairSwap', 1024)),
+                             job_timings.estimate(simulation_configuration('FairSwap', 1024)))
+
+            job_timings.record(simulation_configuration('FairSwap', 1024), 2.0)
+            job_timings.record(simulation_configuration('Delgado', 1024), 20.0)
+            job_timings.save()
+
+            job_timings = JobTimings(target_directory)
+            self.assertEqual(2, len(job_timings))
+            self.assertEqual(2.0, job_timings.estimate(simulation_configuration('FairSwap', 1024)))
+            # scaled by the ratio of recorded duration to heuristic cost of the same protocol
+            self.assertAlmostEqual(
+                2.0 * heuristic_cost(simulation_configuration('FairSwap', 4096))
+                / heuristic_cost(simulation_configuration('FairSwap', 1024)),
+                job_timings.estimate(simulation_configuration('FairSwap', 4096))
+            )
+            self.assertGreater(job_timings.estimate(simulation_configuration('Delgado', 4096)),
+                               job_timings.estimate(simulation_configuration('FairSwap', 4096)))
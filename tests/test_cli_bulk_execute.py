@@ -15,9 +15,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import tempfile
+from typing import Any, Dict, List, Tuple
 from unittest import TestCase
 
-from bdtsim.cli.bulk_execute import BulkExecuteSubCommand
+from bdtsim.bulk_manifest import simulation_job_key
+from bdtsim.cli.bulk_execute import BulkExecuteSubCommand, BulkJob
+from bdtsim.simulation_result_file import SimulationResultFileReader
 
 
 class BulkExecuteSubCommandTest(TestCase):
@@ -40,3 +45,131 @@ class BulkExecuteSubCommandTest(TestCase):
                 suffix='result'
             )
         )
+
+    def test_get_output_filename_sweep(self) -> None:
+        self.assertEqual(
+            'FairSwap_PyEVM_RandomDataProvider_price=5_payoff-matrix.txt',
+            BulkExecuteSubCommand.get_output_filename(
+                simulation_configuration={
+                    'protocol': {'name': 'FairSwap'},
+                    'environment': {'name': 'PyEVM'},
+                    'price': 5,
+                    'sweep': {'price': 5}
+                },
+                renderer_configuration={'name': 'payoff-matrix'},
+                suffix='txt'
+            )
+        )
+
+    def test_run_pipeline(self) -> None:
+        simulation_configuration = {'protocol': {'name': 'SimplePayment-prepaid-direct'}}
+        with tempfile.TemporaryDirectory() as target_directory:
+            _, result_filename, renderer_errors = BulkExecuteSubCommand.run_pipeline(
+                simulation_configuration=simulation_configuration,
+                renderer_configurations=[{'name': 'payoff-matrix', 'suffix': 'txt'}, {'name': 'nonexistent'}],
+                bulk_configuration={'output_format': 'columnar'},
+                target_directory=target_directory
+            )
+            self.assertEqual(1, len(renderer_errors))
+            self.assertTrue(os.path.isfile(os.path.join(target_directory, BulkExecuteSubCommand.get_output_filename(
+                simulation_configuration, {'name': 'payoff-matrix'}, suffix='txt'
+            ))))
+            with SimulationResultFileReader(result_filename) as reader:
+                self.assertTrue(reader.has_summary)
+                self.assertGreater(len(reader.load().execution_result_root.final_nodes), 1)
+
+    def test_run_measured_simulation(self) -> None:
+        simulation_configuration = {'protocol': {'name': 'SimplePayment-prepaid-direct'}}
+        configuration, result, statistics = BulkExecuteSubCommand.run_measured_simulation(simulation_configuration)
+        self.assertIs(simulation_configuration, configuration)
+        self.assertGreater(len(result.execution_result_root.final_nodes), 1)
+        self.assertIsNotNone(statistics.wall_time)
+        self.assertGreater(statistics.wall_time or 0, 0)
+
+    def test_incremental(self) -> None:
+        simulation_configuration = {'protocol': {'name': 'SimplePayment-prepaid-direct'}}
+        payoff_matrix_configuration = {'name': 'payoff-matrix', 'suffix': 'txt'}
+        renderer_configurations = [payoff_matrix_configuration, {'name': 'nonexistent'}]
+        bulk_configuration = {'output_format': 'columnar'}
+        with tempfile.TemporaryDirectory() as target_directory:
+            def plan(force: bool = False, only_failed: bool = False) -> Tuple[bool, List[Dict[str, Any]]]:
+                _, simulate, pending = BulkExecuteSubCommand.plan_job(simulation_configuration,
+                                                                      renderer_configurations, target_directory,
+                                                                      force=force, only_failed=only_failed,
+                                                                      bulk_configuration=bulk_configuration)
+                return simulate, pending
+
+            self.assertEqual((True, renderer_configurations), plan())
+            self.assertEqual((False, []), plan(only_failed=True))
+
+            simulation_key, _, _ = BulkExecuteSubCommand.plan_job(simulation_configuration, [], target_directory,
+                                                                  bulk_configuration=bulk_configuration)
+            BulkExecuteSubCommand.run_pipeline(simulation_configuration, renderer_configurations,
+                                               bulk_configuration=bulk_configuration,
+                                               target_directory=target_directory, simulation_key=simulation_key)
+            self.assertEqual((False, [{'name': 'nonexistent'}]), plan())
+            self.assertEqual((False, [{'name': 'nonexistent'}]), plan(only_failed=True))
+            self.assertEqual((True, renderer_configurations), plan(force=True))
+
+            # renderings are re-created from the existing simulation result
+            os.remove(os.path.join(target_directory, BulkExecuteSubCommand.get_output_filename(
+                simulation_configuration, payoff_matrix_configuration, suffix='txt'
+            )))
+            self.assertEqual((False, renderer_configurations), plan())
+            _, _, renderer_errors = BulkExecuteSubCommand.run_pipeline(
+                simulation_configuration, [payoff_matrix_configuration],
+                bulk_configuration=bulk_configuration, target_directory=target_directory,
+                simulate=False, simulation_key=simulation_key
+            )
+            self.assertEqual([], renderer_errors)
+            self.assertEqual((False, [{'name': 'nonexistent'}]), plan())
+
+            # changed configurations result in new job keys
+            self.assertNotEqual(simulation_key, simulation_job_key({**simulation_configuration, 'price': 1}))
+
+            # results written in another output format are outdated
+            self.assertEqual((True, renderer_configurations), BulkExecuteSubCommand.plan_job(
+                simulation_configuration, renderer_configurations, target_directory,
+                bulk_configuration={'output_format': 'pickle'}
+            )[1:])
+
+    def test_renderer_output_formats(self) -> None:
+        simulation_configuration = {'protocol': {'name': 'FairSwap'}}
+        renderer_configuration = {'name': 'dot', 'output_formats': ['svg', 'pdf']}
+        self.assertEqual([
+            ('svg', 'FairSwap_None_RandomDataProvider_dot.svg'),
+            ('pdf', 'FairSwap_None_RandomDataProvider_dot.pdf')
+        ], BulkExecuteSubCommand.get_renderer_outputs(simulation_configuration, renderer_configuration))
+        self.assertEqual([(None, 'FairSwap_None_RandomDataProvider_dot.gv')],
+                         BulkExecuteSubCommand.get_renderer_outputs(simulation_configuration,
+                                                                    {'name': 'dot', 'suffix': 'gv'}))
+        self.assertEqual(['svg', 'png'], BulkExecuteSubCommand.get_output_formats({'output_formats': 'svg, png'}))
+        self.assertRaises(ValueError, BulkExecuteSubCommand.get_output_formats, {'output_formats': []})
+
+    def test_affinity_batches(self) -> None:
+        jobs = [
+            BulkJob({'protocol': {'name': name, 'parameters': {'slices_count': slices_count}}}, '', simulate, [])
+            for simulate in (True, False)
+            for slices_count in (8, 4, 2)
+            for name in ('FairSwap', 'Delgado')
+        ]
+        batches = BulkExecuteSubCommand.get_affinity_batches(jobs, processes=2)
+        self.assertEqual(sorted(map(id, jobs)), sorted(id(job) for batch in batches for job in batch))
+        for batch in batches:
+            self.assertEqual(1, len(set((job.simulation_configuration['protocol']['name'], job.simulate)
+                                        for job in batch)))
+        self.assertEqual(12, len(batches))
+        self.assertEqual({'protocol': {'name': 'Delgado', 'parameters': {'slices_count': 2}}},
+                         batches[0][0].simulation_configuration)
+        self.assertEqual(4, len(BulkExecuteSubCommand.get_affinity_batches(jobs, processes=1)))
+
+    def test_longest_job_first(self) -> None:
+        jobs = [
+            BulkJob({'protocol': {'name': name, 'parameters': {'size': cost}}}, '', True, [], cost)
+            for name, cost in (('FairSwap', 1), ('FairSwap', 2), ('SmartJudge', 1), ('SmartJudge', 40), ('Delgado', 1))
+        ]
+        batches = BulkExecuteSubCommand.get_affinity_batches(jobs, processes=2)
+        self.assertEqual([jobs[3]], batches[0])
+        self.assertEqual(sorted(map(id, jobs)), sorted(id(job) for batch in batches for job in batch))
+        batch_costs = [sum(job.estimated_cost for job in batch) for batch in batches]
+        self.assertEqual(sorted(batch_costs, reverse=True), batch_costs)
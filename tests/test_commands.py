@@ -59,6 +59,8 @@ class CommandTest(TestCase):
         self.assertEqual(out.decode('utf-8').strip(), '\n'.join([
             'game-tree',
             'dot',
+            'html',
+            'leaf-export',
             'payoff-matrix'
         ]))
 
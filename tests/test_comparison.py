@@ -0,0 +1,98 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+from unittest import TestCase
+
+from bdtsim.comparison import ComparisonEntry, create_entry, get_curves, get_curves_table, get_table, \
+    iter_result_files, iter_result_store, render_curves_svg
+from bdtsim.result_store import ResultStoreWriter
+from bdtsim.simulation_result import SimulationResultSerializer
+from bdtsim.simulation_result_file import SimulationResultFileWriter
+from test_result_store import simulation_configuration
+from test_simulation_result_file import create_simulation_result
+
+
+class ComparisonTest(TestCase):
+    def test_create_entry(self) -> None:
+        simulation_result = create_simulation_result()
+        entry = create_entry('test', simulation_configuration(128), simulation_result.summary)
+        self.assertEqual({'protocol': 'FairSwap', 'protocol.slices_count': 128}, entry.parameters)
+        # no final node with both parties cheating
+        self.assertEqual(['hh', 'hm', 'mh'], sorted(entry.values.keys()))
+        self.assertEqual(21000, entry.values['hh']['buyer_tx_fees_max'])
+        self.assertEqual(1, entry.values['hh']['buyer_item_share_max'])
+        self.assertEqual(0, entry.values['hm']['buyer_tx_fees_max'])
+
+    def test_table(self) -> None:
+        summary = create_simulation_result().summary
+        entries = [create_entry('a', simulation_configuration(128), summary), create_entry('b', None, summary)]
+        columns, rows = get_table(entries)
+        self.assertEqual(['name', 'protocol', 'protocol.slices_count', 'honesty'], columns[:4])
+        self.assertEqual(8, len(rows))
+        self.assertEqual(['b', None, None, 'mm'] + [None] * (len(columns) - 4), rows[-1])
+
+    def test_curves(self) -> None:
+        entries = [
+            ComparisonEntry('a', {'protocol': 'A', 'size': 1}, {'hh': {'seller_tx_fees_max': 10,
+                                                                       'buyer_tx_fees_max': 5}}),
+            ComparisonEntry('b', {'protocol': 'A', 'size': 2}, {'hh': {'seller_tx_fees_max': 20,
+                                                                       'buyer_tx_fees_max': 5}}),
+            ComparisonEntry('c', {'protocol': 'A', 'size': 2}, {'hh': {'seller_tx_fees_max': 30,
+                                                                       'buyer_tx_fees_max': 5}}),
+            ComparisonEntry('d', {'protocol': 'B', 'size': 1}, {'hh': {'seller_tx_fees_max': 1,
+                                                                       'buyer_tx_fees_max': 1}}),
+            ComparisonEntry('e', {'protocol': 'B'}, {'hh': {'seller_tx_fees_max': 1, 'buyer_tx_fees_max': 1}}),
+            ComparisonEntry('f', {'protocol': 'B', 'size': 4}, {})
+        ]
+        curves = get_curves(entries, 'size', 'total_tx_fees_max')
+        self.assertEqual({'A': [(1, 15), (2, 35)], 'B': [(1, 2)]}, curves)
+        self.assertEqual((['size', 'A', 'B'], [[1, 15, 2], [2, 35, None]]), get_curves_table(curves, 'size'))
+        self.assertEqual({'A': [(1, 10), (2, 30)], 'B': [(1, 1)]}, get_curves(entries, 'size', 'seller_tx_fees_max'))
+        self.assertRaises(ValueError, get_curves, entries, 'size', 'unknown')
+        self.assertRaises(ValueError, get_curves, entries, 'size', 'seller_tx_fees_max', 'xx')
+
+        svg = render_curves_svg(curves, 'size', 'fees <max>', log_x=True).decode('utf-8')
+        self.assertTrue(svg.startswith('<svg'))
+        self.assertEqual(2, svg.count('<polyline'))
+        self.assertIn('fees &lt;max&gt;', svg)
+        self.assertRaises(ValueError, render_curves_svg, {}, 'x', 'y')
+
+    def test_result_files_and_store(self) -> None:
+        simulation_result = create_simulation_result()
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'a.result'), 'wb') as fp:
+                with SimulationResultFileWriter(fp) as writer:
+                    writer.add_metadata('simulation_configuration', simulation_configuration(256))
+                    writer.write_simulation_result(simulation_result)
+            with open(os.path.join(directory, 'b.result'), 'wb') as fp:
+                fp.write(SimulationResultSerializer().serialize(simulation_result))
+            store_path = os.path.join(directory, 'store.sqlite')
+            with ResultStoreWriter(store_path) as store_writer:
+                store_writer.put(simulation_configuration(512), simulation_result)
+
+            file_entries = list(iter_result_files([directory]))
+            store_entries = list(iter_result_store(store_path))
+
+        self.assertEqual(['a', 'b'], [entry.name for entry in file_entries])
+        self.assertEqual({'protocol': 'FairSwap', 'protocol.slices_count': 256}, file_entries[0].parameters)
+        self.assertEqual({}, file_entries[1].parameters)
+        self.assertEqual(file_entries[0].values, file_entries[1].values)
+        self.assertEqual(1, len(store_entries))
+        self.assertEqual(512, store_entries[0].parameters['protocol.slices_count'])
+        self.assertEqual(file_entries[0].values, store_entries[0].values)
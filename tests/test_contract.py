@@ -0,0 +1,38 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+from unittest import TestCase
+
+from bdtsim.contract import SolidityContract
+
+
+class SolidityContractTest(TestCase):
+    def test_compile_cache_key(self) -> None:
+        def key(code: str, import_directory: str, imported_code: str) -> str:
+            with open(os.path.join(import_directory, 'Imported.sol'), 'w') as fp:
+                fp.write(imported_code)
+            return SolidityContract.compile_cache_key('Test', code, {'import_remappings': [
+                '.=%s' % import_directory,
+                'Imported.sol=%s' % os.path.join(import_directory, 'Imported.sol')
+            ]}, 'v0.6.1')
+
+        with tempfile.TemporaryDirectory() as directory1, tempfile.TemporaryDirectory() as directory2:
+            self.assertEqual(key('a', directory1, 'b'), key('a', directory2, 'b'))
+            self.assertNotEqual(key('a', directory1, 'b'), key('a', directory2, 'c'))
+            self.assertNotEqual(key('a', directory1, 'b'), key('x', directory2, 'b'))
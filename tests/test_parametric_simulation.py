@@ -0,0 +1,103 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import List, cast
+from unittest import TestCase
+
+from bdtsim.account_related_diff_collection import FundsDiffCollection, ItemShareCollection
+from bdtsim.parametric_simulation import ParametricSimulation, ParametricSimulationResult, PriceDependencyError
+from bdtsim.protocol_path import Choice
+from bdtsim.simulation import Simulation
+from bdtsim.simulation_result import SimulationResult, TransactionLogEntry, TransactionLogList
+from test_simulation_result_file import buyer, operator, seller
+
+
+def payment(price: int, gas_price: int) -> TransactionLogEntry:
+    return TransactionLogEntry(
+        account=buyer,
+        tx_dict={'gasPrice': gas_price},
+        tx_receipt={'gasUsed': 21000},
+        description='payment',
+        funds_diff_collection=FundsDiffCollection({seller: price, buyer: -price}),
+        item_share_collection=ItemShareCollection()
+    )
+
+
+def create_simulation_result(price: int, gas_price: int = 1000000000,
+                             price_dependent: bool = False) -> SimulationResult:
+    simulation_result = SimulationResult(operator, seller, buyer)
+    pay_choice = Choice(buyer, ('yes', 'no'), description='pay')
+    root = simulation_result.execution_result_root
+    for pay_outcome in 'yes', 'no':
+        root.tx_collection.append(TransactionLogList())
+        pay_node = root.child(pay_choice.choose(pay_outcome))
+        pay_transactions = TransactionLogList()
+        if pay_outcome == 'yes':
+            pay_transactions.append(payment(price, gas_price))
+            # e.g. a protocol skipping a refund for low prices
+            if price_dependent and price > 1500:
+                pay_transactions.append(payment(-1, gas_price))
+        pay_node.tx_collection.append(pay_transactions)
+    return simulation_result
+
+
+class FakeSimulation(object):
+    def __init__(self, price: int, price_dependent: bool, runs: List[int]) -> None:
+        self._price = price
+        self._price_dependent = price_dependent
+        self._runs = runs
+
+    def run(self) -> SimulationResult:
+        self._runs.append(self._price)
+        return create_simulation_result(self._price, price_dependent=self._price_dependent)
+
+
+class ParametricSimulationTest(TestCase):
+    def test_evaluate(self) -> None:
+        parametric_result = ParametricSimulationResult.from_probes([
+            (price, create_simulation_result(price)) for price in (1000, 2000, 3000)
+        ])
+        self.assertTrue(parametric_result.price_parametric)
+        for price in 1234, 10 ** 20:
+            for gas_price in 1000000000, 7:
+                self.assertEqual(
+                    create_simulation_result(price, gas_price).summary,
+                    parametric_result.evaluate(price, gas_price)
+                )
+
+    def test_gas_price_only(self) -> None:
+        parametric_result = ParametricSimulationResult.from_simulation_result(create_simulation_result(1000), 1000)
+        self.assertFalse(parametric_result.price_parametric)
+        self.assertEqual(create_simulation_result(1000, 5).summary, parametric_result.evaluate(1000, 5))
+        self.assertRaises(ValueError, parametric_result.evaluate, 2000, 5)
+
+    def test_price_dependency_detection(self) -> None:
+        self.assertRaises(PriceDependencyError, ParametricSimulationResult.from_probes, [
+            (price, create_simulation_result(price, price_dependent=True)) for price in (1000, 2000, 3000)
+        ])
+
+    def test_fallback(self) -> None:
+        for price_dependent, expected_runs in (False, [1000, 2000, 3000]), (True, [1000, 2000, 3000, 1234]):
+            runs: List[int] = []
+            parametric_simulation = ParametricSimulation(
+                lambda price: cast(Simulation, FakeSimulation(price, price_dependent, runs)),
+                probe_prices=(1000, 2000, 3000)
+            )
+            results = parametric_simulation.evaluate_grid([1234, 2000], [1, 2])
+            self.assertEqual(expected_runs, runs)
+            self.assertEqual(4, len(results))
+            self.assertEqual(create_simulation_result(1234, 2, price_dependent).summary, results[(1234, 2)])
@@ -0,0 +1,111 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import time
+from typing import List
+from unittest import TestCase
+
+from bdtsim.profiling import PROFILE_MODE_CPROFILE, PROFILE_MODE_SAMPLING, PROFILE_MODE_TRACEMALLOC, \
+    SUBSYSTEM_EVM, SUBSYSTEM_IMPORT, SUBSYSTEM_OTHER, SUBSYSTEM_PROTOCOL, SUBSYSTEM_RENDER, SUBSYSTEM_RPC, \
+    Profile, Profiler, _cprofile_stacks, classify_stack
+
+
+def busy(duration: float) -> int:
+    count = 0
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        count += 1
+    return count
+
+
+def allocate() -> List[bytes]:
+    return [bytes(1024) for _ in range(1000)]
+
+
+class ProfilingTest(TestCase):
+    def test_classify_stack(self) -> None:
+        protocol = 'execute (bdtsim/protocol/fairswap/fairswap.py:100)'
+        web3 = 'send_transaction (web3/eth.py:10)'
+        evm = 'apply_computation (eth/vm/computation.py:20)'
+        hashing = 'keccak (eth_utils/crypto.py:8)'
+        self.assertEqual(SUBSYSTEM_PROTOCOL, classify_stack((protocol, hashing)))
+        self.assertEqual(SUBSYSTEM_RPC, classify_stack((protocol, web3, hashing)))
+        self.assertEqual(SUBSYSTEM_EVM, classify_stack((protocol, web3, evm, hashing)))
+        self.assertEqual(SUBSYSTEM_RENDER, classify_stack(('render (bdtsim/renderer/dot.py:1)', protocol)))
+        self.assertEqual(SUBSYSTEM_IMPORT, classify_stack((web3, '_find_and_load (<frozen importlib._bootstrap>:1)')))
+        self.assertEqual(SUBSYSTEM_OTHER, classify_stack(('main (bdtsim/cli/main.py:1)', )))
+        self.assertEqual(SUBSYSTEM_EVM, classify_stack(('main (bdtsim/cli/main.py:1)', 'eth/abc.py:12')))
+
+    def test_write_load_merge(self) -> None:
+        profile = Profile(PROFILE_MODE_SAMPLING, {('a', 'b'): 2, ('a', ): 1}, {'wall_time': 1.0})
+        with tempfile.TemporaryDirectory() as directory:
+            paths = profile.write(os.path.join(directory, 'profile'))
+            with open(paths[0], 'r') as fp:
+                self.assertEqual('a 1\na;b 2\n', fp.read())
+            loaded = Profile.load(paths[0])
+        self.assertEqual(profile.stacks, loaded.stacks)
+        loaded += profile
+        self.assertEqual({('a', 'b'): 4, ('a', ): 2}, loaded.stacks)
+        self.assertEqual(2.0, loaded.metadata['wall_time'])
+        self.assertEqual([('b', 4), ('a', 2)], loaded.top_frames())
+        with self.assertRaises(ValueError):
+            loaded += Profile(PROFILE_MODE_CPROFILE)
+
+    def test_cprofile_stacks(self) -> None:
+        root = ('main.py', 1, 'main')
+        recursive = ('lib.py', 1, 'recursive')
+        helper = ('lib.py', 10, 'helper')
+        # main calls recursive, which calls itself via helper; pair times of nested calls overlap
+        stats = {
+            root: (1, 1, 1.0, 10.0, {}),
+            recursive: (1, 3, 3.0, 9.0, {root: (1, 1, 3.0, 9.0), helper: (2, 2, 0.0, 6.0)}),
+            helper: (2, 2, 2.0, 8.0, {recursive: (2, 2, 2.0, 8.0)})
+        }
+        stacks = _cprofile_stacks(stats, unit=1.0)
+        self.assertEqual(10, sum(stacks.values()))
+        self.assertEqual(1, stacks[('main (main.py:1)', )])
+        self.assertEqual({('main (main.py:1)', ), ('main (main.py:1)', 'recursive (lib.py:1)'),
+                          ('main (main.py:1)', 'recursive (lib.py:1)', 'helper (lib.py:10)')}, set(stacks.keys()))
+
+    def test_cprofile(self) -> None:
+        with Profiler(PROFILE_MODE_CPROFILE) as profiler:
+            busy(0.05)
+        profile = profiler.profile
+        self.assertGreater(profile.total, 40000)
+        self.assertTrue(any('busy (' in frame for stack in profile.stacks for frame in stack))
+        with tempfile.TemporaryDirectory() as directory:
+            paths = profiler.write(os.path.join(directory, 'profile'))
+            self.assertEqual(['profile.folded', 'profile.json', 'profile.prof'], [os.path.basename(p) for p in paths])
+
+    def test_sampling(self) -> None:
+        with Profiler(PROFILE_MODE_SAMPLING, interval=0.001) as profiler:
+            busy(0.1)
+        profile = profiler.profile
+        self.assertGreater(profile.total, 0)
+        busy_samples = sum(value for stack, value in profile.stacks.items() if any('busy (' in f for f in stack))
+        self.assertGreater(busy_samples, profile.total / 2)
+
+    def test_tracemalloc(self) -> None:
+        with Profiler(PROFILE_MODE_TRACEMALLOC) as profiler:
+            data = allocate()
+        profile = profiler.profile
+        self.assertEqual(1000, len(data))
+        self.assertGreater(profile.total, 1000 * 1024)
+        self.assertGreaterEqual(profile.metadata['peak_memory'], profile.total)
+        self.assertIn('test_profiling.py:', profile.top_frames(1)[0][0])
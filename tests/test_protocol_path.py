@@ -15,10 +15,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from typing import cast
 from unittest import TestCase
 
 from bdtsim.account import Account
-from bdtsim.protocol_path import Choice, ProtocolPath
+from bdtsim.protocol_path import Choice, Decision, ProtocolPath, ProtocolPathCoercion
 
 
 seller = Account('Seller', '0x3f2c7f45cb3014e2b9d12b7fb331bdfdad6170ce5e4a0d94890aa64162569756')
@@ -132,3 +133,48 @@ class ProtocolPathTest(TestCase):
             ValueError,
             pp_alternatives[0].decide, seller, 'should I sell or should I buy', ('sell', 'buy'), ('sell', 'buy')
         )
+
+    def test_alternatives_share_trie(self) -> None:
+        pp_initial = ProtocolPath()
+        pp_initial.decide(seller, 'sell', ('yes', 'no'))
+        pp_initial.decide(buyer, 'buy', ('yes', 'no'))
+        pp_alternatives = pp_initial.get_alternatives()
+        self.assertEqual(2, len(pp_alternatives))
+        # alternatives should reference the decisions of the initial path instead of copying them:
+        self.assertIs(pp_initial.node.path_nodes()[0].decision, pp_alternatives[1].initial_decisions[0])
+        self.assertIs(pp_initial.node.parent, pp_alternatives[1].node.parent)
+        # alternatives derived twice should be equal and hash equally:
+        self.assertEqual(pp_alternatives, pp_initial.get_alternatives())
+        self.assertEqual(2, len(set(pp_alternatives + pp_initial.get_alternatives())))
+        self.assertNotEqual(pp_alternatives[0], pp_alternatives[1])
+
+    def test_decision_timestamps_per_path(self) -> None:
+        pp_initial = ProtocolPath()
+        decision_initial = pp_initial.decide(seller, 'sell', ('yes', 'no'))
+        pp_initial.decide(buyer, 'buy', ('yes', 'no'))
+        pp_alternative = pp_initial.get_alternatives()[1]
+        decision_alternative = pp_alternative.decide(seller, 'sell', ('yes', 'no'))
+        decision_alternative.timestamp = 0.0
+        # both paths pass the same trie node, but their decisions (and timestamps) should not be shared:
+        self.assertEqual(decision_initial, decision_alternative)
+        self.assertIsNot(decision_initial, decision_alternative)
+        self.assertIsNotNone(decision_initial.timestamp)
+        self.assertNotEqual(0.0, decision_initial.timestamp)
+        # each path returns the decisions it has made
+        self.assertIs(decision_initial, pp_initial.decisions[0])
+        self.assertIs(decision_alternative, pp_alternative.decisions[0])
+        self.assertIs(decision_alternative, pp_alternative.initial_decisions[0])
+        self.assertEqual([], pp_alternative.new_decisions)
+        self.assertIsNone(cast(Decision, pp_alternative.node.decision).timestamp)
+
+    def test_coercion_applies_to_alternatives(self) -> None:
+        coercion = ProtocolPathCoercion([None, ['no']])
+        pp_initial = ProtocolPath(coercion=coercion)
+        pp_initial.decide(seller, 'sell', ('yes', 'no'))
+        self.assertEqual('no', pp_initial.decide(buyer, 'buy', ('yes', 'no')).outcome)
+        pp_alternatives = pp_initial.get_alternatives()
+        self.assertEqual(1, len(pp_alternatives))
+        pp_alternatives[0].decide(seller, 'sell', ('yes', 'no'))
+        self.assertEqual('no', pp_alternatives[0].decide(buyer, 'buy', ('yes', 'no')).outcome)
+        self.assertEqual('no,no', pp_alternatives[0].coercion_str)
+        self.assertEqual(0, len(pp_alternatives[0].get_alternatives()))
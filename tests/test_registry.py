@@ -0,0 +1,89 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import subprocess
+import sys
+from typing import Dict
+from unittest import TestCase
+
+from bdtsim.registry import LazyRegistration, Registration, lazy_attributes, register_lazy
+
+
+class Plugin(object):
+    def __init__(self, value: int, factor: int = 1) -> None:
+        self.value = value * factor
+
+
+PLUGIN_VALUE = 5
+
+
+def run_python(code: str) -> str:
+    return subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, check=True).stdout.decode('utf-8')
+
+
+class RegistryTest(TestCase):
+    def test_registration(self) -> None:
+        registration = Registration(Plugin, 2, factor=3)
+        self.assertEqual(6, registration.instantiate().value)
+        self.assertEqual(4, registration.instantiate(factor=2).value)
+
+    def test_lazy_registration(self) -> None:
+        registrations: Dict[str, Registration[Plugin]] = {'other': Registration(Plugin, 1)}
+        register_lazy(registrations, 'plugin', 'tests.test_registry', 'Plugin', 'PLUGIN_VALUE')
+        register_lazy(registrations, 'missing', 'tests.test_registry', 'MissingPlugin')
+        register_lazy(registrations, 'other', 'tests.test_registry', 'Plugin')
+        self.assertEqual(['other', 'plugin', 'missing'], list(registrations.keys()))
+        self.assertIsInstance(registrations['plugin'], LazyRegistration)
+        self.assertNotIsInstance(registrations['other'], LazyRegistration)
+        self.assertEqual(15, registrations['plugin'].instantiate(factor=3).value)
+        self.assertNotIsInstance(registrations['plugin'], LazyRegistration)
+        # the module does not provide the plugin
+        with self.assertRaises(ImportError):
+            registrations['missing'].instantiate()
+
+    def test_lazy_attributes(self) -> None:
+        getattr_ = lazy_attributes('json', {'dumps': 'json', 'JSONDecoder': '.decoder'})
+        self.assertEqual('{}', getattr_('dumps')({}))
+        self.assertEqual('json.decoder', getattr_('JSONDecoder').__module__)
+        with self.assertRaises(AttributeError):
+            getattr_('missing')
+
+    def test_lazy_imports(self) -> None:
+        output = run_python('\n'.join([
+            'import sys',
+            'from bdtsim.data_provider import DataProviderManager',
+            'from bdtsim.protocol import ProtocolManager',
+            'from bdtsim.registry import LazyRegistration',
+            'print(list(ProtocolManager.protocols.keys())[0])',
+            'print(isinstance(DataProviderManager.data_providers["RandomDataProvider"], LazyRegistration))',
+            'print("web3" in sys.modules)',
+            'data_provider = DataProviderManager.instantiate("RandomDataProvider", size=8)',
+            'print(type(data_provider).__name__)',
+            'print(isinstance(DataProviderManager.data_providers["RandomDataProvider"], LazyRegistration))'
+        ]))
+        self.assertEqual(['Delgado', 'True', 'False', 'RandomDataProvider', 'False'], output.split())
+
+    def test_cli_lazy_subcommands(self) -> None:
+        output = run_python('\n'.join([
+            'import sys',
+            'sys.argv = ["bdtsim", "list-renderers"]',
+            'from bdtsim.cli.main import main',
+            'main()',
+            'print(sorted(module for module in ("web3", "eth_tester", "graphviz", "bdtsim.cli.bulk_execute")',
+            '             if module in sys.modules))'
+        ]))
+        self.assertEqual('game-tree\ndot\nhtml\nleaf-export\npayoff-matrix\n[]\n', output)
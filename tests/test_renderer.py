@@ -15,9 +15,23 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import csv
+import io
+import itertools
+import json
+import re
 import unittest
+from typing import Any, Dict
+from unittest import mock
 
-from bdtsim.renderer import Renderer
+from bdtsim.renderer import GameTreeRenderer, GraphvizDotRenderer, HtmlTreeRenderer, LeafExportRenderer, Renderer
+from bdtsim.renderer.graphviz_dot import ResultGraph
+from bdtsim.protocol_path import Choice
+from bdtsim.renderer.game_tree import SimulationGameTree
+from bdtsim.renderer.graphviz_mixin import GraphvizMixin
+from bdtsim.renderer.leaf_export import COLUMNS
+from bdtsim.simulation_result import SimulationResult, TransactionLogList
+from test_simulation_result_file import buyer, create_simulation_result, operator, seller, tx
 
 
 class RendererTest(unittest.TestCase):
@@ -41,3 +55,203 @@ class RendererTest(unittest.TestCase):
         self.assertEqual(Renderer.get_unit_factor('k'), 1000)
 
         self.assertRaises(ValueError, Renderer.get_unit_factor, 'Q')
+
+
+class DotStreamTest(unittest.TestCase):
+    def test_game_tree(self) -> None:
+        simulation_result = create_simulation_result()
+        renderer = GameTreeRenderer(wei_scaling='GWei')
+        output = io.BytesIO()
+        renderer.render_to(simulation_result, output)
+        self.assertEqual(renderer.render(simulation_result), output.getvalue())
+
+    def test_graphviz_dot(self) -> None:
+        simulation_result = create_simulation_result()
+        for show_transactions, show_transaction_duplicates in itertools.product((True, False), (True, False)):
+            renderer = GraphvizDotRenderer(show_transactions=show_transactions,
+                                           show_transaction_duplicates=show_transaction_duplicates)
+            # node IDs are random UUIDs, replace them with deterministic ones
+            with mock.patch.object(ResultGraph, '_uuid', side_effect=('node_%i' % i for i in itertools.count())):
+                expected = renderer.render(simulation_result)
+            output = io.BytesIO()
+            with mock.patch.object(ResultGraph, '_uuid', side_effect=('node_%i' % i for i in itertools.count())):
+                renderer.render_to(simulation_result, output)
+            self.assertEqual(expected, output.getvalue())
+            self.assertTrue(expected.startswith(b'digraph {\n\tgraph ['))
+
+
+class SimulationGameTreeTest(unittest.TestCase):
+    @staticmethod
+    def create_simulation_result() -> SimulationResult:
+        # three levels of choices with only honest options, all final nodes having the same transactions
+        simulation_result = SimulationResult(operator, seller, buyer)
+        choices = [Choice(buyer, ('a', 'b'), honest_options=('a', 'b'), description='level %i' % level)
+                   for level in range(3)]
+        nodes = [simulation_result.execution_result_root]
+        for choice in choices:
+            children = []
+            for node in nodes:
+                for outcome in choice.options:
+                    node.tx_collection.append(TransactionLogList())
+                    children.append(node.child(choice.choose(outcome, 1)))
+            nodes = children
+        for node in nodes:
+            transactions = TransactionLogList()
+            transactions.append(tx(buyer, 21000, 1000))
+            node.tx_collection.append(transactions)
+        return simulation_result
+
+    def test_defaults(self) -> None:
+        source = SimulationGameTree(self.create_simulation_result()).source
+        self.assertEqual(7 + 8, source.count('shape='))
+        self.assertEqual(14, source.count('->'))
+
+    def test_max_depth(self) -> None:
+        source = SimulationGameTree(self.create_simulation_result(), max_depth=1).source
+        self.assertEqual(1, source.count('shape=circle'))
+        self.assertEqual(2, source.count('shape=box3d'))
+        self.assertIn('4 final nodes', source)
+        self.assertIn('(4/4 honest)', source)
+        source = SimulationGameTree(create_simulation_result(), max_depth=1).source
+        self.assertIn('<i>TX Count</i>: [0, 1]', source)
+        self.assertIn('(1/2 honest)', source)
+
+    def test_collapse_subtrees(self) -> None:
+        source = SimulationGameTree(self.create_simulation_result(), collapse_subtrees=True).source
+        self.assertEqual(3, source.count('shape=circle'))
+        self.assertEqual(1, source.count('shape=note'))
+        self.assertEqual(6, source.count('->'))
+
+    def test_merge_leaves(self) -> None:
+        source = SimulationGameTree(self.create_simulation_result(), merge_leaves=True).source
+        self.assertEqual(7, source.count('shape=circle'))
+        self.assertEqual(4, source.count('shape=note'))
+        self.assertEqual(14, source.count('->'))
+        # different honesty of the final nodes, no merging
+        source = SimulationGameTree(create_simulation_result(), merge_leaves=True).source
+        self.assertEqual(3, source.count('shape=note'))
+
+
+class LeafExportRendererTest(unittest.TestCase):
+    def test_rows(self) -> None:
+        simulation_result = create_simulation_result()
+        rows = list(LeafExportRenderer().iter_rows(simulation_result))
+        self.assertEqual(['yes,yes', 'yes,no', 'no'], [row['path'] for row in rows])
+        for row, final_node in zip(rows, simulation_result.execution_result_root.final_nodes):
+            self.assertEqual(COLUMNS, list(row.keys()))
+            for role, subject in (('seller', seller), ('buyer', buyer)):
+                self.assertEqual(final_node.account_completely_honest(subject), row['%s_honest' % role])
+                entry = final_node.aggregation_summary.get(subject)
+                if entry is None:
+                    self.assertEqual(0, row['%s_tx_fees_max' % role])
+                    continue
+                self.assertEqual(entry.tx_fees_max, row['%s_tx_fees_max' % role])
+                self.assertEqual(entry.balance_diff_min, row['%s_balance_diff_min' % role])
+                self.assertEqual(entry.item_share_min, row['%s_item_share_min' % role])
+
+    def test_formats(self) -> None:
+        simulation_result = create_simulation_result()
+        rows = list(csv.DictReader(io.StringIO(LeafExportRenderer().render(simulation_result).decode('utf-8'))))
+        self.assertEqual(3, len(rows))
+        self.assertEqual('yes,no', rows[1]['path'])
+        self.assertEqual('False', rows[1]['seller_honest'])
+        output = io.BytesIO()
+        LeafExportRenderer(output_format='jsonl', wei_scaling='GWei').render_to(simulation_result, output)
+        self.assertFalse(output.closed)
+        rows = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(3, len(rows))
+        self.assertEqual(21000, rows[0]['buyer_tx_fees_min'])
+        self.assertEqual(-21000.000001, rows[0]['buyer_balance_diff_min'])
+        self.assertRaises(ValueError, LeafExportRenderer, output_format='xml')
+
+
+class HtmlTreeRendererTest(unittest.TestCase):
+    @staticmethod
+    def get_chunks(page: str) -> Dict[str, Any]:
+        return {chunk_id: json.loads(data) for chunk_id, data in re.findall(
+            r'<script type="application/json" id="([^"]+)">(.*?)</script>', page)}
+
+    def test_chunks(self) -> None:
+        page = HtmlTreeRenderer(chunk_size=2).render(create_simulation_result()).decode('utf-8')
+        chunks = self.get_chunks(page)
+        self.assertEqual(2, chunks['meta']['chunk_size'])
+        self.assertEqual(['meta', 'n-0', 'd-0', 'n-1', 'd-1', 'n-2', 'd-2'], list(chunks.keys()))
+        nodes = chunks['n-0'] + chunks['n-1'] + chunks['n-2']
+        details = chunks['d-0'] + chunks['d-1'] + chunks['d-2']
+        # breadth-first order: start, pay yes/no, hand over yes/no
+        self.assertEqual([None, 'yes', 'no', 'yes', 'no'], [node[0] for node in nodes])
+        self.assertEqual([[1, 2], [3, 4], [], [], []], [node[4] for node in nodes])
+        self.assertEqual([None, 0, 0, 1, 1], [node[6] for node in nodes])
+        self.assertEqual(['Buyer', 'pay'], nodes[0][2:4])
+        # honesty flags (seller: 1, buyer: 2)
+        self.assertEqual([3, 3, 1, 3, 2], [node[5] for node in nodes])
+        self.assertEqual([[21000, 21000], [1, 1]], details[3][0]['Buyer'][:2])
+        self.assertEqual(1, len(details[1][1]))
+        self.assertEqual([2, [['Buyer', 'transaction', 21000, -21000000000000, {'Seller': 1000, 'Buyer': -1000}]]],
+                         details[1][1][0])
+
+    def test_escaping(self) -> None:
+        simulation_result = SimulationResult(operator, seller, buyer)
+        choice = Choice(buyer, ('</script>', 'b'), description='<b>')
+        simulation_result.execution_result_root.tx_collection.append(TransactionLogList())
+        simulation_result.execution_result_root.child(choice.choose('</script>', 1))
+        page = HtmlTreeRenderer(title='<title>').render(simulation_result).decode('utf-8')
+        self.assertIn('<title>&lt;title&gt;</title>', page)
+        self.assertEqual(1, page.count('</script>\n<script>'))
+        self.assertEqual('</script>', self.get_chunks(page)['n-0'][1][0])
+
+
+class GraphvizMixinTest(unittest.TestCase):
+    @staticmethod
+    def fake_pipe(engine: str, output_format: str, data: bytes, **kwargs: str) -> bytes:
+        return ('%s:%s:' % (engine, output_format)).encode('utf-8') + data[:7]
+
+    def test_render_graph(self) -> None:
+        renderer = GameTreeRenderer(output_format='svg')
+        with mock.patch('graphviz.pipe', side_effect=self.fake_pipe) as pipe:
+            self.assertEqual(b'dot:svg:digraph', renderer.render(create_simulation_result()))
+        self.assertEqual(1, pipe.call_count)
+
+    def test_render_formats(self) -> None:
+        renderer = GraphvizDotRenderer()
+        with mock.patch('graphviz.pipe', side_effect=self.fake_pipe) as pipe, \
+                mock.patch.object(GraphvizDotRenderer, 'create_graph', wraps=renderer.create_graph) as create_graph:
+            outputs = renderer.render_formats(create_simulation_result(), ['svg', 'pdf', 'png', 'svg'])
+        self.assertEqual(1, create_graph.call_count)
+        self.assertEqual(3, pipe.call_count)
+        self.assertEqual({'svg': b'dot:svg:digraph', 'pdf': b'dot:pdf:digraph', 'png': b'dot:png:digraph'}, outputs)
+
+    def test_pipe_formats_error(self) -> None:
+        def pipe(engine: str, output_format: str, data: bytes, **kwargs: str) -> bytes:
+            if output_format == 'pdf':
+                raise RuntimeError('dot failed')
+            return b''
+
+        with mock.patch('graphviz.pipe', side_effect=pipe):
+            self.assertRaises(RuntimeError, GraphvizMixin.pipe_formats, b'digraph {}', ['svg', 'pdf'])
+
+
+class ResultGraphTest(unittest.TestCase):
+    @staticmethod
+    def create_simulation_result() -> SimulationResult:
+        simulation_result = SimulationResult(operator, seller, buyer)
+        for gas_used in (21000, 21000, 21000, 42000):
+            transactions = TransactionLogList()
+            transactions.append(tx(buyer, gas_used, 1000))
+            transactions.append(tx(seller, 0, item_share=1))
+            simulation_result.execution_result_root.tx_collection.append(transactions)
+        return simulation_result
+
+    def test_transaction_path_deduplication(self) -> None:
+        simulation_result = self.create_simulation_result()
+        source = ResultGraph(simulation_result, show_transactions=True).source
+        # two distinct paths with two transactions each, plus the start edge
+        self.assertEqual(5, source.count('->'))
+        self.assertEqual(1, source.count('3×'))
+        self.assertIn('42000 Gas', source)
+
+    def test_transaction_path_duplicates(self) -> None:
+        simulation_result = self.create_simulation_result()
+        source = ResultGraph(simulation_result, show_transactions=True, show_transaction_duplicates=True).source
+        self.assertEqual(9, source.count('->'))
+        self.assertNotIn('×', source)
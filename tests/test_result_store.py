@@ -0,0 +1,130 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import functools
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Tuple
+from unittest import TestCase
+
+from bdtsim.result_store import ResultRows, ResultStore, ResultStoreWriter
+from test_simulation_result_file import create_simulation_result
+
+
+def simulation_configuration(slices_count: int) -> Dict[str, Any]:
+    return {
+        'protocol': {
+            'name': 'FairSwap',
+            'parameters': {
+                'slices_count': slices_count
+            }
+        }
+    }
+
+
+class ResultStoreTest(TestCase):
+    def setUp(self) -> None:
+        fd, self.path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+
+    def tearDown(self) -> None:
+        os.remove(self.path)
+
+    def test_store_and_query(self) -> None:
+        simulation_result = create_simulation_result()
+        with ResultStoreWriter(self.path) as writer:
+            for slices_count in 128, 256, 512:
+                writer.put(simulation_configuration(slices_count), simulation_result)
+
+        with ResultStore(self.path) as result_store:
+            columns, rows = result_store.query('SELECT count(*) FROM simulations')
+            self.assertEqual([(3, )], rows)
+            columns, rows = result_store.query('SELECT count(*) FROM nodes WHERE final = 1')
+            self.assertEqual([(9, )], rows)
+
+            expected = max(
+                node.aggregation_summary[simulation_result.seller].funds_diff_max
+                for node in simulation_result.execution_result_root.final_nodes
+                if simulation_result.seller in node.aggregation_summary
+            )
+            columns, rows = result_store.query_results(
+                select='max(funds_diff_max), count(DISTINCT simulation)',
+                protocol='FairSwap',
+                parameters=[('slices_count', '>=', '256')],
+                account='Seller'
+            )
+            self.assertEqual([(expected, 2)], rows)
+
+            # paying buyer, but no item handed over by the seller
+            node = simulation_result.execution_result_root.final_nodes[1]
+            self.assertFalse(node.account_completely_honest(simulation_result.seller))
+            self.assertTrue(node.account_completely_honest(simulation_result.buyer))
+            columns, rows = result_store.query_results(select='DISTINCT tx_fees_max, item_share_max',
+                                                       honesty='mh', account='Buyer')
+            buyer_aggregation = node.aggregation_summary[simulation_result.buyer]
+            self.assertEqual([(buyer_aggregation.tx_fees_max, buyer_aggregation.item_share_max)], rows)
+
+    def test_store_collected_rows(self) -> None:
+        simulation_result = create_simulation_result()
+        rows = ResultStore.collect_rows(simulation_configuration(128), simulation_result)
+        # rows are passed from worker processes, either pickled or as JSON (distributed execution)
+        rows = ResultRows(*json.loads(json.dumps(rows)))
+        with ResultStoreWriter(self.path) as writer:
+            writer.put(simulation_configuration(128), rows)
+            writer.put(simulation_configuration(256), simulation_result)
+
+        with ResultStore(self.path) as result_store:
+            for table in 'nodes', 'transactions', 'aggregations':
+                columns, table_rows = result_store.query('SELECT * FROM %s WHERE simulation = 1' % table)
+                self.assertGreater(len(table_rows), 0)
+                columns, expected_rows = result_store.query('SELECT * FROM %s WHERE simulation = 2' % table)
+                self.assertEqual([row[1:] for row in expected_rows], [row[1:] for row in table_rows])
+            columns, parameter_rows = result_store.query('SELECT simulation, value FROM parameters ORDER BY simulation')
+            self.assertEqual([(1, '128'), (2, '256')], parameter_rows)
+
+    def test_store_same_configuration(self) -> None:
+        simulation_result = create_simulation_result()
+        with ResultStore(self.path) as result_store:
+            result_store.store(simulation_configuration(128), simulation_result)
+            result_store.store(simulation_configuration(256), simulation_result)
+            # configurations with the same canonical form replace the previously stored simulation
+            simulation_id = result_store.store({**simulation_configuration(128), 'description': 'again'},
+                                               simulation_result)
+
+            columns, rows = result_store.query('SELECT id, description FROM simulations ORDER BY id')
+            self.assertEqual([(2, None), (simulation_id, 'again')], rows)
+            for table in 'parameters', 'nodes', 'transactions', 'aggregations':
+                columns, rows = result_store.query('SELECT count(DISTINCT simulation), count(*) FROM %s' % table)
+                columns, expected_rows = result_store.query('SELECT 2, 2 * count(*) FROM %s WHERE simulation = 2'
+                                                            % table)
+                self.assertEqual(expected_rows, rows)
+
+    def test_writer_errors(self) -> None:
+        simulation_result = create_simulation_result()
+        errors: List[Tuple[int, BaseException]] = []
+        with ResultStoreWriter(os.path.join(self.path, 'not-a-directory.sqlite')) as writer:
+            for slices_count in 128, 256:
+                writer.put(simulation_configuration(slices_count), simulation_result,
+                           functools.partial(lambda c, error: errors.append((c, error)), slices_count))
+        self.assertEqual([128, 256], [slices_count for slices_count, _ in errors])
+        self.assertIsInstance(errors[0][1], RuntimeError)
+
+    def test_query_invalid_operator(self) -> None:
+        with ResultStore(self.path) as result_store:
+            self.assertRaises(ValueError, result_store.query_results, parameters=[('size', 'LIKE', '1')])
+            self.assertRaises(ValueError, result_store.query_results, honesty='xx')
@@ -18,7 +18,9 @@
 from unittest import TestCase
 
 from bdtsim.account import Account
-from bdtsim.simulation_result import SimulationResult, SimulationResultSerializer
+from bdtsim.account_related_diff_collection import FundsDiffCollection, ItemShareCollection
+from bdtsim.simulation_result import SimulationResult, SimulationResultSerializer, TransactionLogCollection, \
+    TransactionLogEntry, TransactionLogList
 
 
 buyer = Account('Buyer', '0x0633ee528dcfb901af1888d91ce451fc59a71ae7438832966811eb68ed97c173')
@@ -67,3 +69,51 @@ class SimulationResultSerializerTest(TestCase):
         serialized = serializer.serialize(sr_original)
         sr_restored = serializer.unserialize(serialized)
         self.assertEqual(sr_restored, sr_original)
+
+
+def tx(account: Account, gas_used: int, funds_diff: FundsDiffCollection,
+       item_share: ItemShareCollection) -> TransactionLogEntry:
+    return TransactionLogEntry(account, {'gasPrice': 2}, {'gasUsed': gas_used}, 'transaction', funds_diff, item_share)
+
+
+class AggregationTest(TestCase):
+    def test_transaction_log_list_aggregation(self) -> None:
+        tx_log_list = TransactionLogList()
+        tx_log_list.append(tx(seller, 100, FundsDiffCollection(), ItemShareCollection()))
+        tx_log_list.append(tx(buyer, 300, FundsDiffCollection({seller: 50, buyer: -50}), ItemShareCollection()))
+        tx_log_list.append(tx(seller, 0, FundsDiffCollection(), ItemShareCollection({seller: -1, buyer: 1})))
+        self.assertEqual({
+            seller: TransactionLogList.Aggregation.Entry(seller, 100, 2, 50, -150, -1),
+            buyer: TransactionLogList.Aggregation.Entry(buyer, 300, 1, -50, -650, 1)
+        }, tx_log_list.aggregation)
+
+    def test_transaction_log_collection_aggregation(self) -> None:
+        tx_log_collection = TransactionLogCollection()
+        for gas_used, funds_diff in (100, 10), (200, 0), (600, -40):
+            tx_log_list = TransactionLogList()
+            tx_log_list.append(tx(buyer, gas_used, FundsDiffCollection({buyer: funds_diff}), ItemShareCollection()))
+            tx_log_collection.append(tx_log_list)
+        tx_log_collection.append(TransactionLogList())
+        self.assertEqual({
+            buyer: TransactionLogCollection.Aggregation.Entry(
+                account=buyer,
+                tx_fees_min=100,
+                tx_fees_max=600,
+                tx_fees_mean=225.0,
+                tx_count_min=1,
+                tx_count_max=1,
+                tx_count_mean=0.75,
+                funds_diff_min=-40,
+                funds_diff_max=10,
+                balance_diff_min=-1240,
+                balance_diff_max=-190,
+                item_share_min=0,
+                item_share_max=0
+            )
+        }, tx_log_collection.aggregation)
+
+        aggregation_summary = TransactionLogCollection.Aggregation(TransactionLogCollection())
+        aggregation_summary += tx_log_collection.aggregation
+        aggregation_summary += tx_log_collection.aggregation
+        self.assertEqual(1200, aggregation_summary[buyer].tx_fees_max)
+        self.assertEqual(1.5, aggregation_summary[buyer].tx_count_mean)
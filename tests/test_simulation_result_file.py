@@ -0,0 +1,160 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+from typing import Any
+from unittest import TestCase
+
+from hexbytes.main import HexBytes
+
+from bdtsim.account import Account
+from bdtsim.account_related_diff_collection import FundsDiffCollection, ItemShareCollection
+from bdtsim.protocol_path import Choice
+from bdtsim.simulation_result import SimulationResult, TransactionLogEntry, TransactionLogList
+from bdtsim.simulation_result_file import SimulationResultFileReader, SimulationResultFileSerializer, \
+    SimulationResultFileWriter, PHASE_EXECUTION, TABLE_NODES, TABLE_TRANSACTIONS, compression_codec
+
+
+buyer = Account('Buyer', '0x0633ee528dcfb901af1888d91ce451fc59a71ae7438832966811eb68ed97c173')
+seller = Account('Seller', '0x3f2c7f45cb3014e2b9d12b7fb331bdfdad6170ce5e4a0d94890aa64162569756')
+operator = Account('Operator', '0x3f2c7f45cb3014e2b9d12b7fb331bdfdad6170ce5e4a0d94890aa64162569756')
+
+
+def tx(account: Account, gas_used: int, funds_diff: int = 0, item_share: float = 0) -> TransactionLogEntry:
+    return TransactionLogEntry(
+        account=account,
+        tx_dict={'gasPrice': 1000000000, 'data': b'\x01\x02'},
+        tx_receipt={'gasUsed': gas_used, 'logs': [{'topics': [b'\xff']}], 'transactionHash': HexBytes(b'\x0a')},
+        description='transaction',
+        funds_diff_collection=FundsDiffCollection({seller: funds_diff, buyer: -funds_diff}),
+        item_share_collection=ItemShareCollection({seller: -item_share, buyer: item_share})
+    )
+
+
+def create_simulation_result() -> SimulationResult:
+    simulation_result = SimulationResult(operator, seller, buyer)
+    simulation_result.preparation_transactions.append(tx(operator, 100000))
+
+    pay_choice = Choice(buyer, ('yes', 'no'), description='pay')
+    handover_choice = Choice(seller, ('yes', 'no'), description='hand over')
+    root = simulation_result.execution_result_root
+    for pay_outcome in 'yes', 'no':
+        root.tx_collection.append(TransactionLogList())
+        pay_node = root.child(pay_choice.choose(pay_outcome, 1.5))
+        pay_transactions = TransactionLogList()
+        if pay_outcome == 'yes':
+            pay_transactions.append(tx(buyer, 21000, 1000))
+            for handover_outcome in 'yes', 'no':
+                pay_node.tx_collection.append(pay_transactions)
+                handover_node = pay_node.child(handover_choice.choose(handover_outcome, 2.5))
+                handover_transactions = TransactionLogList()
+                if handover_outcome == 'yes':
+                    handover_transactions.append(tx(seller, 0, item_share=1))
+                handover_node.tx_collection.append(handover_transactions)
+        else:
+            pay_node.tx_collection.append(pay_transactions)
+    return simulation_result
+
+
+class SimulationResultFileTest(TestCase):
+    def assertAggregationsEqual(self, expected: SimulationResult, actual: SimulationResult) -> None:
+        expected_nodes = expected.execution_result_root.final_nodes
+        actual_nodes = actual.execution_result_root.final_nodes
+        self.assertEqual(len(expected_nodes), len(actual_nodes))
+        for expected_node, actual_node in zip(expected_nodes, actual_nodes):
+            self.assertEqual(expected_node.aggregation_summary, actual_node.aggregation_summary)
+            for account in seller, buyer:
+                self.assertEqual(expected_node.account_completely_honest(account),
+                                 actual_node.account_completely_honest(account))
+        self.assertEqual(expected.get_important_execution_results(), actual.get_important_execution_results())
+
+    def test_serialize_unserialize(self) -> None:
+        sr_original = create_simulation_result()
+        for compression in 'gzip', 'none':
+            serializer = SimulationResultFileSerializer(compression=compression, block_size=2)
+            sr_restored = serializer.unserialize(serializer.serialize(sr_original))
+            self.assertEqual(sr_original.preparation_transactions, sr_restored.preparation_transactions)
+            self.assertEqual(
+                [node.tx_collection for node in sr_original.execution_result_root.final_nodes],
+                [node.tx_collection for node in sr_restored.execution_result_root.final_nodes]
+            )
+            self.assertAggregationsEqual(sr_original, sr_restored)
+
+    def test_load_without_transactions(self) -> None:
+        sr_original = create_simulation_result()
+        with SimulationResultFileReader(SimulationResultFileSerializer().serialize(sr_original)) as reader:
+            self.assertEqual(5, len(list(reader.iter_rows(TABLE_NODES))))
+            sr_restored = reader.load(include_transactions=False)
+        self.assertEqual(0, len(sr_restored.preparation_transactions))
+        self.assertAggregationsEqual(sr_original, sr_restored)
+
+    def test_summary(self) -> None:
+        sr_original = create_simulation_result()
+        summary = sr_original.summary
+        final_nodes = sr_original.execution_result_root.final_nodes
+        self.assertEqual(len(final_nodes), len(summary.final_nodes))
+        for node, node_summary in zip(final_nodes, summary.final_nodes):
+            self.assertEqual(node.all_accounts_completely_honest(), node_summary.all_accounts_completely_honest())
+            for account in operator, seller, buyer:
+                self.assertEqual(node.account_completely_honest(account),
+                                 node_summary.account_completely_honest(account))
+            self.assertEqual(node.aggregation_summary, node_summary.aggregation_summary)
+
+        with SimulationResultFileReader(SimulationResultFileSerializer().serialize(sr_original)) as reader:
+            self.assertTrue(reader.has_summary)
+            # summary has to be readable without decoding any transactions
+            reader.iter_rows = self._iter_rows_without_transactions(reader)  # type: ignore
+            self.assertEqual(summary, reader.load_summary())
+        self.assertEqual(sr_original.get_important_execution_results(), summary.get_important_execution_results())
+
+    def test_summary_missing(self) -> None:
+        sr_original = create_simulation_result()
+        output = io.BytesIO()
+        with SimulationResultFileWriter(output) as writer:
+            writer.begin(operator, seller, buyer)
+            for node in sr_original.execution_result_root.final_nodes:
+                for tx_log_list in node.tx_collection:
+                    writer.add_transaction_list(PHASE_EXECUTION, tx_log_list, node)
+        with SimulationResultFileReader(output.getvalue()) as reader:
+            self.assertFalse(reader.has_summary)
+            self.assertEqual(len(sr_original.summary.final_nodes), len(reader.load_summary().final_nodes))
+
+    @staticmethod
+    def _iter_rows_without_transactions(reader: SimulationResultFileReader) -> Any:
+        iter_rows = reader.iter_rows
+
+        def wrapper(table: int) -> Any:
+            if table == TABLE_TRANSACTIONS:
+                raise AssertionError('transactions must not be read')
+            return iter_rows(table)
+        return wrapper
+
+    def test_truncated_file(self) -> None:
+        output = io.BytesIO()
+        writer = SimulationResultFileWriter(output, block_size=1)
+        writer.write_simulation_result(create_simulation_result())
+        # simulate aborted simulation: writer is not closed, no footer is written
+        with SimulationResultFileReader(output.getvalue()) as reader:
+            self.assertEqual(seller, reader.accounts[reader.metadata['seller']])
+            self.assertGreater(len(list(reader.iter_rows(TABLE_NODES))), 0)
+
+    def test_compression_codec(self) -> None:
+        self.assertEqual('gzip', compression_codec(True))
+        self.assertEqual('gzip', compression_codec('true'))
+        self.assertEqual('none', compression_codec('false'))
+        self.assertEqual('zstd', compression_codec('zstd'))
+        self.assertRaises(ValueError, compression_codec, 'foobar')
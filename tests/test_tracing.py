@@ -0,0 +1,113 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import json
+import threading
+import time
+from unittest import TestCase
+
+from bdtsim.account import Account
+from bdtsim.protocol_path import ProtocolPath
+from bdtsim.simulation_result import SimulationResult
+from bdtsim.simulation_result_file import SimulationResultFileSerializer
+from bdtsim.tracing import CATEGORY_PROTOCOL, CATEGORY_SIMULATION, NoOpSpan, Tracer, get_tracer, span, \
+    summarize_trace, tracing
+
+
+class TracingTest(TestCase):
+    def test_disabled(self) -> None:
+        self.assertIsNone(get_tracer())
+        with span('noop', CATEGORY_SIMULATION, key='value') as noop_span:
+            noop_span.set('other', 1)
+        self.assertIsInstance(noop_span, NoOpSpan)
+        self.assertIs(noop_span, span('other', CATEGORY_SIMULATION))
+
+    def test_chrome_trace(self) -> None:
+        with tracing() as tracer:
+            self.assertIs(tracer, get_tracer())
+            with span('outer', CATEGORY_SIMULATION, path='a'):
+                with span('inner', CATEGORY_PROTOCOL) as inner_span:
+                    time.sleep(0.01)
+                    inner_span.set('outcome', 'yes')
+                with self.assertRaises(ValueError):
+                    with span('inner', CATEGORY_PROTOCOL):
+                        raise ValueError()
+        self.assertIsNone(get_tracer())
+
+        trace = json.loads(json.dumps(tracer.to_chrome_trace()))
+        events = trace['traceEvents']
+        self.assertEqual(['outer', 'inner', 'inner'], [event['name'] for event in events])
+        self.assertEqual({'X'}, {event['ph'] for event in events})
+        outer, inner, failed = events
+        self.assertEqual({'path': 'a'}, outer['args'])
+        self.assertEqual({'outcome': 'yes'}, inner['args'])
+        self.assertEqual({'error': 'ValueError'}, failed['args'])
+        self.assertGreaterEqual(inner['dur'], 10000)
+        self.assertLessEqual(outer['ts'], inner['ts'])
+        self.assertGreaterEqual(outer['ts'] + outer['dur'], failed['ts'] + failed['dur'])
+
+        summary = summarize_trace(trace)
+        self.assertEqual(['outer', 'inner'], list(summary.keys()))
+        self.assertEqual(2, summary['inner']['count'])
+        self.assertAlmostEqual(summary['inner']['total'] / 2, summary['inner']['mean'])
+        self.assertGreaterEqual(summary['inner']['max'], 0.01)
+
+    def test_threads(self) -> None:
+        tracer = Tracer()
+        barrier = threading.Barrier(4)
+
+        def record() -> None:
+            with span('thread', CATEGORY_SIMULATION):
+                barrier.wait()
+
+        with tracing(tracer):
+            threads = [threading.Thread(target=record) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(4, len(tracer.spans))
+        self.assertEqual(4, len({event['tid'] for event in tracer.to_chrome_trace()['traceEvents']}))
+
+    def test_decide(self) -> None:
+        seller = Account('Seller', '0x' + '11' * 32)
+        protocol_path = ProtocolPath()
+        with tracing() as tracer:
+            protocol_path.decide(seller, 'Pay', ('yes', 'no'))
+        events = tracer.to_chrome_trace()['traceEvents']
+        self.assertEqual(1, len(events))
+        self.assertEqual('decide', events[0]['name'])
+        self.assertEqual({'subject': 'Seller', 'description': 'Pay', 'outcome': 'yes'}, events[0]['args'])
+
+    def test_embedded_trace(self) -> None:
+        accounts = [Account(name, '0x' + value * 32) for name, value in (('Operator', '11'), ('Seller', '22'),
+                                                                         ('Buyer', '33'))]
+        simulation_result = SimulationResult(*accounts)
+        self.assertIsNone(simulation_result.trace)
+        with tracing() as tracer:
+            with span('execute', CATEGORY_SIMULATION):
+                pass
+        simulation_result.trace = tracer.to_chrome_trace()
+
+        serializer = SimulationResultFileSerializer()
+        loaded = serializer.unserialize(serializer.serialize(simulation_result))
+        self.assertEqual(simulation_result.trace, loaded.trace)
+
+        output = io.StringIO()
+        tracer.write(output)
+        self.assertEqual(simulation_result.trace, json.loads(output.getvalue()))
@@ -0,0 +1,103 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import multiprocessing
+import os
+import tempfile
+import time
+from typing import List
+from unittest import TestCase
+
+from bdtsim.work_queue import CLAIMED_DIRECTORY, STATUS_FAILED, STATUS_SUCCESS, WorkQueue
+
+
+def claim_all(work_directory: str, worker_id: str) -> List[str]:
+    work_queue = WorkQueue(work_directory)
+    claimed_job_ids: List[str] = []
+    while True:
+        claimed = work_queue.claim(worker_id)
+        if claimed is None:
+            return claimed_job_ids
+        job_id, job_file = claimed
+        claimed_job_ids.append(job_id)
+        work_queue.complete(job_id, job_file, {'worker': worker_id})
+
+
+class WorkQueueTest(TestCase):
+    def test_claim_and_complete(self) -> None:
+        with tempfile.TemporaryDirectory() as work_directory:
+            work_queue = WorkQueue(work_directory)
+            work_queue.put('b', {'value': 2})
+            work_queue.put('a', {'value': 1})
+            claimed = work_queue.claim('worker')
+            self.assertIsNotNone(claimed)
+            assert claimed is not None
+            job_id, job_file = claimed
+            self.assertEqual('a', job_id)
+            self.assertEqual({'value': 1}, job_file['job'])
+            self.assertTrue(work_queue.renew(job_id))
+            self.assertTrue(work_queue.complete(job_id, job_file, {'answer': 42}))
+            self.assertFalse(work_queue.renew(job_id))
+            result = work_queue.get_result('a')
+            assert result is not None
+            self.assertEqual(STATUS_SUCCESS, result['status'])
+            self.assertEqual('worker', result['worker'])
+            self.assertEqual({'answer': 42}, result['result'])
+            self.assertEqual({'pending': 1, 'claimed': 0, 'done': 1}, work_queue.get_counts())
+
+    def test_retry(self) -> None:
+        with tempfile.TemporaryDirectory() as work_directory:
+            work_queue = WorkQueue(work_directory)
+            work_queue.put('a', {}, max_attempts=2)
+            claimed = work_queue.claim()
+            assert claimed is not None
+            self.assertTrue(work_queue.fail(claimed[0], claimed[1], 'first error'))
+            claimed = work_queue.claim()
+            assert claimed is not None
+            self.assertEqual(1, claimed[1]['attempts'])
+            self.assertFalse(work_queue.fail(claimed[0], claimed[1], 'second error'))
+            self.assertIsNone(work_queue.claim())
+            result = work_queue.get_result('a')
+            assert result is not None
+            self.assertEqual(STATUS_FAILED, result['status'])
+            self.assertEqual(['first error', 'second error'], result['errors'])
+
+    def test_lease_expiry(self) -> None:
+        with tempfile.TemporaryDirectory() as work_directory:
+            work_queue = WorkQueue(work_directory)
+            work_queue.put('a', {}, lease_duration=10)
+            claimed = work_queue.claim('crashed')
+            assert claimed is not None
+            self.assertEqual([], work_queue.requeue_expired())
+            claimed_path = os.path.join(work_directory, CLAIMED_DIRECTORY, 'a.json')
+            os.utime(claimed_path, (time.time() - 20, time.time() - 20))
+            self.assertEqual(['a'], work_queue.requeue_expired())
+            claimed = work_queue.claim('other')
+            assert claimed is not None
+            self.assertEqual(1, claimed[1]['attempts'])
+            self.assertEqual('other', claimed[1]['worker'])
+
+    def test_concurrent_claims(self) -> None:
+        with tempfile.TemporaryDirectory() as work_directory:
+            work_queue = WorkQueue(work_directory)
+            job_ids = ['%03i' % i for i in range(60)]
+            for job_id in job_ids:
+                work_queue.put(job_id, {})
+            with multiprocessing.Pool(4) as pool:
+                claimed_job_ids = pool.starmap(claim_all, [(work_directory, 'worker%i' % i) for i in range(4)])
+            self.assertEqual(job_ids, sorted(sum(claimed_job_ids, [])))
+            self.assertEqual(job_ids, work_queue.get_finished())
@@ -0,0 +1,141 @@
+# This file is part of the Blockchain Data Trading Simulator
+#    https://gitlab.com/MatthiasLohr/bdtsim
+#
+# Copyright 2021 Matthias Lohr <mail@mlohr.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import time
+from typing import Any, Iterator, List, Tuple
+from unittest import TestCase
+
+from bdtsim.worker_pool import TaskTimeoutError, WorkerDiedError, WorkerPool
+
+
+def square(value: int) -> int:
+    return value * value
+
+
+def count(limit: int) -> Iterator[int]:
+    for value in range(limit):
+        yield value
+
+
+def fail() -> None:
+    raise ValueError('expected failure')
+
+
+def sleep_then_yield(delays: List[float]) -> Iterator[float]:
+    for delay in delays:
+        time.sleep(delay)
+        yield delay
+
+
+def get_pid() -> int:
+    return os.getpid()
+
+
+def die_once(flag_path: str) -> None:
+    # the first worker process dies during initialization
+    try:
+        fd = os.open(flag_path, os.O_CREAT | os.O_EXCL)
+    except FileExistsError:
+        return
+    os.close(fd)
+    os._exit(1)
+
+
+def die() -> None:
+    os._exit(1)
+
+
+class WorkerPoolTest(TestCase):
+    def test_results(self) -> None:
+        results: List[Any] = []
+        with WorkerPool(2, poll_interval=0.05) as pool:
+            for value in range(5):
+                pool.submit(square, {'value': value}, callback=results.append)
+            pool.submit(count, {'limit': 3}, callback=results.append)
+            pool.close()
+        self.assertEqual([0, 0, 1, 1, 2, 4, 9, 16], sorted(results))
+
+    def test_error(self) -> None:
+        errors: List[Tuple[BaseException, int]] = []
+        results: List[Any] = []
+        with WorkerPool(1, poll_interval=0.05) as pool:
+            pool.submit(fail, error_callback=lambda error, items: errors.append((error, items)))
+            pool.submit(square, {'value': 3}, callback=results.append)
+            pool.close()
+        self.assertEqual(1, len(errors))
+        self.assertIsInstance(errors[0][0], ValueError)
+        self.assertEqual(0, errors[0][1])
+        self.assertEqual([9], results)
+
+    def test_timeout(self) -> None:
+        errors: List[Tuple[BaseException, int]] = []
+        items: List[Any] = []
+        with WorkerPool(1, task_timeout=0.5, poll_interval=0.05) as pool:
+            pool.submit(sleep_then_yield, {'delays': [0.01, 30]}, callback=items.append,
+                        error_callback=lambda error, completed: errors.append((error, completed)))
+            pool.submit(square, {'value': 4}, callback=items.append)
+            started = time.monotonic()
+            pool.close()
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual(1, len(errors))
+        self.assertIsInstance(errors[0][0], TaskTimeoutError)
+        self.assertEqual(1, errors[0][1])
+        self.assertEqual([0.01, 16], items)
+
+    def test_max_tasks_per_child(self) -> None:
+        pids: List[int] = []
+        with WorkerPool(1, max_tasks_per_child=2, poll_interval=0.05) as pool:
+            for _ in range(4):
+                pool.submit(get_pid, callback=pids.append)
+            pool.close()
+        self.assertEqual(4, len(pids))
+        self.assertEqual(2, len(set(pids)))
+
+    def test_submit_from_callback(self) -> None:
+        results: List[Any] = []
+
+        with WorkerPool(2, poll_interval=0.05) as pool:
+            def callback(result: int) -> None:
+                results.append(result)
+                if result < 256:
+                    pool.submit(square, {'value': result}, callback=callback)
+
+            pool.submit(square, {'value': 2}, callback=callback)
+            pool.close()
+        self.assertEqual([4, 16, 256], results)
+
+    def test_worker_died_during_initialization(self) -> None:
+        results: List[Any] = []
+        with tempfile.TemporaryDirectory() as directory:
+            with WorkerPool(1, initializer=die_once, initargs=(os.path.join(directory, 'died'), ),
+                            poll_interval=0.05) as pool:
+                pool.submit(square, {'value': 3}, callback=results.append)
+                pool.close()
+        self.assertEqual([9], results)
+
+    def test_repeated_initialization_failures(self) -> None:
+        errors: List[Tuple[BaseException, int]] = []
+        with WorkerPool(2, initializer=die, max_init_failures=3, poll_interval=0.05) as pool:
+            for value in range(2):
+                pool.submit(square, {'value': value},
+                            error_callback=lambda error, items: errors.append((error, items)))
+            pool.close()
+        self.assertEqual(2, len(errors))
+        self.assertIsInstance(errors[0][0], WorkerDiedError)
+        self.assertEqual(0, errors[0][1])